@@ -141,8 +141,24 @@ class Ciphertext:
             See "Handbook of Applied Cryptography" Algorithm 8.18 for the 
             meaning of the variables. An array is used because the encrypted 
             data might be longer than the cryptosystem's bit size.
+            For ciphertexts loaded with from_file(..., lazy=True), these are 
+            only decoded from the stored data when first accessed.
     """
     
+    def __getattr__(self, name):
+        """
+        Decode the encrypted data of a lazily loaded ciphertext on first access.
+        
+        (Only called when normal attribute lookup fails, that is, for gamma 
+        and delta before they have been decoded.)
+        """
+        if((name == "gamma" or name == "delta") and 
+           self.__dict__.has_key("_lazy_encrypted_data")):
+            self._load_encrypted_data_from_base64(self._lazy_encrypted_data)
+            del self._lazy_encrypted_data
+            return self.__dict__[name]
+        raise AttributeError(name)
+    
     def get_length(self):
         """
         Returns the length, in blocks, of the ciphertext.
@@ -238,6 +254,38 @@ class Ciphertext:
         self.gamma.append(gamma)
         self.delta.append(delta)
     
+    def is_in_group(self, prime):
+        """
+        Checks that all gamma and delta components lie in the group of the 
+        cryptosystem.
+        
+        PloneVoteCryptoLib's ElGamal works in the whole Z_{p}^{*} group (the 
+        generator has order p - 1), so this is a range check, much cheaper 
+        than any modular exponentiation: every component must be an integer 
+        between 1 and p - 1. (Checking quadratic residuosity would reject 
+        valid ciphertexts, half of which have components that are not 
+        quadratic residues.)
+        
+        Ciphertexts received from untrusted parties (such as voters) should 
+        be checked, since components outside the group can be used to attack 
+        the privacy of the election.
+        
+        Arguments:
+            prime::long -- The prime p of the cryptosystem.
+        
+        Returns:
+            result::bool    -- True if the ciphertext has at least one block 
+                               and all its components are in Z_{p}^{*}.
+        """
+        if(len(self.gamma) == 0 or len(self.gamma) != len(self.delta)):
+            return False
+        for values in (self.gamma, self.delta):
+            for value in values:
+                if(not isinstance(value, (int, long)) or 
+                   not (0 < value < prime)):
+                    return False
+        return True
+    
     def _encrypted_data_as_bitstream(self):
         """
         Returns the contents of this ciphertext as a BitStream object.
@@ -266,6 +314,11 @@ class Ciphertext:
         This includes only the encrypted data (gamma and delta components), not 
         the nbits and public key fingerprint metadata.
         """
+        # A lazily loaded ciphertext that was never decoded can be written back 
+        # as it was read.
+        if(self.__dict__.has_key("_lazy_encrypted_data")):
+            return self._lazy_encrypted_data
+        
         bitstream = self._encrypted_data_as_bitstream()
         bitstream.seek(0)
         length = bitstream.get_length()
@@ -275,7 +328,8 @@ class Ciphertext:
                 
         return bitstream.get_base64(length)
     
-    def to_file(self, filename, SerializerClass=serialize.XMLSerializer):
+    def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+                compression=None, compact=None):
         """
         Saves this ciphertext to a file.
         
@@ -289,6 +343,14 @@ class Ciphertext:
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            compression::string --
+                The compression to apply to the file, one of the 
+                serialize.COMPRESSION_* constants. None (default) means use 
+                serialize.DEFAULT_COMPRESSION. Compressed files are detected 
+                automatically by from_file.
+            compact::bool   --
+                Whether to omit formatting whitespace from the file. None 
+                (default) means use serialize.DEFAULT_COMPACT_OUTPUT.
         """
         # Create a new serializer object for the Ciphertext structure definition
         serializer = SerializerClass(Ciphertext_serialize_structure_definition)
@@ -303,10 +365,36 @@ class Ciphertext:
         }
         
         # Use the serializer to store the data to file
-        serializer.serialize_to_file(filename, data)
+        serializer.serialize_to_file(filename, data, compression=compression, 
+                                     compact=compact)
         
+    def _load_encrypted_data_from_base64(self, enc_data_str):
+        """
+        Sets the gamma and delta components of this ciphertext from a base64 
+        string, in the format produced by _encrypted_data_as_base64.
+        
+        Arguments:
+            enc_data_str::string    -- The encrypted data as a base64 string.
+        """
+        bitstream = BitStream()
+        bitstream.put_base64(enc_data_str)
+        bitstream.seek(0)
+        length = bitstream.get_length()
+        
+        #     number of gamma and delta blocks in the bitstream:
+        blocks = length / (self.nbits * 2)
+        
+        gamma = []
+        delta = []
+        for i in range(0, blocks):
+            gamma.append(bitstream.get_num(self.nbits))
+            delta.append(bitstream.get_num(self.nbits))
+        self.gamma = gamma
+        self.delta = delta
+    
     @classmethod
-    def from_file(cls, filename, SerializerClass=serialize.XMLSerializer):
+    def from_file(cls, filename, SerializerClass=serialize.XMLSerializer, 
+                  lazy=False):
         """
         Loads an instance of Ciphertext from the given file.
         
@@ -320,6 +408,13 @@ class Ciphertext:
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            lazy::bool  -- If True, the encrypted data is kept in its stored 
+                           form and only decoded when the gamma or delta 
+                           components are first accessed. nbits and 
+                           pk_fingerprint are available immediately. This 
+                           makes loading much cheaper when only the metadata 
+                           of the ciphertext is needed (e.g. to find the 
+                           election it belongs to).
         
         Throws:
             InvalidPloneVoteCryptoFileError -- If the file is not a valid 
@@ -354,19 +449,13 @@ class Ciphertext:
         # Construct a new Ciphertext object with the given nbits and fingerprint
         ciphertext = cls(nbits, fingerprint_str)
         
-        # Load the encrypted data
-        bitstream = BitStream()
-        bitstream.put_base64(enc_data_str)
-        bitstream.seek(0)
-        length = bitstream.get_length()
-        
-        #     number of gamma and delta blocks in the bitstream:
-        blocks = length / (nbits * 2)
-        
-        for i in range(0, blocks):
-            gamma_val = bitstream.get_num(nbits)
-            delta_val = bitstream.get_num(nbits)
-            ciphertext.append(gamma_val, delta_val)
+        # Load the encrypted data (or defer it, see __getattr__)
+        if(lazy):
+            del ciphertext.gamma
+            del ciphertext.delta
+            ciphertext._lazy_encrypted_data = enc_data_str
+        else:
+            ciphertext._load_encrypted_data_from_base64(enc_data_str)
         
         # Return the ciphertext
         return ciphertext
@@ -568,7 +568,8 @@ class EGCryptoSystem:
         string = "This should never be printed. - EGCryptoSystem.py"
         return self.to_stub(string, string).to_dom_element(doc)
         
-    def to_file(self, name, description, filename):
+    def to_file(self, name, description, filename, compression=None, 
+                compact=None):
         """
         Saves the current cryptosystem to a file.
         
@@ -576,9 +577,12 @@ class EGCryptoSystem:
         class method, or as an EGStub to avoid the overhead of verifying the 
         cryptosystem parameters.
         
-        A name and description must be stored within the file.
+        A name and description must be stored within the file. compression and 
+        compact are passed to EGStub.to_file.
         """
-        self.to_stub(name, description).to_file(filename)
+        self.to_stub(name, description).to_file(filename, 
+                                                compression=compression, 
+                                                compact=compact)
         
     @classmethod
     def from_file(self, filename):
@@ -715,7 +719,8 @@ class EGStub:
         
         return cs_scheme_element
         
-    def to_file(self, filename, SerializerClass=serialize.XMLSerializer):
+    def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+                compression=None, compact=None):
         """
         Saves this EGStub to a file.
         
@@ -729,6 +734,14 @@ class EGStub:
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            compression::string --
+                The compression to apply to the file, one of the 
+                serialize.COMPRESSION_* constants. None (default) means use 
+                serialize.DEFAULT_COMPRESSION. Compressed files are detected 
+                automatically by from_file.
+            compact::bool   --
+                Whether to omit formatting whitespace from the file. None 
+                (default) means use serialize.DEFAULT_COMPACT_OUTPUT.
         """
         # Create a new serializer object for the EGStub structure definition
         serializer = SerializerClass(EGStub_serialize_structure_definition)
@@ -756,7 +769,8 @@ class EGStub:
         }
         
         # Use the serializer to store the data to file
-        serializer.serialize_to_file(filename, data)
+        serializer.serialize_to_file(filename, data, compression=compression, 
+                                     compact=compact)
     
     # OBSOLETE: Remove as soon as all consuming classes through PVCL have been 
     # upgraded to use the serialize API
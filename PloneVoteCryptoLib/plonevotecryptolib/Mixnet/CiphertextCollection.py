@@ -38,6 +38,51 @@
 # THE SOFTWARE.
 # ============================================================================
 
+import threading
+
+import Crypto.Hash.SHA256	# sha256 is not available in python 2.4 standard lib
+
+# Use configuration parameters from params.py
+from plonevotecryptolib import params
+
+from plonevotecryptolib.Ciphertext import Ciphertext
+from plonevotecryptolib.Mixnet.CiphertextStorage import MemoryCiphertextStorage
+from plonevotecryptolib.Mixnet.CiphertextIngest import IngestReceipt
+from plonevotecryptolib.utilities.MerkleTree import MerkleTree
+import plonevotecryptolib.utilities.serialize as serialize
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextCollectionError
+from plonevotecryptolib.PVCExceptions import DuplicateCiphertextError
+from plonevotecryptolib.PVCExceptions import InvalidCiphertextCollectionMappingError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+from plonevotecryptolib.PVCExceptions import IncompatibleMixPrecomputationError
+
+CiphertextCollection_serialize_structure_definition = {
+	"PloneVoteCiphertextCollection" : (1, 1, {	# Root element
+		"nbits" : (1, 1, None),			# exactly 1 nbits element
+		"PKFingerprint" : (1, 1, None),	# exactly 1 PKFingerprint element
+		"EncryptedData" : (0, 0, None)	# any number of EncryptedData elements 
+										# (one per ciphertext, in order)
+	})
+}
+
+# Number of bytes of the digests used to detect duplicate ciphertexts
+_DUPLICATE_DIGEST_SIZE = 16
+
+def _duplicate_digest(ciphertext):
+	"""
+	Returns a digest of the gamma components of the given ciphertext.
+	
+	Two ciphertexts with the same digest are copies of each other (possibly 
+	with modified delta components).
+	DO NOT USE EXTERNALLY.
+	"""
+	hasher = Crypto.Hash.SHA256.new()
+	hasher.update(",".join(["%x" % gamma for gamma in ciphertext.gamma]))
+	return hasher.digest()[:_DUPLICATE_DIGEST_SIZE]
+
 class CiphertextCollection:
 	"""
 	An object representing an ordered collection of ciphertexts.
@@ -51,7 +96,27 @@ class CiphertextCollection:
 	ciphertext collection into a different collection encapsulating the same 
 	plaintexts.
 	
-	This class can be stored to and loaded to an XML file.
+	This class can be stored to and loaded from a file (see to_file and 
+	from_file).
+	
+	The ciphertexts are kept in a storage backend (see CiphertextStorage.py), 
+	in memory by default. Collections too large to be kept in memory can use 
+	a DiskCiphertextStorage instead. The collections derived from a 
+	collection (such as its shuffles) use a new storage of the same kind.
+	
+	A collection can also keep an index of its ciphertexts, by a digest of 
+	their gamma components, to reject copied ballots as they are added (see 
+	__init__ and find_duplicates).
+	
+	The fingerprint of a collection (see get_fingerprint) is the root of a 
+	Merkle tree over the fingerprints of its ciphertexts, which is cached and 
+	updated as ciphertexts are added. It also provides proofs that a given 
+	ciphertext is in the collection (see get_inclusion_proof). Ciphertexts 
+	must not be modified after being added to a collection.
+	
+	Ciphertexts can be added concurrently from several threads (see 
+	add_ciphertext, add_many and CiphertextIngest.py), but no other method 
+	should be called while ciphertexts are being added.
 	
 	Attributes:
 		public_key::PublicKey	-- The public key that was used to encrypt all 
@@ -62,7 +127,7 @@ class CiphertextCollection:
 		"""
 		Returns the number of ciphertexts in the collection.
 		"""
-		return len(self._ciphertexts)
+		return self._storage.get_length()
 	
 		
 	def __getitem__(self, i):
@@ -72,20 +137,23 @@ class CiphertextCollection:
 		Returns:
 			ciphertext::Ciphertext	-- Returns the ith ciphertext in the 
 									   collection. Index start at 0.
+		
+		Throws:
+			IndexError	-- If i is not between 0 and get_length() - 1.
 		"""
-		length = len(self._ciphertexts)
+		length = self._storage.get_length()
 		if(not (0 <= i < length)):
-			return ValueError("Index out of range: Got %d, expected index " \
-							  "between 0 and %d." % (i, length-1))
+			raise IndexError("Index out of range: Got %d, expected index " \
+							 "between 0 and %d." % (i, length-1))
 		
-		return self._ciphertexts[i]
+		return self._storage.get(i)
 	
 	
 	def __iter__(self):
 		"""
 		Return an iterator for the current ciphertext collection.
 		"""
-		return self._ciphertexts.__iter__()
+		return self._storage.__iter__()
 	
 	
 	def __eq__(self, other):
@@ -96,6 +164,8 @@ class CiphertextCollection:
 		elements and those elements are equal and in the same order. A 
 		CiphertextCollection object is not equal to any object of a different 
 		type.
+		
+		(Collections are compared by their fingerprints, see get_fingerprint.)
 		"""
 		if(not isinstance(other, CiphertextCollection)):
 			return False
@@ -103,11 +173,12 @@ class CiphertextCollection:
 		if(other.get_length() != self.get_length()):
 			return False
 		
-		for i in range(0, self.get_length()):
-			if(other[i] != self[i]):
-				return False
+		# Ciphertexts of different public keys are never equal
+		if(self.get_length() > 0 and 
+		   other._pk_fingerprint != self._pk_fingerprint):
+			return False
 		
-		return True
+		return (other.get_fingerprint() == self.get_fingerprint())
 	
 	
 	def __ne__(self, other):
@@ -120,44 +191,484 @@ class CiphertextCollection:
 		return not self.__eq__(other)
 	
 	
-	def __init__(self, public_key):
+	def __init__(self, public_key, storage=None, reject_duplicates=False):
 		"""
 		Constructs a new (empty) CiphertextCollection.
 		
 		Arguments:
 			(See class attributes)
+			storage::CiphertextStorage	-- An empty storage in which to keep 
+										   the ciphertexts of the collection. 
+										   A MemoryCiphertextStorage if not 
+										   given.
+			reject_duplicates::bool	-- If True, keep an index of the 
+									   ciphertexts of the collection and 
+									   refuse to add a ciphertext with the 
+									   same gamma components as one already 
+									   in the collection.
 		"""
 		self.public_key = public_key
 		# Cache the fingerprint to improve performance
 		self._pk_fingerprint = self.public_key.get_fingerprint()
-		self._ciphertexts = []
+		self._prime = self.public_key.cryptosystem.get_prime()
+		if(storage == None):
+			storage = MemoryCiphertextStorage()
+		self._storage = storage
+		
+		# Index of the digest of each ciphertext (see _duplicate_digest) to 
+		# its position in the collection, or None if reject_duplicates is False
+		self._duplicate_index = None
+		if(reject_duplicates):
+			self._duplicate_index = {}
+		
+		# Merkle tree over the fingerprints of the ciphertexts (see 
+		# get_fingerprint). It is only updated when needed, and might thus 
+		# cover only the first ciphertexts of the collection.
+		self._merkle_tree = MerkleTree()
+		
+		# Lock held while adding ciphertexts
+		self._lock = threading.Lock()
+	
+	
+	def __getstate__(self):
+		"""
+		Pickles the collection (without its lock).
+		"""
+		state = self.__dict__.copy()
+		del state["_lock"]
+		return state
+	
+	
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
 	
 		
-	def add_ciphertext(self, ciphertext):
+	def _check_ciphertext(self, ciphertext, blocks=None):
 		"""
-		Adds a new Ciphertext object to the CiphertextCollection.
+		Checks that a ciphertext can be added to this collection.
+		
+		This does not check for duplicates, but it returns the digest used to 
+		do so (see _duplicate_digest), if the collection rejects duplicates.
 		
 		Arguments:
-			ciphertext::Ciphertext	-- The ciphertext to add.
+			(see add_many)
+		
+		Returns:
+			digest::string	-- The digest of the ciphertext, or None.
 		
 		Throws:
-			IncompatibleCiphertextError	-- If the given ciphertext was not 
-										   encrypted with the public key for 
-										   this collection.
+			IncompatibleCiphertextError	-- If the ciphertext cannot be added.
 		"""
 		# Check that the ciphertext was encrypted with the correct public key 
 		# for this collection.
-		if(ciphertext.pk_fingerprint != self._pk_fingerprint):
+		if(ciphertext.pk_fingerprint != self._pk_fingerprint or 
+		   ciphertext.nbits != self.public_key.cryptosystem.get_nbits()):
 			raise IncompatibleCiphertextError("The given ciphertext is " \
 				"incompatible with this collection and cannot be added: It " \
 				"was not encrypted with the public key declared for the " \
 				"collection.")
 		
-		# Add the ciphertext
-		self._ciphertexts.append(ciphertext)
+		# Check that the ciphertext is well formed (see Ciphertext.is_in_group)
+		if(not ciphertext.is_in_group(self._prime)):
+			raise IncompatibleCiphertextError("The given ciphertext cannot " \
+				"be added to this collection: Its values are not in the " \
+				"group of the cryptosystem.")
+		
+		length = ciphertext.get_length()
+		if(blocks != None and length != blocks):
+			raise IncompatibleCiphertextError("The given ciphertext cannot " \
+				"be added to this collection: It has %d blocks." % length)
+		
+		if(self._duplicate_index == None):
+			return None
+		return _duplicate_digest(ciphertext)
 	
 	
-	def shuffle_with_proof(self):
+	def _add_checked(self, ciphertext, digest):
+		"""
+		Adds a ciphertext that passed _check_ciphertext(...), which returned 
+		digest. The lock of the collection must be held.
+		
+		Returns:
+			index::int	-- The index of the ciphertext in the collection.
+		
+		Throws:
+			DuplicateCiphertextError	-- (see add_ciphertext)
+		"""
+		index = self._storage.get_length()
+		
+		# Check that the ciphertext is not a copy of another one
+		if(digest != None):
+			copied = self._duplicate_index.get(digest)
+			if(copied != None):
+				raise DuplicateCiphertextError(copied, "The given ciphertext " \
+					"cannot be added to this collection: It is a copy of " \
+					"ciphertext #%d of the collection (same gamma " \
+					"components)." % copied)
+			self._duplicate_index[digest] = index
+		
+		self._storage.append(ciphertext)
+		return index
+	
+	
+	def _append_checked(self, batch):
+		"""
+		Adds a batch of ciphertexts that passed _check_ciphertext(...), 
+		completing their receipts.
+		
+		Arguments:
+			batch::(Ciphertext, string, IngestReceipt)[]	--
+				A list of tuples (ciphertext, digest, receipt), where digest 
+				is the value returned by _check_ciphertext(ciphertext).
+		"""
+		self._lock.acquire()
+		try:
+			for (ciphertext, digest, receipt) in batch:
+				try:
+					index = self._add_checked(ciphertext, digest)
+				except DuplicateCiphertextError, e:
+					receipt._reject(str(e))
+				else:
+					receipt._accept(index)
+		finally:
+			self._lock.release()
+	
+	
+	def add_ciphertext(self, ciphertext):
+		"""
+		Adds a new Ciphertext object to the CiphertextCollection.
+		
+		This method is thread-safe.
+		
+		Arguments:
+			ciphertext::Ciphertext	-- The ciphertext to add.
+		
+		Throws:
+			IncompatibleCiphertextError	-- If the given ciphertext was not 
+										   encrypted with the public key for 
+										   this collection, or any of its 
+										   values are outside the group of 
+										   the cryptosystem.
+			DuplicateCiphertextError	-- If the collection rejects 
+										   duplicates and the given ciphertext 
+										   has the same gamma components as 
+										   one already in the collection.
+		"""
+		digest = self._check_ciphertext(ciphertext)
+		
+		self._lock.acquire()
+		try:
+			self._add_checked(ciphertext, digest)
+		finally:
+			self._lock.release()
+	
+	
+	def add_many(self, ciphertexts, blocks=None):
+		"""
+		Adds several Ciphertext objects to the CiphertextCollection.
+		
+		Unlike add_ciphertext, this method does not raise an exception for the 
+		ciphertexts that cannot be added, but rejects them in their receipts. 
+		The ciphertexts are checked before taking the lock of the collection, 
+		which is then taken once for the whole list.
+		
+		This method is thread-safe.
+		
+		Arguments:
+			ciphertexts::Ciphertext[]	-- The ciphertexts to add, in order.
+			blocks::int	-- If given, reject the ciphertexts that do not have 
+						   exactly this number of blocks.
+		
+		Returns:
+			receipts::IngestReceipt[]	-- The receipt of each ciphertext, in 
+										   the same order.
+		"""
+		receipts = []
+		batch = []
+		for ciphertext in ciphertexts:
+			receipt = IngestReceipt(ciphertext)
+			receipts.append(receipt)
+			try:
+				digest = self._check_ciphertext(ciphertext, blocks)
+			except IncompatibleCiphertextError, e:
+				receipt._reject(str(e))
+			else:
+				batch.append((ciphertext, digest, receipt))
+		
+		self._append_checked(batch)
+		return receipts
+	
+	
+	def _update_merkle_tree(self):
+		"""
+		Adds the ciphertexts not yet in the Merkle tree of the collection.
+		"""
+		tree = self._merkle_tree
+		for i in range(tree.get_size(), self._storage.get_length()):
+			tree.append(self._storage.get(i).get_fingerprint())
+	
+	
+	def get_fingerprint(self):
+		"""
+		Gets a fingerprint of the current collection.
+		
+		The fingerprint is the root of the Merkle tree (in the format of 
+		RFC 6962, see utilities/MerkleTree.py) whose items are the 
+		fingerprints (Ciphertext.get_fingerprint()) of the ciphertexts in the 
+		collection, in order. It is cached, so that after adding ciphertexts 
+		only the new ones are hashed.
+		
+		Together with the length of the collection, the fingerprint can be 
+		published as a commitment to the collection, and used to check the 
+		proofs returned by get_inclusion_proof.
+		
+		Returns:
+			fingerprint::string -- A SHA-256 hexdigest providing a fingerprint 
+								   of the current collection.
+		"""
+		self._update_merkle_tree()
+		return self._merkle_tree.get_root().encode("hex")
+	
+	
+	def get_inclusion_proof(self, i):
+		"""
+		Gets a proof that the ith ciphertext is in the collection.
+		
+		The proof can be checked against the fingerprint and length of the 
+		collection alone, using verify_inclusion_proof(...). It contains 
+		O(log n) digests, for a collection of n ciphertexts.
+		
+		Arguments:
+			i::int	-- The index of the ciphertext in the collection.
+		
+		Returns:
+			proof::string[]	-- A list of SHA-256 hexdigests (the audit path of 
+							   the ciphertext in the Merkle tree of the 
+							   collection, see get_fingerprint).
+		
+		Throws:
+			IndexError	-- If i is not between 0 and get_length() - 1.
+		"""
+		self._update_merkle_tree()
+		return [digest.encode("hex") 
+				for digest in self._merkle_tree.get_inclusion_proof(i)]
+	
+	
+	@staticmethod
+	def verify_inclusion_proof(ciphertext, i, length, fingerprint, proof):
+		"""
+		Checks that a ciphertext is in a collection, given an inclusion proof.
+		
+		Arguments:
+			ciphertext::Ciphertext	-- The ciphertext.
+			i::int	-- The index of the ciphertext in the collection.
+			length::int	-- The number of ciphertexts in the collection.
+			fingerprint::string	-- The fingerprint of the collection (see 
+								   get_fingerprint).
+			proof::string[]	-- The proof, as returned by get_inclusion_proof.
+		
+		Returns:
+			result::bool	-- True if the proof shows that ciphertext is the 
+							   ith ciphertext of a collection with the given 
+							   length and fingerprint, False otherwise.
+		"""
+		try:
+			root = fingerprint.decode("hex")
+			proof = [digest.decode("hex") for digest in proof]
+		except TypeError:
+			return False
+		return MerkleTree.verify_inclusion_proof(ciphertext.get_fingerprint(), 
+												 i, length, proof, root)
+	
+	
+	def find_duplicates(self):
+		"""
+		Finds the ciphertexts of the collection which are copies of each other.
+		
+		Two ciphertexts are considered copies if they have the same gamma 
+		components. This takes a single pass over the collection (or none, 
+		if the collection rejects duplicates).
+		
+		Returns:
+			duplicates::int[][]	-- A list with a list of the indexes of each 
+								   group of ciphertexts which are copies of 
+								   each other, in increasing order (of the 
+								   first index of each group). Empty if there 
+								   are no copies.
+		"""
+		# A collection that rejects duplicates cannot contain any
+		if(self._duplicate_index != None):
+			return []
+		
+		groups = {}
+		duplicates = []
+		i = 0
+		for ciphertext in self._storage:
+			digest = _duplicate_digest(ciphertext)
+			group = groups.get(digest)
+			if(group == None):
+				groups[digest] = i
+			else:
+				if(not isinstance(group, list)):
+					# (second ciphertext with this digest, start a new group)
+					group = [group]
+					groups[digest] = group
+					duplicates.append(group)
+				group.append(i)
+			i += 1
+		
+		duplicates.sort()
+		return duplicates
+	
+	
+	def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+				compression=None, compact=None):
+		"""
+		Saves this ciphertext collection to a file.
+		
+		The public key of the collection is not stored, only its fingerprint. 
+		The same public key must be given to from_file to load the collection.
+		
+		Arguments:
+			filename::string	-- The path to the file in which to store the 
+								   serialized CiphertextCollection object.
+			SerializerClass::class --
+				The class that provides the serialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate serialize_to_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+			compression::string --
+				The compression to apply to the file, one of the 
+				serialize.COMPRESSION_* constants. None (default) means use 
+				serialize.DEFAULT_COMPRESSION.
+			compact::bool	--
+				Whether to omit formatting whitespace from the file. None 
+				(default) means use serialize.DEFAULT_COMPACT_OUTPUT.
+		"""
+		# Create a new serializer object for the collection structure 
+		# definition
+		serializer = SerializerClass(
+							CiphertextCollection_serialize_structure_definition)
+		
+		# Generate a serializable data dictionary matching the definition:
+		data = {"PloneVoteCiphertextCollection" : self._to_data()}
+		
+		# Use the serializer to store the data to file
+		serializer.serialize_to_file(filename, data, compression=compression, 
+									 compact=compact)
+	
+	@classmethod
+	def from_file(cls, filename, public_key, 
+				  SerializerClass=serialize.XMLSerializer, storage=None, 
+				  reject_duplicates=False):
+		"""
+		Loads an instance of CiphertextCollection from the given file.
+		
+		Arguments:
+			filename::string	-- The name of a file containing the collection 
+								   in serialized form.
+			public_key::PublicKey	-- The public key of the collection (must 
+									   match the fingerprint stored in the 
+									   file).
+			SerializerClass::class --
+				The class that provides the deserialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate deserialize_from_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+			storage::CiphertextStorage	-- An empty storage in which to keep 
+										   the ciphertexts loaded. (See 
+										   __init__)
+			reject_duplicates::bool	-- Whether the collection loaded rejects 
+									   duplicates. (See __init__)
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the file is not a valid 
+											   PloneVoteCryptoLib stored 
+											   ciphertext collection file for 
+											   the given public key.
+			DuplicateCiphertextError	-- If reject_duplicates is True and 
+										   the file contains copies of a 
+										   ciphertext.
+		"""
+		# Create a new serializer object for the collection structure 
+		# definition
+		serializer = SerializerClass(
+							CiphertextCollection_serialize_structure_definition)
+		
+		# Deserialize the CiphertextCollection instance from file
+		try:
+			data = serializer.deserialize_from_file(filename)
+		except serialize.InvalidSerializeDataError, e:
+			# Convert the exception to an InvalidPloneVoteCryptoFileError
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a valid ciphertext collection. " \
+				"The following error occurred while trying to deserialize " \
+				"the file contents: %s" % (filename, str(e)))
+		
+		return cls._from_data(data["PloneVoteCiphertextCollection"], 
+							  public_key, filename, storage, reject_duplicates)
+	
+	def _to_data(self):
+		"""
+		Returns the contents of the root element of the serialized collection 
+		(see CiphertextCollection_serialize_structure_definition).
+		
+		Used by to_file, and by the proofs of shuffling to store their 
+		collections.
+		"""
+		return {
+			"nbits" : str(self.public_key.cryptosystem.get_nbits()),
+			"PKFingerprint" : self._pk_fingerprint,
+			"EncryptedData" : [ciphertext._encrypted_data_as_base64() 
+							   for ciphertext in self._storage]
+		}
+	
+	@classmethod
+	def _from_data(cls, root, public_key, filename, storage=None, 
+				   reject_duplicates=False):
+		"""
+		Returns the collection stored in the given contents of the root 
+		element of a serialized collection (see _to_data).
+		
+		Used by from_file, and by the proofs of shuffling to load their 
+		collections. filename is the name of the file (or stream) being 
+		loaded, used for error messages. See from_file for the rest of the 
+		arguments and the exceptions raised.
+		"""
+		# Check that the collection belongs to the given public key
+		collection = cls(public_key, storage, reject_duplicates)
+		nbits = public_key.cryptosystem.get_nbits()
+		if(root["PKFingerprint"] != collection._pk_fingerprint or 
+		   root["nbits"] != str(nbits)):
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a ciphertext collection for the " \
+				"given public key." % filename)
+		
+		# Load the ciphertexts
+		enc_data_list = root.get("EncryptedData", [])
+		if(not isinstance(enc_data_list, list)):
+			enc_data_list = [enc_data_list]
+		
+		for enc_data_str in enc_data_list:
+			ciphertext = Ciphertext(nbits, collection._pk_fingerprint)
+			try:
+				ciphertext._load_encrypted_data_from_base64(enc_data_str)
+				collection.add_ciphertext(ciphertext)
+			except (ValueError, IncompatibleCiphertextError), e:
+				raise InvalidPloneVoteCryptoFileError(filename, 
+					"File \"%s\" contains an invalid ciphertext: %s" \
+					% (filename, str(e)))
+		
+		return collection
+	
+	
+	def shuffle_with_proof(self, workers=None, ProofClass=None, 
+						   precomputation=None, checkpoint_dir=None):
 		"""
 		Produce a verifiable shuffle of this ciphertext collection.
 		
@@ -178,6 +689,27 @@ class CiphertextCollection:
 		http://www.usenix.org/event/evt06/tech/full_papers/benaloh/benaloh.pdf 
 		for more information.)
 		
+		Arguments:
+			workers::int	-- If greater than 1, shuffle the collection and 
+							   generate the proof using that many worker 
+							   processes (see ShufflingProof.new).
+			ProofClass::class	-- The class of proof of shuffling to 
+								   generate: ShufflingProof (the default) or 
+								   LinearShufflingProof, which is much 
+								   faster to generate and verify for large 
+								   collections.
+			precomputation::MixPrecomputation	--
+				If given, take the mapping of the shuffle (and, for a 
+				ShufflingProof, those of its shadow shuffles) from this 
+				precomputation instead of generating them, so that almost no 
+				modular exponentiations are needed to shuffle. The mappings 
+				used are removed from the precomputation.
+			checkpoint_dir::string	--
+				If given (and ProofClass is ShufflingProof), checkpoint the 
+				shadow shuffles of the proof in this directory, and resume 
+				from them if the same collection is shuffled again after an 
+				interruption (see checkpoint_dir in ShufflingProof.new).
+		
 		Returns:
 			(shuffled_collection, proof)::
 				(CiphertextCollection, ShufflingProof)
@@ -197,6 +729,12 @@ class CiphertextCollection:
 			ValueError --
 				If params.SHUFFLING_PROOF_SECURITY_PARAMETER is within an 
 				invalid range.
+			IncompatibleCiphertextCollectionError --
+				If ProofClass is LinearShufflingProof and the ciphertexts in 
+				this collection are not all of the same length in blocks.
+			IncompatibleMixPrecomputationError --
+				If precomputation cannot provide the mappings needed to 
+				shuffle this collection.
 		"""
 		# Import CiphertextCollectionMapping and ShufflingProof
 		
@@ -216,12 +754,30 @@ class CiphertextCollection:
 		from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import CiphertextCollectionMapping
 		from plonevotecryptolib.Mixnet.ShufflingProof import ShufflingProof
 		
+		if(ProofClass == None):
+			ProofClass = ShufflingProof
+		
 		# Create a mapping from the current collection into a random shuffling
-		mapping = CiphertextCollectionMapping.new(self)
+		# (checking first that the precomputation has enough mappings left). 
+		# When resuming from checkpoint_dir, fewer shadow shuffles may be 
+		# needed, which only ShufflingProof.new knows after loading the 
+		# checkpoint, so we leave that check to it.
+		if(precomputation != None):
+			needed = 1
+			if(ProofClass == ShufflingProof and checkpoint_dir == None):
+				needed += params.SHUFFLING_PROOF_SECURITY_PARAMETER
+			if(precomputation.get_remaining() < needed):
+				raise IncompatibleMixPrecomputationError("The " \
+					"precomputation has %d mappings left, but %d are needed " \
+					"to shuffle with proof." \
+					% (precomputation.get_remaining(), needed))
+			mapping = precomputation.next_mapping(self)
+		else:
+			mapping = CiphertextCollectionMapping.new(self)
 		
 		# Apply the mapping to obtain the resulting shuffled collection
 		try:
-			shuffled_collection = mapping.apply(self)
+			shuffled_collection = mapping.apply(self, workers)
 		except IncompatibleCiphertextCollectionError:
 			assert False, "IncompatibleCiphertextCollectionError may not be " \
 						"raised when applying a mapping M created using " \
@@ -229,7 +785,13 @@ class CiphertextCollection:
 		
 		# Generate the zero-knowledge proof of shuffling
 		try:
-			proof = ShufflingProof.new(self, shuffled_collection, mapping)
+			if(ProofClass == ShufflingProof):
+				proof = ProofClass.new(self, shuffled_collection, mapping, 
+									   workers, precomputation=precomputation, 
+									   checkpoint_dir=checkpoint_dir)
+			else:
+				proof = ProofClass.new(self, shuffled_collection, mapping, 
+									   workers)
 		except InvalidCiphertextCollectionMappingError:
 			assert False, "InvalidCiphertextCollectionMappingError may not be " \
 						"raised when shuffled_collection was created from the " \
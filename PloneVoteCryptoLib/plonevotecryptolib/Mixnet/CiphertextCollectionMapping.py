@@ -44,35 +44,182 @@
 # THE SOFTWARE.
 # ============================================================================
 
-# secure version of python's random:
-from Crypto.Random.random import StrongRandom
+import base64
+import binascii
+import itertools
+import struct
+from array import array
+
+import Crypto.Util.number
+
+# Buffered CSPRNG, with uniform integers and permutations:
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+# Process pools for apply and rebase:
+import plonevotecryptolib.utilities.parallel as parallel
 
 # Use configuration parameters from params.py
 from plonevotecryptolib import params
 
 from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
 from plonevotecryptolib.Mixnet.CiphertextReencryptionInfo import CiphertextReencryptionInfo
+import plonevotecryptolib.utilities.serialize as serialize
 # Exceptions:
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
 from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextCollectionError
 from plonevotecryptolib.PVCExceptions import IncompatibleReencryptionInfoError
 from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextCollectionMappingError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+CiphertextCollectionMapping_serialize_structure_definition = {
+	"PloneVoteCiphertextCollectionMapping" : (1, 1, {	# Root element
+		# (nbits is 0, and PKFingerprint and Reordering are omitted, for 
+		# empty mappings)
+		"nbits" : (1, 1, None),			# exactly 1 nbits element
+		"PKFingerprint" : (0, 1, None),	# 0 or 1 PKFingerprint elements
+		"Reordering" : (0, 1, None),	# 0 or 1 Reordering elements
+		"Seed" : (0, 1, None),			# 0 or 1 Seed elements
+		"Reencryption" : (0, 0, {		# one Reencryption element per 
+										# ciphertext (in order)
+			# (only the exponents are stored when they are known, otherwise 
+			# only the blocks)
+			"Blocks" : (0, 1, None),	# 0 or 1 Blocks elements
+			"Exponents" : (0, 1, None)	# 0 or 1 Exponents elements
+		})
+	})
+}
+
+def _numbers_to_base64(numbers, nbytes):
+	"""
+	Encodes a list of non-negative numbers as a base64 string, with each 
+	number stored as nbytes big-endian bytes.
+	"""
+	return base64.b64encode("".join(
+				[Crypto.Util.number.long_to_bytes(n, nbytes) for n in numbers]))
 
-def _random_shuffle_in_place(strong_random, l):
+def _numbers_from_base64(data, nbytes):
 	"""
-	This method is a workaround for pycrypto's bug 720310 
-	(https://bugs.launchpad.net/pycrypto/+bug/720310). 
-	It implements StrongRandom.shuffle(l).
+	Decodes a list of numbers encoded by _numbers_to_base64.
+	
+	Throws:
+		ValueError	-- If data is not valid base64 or its length is not a 
+					   multiple of nbytes.
+	"""
+	try:
+		raw = base64.b64decode(data)
+	except (TypeError, binascii.Error):
+		raise ValueError("Invalid base64 data.")
+	if(len(raw) % nbytes != 0):
+		raise ValueError("Expected a multiple of %d bytes, got %d bytes." \
+						 % (nbytes, len(raw)))
+	return [Crypto.Util.number.bytes_to_long(raw[i:i + nbytes]) 
+			for i in range(0, len(raw), nbytes)]
+
+# Number of tasks per worker process into which apply and rebase divide the 
+# indexes of the collection (more, smaller tasks balance the work better 
+# between workers, fewer reduce the communication overhead)
+_TASKS_PER_WORKER = 4
+
+def _split_range(length, workers):
+	"""
+	Splits the indexes 0, ..., length - 1 into consecutive ranges, as a list 
+	of (start, end) tuples, for processing by the given number of workers.
 	DO NOT USE EXTERNALLY.
 	"""
-	# Make a (copy) of the list of objects we want to shuffle
-	items = list(l)
+	tasks = workers * _TASKS_PER_WORKER
+	chunk_size = max(1, (length + tasks - 1) / tasks)
+	return [(start, min(start + chunk_size, length)) 
+			for start in range(0, length, chunk_size)]
 
-	# Choose a random item (without replacement) until all the items have been
-	# chosen.
-	for i in xrange(len(l)):
-		p = strong_random.randint(0, len(items) - 1)
-		l[i] = items[p]
-		del items[p]
+def _reencrypt(mapping, collection, i):
+	"""
+	Re-encrypts the ith ciphertext of collection, as done by mapping.apply.
+	
+	Throws:
+		IncompatibleCiphertextCollectionError	-- (see apply)
+	DO NOT USE EXTERNALLY.
+	"""
+	try:
+		return mapping._reencryptions[i].apply(collection[i])
+	except IncompatibleCiphertextError, e:
+		raise IncompatibleCiphertextCollectionError( \
+			"The given collection is incompatible with this mapping. " \
+			"The ciphertext #%d in the collection cannot be " \
+			"re-encrypted with the corresponding re-encryption " \
+			"associated with this mapping. Internal exception message "\
+			"is \"%s\". To create a new random mapping compatible " \
+			"with the given collection, use " \
+			"CiphertextCollectionMapping.new(...)." % (i,e.msg))
+
+def _subtract(mapping, other_mapping, i):
+	"""
+	Returns the re-encryption of index i of the result of 
+	mapping.rebase(other_mapping).
+	
+	Throws:
+		IncompatibleCiphertextCollectionMappingError	-- (see rebase)
+	DO NOT USE EXTERNALLY.
+	"""
+	try:
+		return mapping._reencryptions[i].subtract(
+											other_mapping._reencryptions[i])
+	except IncompatibleReencryptionInfoError, e:
+		raise IncompatibleCiphertextCollectionMappingError( \
+			"The given ciphertext collection mappings are incompatible"\
+			" for rebase. It is likely that the origin collection for "\
+			"each mapping is not the same. In particular, it would " \
+			"seem that the %dth element of the origin collection is " \
+			"incompatible between mappings. Inner exception message: " \
+			"\"%s\"" % (i, str(e)))
+
+# Data shared by all tasks run in a worker process of an apply or rebase 
+# pool. (Set once per process by _init_worker)
+_worker_data = {}
+
+def _init_worker(data):
+	"""
+	Initializes a worker process of an apply or rebase pool.
+	DO NOT USE EXTERNALLY.
+	"""
+	_worker_data.update(data)
+
+def _apply_task(task):
+	"""
+	Worker process task: re-encrypts the ciphertexts for the positions start 
+	to end - 1 of the shuffled collection.
+	
+	Takes a tuple (start, end) and returns the list of re-encrypted 
+	ciphertexts, or the message of the IncompatibleCiphertextCollectionError 
+	raised, as a string.
+	DO NOT USE EXTERNALLY.
+	"""
+	(start, end) = task
+	mapping = _worker_data["mapping"]
+	collection = _worker_data["collection"]
+	original_indexes = _worker_data["original_indexes"]
+	try:
+		return [_reencrypt(mapping, collection, i) 
+				for i in original_indexes[start:end]]
+	except IncompatibleCiphertextCollectionError, e:
+		return str(e)
+
+def _rebase_task(task):
+	"""
+	Worker process task: computes the re-encryptions of the indexes start to 
+	end - 1 of the result of a rebase.
+	
+	Takes a tuple (start, end) and returns the list of re-encryptions, or the 
+	message of the IncompatibleCiphertextCollectionMappingError raised, as a 
+	string.
+	DO NOT USE EXTERNALLY.
+	"""
+	(start, end) = task
+	mapping = _worker_data["mapping"]
+	other_mapping = _worker_data["other_mapping"]
+	try:
+		return [_subtract(mapping, other_mapping, i) 
+				for i in range(start, end)]
+	except IncompatibleCiphertextCollectionMappingError, e:
+		return str(e)
 
 class CiphertextCollectionMapping:
 	"""
@@ -109,6 +256,8 @@ class CiphertextCollectionMapping:
 	#	  element of the original collection corresponds to the 
 	#	  self._reordering[i]-th element of the shuffled collection that 
 	#	  results of applying this mapping to the original collection.
+	#	  (Stored as an array('l') of indexes, rather than a list, to save 
+	#	  memory for large collections.)
 	#
 	#	* self._reencryptions is a list of CiphertextReencryptionInfo objects 
 	#	  providing the re-encryption information between individual elements 
@@ -120,6 +269,10 @@ class CiphertextCollectionMapping:
 	#	  original collection into the self._reordering[i]-th element of the 
 	#	  shuffled collection.
 	#
+	#	* self._seed, the seed from which the mapping was derived, if it was 
+	#	  created by new(...) with a seed, or None otherwise. Such a mapping 
+	#	  can be regenerated from the collection and the seed alone.
+	#
 	##
 	
 	def __init__(self):
@@ -130,11 +283,12 @@ class CiphertextCollectionMapping:
 		CiphertextCollectionMapping.new(...) for creating a new 
 		CiphertextCollectionMapping object for a particular collection.
 		"""
-		self._reordering = []
+		self._reordering = array('l')
 		self._reencryptions = []
+		self._seed = None
 	
 	@classmethod
-	def new(cls, collection):
+	def new(cls, collection, seed=None):
 		"""
 		Generate a new mapping compatible with the given collection.
 		
@@ -150,9 +304,17 @@ class CiphertextCollectionMapping:
 		as well as using the same public key for re-encryption as the one used 
 		to encrypt the elements of the original collection.
 		
+		If a seed is given, the mapping is derived deterministically from it 
+		(see RandomSource), so that calling new(...) again with the same 
+		collection and seed produces the same mapping. Anyone who knows the 
+		seed can regenerate the mapping, so seeded mappings must be kept 
+		exactly as secret as the mappings themselves.
+		
 		Arguments:
 			collection::CiphertextCollection -- The collection for which we 
 												wish to generate a new mapping.
+			seed::string	-- A seed obtained from RandomSource.new_seed() 
+							   (optional).
 		
 		Returns:
 			mapping::CiphertextCollectionMapping --
@@ -164,28 +326,25 @@ class CiphertextCollectionMapping:
 		
 		# Create an empty mapping
 		mapping = CiphertextCollectionMapping()
+		mapping._seed = seed
 		
-		# Generate a list of all collection element indexes
-		for i in range(0, length):
-			mapping._reordering.append(i)
-		
-		# Randomly permute those indexes to generate a reordering
-		random = StrongRandom()
-		### random.shuffle(self._reordering) is broken upstream, workaround: 
-		_random_shuffle_in_place(random, mapping._reordering)
+		# Generate a random permutation of all collection element indexes, 
+		# to use as the reordering (Fisher-Yates, linear time)
+		random = RandomSource(seed=seed)
+		mapping._reordering = random.permutation(length)
 		
 		# Generate a random re-encryption for each ciphertext in the collection
 		for ciphertext in collection:
 			ciphertext_len = ciphertext.get_length()
-			reencryption = \
-				CiphertextReencryptionInfo.new(public_key, ciphertext_len)
+			reencryption = CiphertextReencryptionInfo.new(public_key, 
+												ciphertext_len, random)
 			mapping._reencryptions.append(reencryption)
 		
 		# Return the generated mapping
 		return mapping
 		
 		
-	def apply(self, collection):
+	def apply(self, collection, workers=None):
 		"""
 		Apply this mapping to the given collection.
 		
@@ -203,6 +362,9 @@ class CiphertextCollectionMapping:
 			collection::CiphertextCollection	-- The collection to which to 
 												   apply this mapping, 
 												   thus shuffling it.
+			workers::int	-- If greater than 1, re-encrypt the ciphertexts in 
+							   that many worker processes, each taking 
+							   consecutive ranges of the shuffled collection.
 		
 		Returns:
 			shuffled_collection::CiphertextCollection	--
@@ -229,40 +391,43 @@ class CiphertextCollectionMapping:
 					"CiphertextCollectionMapping.new(...)." % \
 					(len(self._reencryptions), length))
 		
-		# Create a temporary array to store the mapped ciphertexts
-		ciphertexts = [None for i in range(0, length)]
+		# Create the shuffled collection, in a new storage of the same kind as 
+		# that of the given collection
+		shuffled_collection = CiphertextCollection(collection.public_key, 
+										collection._storage.new_storage())
 		
-		# For each ciphertext in the original collection
+		# Compute the index in the original collection of each position of 
+		# the shuffled collection, so that the shuffled collection can be 
+		# filled in order (storages are append-only)
+		original_indexes = array('l', [0]) * length
 		for i in range(0, length):
-			ciphertext = collection[i]
-			
-			# Re-encrypt the ciphertext with the corresponding re-encryption 
-			# info.
-			reencryption = self._reencryptions[i]
-			
-			try:
-				reencrypted_ciphertext = reencryption.apply(ciphertext)
-			except IncompatibleCiphertextError, e:
-				raise IncompatibleCiphertextCollectionError( \
-					"The given collection is incompatible with this mapping. " \
-					"The ciphertext #%d in the collection cannot be " \
-					"re-encrypted with the corresponding re-encryption " \
-					"associated with this mapping. Internal exception message "\
-					"is \"%s\". To create a new random mapping compatible " \
-					"with the given collection, use " \
-					"CiphertextCollectionMapping.new(...)." % (i,e.msg))
-					
-			# Get the index after re-ordering
-			index = self._reordering[i]
-			
-			# Store the re-encrypted ciphertext at that index in the temp array
-			ciphertexts[index] = reencrypted_ciphertext
+			original_indexes[self._reordering[i]] = i
+		
+		if(not parallel.is_parallel(workers)):
+			# For each position in the shuffled collection
+			for i in original_indexes:
+				shuffled_collection.add_ciphertext(
+										_reencrypt(self, collection, i))
+			return shuffled_collection
+		
+		# Re-encrypt ranges of positions in parallel, adding them to the 
+		# shuffled collection in order
+		pool = parallel.new_pool(workers, _init_worker, 
+								 ({"mapping" : self, 
+								   "collection" : collection, 
+								   "original_indexes" : original_indexes},))
+		success = False
+		try:
+			for result in pool.imap(_apply_task, 
+									_split_range(length, workers)):
+				if(isinstance(result, str)):
+					raise IncompatibleCiphertextCollectionError(result)
+				for ciphertext in result:
+					shuffled_collection.add_ciphertext(ciphertext)
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
 		
-		# Turn the temp array into a new CiphertextCollection and return it
-		shuffled_collection = CiphertextCollection(collection.public_key)
-		for ciphertext in ciphertexts:
-			shuffled_collection.add_ciphertext(ciphertext)
-			
 		return shuffled_collection
 	
 	def verify(self, original_collection, shuffled_collection):
@@ -298,14 +463,227 @@ class CiphertextCollectionMapping:
 							   mapping.
 							   False otherwise.
 		"""
-		try:
-			original_shuffled = self.apply(original_collection)
-		except IncompatibleCiphertextCollectionError:
+		if(not isinstance(shuffled_collection, CiphertextCollection)):
+			return False
+		
+		# Check that the lengths of both collections are compatible with this 
+		# mapping
+		length = original_collection.get_length()
+		assert len(self._reencryptions) == len(self._reordering)
+		if(length != len(self._reencryptions) or 
+		   length != shuffled_collection.get_length()):
 			return False
 		
-		return (original_shuffled == shuffled_collection)
+		# Check each ciphertext of the original collection against the 
+		# ciphertext it is mapped to in the shuffled collection, one at a time 
+		# (without building the shuffled collection that apply(...) would 
+		# return), stopping at the first one that does not match.
+		i = 0
+		for ciphertext in original_collection:
+			shuffled_ciphertext = shuffled_collection[self._reordering[i]]
+			if(not self._reencryptions[i].verify(ciphertext, 
+												 shuffled_ciphertext)):
+				return False
+			i += 1
+		
+		return True
 	
-	def rebase(self, other_mapping):
+	def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+				compression=None, compact=None):
+		"""
+		Saves this mapping to a file.
+		
+		Note that a CiphertextCollectionMapping reveals the correspondence 
+		between the ciphertexts of two collections, so it should only be 
+		stored where that is acceptable (e.g. for a mapping disclosed as part 
+		of a ShufflingProof).
+		
+		Arguments:
+			filename::string	-- The path to the file in which to store the 
+								   serialized CiphertextCollectionMapping.
+			SerializerClass::class --
+				The class that provides the serialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate serialize_to_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+			compression::string --
+				The compression to apply to the file, one of the 
+				serialize.COMPRESSION_* constants. None (default) means use 
+				serialize.DEFAULT_COMPRESSION.
+			compact::bool	--
+				Whether to omit formatting whitespace from the file. None 
+				(default) means use serialize.DEFAULT_COMPACT_OUTPUT.
+		"""
+		# Create a new serializer object for the mapping structure definition
+		serializer = SerializerClass(
+					CiphertextCollectionMapping_serialize_structure_definition)
+		
+		# Generate a serializable data dictionary matching the definition:
+		data = {"PloneVoteCiphertextCollectionMapping" : self._to_data()}
+		
+		# Use the serializer to store the data to file
+		serializer.serialize_to_file(filename, data, compression=compression, 
+									 compact=compact)
+	
+	def _to_data(self):
+		"""
+		Returns the contents of the root element of the serialized mapping 
+		(see CiphertextCollectionMapping_serialize_structure_definition).
+		
+		Used by to_file, and by ShufflingProof to store its mappings.
+		"""
+		mapping_data = {"nbits" : "0"}
+		if(self._seed != None):
+			mapping_data["Seed"] = binascii.hexlify(self._seed)
+		
+		# (an empty mapping has no public key)
+		if(len(self._reencryptions) == 0):
+			return mapping_data
+		
+		public_key = self._reencryptions[0].public_key
+		nbits = public_key.cryptosystem.get_nbits()
+		nbytes = (nbits + 7) / 8
+		
+		# Store each re-encryption, as its exponents if known (which also 
+		# avoids computing its blocks), otherwise as its blocks
+		reencryptions = []
+		for reencryption in self._reencryptions:
+			exponents = reencryption.get_exponents()
+			if(exponents != None):
+				reencryptions.append(
+					{"Exponents" : _numbers_to_base64(exponents, nbytes)})
+				continue
+			
+			blocks = []
+			for (gr, yr) in reencryption:
+				blocks.append(gr)
+				blocks.append(yr)
+			reencryptions.append(
+					{"Blocks" : _numbers_to_base64(blocks, nbytes)})
+		
+		mapping_data["nbits"] = str(nbits)
+		mapping_data["PKFingerprint"] = public_key.get_fingerprint()
+		mapping_data["Reordering"] = base64.b64encode(struct.pack(
+							">%dL" % len(self._reordering), *self._reordering))
+		mapping_data["Reencryption"] = reencryptions
+		return mapping_data
+	
+	@classmethod
+	def from_file(cls, filename, public_key, 
+				  SerializerClass=serialize.XMLSerializer):
+		"""
+		Loads an instance of CiphertextCollectionMapping from the given file.
+		
+		Arguments:
+			filename::string	-- The name of a file containing the mapping 
+								   in serialized form.
+			public_key::PublicKey	-- The public key of the collections 
+									   mapped (must match the fingerprint 
+									   stored in the file).
+			SerializerClass::class --
+				The class that provides the deserialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate deserialize_from_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the file is not a valid 
+											   PloneVoteCryptoLib stored 
+											   mapping file for the given 
+											   public key.
+		"""
+		# Create a new serializer object for the mapping structure definition
+		serializer = SerializerClass(
+					CiphertextCollectionMapping_serialize_structure_definition)
+		
+		# Deserialize the CiphertextCollectionMapping instance from file
+		try:
+			data = serializer.deserialize_from_file(filename)
+		except serialize.InvalidSerializeDataError, e:
+			# Convert the exception to an InvalidPloneVoteCryptoFileError
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a valid ciphertext collection " \
+				"mapping. The following error occurred while trying to " \
+				"deserialize the file contents: %s" % (filename, str(e)))
+		
+		return cls._from_data(data["PloneVoteCiphertextCollectionMapping"], 
+							  public_key, filename)
+	
+	@classmethod
+	def _from_data(cls, root, public_key, filename):
+		"""
+		Returns the mapping stored in the given contents of the root element 
+		of a serialized mapping (see _to_data).
+		
+		Used by from_file, and by ShufflingProof to load its mappings. 
+		filename is the name of the file (or stream) being loaded, used for 
+		error messages. See from_file for the rest of the arguments and the 
+		exceptions raised.
+		"""
+		reencryptions_data = root.get("Reencryption", [])
+		if(not isinstance(reencryptions_data, list)):
+			reencryptions_data = [reencryptions_data]
+		
+		# Check that the mapping belongs to the given public key
+		nbits = public_key.cryptosystem.get_nbits()
+		if(len(reencryptions_data) > 0 and 
+		   (root.get("PKFingerprint") != public_key.get_fingerprint() or 
+			root.get("nbits") != str(nbits))):
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a ciphertext collection " \
+				"mapping for the given public key." % filename)
+		nbytes = (nbits + 7) / 8
+		
+		mapping = cls()
+		try:
+			# Load the reordering, which must be a permutation of the indexes 
+			# of the re-encryptions
+			reordering = base64.b64decode(root.get("Reordering", ""))
+			length = len(reencryptions_data)
+			if(len(reordering) != 4 * length):
+				raise ValueError("Wrong reordering length.")
+			mapping._reordering = array('l', 
+									struct.unpack(">%dL" % length, reordering))
+			if(sorted(mapping._reordering) != range(0, length)):
+				raise ValueError("The reordering is not a permutation.")
+			
+			# Load the re-encryptions
+			for reencryption_data in reencryptions_data:
+				has_blocks = reencryption_data.has_key("Blocks")
+				if(has_blocks == reencryption_data.has_key("Exponents")):
+					raise ValueError("Each re-encryption must be stored " \
+									 "either as blocks or as exponents.")
+				
+				reencryption = CiphertextReencryptionInfo(public_key)
+				if(has_blocks):
+					blocks = _numbers_from_base64(reencryption_data["Blocks"], 
+												  nbytes)
+					if(len(blocks) % 2 != 0):
+						raise ValueError("Wrong number of block values.")
+					for i in range(0, len(blocks) / 2):
+						reencryption.add_block(blocks[2 * i], 
+											   blocks[2 * i + 1])
+				else:
+					exponents = _numbers_from_base64(
+									reencryption_data["Exponents"], nbytes)
+					for r in exponents:
+						reencryption.add_exponent(r)
+				mapping._reencryptions.append(reencryption)
+			
+			if(root.has_key("Seed")):
+				mapping._seed = binascii.unhexlify(root["Seed"])
+		except (ValueError, TypeError, binascii.Error), e:
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a valid ciphertext collection " \
+				"mapping: %s" % (filename, str(e)))
+		
+		return mapping
+	
+	def rebase(self, other_mapping, workers=None):
 		"""
 		Performs a rebase operation between two mappings.
 		
@@ -337,6 +715,10 @@ class CiphertextCollectionMapping:
 							An A->B ciphertext collection mapping.
 			other_mapping::CiphertextCollectionMapping	--
 							An A->C ciphertext collection mapping.
+			workers::int	-- If greater than 1, compute the re-encryptions 
+							   in that many worker processes. (This only pays 
+							   off when the re-encryption exponents are not 
+							   known, see CiphertextReencryptionInfo.subtract)
 		
 		Returns:
 			result::CiphertextCollectionMapping	--
@@ -385,42 +767,41 @@ class CiphertextCollectionMapping:
 		# Initialize the reordering and reencryption arrays of the mapping to 
 		# empty ones of the correct length.
 		# (initialized to invalid values)
-		result._reordering = [-1 for i in range(0, length)]
+		result._reordering = array('l', [-1]) * length
 		result._reencryptions = [None for i in range(0, length)]
 		
-		# Calculate C->B element by element, in the order of the element's 
-		# index in A.
+		# Calculate the reordering of C->B: indC goes to indB, for the 
+		# indexes indB and indC in B and C of each element of A
 		for i in range(0, length):
-			# i is the index of the element in A
-			
-			indB = self._reordering[i]	# indB is the index of the element in B
-			indC = other_mapping._reordering[i]	# index in C
-			
-			# So in C->B, indC goes to indB
-			result._reordering[indC] = indB
-			
-			# Now, we get the re-encryption from a \in A to b \in B
-			atob_reencryption = self._reencryptions[i]
-			
-			# and the corresponding one from a to c \in C
-			atoc_reencryption = other_mapping._reencryptions[i]
-			
-			# Generate the c-to-b re-encryption by subtracting a-to-c from 
-			# a-to-b.
+			result._reordering[other_mapping._reordering[i]] = \
+														self._reordering[i]
+		
+		# Calculate the c-to-b re-encryptions by subtracting a-to-c from 
+		# a-to-b, for each element of A (in parallel, by ranges of indexes in 
+		# A, if requested), storing them by the index of c in C
+		if(not parallel.is_parallel(workers)):
+			for i in range(0, length):
+				result._reencryptions[other_mapping._reordering[i]] = \
+											_subtract(self, other_mapping, i)
+		else:
+			pool = parallel.new_pool(workers, _init_worker, 
+									 ({"mapping" : self, 
+									   "other_mapping" : other_mapping},))
+			success = False
 			try:
-				ctob_reencryption = atob_reencryption.subtract(atoc_reencryption)
-			except IncompatibleReencryptionInfoError, e:
-				raise IncompatibleCiphertextCollectionMappingError( \
-					"The given ciphertext collection mappings are incompatible"\
-					" for rebase. It is likely that the origin collection for "\
-					"each mapping is not the same. In particular, it would " \
-					"seem that the %dth element of the origin collection is " \
-					"incompatible between mappings. Inner exception message: " \
-					"\"%s\"" % (i, str(e)))
-			
-			# result._reencryption should be indexed by the ciphertext's index 
-			# in the origin collection (C)
-			result._reencryptions[indC] = ctob_reencryption
+				ranges = _split_range(length, workers)
+				results = pool.imap(_rebase_task, ranges)
+				for ((start, end), reencryptions) in itertools.izip(ranges, 
+															   results):
+					if(isinstance(reencryptions, str)):
+						raise IncompatibleCiphertextCollectionMappingError(
+																reencryptions)
+					for i in range(start, end):
+						result._reencryptions[other_mapping._reordering[i]] = \
+												reencryptions[i - start]
+				success = True
+			finally:
+				parallel.close_pool(pool, success)
 		
 		# Do some resource intensive checks to ensure that result has the right 
 		# structure (only in debug mode)
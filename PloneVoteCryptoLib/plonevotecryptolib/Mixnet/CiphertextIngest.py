@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  CiphertextIngest.py :
+#
+#  This file provides CiphertextIngestWorker, which adds the ciphertexts 
+#  submitted by many threads (such as those of a ballot casting server) to a 
+#  CiphertextCollection, and IngestReceipt, the receipt returned for each 
+#  ciphertext submitted.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+import threading
+import Queue
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
+
+# Maximum number of ciphertexts added to the collection at a time by a 
+# CiphertextIngestWorker
+DEFAULT_BATCH_SIZE = 256
+
+class IngestReceipt:
+	"""
+	The receipt of a ciphertext submitted for addition to a collection.
+	
+	Receipts are returned by CiphertextCollection.add_many(...) and 
+	CiphertextIngestWorker.submit(...). The receipts returned by the worker 
+	are pending until the ciphertext has been processed (see wait()).
+	
+	Attributes:
+		ciphertext_fingerprint::string	-- The fingerprint of the ciphertext 
+										   (see Ciphertext.get_fingerprint), 
+										   or None if the ciphertext is so 
+										   malformed that it has none.
+		accepted::bool	-- Whether the ciphertext was added to the collection 
+						   (None while the receipt is pending).
+		index::int	-- The index of the ciphertext in the collection, if it 
+					   was accepted, or None.
+		error::string	-- The reason why the ciphertext was rejected, if it 
+						   was, or None.
+	"""
+	
+	def __init__(self, ciphertext):
+		"""
+		Constructs a new pending receipt for the given ciphertext.
+		
+		Arguments:
+			ciphertext::Ciphertext	-- The ciphertext submitted.
+		"""
+		try:
+			self.ciphertext_fingerprint = ciphertext.get_fingerprint()
+		except TypeError:
+			self.ciphertext_fingerprint = None
+		self.accepted = None
+		self.index = None
+		self.error = None
+		self._done = threading.Event()
+	
+	def _accept(self, index):
+		"""
+		Marks the ciphertext as added to the collection at the given index.
+		"""
+		self.accepted = True
+		self.index = index
+		self._done.set()
+	
+	def _reject(self, error):
+		"""
+		Marks the ciphertext as rejected for the given reason.
+		"""
+		self.accepted = False
+		self.error = error
+		self._done.set()
+	
+	def is_done(self):
+		"""
+		Returns whether the ciphertext has been processed (accepted or 
+		rejected).
+		"""
+		return self._done.isSet()
+	
+	def wait(self, timeout=None):
+		"""
+		Waits until the ciphertext has been processed.
+		
+		Arguments:
+			timeout::float	-- The maximum time to wait, in seconds. If not 
+							   given, wait for as long as necessary.
+		
+		Returns:
+			done::bool	-- Whether the ciphertext has been processed.
+		"""
+		self._done.wait(timeout)
+		return self._done.isSet()
+
+
+class CiphertextIngestWorker:
+	"""
+	Adds the ciphertexts submitted by many threads to a CiphertextCollection.
+	
+	Each ciphertext submitted is first checked in the submitting thread (see 
+	CiphertextCollection.add_many), so that the checks of different 
+	ciphertexts run concurrently. The ciphertexts that pass are queued, and a 
+	single worker thread adds them to the collection in batches of up to 
+	batch_size ciphertexts, completing their receipts.
+	
+	Usage:
+		worker = CiphertextIngestWorker(collection, blocks=2)
+		worker.start()
+		...
+		# (in any thread)
+		receipt = worker.submit(ciphertext)
+		receipt.wait()
+		...
+		worker.stop()
+	
+	No other method of the collection should be called until stop() returns.
+	"""
+	
+	def __init__(self, collection, blocks=None, batch_size=DEFAULT_BATCH_SIZE):
+		"""
+		Constructs a new CiphertextIngestWorker.
+		
+		Arguments:
+			collection::CiphertextCollection	-- The collection to which to 
+												   add the ciphertexts.
+			blocks::int	-- If given, only accept ciphertexts of exactly this 
+						   number of blocks.
+			batch_size::int	-- The maximum number of ciphertexts added to the 
+							   collection at a time.
+		"""
+		self.collection = collection
+		self._blocks = blocks
+		self._batch_size = batch_size
+		self._queue = Queue.Queue()
+		self._thread = None
+	
+	def start(self):
+		"""
+		Starts the worker thread.
+		"""
+		assert self._thread == None, "The worker was already started."
+		self._thread = threading.Thread(target=self._run)
+		self._thread.setDaemon(True)
+		self._thread.start()
+	
+	def stop(self):
+		"""
+		Stops the worker thread, after processing all the ciphertexts 
+		submitted so far.
+		"""
+		self._queue.put(None)
+		self._thread.join()
+	
+	def submit(self, ciphertext):
+		"""
+		Submits a ciphertext for addition to the collection.
+		
+		This method can be called from any thread.
+		
+		Arguments:
+			ciphertext::Ciphertext	-- The ciphertext to add.
+		
+		Returns:
+			receipt::IngestReceipt	-- The receipt for the ciphertext. It is 
+									   completed immediately if the ciphertext 
+									   is rejected by the checks made in the 
+									   calling thread, or by the worker thread 
+									   once it processes the ciphertext.
+		"""
+		receipt = IngestReceipt(ciphertext)
+		try:
+			digest = self.collection._check_ciphertext(ciphertext, self._blocks)
+		except IncompatibleCiphertextError, e:
+			receipt._reject(str(e))
+			return receipt
+		
+		self._queue.put((ciphertext, digest, receipt))
+		return receipt
+	
+	def _run(self):
+		"""
+		The worker thread: adds the queued ciphertexts in batches.
+		"""
+		stopping = False
+		while(not stopping):
+			# Wait for a ciphertext, then take as many as are queued, up to 
+			# batch_size
+			batch = []
+			item = self._queue.get()
+			while(True):
+				if(item == None):
+					stopping = True
+					break
+				batch.append(item)
+				if(len(batch) == self._batch_size):
+					break
+				try:
+					item = self._queue.get_nowait()
+				except Queue.Empty:
+					break
+			
+			try:
+				self.collection._append_checked(batch)
+			except Exception, e:
+				# (do not leave the submitting threads waiting)
+				for (ciphertext, digest, receipt) in batch:
+					if(not receipt.is_done()):
+						receipt._reject("Error adding the ciphertext: %s" % e)
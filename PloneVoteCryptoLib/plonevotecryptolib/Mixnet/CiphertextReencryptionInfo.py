@@ -39,8 +39,8 @@
 # THE SOFTWARE.
 # ============================================================================
 
-# secure version of python's random:
-from Crypto.Random.random import StrongRandom
+# Buffered CSPRNG:
+from plonevotecryptolib.utilities.RandomSource import RandomSource
 
 from plonevotecryptolib.Ciphertext import Ciphertext
 from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
@@ -60,6 +60,12 @@ class CiphertextReencryptionInfo:
 	and iterable, and behave as a list of pairs (g^{r'}, y^{r'}) when accessed 
 	so.
 	
+	When the exponents r' are known (as for re-encryptions generated with 
+	new() and their subtractions), only the exponents are stored, and the 
+	pairs (g^{r'}, y^{r'}) are computed the first time they are needed (for 
+	example, to apply or verify the re-encryption). Subtracting two such 
+	re-encryptions then requires no modular exponentiations or inversions.
+	
 	Given the two ciphertexts and the corresponding CiphertextReencryptionInfo 
 	object, the fact that they both are different encryptions of the same 
 	plaintext can be verified without decryption. If the origin ciphertext is 
@@ -79,9 +85,10 @@ class CiphertextReencryptionInfo:
 								   encrypt the original ciphertext.
 	"""
 	
-	# NOTE: Would just storing r' per block instead of (g^{r'}, y^{r'})  
-	# be secure?
-	# The answer seems to be yes, consider refactoring
+	# NOTE: Storing (and disclosing) r' per block instead of 
+	# (g^{r'}, y^{r'}) is secure: r' is uniformly random, and 
+	# (g^{r'}, y^{r'}) is computed from it by whoever uses the re-encryption, 
+	# so it cannot be inconsistent with the exponent.
 	
 	def get_length(self):
 		"""
@@ -96,20 +103,45 @@ class CiphertextReencryptionInfo:
 		Returns:
 			(g^{r'}, y^{r'})::(long, long)	-- Returns the ith block of 
 											   re-encryption information.
+		
+		Throws:
+			IndexError	-- If i is not between 0 and the length minus one.
 		"""
 		length = len(self._blocks)
 		if(not (0 <= i < length)):
-			return ValueError("Index out of range: Got %d, expected index " \
+			raise IndexError("Index out of range: Got %d, expected index " \
 							  "between 0 and %d." % (i, length-1))
 		
+		if(self._blocks[i] == None):
+			self._compute_blocks()
 		return self._blocks[i]
 	
 	def __iter__(self):
 		"""
 		Return an iterator for the current CiphertextReencryptionInfo.
 		"""
+		self._compute_blocks()
 		return self._blocks.__iter__()
 	
+	def _compute_blocks(self):
+		"""
+		Computes the pairs (g^{r'}, y^{r'}) of the blocks that are stored 
+		only as their exponent r' (see add_exponent).
+		"""
+		if(self._pending_blocks == 0):
+			return
+		
+		prime = self.public_key.cryptosystem.get_prime()
+		generator = self.public_key.cryptosystem.get_generator()
+		key = self.public_key._key
+		
+		for i in range(0, len(self._blocks)):
+			if(self._blocks[i] == None):
+				r = self._exponents[i]
+				self._blocks[i] = (pow(generator, r, prime), 
+								   pow(key, r, prime))
+		self._pending_blocks = 0
+	
 	def __init__(self, public_key):
 		"""
 		Constructs a new (empty) CiphertextReencryptionInfo object.
@@ -118,9 +150,18 @@ class CiphertextReencryptionInfo:
 			(See class attributes)
 		"""
 		self.public_key = public_key
+		
+		# The pairs (g^{r'}, y^{r'}) of each block, or None for blocks added 
+		# with add_exponent whose pair has not been computed yet.
 		self._blocks = []
+		self._pending_blocks = 0
+		
+		# The exponents r' of each block, if known. (They are known for 
+		# re-encryptions generated with new(), and are needed to produce some 
+		# proofs of shuffling, see LinearShufflingProof.)
+		self._exponents = []
 		
-	def add_block(self, gr, yr):
+	def add_block(self, gr, yr, r=None):
 		"""
 		Adds a new block of re-encryption information to this object.
 		
@@ -128,11 +169,56 @@ class CiphertextReencryptionInfo:
 			gr::long   -- The g^{r'} component of the re-encryption information.
 			yr::long   -- The y^{r'} component of the re-encryption information.
 						  (Where y is the public key value)
+			r::long	-- The exponent r' itself (optional). If not given for 
+					   any block, the exponents of this re-encryption 
+					   information are considered unknown.
 		"""
 		self._blocks.append((gr, yr))
 		
+		if(r == None):
+			self._exponents = None
+		elif(self._exponents != None):
+			self._exponents.append(r)
+	
+	def add_exponent(self, r):
+		"""
+		Adds a new block of re-encryption information to this object, given 
+		only its exponent r'.
+		
+		The (g^{r'}, y^{r'}) components of the block are computed the first 
+		time they are needed.
+		
+		Arguments:
+			r::long	-- The exponent r' of the re-encryption information.
+		"""
+		if(self._exponents == None):
+			# (the pairs of the other blocks are all known, keep it that way)
+			prime = self.public_key.cryptosystem.get_prime()
+			generator = self.public_key.cryptosystem.get_generator()
+			self.add_block(pow(generator, r, prime), 
+						   pow(self.public_key._key, r, prime))
+			return
+		
+		self._blocks.append(None)
+		self._pending_blocks += 1
+		self._exponents.append(r)
+	
+	def get_exponents(self):
+		"""
+		Returns the exponents r' of each block of re-encryption information.
+		
+		Returns:
+			exponents::long[]	-- The list of exponents r', one per block, 
+								   or None if they are not known for this 
+								   re-encryption information object (for 
+								   example, if it was obtained by 
+								   subtracting re-encryptions with unknown 
+								   exponents).
+		"""
+		return self._exponents
+		
 	@classmethod
-	def new(cls, public_key, length):
+	def new(cls, public_key, length, random=None):
 		"""
 		Generate a new re-encryption information object with the given length. 
 		
@@ -145,17 +231,19 @@ class CiphertextReencryptionInfo:
 								   This must be the same public key that was 
 								   used to encrypt the original ciphertext.
 			length::int	-- Number of blocks of re-encryption information.
+			random::RandomSource	-- The source of randomness to use. A new 
+									   RandomSource is created if not given.
 			
 		Returns:
 			reencryption_info::CiphertextReencryptionInfo	--
 				A new CiphertextReencryptionInfo object containing length 
 				random blocks or re-encryption information.
 		"""
-		random = StrongRandom()
+		if(random == None):
+			random = RandomSource()
 		
-		# Get p and g
+		# Get p
 		prime = public_key.cryptosystem.get_prime()
-		generator = public_key.cryptosystem.get_generator()
 		
 		# Create a new empty CiphertextReencryptionInfo object
 		reencryption_info = CiphertextReencryptionInfo(public_key)
@@ -166,10 +254,8 @@ class CiphertextReencryptionInfo:
 			# Select a random integer r, 1 <= r <= p − 2
 			r = random.randint(1, prime - 2)
 			
-			# store block (g^{r}, y^{r})
-			gr = pow(generator, r, prime)
-			yr = pow(public_key._key, r, prime)
-			reencryption_info.add_block(gr, yr)
+			# store r, (g^{r}, y^{r}) is computed when first needed
+			reencryption_info.add_exponent(r)
 		
 		assert (reencryption_info.get_length() == length)
 		
@@ -247,12 +333,34 @@ class CiphertextReencryptionInfo:
 							   with this re-encryption information. 
 							   False otherwise.
 		"""
-		try:
-			original_reencrypted = self.apply(original_ciphertext)
-		except IncompatibleCiphertextError:
+		if(not isinstance(reencrypted_ciphertext, Ciphertext)):
+			return False
+		
+		# Check that both ciphertexts are compatible with this re-encryption 
+		# information (see apply)
+		length = self.get_length()
+		pk_fingerprint = self.public_key.get_fingerprint()
+		if(original_ciphertext.get_length() != length or 
+		   reencrypted_ciphertext.get_length() != length or 
+		   original_ciphertext.pk_fingerprint != pk_fingerprint or 
+		   reencrypted_ciphertext.pk_fingerprint != pk_fingerprint or 
+		   reencrypted_ciphertext.nbits != \
+				self.public_key.cryptosystem.get_nbits()):
 			return False
 		
-		return (original_reencrypted == reencrypted_ciphertext)
+		prime = self.public_key.cryptosystem.get_prime()
+		
+		# Re-encrypt and compare block by block, without building the 
+		# re-encrypted ciphertext, stopping at the first block that differs.
+		for i in range(0, length):
+			gamma, delta = original_ciphertext[i]
+			new_gamma, new_delta = reencrypted_ciphertext[i]
+			gr, yr = self[i]
+			if((gr * gamma) % prime != new_gamma or 
+			   (yr * delta) % prime != new_delta):
+				return False
+		
+		return True
 	
 	def subtract(self, other_reencryption):
 		"""
@@ -272,6 +380,10 @@ class CiphertextReencryptionInfo:
 		Re-encryption subtraction only works on re-encryptions created with 
 		the same public key.
 		
+		If the exponents of both re-encryptions are known, the result is 
+		computed from the exponents alone, as r_1 - r_2 (mod p - 1), and the 
+		result has known exponents as well.
+		
 		We define this as a new method instead of using operator overloading 
 		for (-), because the semantics of re-encryption information subtraction 
 		are not obvious.
@@ -317,6 +429,17 @@ class CiphertextReencryptionInfo:
 		# Create a new empty re-encryption to hold the subtraction
 		result = CiphertextReencryptionInfo(self.public_key)
 		
+		# If both exponents are known, subtract them instead. Since g (and 
+		# thus y) has order p - 1, g^{r_1 - r_2} = g^{(r_1 - r_2) mod (p - 1)}.
+		exponents_self = self.get_exponents()
+		exponents_other = other_reencryption.get_exponents()
+		if(exponents_self != None and exponents_other != None):
+			order = prime - 1
+			for i in range(0, self.get_length()):
+				result.add_exponent((exponents_self[i] - exponents_other[i]) \
+									% order)
+			return result
+		
 		# Perform the subtraction of self - other_reencryption block by block 
 		# and store it on result.
 		for i in range(0, self.get_length()):		 
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  CiphertextStorage.py :
+#
+#  This file provides the storage backends in which a CiphertextCollection
+#  keeps its ciphertexts: MemoryCiphertextStorage, a list of Ciphertext
+#  objects in memory, and DiskCiphertextStorage, an append-only file of
+#  fixed-width values accessed through a memory map, for collections larger
+#  than the available memory.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import os
+import mmap
+import tempfile
+import binascii
+from array import array
+
+from plonevotecryptolib.Ciphertext import Ciphertext
+
+class CiphertextStorage:
+	"""
+	The interface of the storage backends of CiphertextCollection.
+	
+	A storage keeps an ordered, append-only sequence of ciphertexts, all
+	encrypted with the same public key. CiphertextCollection checks the
+	ciphertexts added and the indexes requested, so storages need not do so.
+	"""
+	
+	def get_length(self):
+		"""
+		Returns the number of ciphertexts stored.
+		"""
+		raise NotImplementedError()
+	
+	def get(self, i):
+		"""
+		Returns the ith ciphertext stored (0 <= i < get_length()).
+		"""
+		raise NotImplementedError()
+	
+	def __iter__(self):
+		"""
+		Return an iterator over the ciphertexts stored, in order.
+		"""
+		raise NotImplementedError()
+	
+	def append(self, ciphertext):
+		"""
+		Stores a new ciphertext after all the others.
+		"""
+		raise NotImplementedError()
+	
+	def new_storage(self):
+		"""
+		Returns a new empty storage of the same kind (used for the collections
+		derived from a collection, such as its shuffles).
+		"""
+		raise NotImplementedError()
+	
+	def hand_over(self):
+		"""
+		Makes the next copy of this storage sent to another process (by 
+		pickling it) take over the resources held by this storage, which 
+		becomes read-only.
+		
+		Worker processes call this on the collections they return.
+		"""
+		pass
+	
+	def close(self):
+		"""
+		Releases the resources held by the storage. The storage cannot be
+		used afterwards.
+		"""
+		pass
+
+
+class MemoryCiphertextStorage(CiphertextStorage):
+	"""
+	Stores ciphertexts as a list of Ciphertext objects in memory.
+	
+	This is the default storage of CiphertextCollection.
+	"""
+	
+	def __init__(self):
+		"""
+		Constructs a new empty MemoryCiphertextStorage.
+		"""
+		self._ciphertexts = []
+	
+	def get_length(self):
+		return len(self._ciphertexts)
+	
+	def get(self, i):
+		return self._ciphertexts[i]
+	
+	def __iter__(self):
+		return self._ciphertexts.__iter__()
+	
+	def append(self, ciphertext):
+		self._ciphertexts.append(ciphertext)
+	
+	def new_storage(self):
+		return MemoryCiphertextStorage()
+
+
+class DiskCiphertextStorage(CiphertextStorage):
+	"""
+	Stores ciphertexts in an append-only temporary file.
+	
+	Each ciphertext is stored as a record of the gamma and delta values of
+	each of its blocks, in order, each value encoded as a fixed-width
+	big-endian number of nbits bits. Only an index with the offset of each
+	record (one integer per ciphertext) is kept in memory. The file is read
+	through a memory map, so that the operating system, rather than the
+	Python heap, decides which parts of it are kept in memory.
+	
+	The ciphertexts returned by get(...) and by iteration are new Ciphertext
+	objects read from the file: modifying them does not modify the stored
+	ciphertexts.
+	
+	The file is deleted when the storage is closed or garbage collected, by 
+	the process that created it. A copy of the storage sent to another 
+	process (by pickling it) refers to the same file and can only read it. 
+	After hand_over() is called, the next such copy instead becomes 
+	responsible for the file, and the original object becomes read-only. 
+	(This allows worker processes to return the collections they create.)
+	"""
+	
+	def __init__(self, directory=None):
+		"""
+		Constructs a new empty DiskCiphertextStorage.
+		
+		Arguments:
+			directory::string	-- The directory in which to create the
+								   storage file. The system's temporary
+								   directory if not given.
+		"""
+		self._directory = directory
+		(file_descriptor, self._filename) = \
+						tempfile.mkstemp(suffix=".pvciphertexts", dir=directory)
+		# (the file is unbuffered, so that forked processes do not inherit 
+		# pending writes)
+		self._file = os.fdopen(file_descriptor, "w+b", 0)
+		self._owner = True
+		self._writable = True
+		self._handing_over = False
+		
+		# (copies of the storage inherited by forked processes do not own the 
+		# file)
+		self._pid = os.getpid()
+		
+		# The offsets of the records, in values (not bytes), with the end of
+		# the last record as the last element
+		self._offsets = array('L', [0])
+		
+		# nbits and the public key fingerprint are those of the first
+		# ciphertext appended
+		self._nbits = None
+		self._pk_fingerprint = None
+		self._value_size = None
+		
+		self._map = None
+		self._mapped_size = 0
+		self._size = 0
+	
+	def __getstate__(self):
+		"""
+		Pickles the storage as a reference to its file (see the class 
+		documentation).
+		"""
+		handing_over = self._handing_over
+		state = {"directory" : self._directory,
+				 "filename" : self._filename,
+				 "owner" : self._owner and handing_over,
+				 "writable" : self._writable and handing_over,
+				 "offsets" : self._offsets,
+				 "nbits" : self._nbits,
+				 "pk_fingerprint" : self._pk_fingerprint,
+				 "value_size" : self._value_size,
+				 "size" : self._size}
+		if(handing_over):
+			self._owner = False
+			self._writable = False
+			self._handing_over = False
+		return state
+	
+	def __setstate__(self, state):
+		self._directory = state["directory"]
+		self._filename = state["filename"]
+		self._owner = state["owner"]
+		self._writable = state["writable"]
+		self._offsets = state["offsets"]
+		self._nbits = state["nbits"]
+		self._pk_fingerprint = state["pk_fingerprint"]
+		self._value_size = state["value_size"]
+		self._size = state["size"]
+		self._handing_over = False
+		self._pid = os.getpid()
+		if(self._writable):
+			self._file = open(self._filename, "r+b", 0)
+		else:
+			self._file = open(self._filename, "rb")
+		self._map = None
+		self._mapped_size = 0
+	
+	def __del__(self):
+		self.close()
+	
+	def close(self):
+		# (_file is not set if the file could not be created)
+		if(getattr(self, "_file", None) == None):
+			return
+		if(self._map != None):
+			self._map.close()
+			self._map = None
+		self._file.close()
+		self._file = None
+		if(self._owner and self._pid == os.getpid()):
+			os.remove(self._filename)
+	
+	def hand_over(self):
+		self._handing_over = True
+	
+	def _get_map(self):
+		"""
+		Returns a memory map of the file, covering all the records appended.
+		"""
+		if(self._mapped_size < self._size):
+			if(self._map != None):
+				self._map.close()
+			self._map = mmap.mmap(self._file.fileno(), self._size,
+								  access=mmap.ACCESS_READ)
+			self._mapped_size = self._size
+		return self._map
+	
+	def get_length(self):
+		return len(self._offsets) - 1
+	
+	def get(self, i):
+		start = self._offsets[i]
+		end = self._offsets[i + 1]
+		size = self._value_size
+		data = binascii.hexlify(self._get_map()[start * size:end * size])
+		
+		digits = 2 * size
+		ciphertext = Ciphertext(self._nbits, self._pk_fingerprint)
+		pos = 0
+		for j in range(0, (end - start) / 2):
+			gamma = long(data[pos:pos + digits], 16)
+			delta = long(data[pos + digits:pos + 2 * digits], 16)
+			ciphertext.append(gamma, delta)
+			pos += 2 * digits
+		return ciphertext
+	
+	def __iter__(self):
+		for i in range(0, self.get_length()):
+			yield self.get(i)
+	
+	def append(self, ciphertext):
+		"""
+		Stores a new ciphertext after all the others.
+		
+		Throws:
+			ValueError	-- If this storage can no longer be appended to (see
+						   the class documentation), or ciphertext contains
+						   a value that does not fit in its nbits bits.
+		"""
+		if(not self._writable):
+			raise ValueError("This DiskCiphertextStorage has been sent to " \
+							 "another process and can no longer be " \
+							 "appended to.")
+		
+		if(self._nbits == None):
+			self._nbits = ciphertext.nbits
+			self._pk_fingerprint = ciphertext.pk_fingerprint
+			self._value_size = (self._nbits + 7) / 8
+		
+		value_format = "%%0%dx" % (2 * self._value_size)
+		parts = []
+		for (gamma, delta) in zip(ciphertext.gamma, ciphertext.delta):
+			parts.append(value_format % gamma)
+			parts.append(value_format % delta)
+		data = "".join(parts)
+		if(len(data) != 2 * self._value_size * len(parts)):
+			raise ValueError("The ciphertext contains a value that does not " \
+							 "fit in its %d bits." % self._nbits)
+		try:
+			data = binascii.unhexlify(data)
+		except TypeError:
+			raise ValueError("The ciphertext contains a negative value.")
+		
+		self._file.seek(0, 2)
+		self._file.write(data)
+		self._size += len(data)
+		self._offsets.append(self._offsets[-1] + len(parts))
+	
+	def new_storage(self):
+		return DiskCiphertextStorage(self._directory)
@@ -0,0 +1,902 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  LinearShufflingProof.py :
+#
+#  This file provides LinearShufflingProof, a class storing a verifiable
+#  Zero-Knowledge proof of correct shuffling between two ciphertext
+#  collections, based on commitments to the permutation used for shuffling
+#  (Terelius-Wikström). Unlike ShufflingProof, which is a cut-and-choose
+#  proof that requires many shadow shuffles of the whole collection, the size
+#  of a LinearShufflingProof and the number of exponentiations needed to
+#  generate or verify it are linear in the size of the collections.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+from array import array
+
+import Crypto.Hash.SHA256	# sha256 is not available in python 2.4 standard lib
+
+# Buffered CSPRNG:
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+import plonevotecryptolib.utilities.serialize as serialize
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import InvalidCiphertextCollectionMappingError
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextCollectionError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+# (all values are stored as hexadecimal numbers)
+LinearShufflingProof_serialize_structure_definition = {
+	"PloneVoteLinearShufflingProof" : (1, 1, {	# Root element
+		"Challenge" : (1, 1, None),				# exactly 1 Challenge element
+		"Response" : (3, 3, None),				# exactly 3 Response elements 
+												# (s_1, s_2, s_3)
+		"BlockResponse" : (0, 0, None),			# one per block (in order)
+		"PermutationCommitment" : (0, 0, None),	# one per ciphertext 
+												# (in order)
+		"ChainCommitment" : (0, 0, None),		# one per ciphertext 
+												# (in order)
+		"ChainResponse" : (0, 0, None),			# one per ciphertext 
+												# (in order)
+		"PermutationResponse" : (0, 0, None)	# one per ciphertext 
+												# (in order)
+	})
+}
+
+# Prefix used when deriving the independent generators of the proof.
+_GENERATOR_DERIVATION_PREFIX = "PloneVoteCryptoLib LinearShufflingProof generator"
+
+def _jacobi(a, n):
+	"""
+	Computes the Jacobi symbol (a/n), for n odd and positive.
+	
+	For a prime n, this is the Legendre symbol: 1 if a is a quadratic residue
+	modulo n, -1 if it is not and 0 if n divides a. It is computed using
+	quadratic reciprocity, which is much faster than Euler's criterion
+	(pow(a, (n-1)/2, n)).
+	DO NOT USE EXTERNALLY.
+	"""
+	a = a % n
+	result = 1
+	while(a != 0):
+		while((a & 1) == 0):
+			a >>= 1
+			if((n & 7) in (3, 5)):
+				result = -result
+		a, n = n, a
+		if((a & 3) == 3 and (n & 3) == 3):
+			result = -result
+		a = a % n
+	if(n == 1):
+		return result
+	return 0
+
+def _derive_generators(prime, count):
+	"""
+	Derives count generators of the subgroup of quadratic residues modulo the
+	safe prime prime, by hashing into Z_{p}^{*} and squaring.
+	
+	The generators are derived deterministically from prime, so prover and
+	verifier obtain the same ones, and nobody knows their discrete logarithms
+	with respect to each other or to the cryptosystem's generator.
+	DO NOT USE EXTERNALLY.
+	"""
+	# Number of hash blocks to get at least 128 bits more than the size of
+	# the prime (so that the hashed value is almost uniform modulo prime).
+	nblocks = (len("%x" % prime) * 4 + 128) / 256 + 1
+	
+	generators = []
+	index = 0
+	while(len(generators) < count):
+		digests = []
+		for block in range(0, nblocks):
+			hasher = Crypto.Hash.SHA256.new()
+			hasher.update("%s %d %d %s" % (_GENERATOR_DERIVATION_PREFIX, index,
+										   block, hex(prime)))
+			digests.append(hasher.hexdigest())
+		index += 1
+		
+		value = long("".join(digests), 16) % prime
+		generator = pow(value, 2, prime)
+		if(generator > 1):
+			generators.append(generator)
+	
+	return generators
+
+def _product(bases, exponents, prime):
+	"""
+	Returns the product of bases[i]^exponents[i] modulo prime.
+	DO NOT USE EXTERNALLY.
+	"""
+	result = 1
+	for i in range(0, len(bases)):
+		result = (result * pow(bases[i], exponents[i], prime)) % prime
+	return result
+
+def _hash_to_int(hasher, modulus):
+	"""
+	Returns the digest of the given hash object as an integer modulo modulus.
+	DO NOT USE EXTERNALLY.
+	"""
+	return long(hasher.hexdigest(), 16) % modulus
+
+
+class LinearShufflingProof:
+	"""
+	Stores a linear size Zero-Knowledge proof of shuffling between two
+	CiphertextCollection objects.
+	
+	This class has the same interface as ShufflingProof, and can be used
+	instead of it through the ProofClass argument of
+	CiphertextCollection.shuffle_with_proof(). To verify (in Zero-Knowledge)
+	that two collections are shown to be equivalent by this proof, we use the
+	verify(...) method of the proof, passing it both the original and the
+	shuffled collection.
+	
+	Generating or verifying a LinearShufflingProof takes a number of modular
+	exponentiations proportional to the number of ciphertexts times their
+	length in blocks, independent of any security parameter, and its size is
+	proportional to the number of ciphertexts. In contrast, ShufflingProof
+	requires params.SHUFFLING_PROOF_SECURITY_PARAMETER full shuffles of the
+	collection.
+	
+	All the ciphertexts of the collections must have the same length in
+	blocks.
+	"""
+	
+	## SOME NOTES ON THE INTERNALS OF THIS PROOF:
+	#
+	# This is the proof of shuffle of:
+	#
+	#	Björn Terelius and Douglas Wikström, "Proofs of Restricted Shuffles",
+	#	AFRICACRYPT 2010.
+	#
+	# made non-interactive with the Fiat-Shamir heuristic, in the notation of:
+	#
+	#	Rolf Haenni, Philipp Locher, Reto Koenig and Eric Dubuis,
+	#	"Pseudo-Code Algorithms for Verifiable Re-Encryption Mix-Nets",
+	#	Financial Cryptography Workshops (Voting'17), 2017.
+	#
+	# extended to ciphertexts of several blocks (with independent
+	# re-encryption exponents for each block).
+	#
+	# The proof works in a group of prime order q. Our ciphertexts live in
+	# Z_{p}^{*}, of order p - 1 = 2q, where the cryptosystem generator g has
+	# order 2q. So we run the proof over the squares of all ciphertext
+	# components, which are in the subgroup G_q of quadratic residues,
+	# generated by G = g^2, with public key Y = y^2. A re-encryption
+	# (g^r*gamma, y^r*delta) of (gamma, delta) becomes a re-encryption
+	# (G^r*gamma^2, Y^r*delta^2) of the squared block.
+	#
+	# Squaring loses the "sign" of each plaintext m: both m and -m (and only
+	# them) have the same square, and exactly one of them is a quadratic
+	# residue, since p = 3 mod 4. The quadratic character of m,
+	# beta = L(m), can be computed from any encryption of m: if L(z) is 0 for
+	# quadratic residues and 1 otherwise, L(m) = L(delta) + x*L(gamma) (mod 2)
+	# and x = L(y) (mod 2), where x is the private key. So beta is a public
+	# property of each block of ciphertext, unchanged by re-encryption. We
+	# include the betas as an additional component of each block, on which
+	# re-encryption acts trivially. The proof then shows that each shuffled
+	# ciphertext has the same squares and betas as the original ciphertext it
+	# is mapped to by the committed permutation, which implies that both
+	# encrypt the same plaintext.
+	#
+	# A LinearShufflingProof has the following private fields, for N
+	# ciphertexts of L blocks each:
+	#
+	#	* self._permutation_commitment: N commitments c_i = G^{r_i}*h_{pi(i)}
+	#	  to the permutation pi, where h_1..h_N are generators derived by
+	#	  hashing (see _derive_generators).
+	#
+	#	* self._chain_commitment: N commitments c^_k, chained so that the
+	#	  last one commits to the product of all challenges u_i.
+	#
+	#	* self._challenge: The Fiat-Shamir challenge c (a long).
+	#
+	#	* self._responses: The responses (s_1, s_2, s_3), as a tuple.
+	#
+	#	* self._block_responses: The L responses s_4 (one per block).
+	#
+	#	* self._chain_responses: The N responses s^_k.
+	#
+	#	* self._permutation_responses: The N responses s'_k.
+	#
+	# The commitments t of the prover are not stored: the verifier recomputes
+	# them from the responses and checks that they hash to the challenge.
+	##
+	
+	def __init__(self):
+		"""
+		Constructs a new empty LinearShufflingProof.
+		
+		This method should not be used outside of this class. Consider using
+		LinearShufflingProof.new(...) or
+		CiphertextCollection.shuffle_with_proof().
+		"""
+		self._permutation_commitment = []
+		self._chain_commitment = []
+		self._challenge = None
+		self._responses = None
+		self._block_responses = []
+		self._chain_responses = []
+		self._permutation_responses = []
+	
+	@staticmethod
+	def _get_group(public_key):
+		"""
+		Returns the tuple (p, q, G, Y, L(y)) for the given public key.
+		(See the notes on the internals of this proof above.)
+		"""
+		prime = public_key.cryptosystem.get_prime()
+		order = (prime - 1) / 2
+		generator = pow(public_key.cryptosystem.get_generator(), 2, prime)
+		key = pow(public_key._key, 2, prime)
+		key_parity = int(_jacobi(public_key._key, prime) != 1)
+		return (prime, order, generator, key, key_parity)
+	
+	@staticmethod
+	def _get_blocks_length(original_collection, shuffled_collection):
+		"""
+		Returns the common length in blocks of all the ciphertexts in both
+		collections, or None if they have different lengths.
+		
+		(The length of empty collections is 0.)
+		"""
+		length = None
+		for collection in (original_collection, shuffled_collection):
+			for ciphertext in collection:
+				if(length == None):
+					length = ciphertext.get_length()
+				elif(ciphertext.get_length() != length):
+					return None
+		
+		if(length == None):
+			length = 0
+		return length
+	
+	@staticmethod
+	def _squared_collection(collection, prime, key_parity):
+		"""
+		Returns the squared components and the quadratic characters of the
+		plaintexts of each block of each ciphertext in the collection.
+		
+		Returns:
+			(squares, parities)::(list, list)	--
+				squares[i][j] is the tuple (gamma^2, delta^2) for the jth block
+				of the ith ciphertext, and parities[i][j] is its beta (see the
+				notes on the internals of this proof above).
+				(None, None) if some component is not in Z_{p}^{*}.
+		"""
+		squares = []
+		parities = []
+		for ciphertext in collection:
+			ciphertext_squares = []
+			ciphertext_parities = []
+			for (gamma, delta) in ciphertext:
+				if(not (0 < gamma < prime and 0 < delta < prime)):
+					return (None, None)
+				
+				ciphertext_squares.append((pow(gamma, 2, prime),
+										   pow(delta, 2, prime)))
+				
+				delta_parity = int(_jacobi(delta, prime) != 1)
+				if(key_parity == 1):
+					gamma_parity = int(_jacobi(gamma, prime) != 1)
+					ciphertext_parities.append(delta_parity ^ gamma_parity)
+				else:
+					ciphertext_parities.append(delta_parity)
+			
+			squares.append(ciphertext_squares)
+			parities.append(ciphertext_parities)
+		
+		return (squares, parities)
+	
+	@staticmethod
+	def _hash_collection(hasher, collection):
+		"""
+		Adds a collection to the hash used to generate the seed.
+		
+		The length of the collection and of each ciphertext is hashed before 
+		its values, and every value is hashed as "%x," (see 
+		_generate_challenge), so that the hash does not depend on whether a 
+		value is an int or a long.
+		
+		Arguments:
+			hasher::Crypto.Hash.SHA256	-- The hash object to update.
+			collection::CiphertextCollection -- The collection to hash.
+		"""
+		hasher.update("%x;" % collection.get_length())
+		for ciphertext in collection:
+			hasher.update("%x;" % ciphertext.get_length())
+			for (gamma, delta) in ciphertext:
+				hasher.update("%x," % gamma)
+				hasher.update("%x," % delta)
+	
+	@staticmethod
+	def _generate_seed(original_collection, shuffled_collection,
+					   permutation_commitment):
+		"""
+		Generates the seed from which the challenges u_i are derived.
+		
+		The seed is a hash of both collections, the commitment to the
+		permutation and the public key.
+		"""
+		c = Crypto.Hash.SHA256.new()
+		c.update(_GENERATOR_DERIVATION_PREFIX)
+		LinearShufflingProof._hash_collection(c, original_collection)
+		LinearShufflingProof._hash_collection(c, shuffled_collection)
+		for commitment in permutation_commitment:
+			c.update("%x," % commitment)
+		c.update(original_collection.public_key.get_fingerprint())
+		return c.hexdigest()
+	
+	@staticmethod
+	def _generate_challenges(seed, count, order):
+		"""
+		Derives the challenges u_1..u_N from the seed.
+		"""
+		challenges = []
+		for i in range(0, count):
+			c = Crypto.Hash.SHA256.new()
+			c.update(seed)
+			c.update("%x," % i)
+			challenges.append(_hash_to_int(c, order))
+		return challenges
+	
+	@staticmethod
+	def _generate_challenge(seed, chain_commitment, t_values, order):
+		"""
+		Generates the challenge c of the proof.
+		
+		The challenge is a hash of the seed, the chained commitments and the
+		commitments t of the prover (recomputed by the verifier).
+		
+		(Values are hashed as "%x," instead of hex(...), which would hash the
+		same value differently depending on whether it is an int or a long.)
+		"""
+		c = Crypto.Hash.SHA256.new()
+		c.update(seed)
+		for commitment in chain_commitment:
+			c.update("%x," % commitment)
+		for t in t_values:
+			c.update("%x," % t)
+		return _hash_to_int(c, order)
+	
+	@classmethod
+	def new(cls, original_collection, shuffled_collection, mapping,
+			workers=None):
+		"""
+		Constructs a new proof of equivalence between original_collection and
+		shuffled_collection.
+		
+		This method should not be used outside of plonevotecryptolib.Mixnet.
+		Consider using CiphertextCollection.shuffle_with_proof() instead.
+		
+		The given CiphertextCollectionMapping must be a valid mapping between
+		original_collection and shuffled_collection, created with
+		CiphertextCollectionMapping.new(...) (so that the exponents of its
+		re-encryptions are known).
+		
+		Arguments:
+			original_collection::CiphertextCollection --
+				The original collection to be shuffled.
+			shuffled_collection::CiphertextCollection --
+				The shuffled collection resulting from applying mapping to
+				original_collection.
+			mapping::CiphertextCollectionMapping --
+				The mapping between original_collection and shuffled_collection.
+			workers::int --
+				Accepted for compatibility with ShufflingProof.new. This proof
+				is always generated in the current process.
+		
+		Returns:
+			proof::LinearShufflingProof --
+				The zero-knowledge proof of equivalence between
+				original_collection and shuffled_collection.
+		
+		Throws:
+			InvalidCiphertextCollectionMappingError --
+				If mapping is not a valid mapping between original_collection
+				and shuffled_collection, or the exponents of its re-encryptions
+				are unknown.
+			IncompatibleCiphertextCollectionError --
+				If the ciphertexts of the collections do not all have the same
+				length in blocks.
+		"""
+		# Check that we have a valid mapping between the two collections
+		if(not mapping.verify(original_collection, shuffled_collection)):
+			raise InvalidCiphertextCollectionMappingError("mapping is not a " \
+					"valid CiphertextCollectionMapping between " \
+					"original_collection and shuffled_collection")
+		
+		for reencryption in mapping._reencryptions:
+			if(reencryption.get_exponents() == None):
+				raise InvalidCiphertextCollectionMappingError("The " \
+					"re-encryption exponents of mapping are unknown. A " \
+					"LinearShufflingProof can only be constructed for a " \
+					"mapping created with CiphertextCollectionMapping.new().")
+		
+		nblocks = cls._get_blocks_length(original_collection,
+										 shuffled_collection)
+		if(nblocks == None):
+			raise IncompatibleCiphertextCollectionError("A " \
+					"LinearShufflingProof can only be constructed for " \
+					"collections of ciphertexts of the same length in blocks.")
+		
+		length = original_collection.get_length()
+		(prime, order, generator, key, key_parity) = \
+			cls._get_group(original_collection.public_key)
+		def neg(exponent):
+			return (order - exponent) % order
+		
+		(squares, parities) = cls._squared_collection(shuffled_collection,
+													  prime, key_parity)
+		
+		generators = _derive_generators(prime, length + 1)
+		h = generators[0]
+		hs = generators[1:]
+		
+		# psi[k] is the index in original_collection of the kth ciphertext of
+		# shuffled_collection.
+		reordering = mapping._reordering
+		psi = array('l', [0]) * length
+		for i in range(0, length):
+			psi[reordering[i]] = i
+		
+		random = RandomSource()
+		proof = LinearShufflingProof()
+		
+		# Commit to the permutation: c_i = G^{r_i}*h_{pi(i)}
+		r = []
+		for i in range(0, length):
+			r.append(random.randbelow(order))
+			proof._permutation_commitment.append(
+				(pow(generator, r[i], prime) * hs[reordering[i]]) % prime)
+		
+		seed = cls._generate_seed(original_collection, shuffled_collection,
+								  proof._permutation_commitment)
+		u = cls._generate_challenges(seed, length, order)
+		
+		# u' and the re-encryption exponents in the order of the shuffled
+		# collection
+		u_shuffled = [u[psi[k]] for k in range(0, length)]
+		exponents = [mapping._reencryptions[psi[k]].get_exponents()
+					 for k in range(0, length)]
+		
+		# Chained commitments: c^_k = G^{r^_k}*c^_{k-1}^{u'_k}, c^_0 = h
+		r_chain = []
+		previous = h
+		for k in range(0, length):
+			r_chain.append(random.randbelow(order))
+			previous = (pow(generator, r_chain[k], prime) * \
+						pow(previous, u_shuffled[k], prime)) % prime
+			proof._chain_commitment.append(previous)
+		
+		# Combined randomness
+		r_bar = sum(r) % order
+		r_hat = 0
+		v = 1	# v_k = u'_{k+1} * ... * u'_N
+		for k in range(length - 1, -1, -1):
+			r_hat = (r_hat + r_chain[k] * v) % order
+			v = (v * u_shuffled[k]) % order
+		r_tilde = 0
+		for i in range(0, length):
+			r_tilde = (r_tilde + r[i] * u[i]) % order
+		r_blocks = []
+		for j in range(0, nblocks):
+			r_block = 0
+			for k in range(0, length):
+				r_block = (r_block + exponents[k][j] * u_shuffled[k]) % order
+			r_blocks.append(r_block)
+		
+		# Prover commitments t
+		w1 = random.randbelow(order)
+		w2 = random.randbelow(order)
+		w3 = random.randbelow(order)
+		w_blocks = [random.randbelow(order) for j in range(0, nblocks)]
+		w_chain = [random.randbelow(order) for k in range(0, length)]
+		w_shuffled = [random.randbelow(order) for k in range(0, length)]
+		
+		t1 = pow(generator, w1, prime)
+		t2 = pow(generator, w2, prime)
+		t3 = (pow(generator, w3, prime) * \
+			  _product(hs, w_shuffled, prime)) % prime
+		t_gammas = []
+		t_deltas = []
+		t_parities = []
+		for j in range(0, nblocks):
+			gammas = [squares[k][j][0] for k in range(0, length)]
+			deltas = [squares[k][j][1] for k in range(0, length)]
+			t_gammas.append((pow(generator, neg(w_blocks[j]), prime) * \
+							 _product(gammas, w_shuffled, prime)) % prime)
+			t_deltas.append((pow(key, neg(w_blocks[j]), prime) * \
+							 _product(deltas, w_shuffled, prime)) % prime)
+			t_parity = 0
+			for k in range(0, length):
+				if(parities[k][j] == 1):
+					t_parity = (t_parity + w_shuffled[k]) % order
+			t_parities.append(t_parity)
+		t_chain = []
+		previous = h
+		for k in range(0, length):
+			t_chain.append((pow(generator, w_chain[k], prime) * \
+							pow(previous, w_shuffled[k], prime)) % prime)
+			previous = proof._chain_commitment[k]
+		
+		t_values = [t1, t2, t3] + t_gammas + t_deltas + t_parities + t_chain
+		challenge = cls._generate_challenge(seed, proof._chain_commitment,
+											t_values, order)
+		
+		# Responses
+		proof._challenge = challenge
+		proof._responses = ((w1 + challenge * r_bar) % order,
+							(w2 + challenge * r_hat) % order,
+							(w3 + challenge * r_tilde) % order)
+		proof._block_responses = \
+			[(w_blocks[j] + challenge * r_blocks[j]) % order
+			 for j in range(0, nblocks)]
+		proof._chain_responses = \
+			[(w_chain[k] + challenge * r_chain[k]) % order
+			 for k in range(0, length)]
+		proof._permutation_responses = \
+			[(w_shuffled[k] + challenge * u_shuffled[k]) % order
+			 for k in range(0, length)]
+		
+		# return the proof object
+		return proof
+	
+	def verify(self, original_collection, shuffled_collection, workers=None):
+		"""
+		Verifies that original_collection and shuffled_collection are
+		equivalent as proven by this LinearShufflingProof object.
+		
+		If this method returns true, then we have proof that both collections
+		contain encryptions of the same collection of plaintexts, save for a
+		negligible probability that the zero-knowledge proof has been faked.
+		Otherwise we gain no information about the two collections, other than
+		they are not shown to be equivalent by this particular proof.
+		
+		Arguments:
+			original_collection::CiphertextCollection	--
+				The original collection of ciphertexts.
+			shuffled_collection::CiphertextCollection	--
+				Another collection for which we wish to know if the current
+				LinearShufflingProof object demonstrates equivalence with
+				original_collection.
+			workers::int --
+				Accepted for compatibility with ShufflingProof.verify. This
+				proof is always verified in the current process.
+		
+		Returns:
+			result::bool	-- True if this proof shows both collections to be
+							   equivalent.
+							   False otherwise.
+		"""
+		# Check that the collections and the proof have compatible sizes
+		public_key = original_collection.public_key
+		if(public_key.get_fingerprint() != \
+		   shuffled_collection.public_key.get_fingerprint()):
+			return False
+		
+		length = original_collection.get_length()
+		if(shuffled_collection.get_length() != length or
+		   len(self._permutation_commitment) != length or
+		   len(self._chain_commitment) != length or
+		   len(self._chain_responses) != length or
+		   len(self._permutation_responses) != length):
+			return False
+		
+		nblocks = self._get_blocks_length(original_collection,
+										  shuffled_collection)
+		if(nblocks == None or len(self._block_responses) != nblocks):
+			return False
+		
+		(prime, order, generator, key, key_parity) = \
+			self._get_group(public_key)
+		def neg(exponent):
+			return (order - exponent) % order
+		
+		# Check that the commitments are in G_q and the challenge and
+		# responses are in Z_q
+		for commitment in self._permutation_commitment + \
+						  self._chain_commitment:
+			if(not (0 < commitment < prime) or
+			   _jacobi(commitment, prime) != 1):
+				return False
+		
+		for response in [self._challenge] + list(self._responses) + \
+						self._block_responses + self._chain_responses + \
+						self._permutation_responses:
+			if(not (0 <= response < order)):
+				return False
+		
+		# Get the squared collections
+		(original_squares, original_parities) = \
+			self._squared_collection(original_collection, prime, key_parity)
+		(shuffled_squares, shuffled_parities) = \
+			self._squared_collection(shuffled_collection, prime, key_parity)
+		if(original_squares == None or shuffled_squares == None):
+			return False
+		
+		generators = _derive_generators(prime, length + 1)
+		h = generators[0]
+		hs = generators[1:]
+		
+		seed = self._generate_seed(original_collection, shuffled_collection,
+								   self._permutation_commitment)
+		u = self._generate_challenges(seed, length, order)
+		
+		challenge = self._challenge
+		(s1, s2, s3) = self._responses
+		s_shuffled = self._permutation_responses
+		
+		# c_bar = prod(c_i) / prod(h_i)
+		c_bar = 1
+		h_product = 1
+		for i in range(0, length):
+			c_bar = (c_bar * self._permutation_commitment[i]) % prime
+			h_product = (h_product * hs[i]) % prime
+		c_bar = (c_bar * pow(h_product, prime - 2, prime)) % prime
+		
+		# c_hat = c^_N / h^{prod(u_i)}
+		u_product = 1
+		for i in range(0, length):
+			u_product = (u_product * u[i]) % order
+		if(length > 0):
+			c_hat = self._chain_commitment[-1]
+		else:
+			c_hat = h
+		c_hat = (c_hat * pow(pow(h, u_product, prime), prime - 2, prime)) % \
+				prime
+		
+		# c' = prod(c_i^{u_i})
+		c_u = _product(self._permutation_commitment, u, prime)
+		
+		# Recompute the prover commitments t
+		t1 = (pow(c_bar, neg(challenge), prime) * \
+			  pow(generator, s1, prime)) % prime
+		t2 = (pow(c_hat, neg(challenge), prime) * \
+			  pow(generator, s2, prime)) % prime
+		t3 = (pow(c_u, neg(challenge), prime) * pow(generator, s3, prime) * \
+			  _product(hs, s_shuffled, prime)) % prime
+		t_gammas = []
+		t_deltas = []
+		t_parities = []
+		for j in range(0, nblocks):
+			s4 = self._block_responses[j]
+			gammas = [original_squares[i][j][0] for i in range(0, length)]
+			deltas = [original_squares[i][j][1] for i in range(0, length)]
+			gammas_shuffled = [shuffled_squares[k][j][0]
+							   for k in range(0, length)]
+			deltas_shuffled = [shuffled_squares[k][j][1]
+							   for k in range(0, length)]
+			
+			t_gammas.append((pow(_product(gammas, u, prime), neg(challenge),
+								 prime) * \
+							 pow(generator, neg(s4), prime) * \
+							 _product(gammas_shuffled, s_shuffled, prime)) % \
+							prime)
+			t_deltas.append((pow(_product(deltas, u, prime), neg(challenge),
+								 prime) * \
+							 pow(key, neg(s4), prime) * \
+							 _product(deltas_shuffled, s_shuffled, prime)) % \
+							prime)
+			
+			t_parity = 0
+			for i in range(0, length):
+				if(original_parities[i][j] == 1):
+					t_parity = (t_parity + u[i]) % order
+			t_parity = (t_parity * neg(challenge)) % order
+			for k in range(0, length):
+				if(shuffled_parities[k][j] == 1):
+					t_parity = (t_parity + s_shuffled[k]) % order
+			t_parities.append(t_parity)
+		
+		t_chain = []
+		previous = h
+		for k in range(0, length):
+			t_chain.append((pow(self._chain_commitment[k], neg(challenge),
+								prime) * \
+							pow(generator, self._chain_responses[k], prime) * \
+							pow(previous, s_shuffled[k], prime)) % prime)
+			previous = self._chain_commitment[k]
+		
+		# The proof is valid if the recomputed commitments hash to the
+		# challenge
+		t_values = [t1, t2, t3] + t_gammas + t_deltas + t_parities + t_chain
+		expected_challenge = self._generate_challenge(seed,
+							self._chain_commitment, t_values, order)
+		
+		return (expected_challenge == challenge)
+	
+	def _to_data(self):
+		"""
+		Returns the serializable data dictionary of this proof (see 
+		LinearShufflingProof_serialize_structure_definition).
+		"""
+		def to_hex(numbers):
+			return ["%x" % number for number in numbers]
+		
+		return {
+			"PloneVoteLinearShufflingProof" : {
+				"Challenge" : "%x" % self._challenge,
+				"Response" : to_hex(self._responses),
+				"BlockResponse" : to_hex(self._block_responses),
+				"PermutationCommitment" : 
+								to_hex(self._permutation_commitment),
+				"ChainCommitment" : to_hex(self._chain_commitment),
+				"ChainResponse" : to_hex(self._chain_responses),
+				"PermutationResponse" : to_hex(self._permutation_responses)
+			}
+		}
+	
+	@classmethod
+	def _from_data(cls, data, filename):
+		"""
+		Returns the proof stored in the given data dictionary (see _to_data).
+		
+		filename is the name of the file (or stream) being loaded, used for 
+		error messages.
+		"""
+		root = data["PloneVoteLinearShufflingProof"]
+		
+		def from_hex(name):
+			values = root.get(name, [])
+			if(not isinstance(values, list)):
+				values = [values]
+			try:
+				return [long(value, 16) for value in values]
+			except ValueError:
+				raise InvalidPloneVoteCryptoFileError(filename, 
+					"File \"%s\" does not contain a valid linear shuffling " \
+					"proof. The stored values for %s are not valid " \
+					"hexadecimal numbers." % (filename, name))
+		
+		proof = cls()
+		proof._challenge = from_hex("Challenge")[0]
+		proof._responses = tuple(from_hex("Response"))
+		proof._block_responses = from_hex("BlockResponse")
+		proof._permutation_commitment = from_hex("PermutationCommitment")
+		proof._chain_commitment = from_hex("ChainCommitment")
+		proof._chain_responses = from_hex("ChainResponse")
+		proof._permutation_responses = from_hex("PermutationResponse")
+		return proof
+	
+	def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+				compression=None, compact=None):
+		"""
+		Saves this proof to a file.
+		
+		Arguments:
+			filename::string	-- The path to the file in which to store the 
+								   serialized LinearShufflingProof.
+			SerializerClass::class --
+				The class that provides the serialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate serialize_to_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+			compression::string --
+				The compression to apply to the file, one of the 
+				serialize.COMPRESSION_* constants. None (default) means use 
+				serialize.DEFAULT_COMPRESSION.
+			compact::bool	--
+				Whether to omit formatting whitespace from the file. None 
+				(default) means use serialize.DEFAULT_COMPACT_OUTPUT.
+		"""
+		serializer = SerializerClass(
+						LinearShufflingProof_serialize_structure_definition)
+		serializer.serialize_to_file(filename, self._to_data(), 
+									 compression=compression, compact=compact)
+	
+	def to_string(self, SerializerClass=serialize.XMLSerializer):
+		"""
+		Returns this proof serialized as a string (see to_file).
+		
+		Arguments:
+			SerializerClass::class --
+				The class that provides the serialization (see to_file).
+		
+		Returns:
+			data::string	-- The serialized LinearShufflingProof.
+		"""
+		serializer = SerializerClass(
+						LinearShufflingProof_serialize_structure_definition)
+		return serializer.serialize_to_string(self._to_data())
+	
+	@classmethod
+	def from_file(cls, filename, public_key, 
+				  SerializerClass=serialize.XMLSerializer):
+		"""
+		Loads an instance of LinearShufflingProof from the given file.
+		
+		Arguments:
+			filename::string	-- The name of a file containing the proof in 
+								   serialized form.
+			public_key::PublicKey	-- Accepted for compatibility with 
+									   ShufflingProof.from_file. (The proof 
+									   is checked against the public key of 
+									   the collections on verification.)
+			SerializerClass::class --
+				The class that provides the deserialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate deserialize_from_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the file is not a valid 
+											   PloneVoteCryptoLib stored 
+											   linear shuffling proof file.
+		"""
+		serializer = SerializerClass(
+						LinearShufflingProof_serialize_structure_definition)
+		try:
+			data = serializer.deserialize_from_file(filename)
+		except serialize.InvalidSerializeDataError, e:
+			# Convert the exception to an InvalidPloneVoteCryptoFileError
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a valid linear shuffling " \
+				"proof. The following error occurred while trying to " \
+				"deserialize the file contents: %s" % (filename, str(e)))
+		return cls._from_data(data, filename)
+	
+	@classmethod
+	def from_string(cls, string, public_key, 
+					SerializerClass=serialize.XMLSerializer):
+		"""
+		Loads an instance of LinearShufflingProof from a string (see 
+		from_file).
+		
+		Arguments:
+			string::string	-- The proof in serialized form.
+			public_key::PublicKey	-- Accepted for compatibility with 
+									   ShufflingProof.from_string.
+			SerializerClass::class --
+				The class that provides the deserialization (see from_file).
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the string is not a valid 
+											   serialized linear shuffling 
+											   proof.
+		"""
+		serializer = SerializerClass(
+						LinearShufflingProof_serialize_structure_definition)
+		try:
+			data = serializer.deserialize_from_string(string)
+		except serialize.InvalidSerializeDataError, e:
+			raise InvalidPloneVoteCryptoFileError("<string>", 
+				"The given string does not contain a valid linear shuffling " \
+				"proof. The following error occurred while trying to " \
+				"deserialize it: %s" % str(e))
+		return cls._from_data(data, "<string>")
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  MixCascade.py :
+#
+#  This file provides MixCascade, which shuffles a ciphertext collection 
+#  through a sequence of mixers, each shuffling the output of the previous 
+#  one with a proof of shuffling, and verifies the proof of every stage while 
+#  the next stages are being shuffled.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import time
+
+# Process pools for overlapped verification:
+import plonevotecryptolib.utilities.parallel as parallel
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import InvalidShuffilingProofError
+
+def _verify_stage(original_collection, shuffled_collection, proof):
+	"""
+	Verifies a single stage of a cascade, returning a tuple 
+	(result, elapsed_time).
+	
+	A proof that does not meet the security standards of params.py fails 
+	verification.
+	DO NOT USE EXTERNALLY.
+	"""
+	start = time.time()
+	try:
+		result = proof.verify(original_collection, shuffled_collection)
+	except InvalidShuffilingProofError:
+		result = False
+	return (result, time.time() - start)
+
+def _verify_stage_task(task):
+	"""
+	Worker process task: _verify_stage for a tuple (i, original_collection, 
+	shuffled_collection, proof), returning a tuple (i, result, elapsed_time).
+	DO NOT USE EXTERNALLY.
+	"""
+	(i, original_collection, shuffled_collection, proof) = task
+	(result, elapsed_time) = _verify_stage(original_collection, 
+										   shuffled_collection, proof)
+	return (i, result, elapsed_time)
+
+
+class MixCascade:
+	"""
+	Shuffles a ciphertext collection through a sequence of mixers.
+	
+	Each stage (mixer) of the cascade shuffles the collection produced by the 
+	previous stage with CiphertextCollection.shuffle_with_proof(...), and the 
+	proof of every stage is verified. The result is a shuffle of the original 
+	collection that no single mixer can link to it.
+	
+	If the cascade runs with several worker processes, the verification of 
+	each stage runs in a pool of worker processes while the following stages 
+	are shuffled, instead of after them.
+	
+	Usage:
+		cascade = MixCascade(3, workers=4)
+		shuffled_collection = cascade.run(collection)
+		if(cascade.get_first_failing_stage() != None):
+			...
+	
+	Attributes (set by run):
+		collections::CiphertextCollection[]	--
+			The input collection of the cascade followed by the output 
+			collection of each stage that was run.
+		proofs::ShufflingProof[]	-- The proof of shuffling of each stage 
+									   (from collections[i] to 
+									   collections[i + 1]).
+		verified::bool[]	-- Whether the proof of each stage verified.
+		shuffle_times::float[]	-- The time, in seconds, taken to shuffle and 
+								   prove each stage.
+		verify_times::float[]	-- The time, in seconds, taken to verify 
+								   each stage.
+	"""
+	
+	def __init__(self, stages, ProofClass=None, workers=None, directory=None):
+		"""
+		Constructs a new MixCascade.
+		
+		Arguments:
+			stages::int	-- The number of mixers of the cascade.
+			ProofClass::class	-- The class of proof of shuffling generated 
+								   by each stage (see 
+								   CiphertextCollection.shuffle_with_proof).
+			workers::int	-- If greater than 1, shuffle each stage with that 
+							   many worker processes, and verify the stages 
+							   in a pool of that many worker processes, 
+							   overlapped with the shuffling of the next 
+							   stages.
+			directory::string	-- If given, keep the collections of the 
+								   cascade on disk, in this directory (see 
+								   DiskCiphertextStorage).
+		
+		Throws:
+			ValueError	-- If stages is not positive.
+		"""
+		if(stages < 1):
+			raise ValueError("A MixCascade needs at least one stage, got %d." \
+							 % stages)
+		self._stages = stages
+		self._ProofClass = ProofClass
+		self._workers = workers
+		self._directory = directory
+		
+		self.collections = []
+		self.proofs = []
+		self.verified = []
+		self.shuffle_times = []
+		self.verify_times = []
+	
+	def run(self, collection):
+		"""
+		Runs the collection through every stage of the cascade.
+		
+		If the proof of a stage fails verification, no further stages are 
+		started (but the stages already started are completed and verified).
+		
+		Arguments:
+			collection::CiphertextCollection	-- The collection to shuffle.
+		
+		Returns:
+			shuffled_collection::CiphertextCollection	--
+				The output collection of the last stage run.
+		"""
+		if(self._directory != None and 
+		   not isinstance(collection._storage, DiskCiphertextStorage)):
+			disk_collection = CiphertextCollection(collection.public_key, 
+								DiskCiphertextStorage(self._directory))
+			for ciphertext in collection:
+				disk_collection.add_ciphertext(ciphertext)
+			collection = disk_collection
+		
+		self.collections = [collection]
+		self.proofs = []
+		self.verified = [None] * self._stages
+		self.shuffle_times = []
+		self.verify_times = [None] * self._stages
+		
+		pool = parallel.new_pool(self._workers)
+		success = False
+		try:
+			pending = []
+			for i in range(0, self._stages):
+				# Stop if a stage already failed verification
+				pending = self._collect(pending, False)
+				if(self.get_first_failing_stage() != None):
+					break
+				
+				start = time.time()
+				(shuffled_collection, proof) = collection.shuffle_with_proof(
+								workers=self._workers, 
+								ProofClass=self._ProofClass)
+				self.shuffle_times.append(time.time() - start)
+				self.collections.append(shuffled_collection)
+				self.proofs.append(proof)
+				
+				if(pool == None):
+					(self.verified[i], self.verify_times[i]) = \
+						_verify_stage(collection, shuffled_collection, proof)
+				else:
+					pending.append(pool.apply_async(_verify_stage_task, 
+							((i, collection, shuffled_collection, proof),)))
+				
+				collection = shuffled_collection
+			
+			self._collect(pending, True)
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
+		
+		# (stages never started are dropped)
+		stages_run = len(self.proofs)
+		self.verified = self.verified[0:stages_run]
+		self.verify_times = self.verify_times[0:stages_run]
+		
+		return collection
+	
+	def _collect(self, pending, wait):
+		"""
+		Records the results of the verifications in pending (a list of 
+		multiprocessing.AsyncResult) which have finished, or of all of them if 
+		wait is True. Returns the list of those still pending.
+		"""
+		still_pending = []
+		for async_result in pending:
+			if(wait or async_result.ready()):
+				(i, result, elapsed_time) = async_result.get()
+				self.verified[i] = result
+				self.verify_times[i] = elapsed_time
+			else:
+				still_pending.append(async_result)
+		return still_pending
+	
+	def get_first_failing_stage(self):
+		"""
+		Returns the index of the first stage whose proof failed verification, 
+		or None if no stage (verified so far) failed.
+		"""
+		for i in range(0, len(self.verified)):
+			if(self.verified[i] == False):
+				return i
+		return None
+	
+	@staticmethod
+	def find_failing_stage(collections, proofs, workers=None):
+		"""
+		Verifies a cascade run elsewhere (for example, by independent mix 
+		servers), given its collections and proofs.
+		
+		Arguments:
+			collections::CiphertextCollection[]	--
+				The input collection of the cascade followed by the output 
+				collection of each stage.
+			proofs::ShufflingProof[]	-- The proof of shuffling of each stage.
+			workers::int	-- If greater than 1, verify the stages in a pool 
+							   of that many worker processes.
+		
+		Returns:
+			stage::int	-- The index of the first stage whose proof fails 
+						   verification, or None if all of them verify.
+		
+		Throws:
+			ValueError	-- If there is not one more collection than proofs.
+		"""
+		if(len(collections) != len(proofs) + 1):
+			raise ValueError("A cascade of %d stages must have %d " \
+							 "collections, got %d." % \
+							 (len(proofs), len(proofs) + 1, len(collections)))
+		
+		tasks = [(i, collections[i], collections[i + 1], proofs[i]) 
+				 for i in range(0, len(proofs))]
+		
+		if(not parallel.is_parallel(workers)):
+			for task in tasks:
+				(i, result, elapsed_time) = _verify_stage_task(task)
+				if(not result):
+					return i
+			return None
+		
+		pool = parallel.new_pool(workers)
+		success = False
+		try:
+			results = pool.map(_verify_stage_task, tasks)
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
+		
+		for (i, result, elapsed_time) in results:
+			if(not result):
+				return i
+		return None
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  MixNode.py :
+#
+#  This file provides MixNode, a node (mix server) of a mix network, which 
+#  receives a ciphertext collection as a mix stream, shuffles it with a proof 
+#  of shuffling, streams the result to the next node and publishes it to a 
+#  bulletin board directory.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import os
+import time
+
+import plonevotecryptolib.utilities.serialize as serialize
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import \
+													CiphertextCollectionMapping
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+from plonevotecryptolib.Mixnet.ShufflingProof import ShufflingProof
+from plonevotecryptolib.Mixnet.MixStream import MixStreamReader
+from plonevotecryptolib.Mixnet.MixStream import MixStreamWriter
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import InvalidShuffilingProofError
+
+# Names of the files in which each stage is published, inside the bulletin 
+# board directory (collection i is the output of stage i - 1, and proof i the 
+# proof of shuffling from collection i to collection i + 1)
+_BOARD_COLLECTION_FILENAME = "collection_%d.pvcollection"
+_BOARD_PROOF_FILENAME = "proof_%d.pvproof"
+
+class MixNode:
+	"""
+	A node (mix server) of a mix network.
+	
+	A node reads a ciphertext collection from a mix stream (see MixStream.py), 
+	shuffles it with a proof of shuffling, and writes the shuffled collection 
+	and the proof as a mix stream for the next node. The nodes of a mix 
+	network can run as separate processes connected by pipes or sockets (see 
+	the plonevote.mix_node.py tool).
+	
+	The work of consecutive nodes overlaps:
+		
+		* The ciphertexts received are checked and stored as they arrive.
+		
+		* The shuffled collection is streamed to the next node before the 
+		  proof of shuffling is generated, so the next node can shuffle it 
+		  while this node generates the proof.
+	
+	Before sending its own proof, each node verifies the proof of shuffling 
+	of the previous stage against the collection of that stage, taken from 
+	the bulletin board (see run). A node whose input does not verify fails 
+	without sending or publishing its proof, which stops the mix network.
+	
+	If given a bulletin board directory, the node publishes there its output 
+	collection and its proof (both in BinarySerializer format), and, for the 
+	first stage, its input collection. See load_bulletin_board. The 
+	collections are published before the proof is sent, so that the 
+	collection of the previous stage is always on the bulletin board by the 
+	time a node receives its input proof.
+	
+	Attributes (set by run):
+		stage::int	-- The stage of the node in the mix network (the stage of 
+					   its input collection).
+		input_collection::CiphertextCollection	-- The collection received.
+		input_proof::ShufflingProof	-- The proof of shuffling received with 
+									   the input collection (None for the 
+									   first stage).
+		input_verified::bool	-- True if input_proof was verified. None 
+								   for the first stage, or if the collection 
+								   of the previous stage was not available 
+								   (see run).
+		timings::dict	-- The time, in seconds, taken by each step of the 
+						   node: "receive", "shuffle", "send", "verify", 
+						   "prove" and "publish".
+	"""
+	
+	def __init__(self, public_key, bulletin_board=None, ProofClass=None, 
+				 workers=None, directory=None):
+		"""
+		Constructs a new MixNode.
+		
+		Arguments:
+			public_key::PublicKey	-- The public key of the collections mixed.
+			bulletin_board::string	-- The directory in which to publish the 
+									   collections and proofs. None to not 
+									   publish them.
+			ProofClass::class	-- The class of proof of shuffling to 
+								   generate (see 
+								   CiphertextCollection.shuffle_with_proof).
+			workers::int	-- If greater than 1, shuffle the collection and 
+							   generate the proof using that many worker 
+							   processes.
+			directory::string	-- If given, keep the collections of the node 
+								   on disk, in this directory (see 
+								   DiskCiphertextStorage).
+		"""
+		self.public_key = public_key
+		self._bulletin_board = bulletin_board
+		if(ProofClass == None):
+			ProofClass = ShufflingProof
+		self._ProofClass = ProofClass
+		self._workers = workers
+		self._directory = directory
+		
+		self.stage = None
+		self.input_collection = None
+		self.input_proof = None
+		self.input_verified = None
+		self.timings = {}
+	
+	def run(self, input_file, output_file=None, previous_collection=None):
+		"""
+		Runs the node on a single collection.
+		
+		Arguments:
+			input_file::file	-- A file object from which to read the input 
+								   mix stream.
+			output_file::file	-- A file object to which to write the output 
+								   mix stream. None for the last node.
+			previous_collection::CiphertextCollection	--
+				The collection of the previous stage, against which to verify 
+				the input proof. If not given, it is loaded from the bulletin 
+				board. If it is not there either, the input proof is not 
+				verified (input_verified is None), and can only be checked 
+				later (see MixCascade.find_failing_stage).
+		
+		Returns:
+			(shuffled_collection, proof)::
+				(CiphertextCollection, ShufflingProof)	--
+				The shuffled collection and its proof of shuffling.
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError	-- If the input stream is not a 
+											   valid mix stream for the public 
+											   key of the node.
+			InvalidShuffilingProofError	-- If the input stream of a stage 
+										   other than the first has no proof, 
+										   or the proof does not verify.
+		"""
+		start = time.time()
+		reader = MixStreamReader(input_file, self.public_key)
+		self.stage = reader.stage
+		storage = None
+		if(self._directory != None):
+			storage = DiskCiphertextStorage(self._directory)
+		collection = reader.read_collection(storage)
+		self.input_collection = collection
+		self.timings["receive"] = time.time() - start
+		
+		start = time.time()
+		mapping = CiphertextCollectionMapping.new(collection)
+		shuffled_collection = mapping.apply(collection, self._workers)
+		self.timings["shuffle"] = time.time() - start
+		
+		# Send (and publish) the shuffled collection before generating the 
+		# proof, and only then wait for the proof of the previous stage.
+		start = time.time()
+		writer = None
+		if(output_file != None):
+			writer = MixStreamWriter(output_file, self.public_key, 
+									 self.stage + 1)
+			writer.write_collection(shuffled_collection)
+		self.timings["send"] = time.time() - start
+		
+		start = time.time()
+		if(self._bulletin_board != None):
+			if(self.stage == 0):
+				self._publish_collection(collection, self.stage)
+			self._publish_collection(shuffled_collection, self.stage + 1)
+		self.timings["publish"] = time.time() - start
+		
+		# Verify the proof of the previous stage before sending our own
+		start = time.time()
+		self.input_proof = reader.read_proof(self._ProofClass)
+		self.input_verified = self._verify_input_proof(previous_collection)
+		self.timings["verify"] = time.time() - start
+		
+		start = time.time()
+		proof = self._ProofClass.new(collection, shuffled_collection, mapping, 
+									 self._workers)
+		if(writer != None):
+			writer.write_proof(proof)
+			writer.close()
+		self.timings["prove"] = time.time() - start
+		
+		start = time.time()
+		if(self._bulletin_board != None):
+			self._publish_proof(proof, self.stage)
+		self.timings["publish"] += time.time() - start
+		
+		return (shuffled_collection, proof)
+	
+	def _verify_input_proof(self, previous_collection):
+		"""
+		Verifies self.input_proof against previous_collection, or, if not 
+		given, the collection of the previous stage on the bulletin board.
+		
+		Returns True if the proof verifies, and None for the first stage or 
+		if the collection of the previous stage is not available. Throws 
+		InvalidShuffilingProofError otherwise (see run).
+		"""
+		if(self.stage == 0):
+			return None
+		if(self.input_proof == None):
+			raise InvalidShuffilingProofError("The input stream of stage %d " \
+					"does not include the proof of shuffling of the " \
+					"previous stage." % self.stage)
+		
+		if(previous_collection == None and self._bulletin_board != None):
+			filename = os.path.join(self._bulletin_board, 
+									_BOARD_COLLECTION_FILENAME % \
+									(self.stage - 1))
+			if(os.path.exists(filename)):
+				storage = None
+				if(self._directory != None):
+					storage = DiskCiphertextStorage(self._directory)
+				previous_collection = CiphertextCollection.from_file(filename, 
+									self.public_key, 
+									serialize.BinarySerializer, storage)
+		if(previous_collection == None):
+			return None
+		
+		if(not self.input_proof.verify(previous_collection, 
+									   self.input_collection, self._workers)):
+			raise InvalidShuffilingProofError("The proof of shuffling of " \
+					"stage %d does not verify." % (self.stage - 1))
+		return True
+	
+	def _publish_collection(self, collection, stage):
+		"""
+		Publishes the collection of the given stage to the bulletin board.
+		
+		The file is written under a temporary name and then renamed, so that 
+		readers of the bulletin board never see it incomplete.
+		"""
+		filename = os.path.join(self._bulletin_board, 
+								_BOARD_COLLECTION_FILENAME % stage)
+		collection.to_file(filename + ".tmp", serialize.BinarySerializer)
+		os.rename(filename + ".tmp", filename)
+	
+	def _publish_proof(self, proof, stage):
+		"""
+		Publishes the proof of the given stage to the bulletin board (see 
+		_publish_collection).
+		"""
+		filename = os.path.join(self._bulletin_board, 
+								_BOARD_PROOF_FILENAME % stage)
+		proof.to_file(filename + ".tmp", serialize.BinarySerializer)
+		os.rename(filename + ".tmp", filename)
+	
+	@staticmethod
+	def load_bulletin_board(bulletin_board, public_key, ProofClass=None):
+		"""
+		Loads the collections and proofs published to a bulletin board 
+		directory, for all the consecutive stages completed.
+		
+		The result can be checked with MixCascade.find_failing_stage(...).
+		
+		Arguments:
+			bulletin_board::string	-- The bulletin board directory.
+			public_key::PublicKey	-- The public key of the collections.
+			ProofClass::class	-- The class of the proofs of shuffling 
+								   published by the nodes: ShufflingProof 
+								   (the default) or LinearShufflingProof.
+		
+		Returns:
+			(collections, proofs)::(CiphertextCollection[], ShufflingProof[])
+				--
+				The input collection of the mix network followed by the 
+				output collection of each stage, and the proof of each stage.
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError	-- If a published file is 
+											   invalid.
+		"""
+		if(ProofClass == None):
+			ProofClass = ShufflingProof
+		
+		collections = []
+		proofs = []
+		stage = 0
+		while(True):
+			collection_filename = os.path.join(bulletin_board, 
+										_BOARD_COLLECTION_FILENAME % stage)
+			if(not os.path.exists(collection_filename)):
+				break
+			if(stage > 0):
+				proof_filename = os.path.join(bulletin_board, 
+										_BOARD_PROOF_FILENAME % (stage - 1))
+				if(not os.path.exists(proof_filename)):
+					break
+				proofs.append(ProofClass.from_file(proof_filename, 
+									public_key, serialize.BinarySerializer))
+			collections.append(CiphertextCollection.from_file(
+								collection_filename, public_key, 
+								serialize.BinarySerializer))
+			stage += 1
+		return (collections, proofs)
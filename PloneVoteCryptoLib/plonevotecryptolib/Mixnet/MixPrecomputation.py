@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  MixPrecomputation.py :
+#
+#  This file provides MixPrecomputation, a class storing random shuffles
+#  (permutations and re-encryption material (r', g^{r'}, y^{r'})) generated
+#  ahead of time for a future mix of a ciphertext collection, together with
+#  the means to store them into a passphrase-encrypted file.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import base64
+import binascii
+import struct
+from array import array
+
+import Crypto.Hash.SHA256	# sha256 is not available in python 2.4 standard lib
+import Crypto.Hash.HMAC
+from Crypto.Cipher import AES
+
+# Use configuration parameters from params.py
+from plonevotecryptolib import params
+
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+from plonevotecryptolib.utilities import parallel
+import plonevotecryptolib.utilities.serialize as serialize
+
+from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import CiphertextCollectionMapping
+from plonevotecryptolib.Mixnet.CiphertextReencryptionInfo import CiphertextReencryptionInfo
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import IncompatibleMixPrecomputationError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+MixPrecomputation_serialize_structure_definition = {
+	"PloneVoteMixPrecomputation" : (1, 1, {	# Root element
+		"nbits" : (1, 1, None),			# exactly 1 nbits element
+		"PKFingerprint" : (1, 1, None),	# exactly 1 PKFingerprint element
+		"Length" : (1, 1, None),		# exactly 1 Length element
+		"Blocks" : (1, 1, None),		# exactly 1 Blocks element
+		"Salt" : (1, 1, None),			# exactly 1 Salt element
+		"Iterations" : (1, 1, None),	# exactly 1 Iterations element
+		"Mix" : (1, 0, {				# one Mix element per precomputed mix
+			"IV" : (1, 1, None),		# exactly 1 IV element
+			"Data" : (1, 1, None),		# exactly 1 Data element
+			"MAC" : (1, 1, None)		# exactly 1 MAC element
+		})
+	})
+}
+
+# Number of PBKDF2 iterations used by default to derive the file keys from
+# the passphrase
+DEFAULT_KDF_ITERATIONS = 100000
+
+# Sizes in bytes of the salt and of the derived keys
+_SALT_SIZE = 16
+_KEY_SIZE = 32
+
+
+def _pbkdf2(passphrase, salt, iterations):
+	"""
+	Derives a _KEY_SIZE bytes key from passphrase, using PBKDF2 with
+	HMAC-SHA256 (RFC 2898).
+	
+	(Crypto.Protocol.KDF is not available in all the versions of pycrypto we
+	support.)
+	"""
+	prf = Crypto.Hash.HMAC.new(passphrase, digestmod=Crypto.Hash.SHA256)
+	
+	# (_KEY_SIZE is the size of a single SHA256 block, so only the first
+	# PBKDF2 block is needed)
+	hasher = prf.copy()
+	hasher.update(salt + struct.pack(">L", 1))
+	u = hasher.digest()
+	result = long(binascii.hexlify(u), 16)
+	for i in range(1, iterations):
+		hasher = prf.copy()
+		hasher.update(u)
+		u = hasher.digest()
+		result ^= long(binascii.hexlify(u), 16)
+	return binascii.unhexlify("%064x" % result)
+
+def _derive_keys(passphrase, salt, iterations):
+	"""
+	Returns the (encryption_key, mac_key) pair for a precomputation file.
+	"""
+	master_key = _pbkdf2(passphrase, salt, iterations)
+	encryption_key = Crypto.Hash.HMAC.new(master_key, "encryption",
+										  Crypto.Hash.SHA256).digest()
+	mac_key = Crypto.Hash.HMAC.new(master_key, "authentication",
+								   Crypto.Hash.SHA256).digest()
+	return (encryption_key, mac_key)
+
+def _constant_time_equals(a, b):
+	"""
+	Compares two strings in time independent of where they differ.
+	"""
+	if(len(a) != len(b)):
+		return False
+	result = 0
+	for i in range(0, len(a)):
+		result |= ord(a[i]) ^ ord(b[i])
+	return (result == 0)
+
+def _new_precomputed_mapping(public_key, length, blocks):
+	"""
+	Generates a random mapping for collections of length ciphertexts of
+	blocks blocks each, with all its re-encryption material computed.
+	DO NOT USE EXTERNALLY.
+	"""
+	random = RandomSource()
+	mapping = CiphertextCollectionMapping()
+	mapping._reordering = random.permutation(length)
+	for i in range(0, length):
+		reencryption = CiphertextReencryptionInfo.new(public_key, blocks,
+													  random)
+		reencryption._compute_blocks()
+		mapping._reencryptions.append(reencryption)
+	return mapping
+
+def _precompute_mapping_task(task):
+	"""
+	Worker process task: _new_precomputed_mapping(*task).
+	DO NOT USE EXTERNALLY.
+	"""
+	(public_key, length, blocks) = task
+	return _new_precomputed_mapping(public_key, length, blocks)
+
+
+class MixPrecomputation:
+	"""
+	Stores random shuffles precomputed for a future mix.
+	
+	A mix server knows its public key, and a bound on the size of the
+	collection it will mix, before that collection is available. A
+	MixPrecomputation object holds a number of random mappings
+	(CiphertextCollectionMapping) for collections of up to that size, whose
+	re-encryption material (r', g^{r'}, y^{r'}) has already been computed.
+	Mixing with them (see CiphertextCollection.shuffle_with_proof) then
+	requires almost no modular exponentiations for generating the shuffles.
+	
+	The precomputation can be stored to a file encrypted with a passphrase
+	(see to_file), since anyone who knows the precomputed mappings can link
+	the ciphertexts of the mix. Each precomputed mapping is removed from the
+	object when used, and must never be used again: the file should be
+	deleted once it has been loaded for a mix.
+	
+	Attributes:
+		public_key::PublicKey	-- The public key of the collections to mix.
+	"""
+	
+	def get_length(self):
+		"""
+		Returns the maximum number of ciphertexts of the collections that can
+		be mixed with this precomputation.
+		"""
+		return self._length
+	
+	def get_blocks(self):
+		"""
+		Returns the maximum length in blocks of the ciphertexts that can be
+		mixed with this precomputation.
+		"""
+		return self._blocks
+	
+	def get_remaining(self):
+		"""
+		Returns the number of precomputed mappings not yet used.
+		"""
+		return len(self._mappings)
+	
+	def __init__(self, public_key, length, blocks):
+		"""
+		Constructs a new empty MixPrecomputation.
+		
+		This method should not be used outside of this class. Consider using
+		MixPrecomputation.new(...) or MixPrecomputation.from_file(...).
+		"""
+		self.public_key = public_key
+		self._length = length
+		self._blocks = blocks
+		self._mappings = []
+	
+	@classmethod
+	def new(cls, public_key, length, blocks=1, count=None, workers=None):
+		"""
+		Precomputes random mappings for a future mix.
+		
+		Arguments:
+			public_key::PublicKey	-- The public key of the collections to
+									   mix.
+			length::int	-- The maximum number of ciphertexts of the
+						   collections to mix.
+			blocks::int	-- The maximum length in blocks of each ciphertext.
+			count::int	-- The number of mappings to precompute. By default,
+						   params.SHUFFLING_PROOF_SECURITY_PARAMETER + 1,
+						   enough for one mix with a ShufflingProof.
+			workers::int	-- If given (and greater than 1), the number of
+							   worker processes among which to distribute the
+							   precomputation.
+		
+		Returns:
+			precomputation::MixPrecomputation	-- The new precomputation.
+		"""
+		if(count == None):
+			count = params.SHUFFLING_PROOF_SECURITY_PARAMETER + 1
+		
+		precomputation = MixPrecomputation(public_key, length, blocks)
+		tasks = [(public_key, length, blocks) for i in range(0, count)]
+		
+		pool = parallel.new_pool(workers)
+		success = False
+		try:
+			if(pool == None):
+				mappings = [_precompute_mapping_task(task) for task in tasks]
+			else:
+				mappings = pool.map(_precompute_mapping_task, tasks)
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
+		
+		precomputation._mappings = list(mappings)
+		return precomputation
+	
+	def next_mapping(self, collection):
+		"""
+		Removes the next precomputed mapping from this object, and returns it
+		as a mapping for the given collection.
+		
+		If the collection has fewer ciphertexts, or its ciphertexts have fewer
+		blocks, than the precomputation, the mapping is restricted to it. (A
+		uniformly random permutation, restricted to the relative order of a
+		subset of its elements, is still uniformly random.)
+		
+		Arguments:
+			collection::CiphertextCollection	-- The collection to shuffle.
+		
+		Returns:
+			mapping::CiphertextCollectionMapping --
+				A mapping from collection to a randomly shuffled new collection.
+		
+		Throws:
+			IncompatibleMixPrecomputationError --
+				If there are no precomputed mappings left, or the collection
+				does not have the same public key as the precomputation, is
+				longer than it or has ciphertexts with too many blocks.
+		"""
+		if(len(self._mappings) == 0):
+			raise IncompatibleMixPrecomputationError("All the precomputed " \
+				"mappings of this MixPrecomputation have already been used.")
+		
+		if(collection.public_key.get_fingerprint() !=
+		   self.public_key.get_fingerprint()):
+			raise IncompatibleMixPrecomputationError("The collection was not " \
+				"created with the public key of this MixPrecomputation.")
+		
+		length = collection.get_length()
+		if(length > self._length):
+			raise IncompatibleMixPrecomputationError("The collection has %d " \
+				"ciphertexts, but this MixPrecomputation supports at most %d." \
+				% (length, self._length))
+		
+		for ciphertext in collection:
+			if(ciphertext.get_length() > self._blocks):
+				raise IncompatibleMixPrecomputationError("The collection " \
+					"contains a ciphertext of %d blocks, but this " \
+					"MixPrecomputation supports at most %d." \
+					% (ciphertext.get_length(), self._blocks))
+		
+		precomputed = self._mappings.pop(0)
+		
+		# Restrict the reordering to the first length indexes, keeping their
+		# relative order
+		positions = precomputed._reordering
+		order = range(0, length)
+		order.sort(key=positions.__getitem__)
+		reordering = array('l', [0]) * length
+		for rank in range(0, length):
+			reordering[order[rank]] = rank
+		
+		mapping = CiphertextCollectionMapping()
+		mapping._reordering = reordering
+		
+		# Restrict each re-encryption to the blocks of its ciphertext
+		i = 0
+		for ciphertext in collection:
+			reencryption = precomputed._reencryptions[i]
+			ciphertext_len = ciphertext.get_length()
+			if(ciphertext_len != self._blocks):
+				exponents = reencryption.get_exponents()
+				restricted = CiphertextReencryptionInfo(self.public_key)
+				for j in range(0, ciphertext_len):
+					gr, yr = reencryption[j]
+					restricted.add_block(gr, yr, exponents[j])
+				reencryption = restricted
+			mapping._reencryptions.append(reencryption)
+			i += 1
+		
+		return mapping
+	
+	def _get_header(self, count):
+		"""
+		Returns the data that identifies this precomputation in the MAC of
+		each of its count stored mixes.
+		"""
+		return "PloneVoteMixPrecomputation,%s,%d,%d,%d,%d," % \
+			(self.public_key.get_fingerprint(),
+			 self.public_key.cryptosystem.get_nbits(),
+			 self._length, self._blocks, count)
+	
+	def _mapping_to_string(self, mapping):
+		"""
+		Encodes a precomputed mapping as a string of bytes: its reordering
+		(4 bytes per index) followed by r', g^{r'} and y^{r'} for each block
+		of each re-encryption (nbits bits each).
+		"""
+		nbits = self.public_key.cryptosystem.get_nbits()
+		value_format = "%%0%dx" % (2 * ((nbits + 7) / 8))
+		
+		parts = []
+		for reencryption in mapping._reencryptions:
+			exponents = reencryption.get_exponents()
+			j = 0
+			for (gr, yr) in reencryption:
+				parts.append(value_format % exponents[j])
+				parts.append(value_format % gr)
+				parts.append(value_format % yr)
+				j += 1
+		
+		return struct.pack(">%dL" % self._length, *mapping._reordering) + \
+			   binascii.unhexlify("".join(parts))
+	
+	def _mapping_from_string(self, data):
+		"""
+		Decodes a mapping encoded by _mapping_to_string.
+		
+		Throws:
+			ValueError	-- If data is not a valid encoded mapping.
+		"""
+		nbits = self.public_key.cryptosystem.get_nbits()
+		value_digits = 2 * ((nbits + 7) / 8)
+		num_values = 3 * self._length * self._blocks
+		reordering_size = 4 * self._length
+		if(len(data) != reordering_size + num_values * value_digits / 2):
+			raise ValueError("Wrong precomputed mapping length.")
+		
+		mapping = CiphertextCollectionMapping()
+		mapping._reordering = array('l',
+				struct.unpack(">%dL" % self._length, data[:reordering_size]))
+		if(sorted(mapping._reordering) != range(0, self._length)):
+			raise ValueError("The reordering is not a permutation.")
+		
+		hex_data = binascii.hexlify(data[reordering_size:])
+		pos = 0
+		for i in range(0, self._length):
+			reencryption = CiphertextReencryptionInfo(self.public_key)
+			for j in range(0, self._blocks):
+				values = []
+				for k in range(0, 3):
+					values.append(long(hex_data[pos:pos + value_digits], 16))
+					pos += value_digits
+				reencryption.add_block(values[1], values[2], values[0])
+			mapping._reencryptions.append(reencryption)
+		
+		return mapping
+	
+	def to_file(self, filename, passphrase,
+				SerializerClass=serialize.XMLSerializer,
+				iterations=DEFAULT_KDF_ITERATIONS, compression=None,
+				compact=None):
+		"""
+		Saves the remaining precomputed mappings to a file, encrypted with the
+		given passphrase.
+		
+		Each mapping is encrypted with AES-256 in CBC mode and authenticated
+		with HMAC-SHA256, with keys derived from the passphrase using PBKDF2.
+		
+		Arguments:
+			filename::string	-- The path to the file in which to store
+								   the precomputation.
+			passphrase::string	-- The passphrase with which to encrypt the
+								   file.
+			SerializerClass::class --
+				The class that provides the serialization. XMLSerializer by
+				default. Must inherit from serialize.BaseSerializer and provide
+				an adequate serialize_to_file method.
+				Note that often the same class used to serialize the data must
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+			iterations::int	-- The number of PBKDF2 iterations.
+			compression::string	-- See serialize.BaseSerializer.
+			compact::bool	-- See serialize.BaseSerializer.
+		"""
+		# Create a new serializer object for the precomputation structure
+		# definition
+		serializer = SerializerClass(
+						MixPrecomputation_serialize_structure_definition)
+		
+		random = RandomSource()
+		salt = random.read(_SALT_SIZE)
+		(encryption_key, mac_key) = _derive_keys(passphrase, salt, iterations)
+		header = self._get_header(len(self._mappings))
+		
+		mixes = []
+		for index in range(0, len(self._mappings)):
+			plaintext = self._mapping_to_string(self._mappings[index])
+			
+			# PKCS#7 padding
+			padding = AES.block_size - len(plaintext) % AES.block_size
+			plaintext += chr(padding) * padding
+			
+			iv = random.read(AES.block_size)
+			ciphertext = AES.new(encryption_key, AES.MODE_CBC, iv).encrypt(
+																	plaintext)
+			mac = Crypto.Hash.HMAC.new(mac_key, header + str(index) + "," + \
+							iv + ciphertext, Crypto.Hash.SHA256).digest()
+			
+			mixes.append({"IV" : base64.b64encode(iv),
+						  "Data" : base64.b64encode(ciphertext),
+						  "MAC" : base64.b64encode(mac)})
+		
+		data = {
+			"PloneVoteMixPrecomputation" : {
+				"nbits" : str(self.public_key.cryptosystem.get_nbits()),
+				"PKFingerprint" : self.public_key.get_fingerprint(),
+				"Length" : str(self._length),
+				"Blocks" : str(self._blocks),
+				"Salt" : base64.b64encode(salt),
+				"Iterations" : str(iterations),
+				"Mix" : mixes
+			}
+		}
+		
+		# Use the serializer to store the data to file
+		serializer.serialize_to_file(filename, data, compression=compression,
+									 compact=compact)
+	
+	@classmethod
+	def from_file(cls, filename, public_key, passphrase,
+				  SerializerClass=serialize.XMLSerializer):
+		"""
+		Loads an instance of MixPrecomputation from the given file.
+		
+		Arguments:
+			filename::string	-- The name of a file containing the
+								   precomputation in serialized form.
+			public_key::PublicKey	-- The public key of the precomputation
+									   (must match the fingerprint stored in
+									   the file).
+			passphrase::string	-- The passphrase with which the file was
+								   encrypted.
+			SerializerClass::class --
+				The class that provides the deserialization. XMLSerializer by
+				default. Must inherit from serialize.BaseSerializer and provide
+				an adequate deserialize_from_file method.
+				Note that often the same class used to serialize the data must
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the file is not a valid
+											   PloneVoteCryptoLib stored
+											   precomputation file for the
+											   given public key, or the
+											   passphrase is wrong.
+		"""
+		# Create a new serializer object for the precomputation structure
+		# definition
+		serializer = SerializerClass(
+						MixPrecomputation_serialize_structure_definition)
+		
+		# Deserialize the MixPrecomputation instance from file
+		try:
+			data = serializer.deserialize_from_file(filename)
+		except serialize.InvalidSerializeDataError, e:
+			# Convert the exception to an InvalidPloneVoteCryptoFileError
+			raise InvalidPloneVoteCryptoFileError(filename,
+				"File \"%s\" does not contain a valid mix precomputation. The " \
+				"following error occurred while trying to deserialize the " \
+				"file contents: %s" % (filename, str(e)))
+		
+		root = data["PloneVoteMixPrecomputation"]
+		
+		# Check that the precomputation belongs to the given public key
+		if(root["PKFingerprint"] != public_key.get_fingerprint() or
+		   root["nbits"] != str(public_key.cryptosystem.get_nbits())):
+			raise InvalidPloneVoteCryptoFileError(filename,
+				"File \"%s\" does not contain a mix precomputation for the " \
+				"given public key." % filename)
+		
+		mixes = root["Mix"]
+		if(not isinstance(mixes, list)):
+			mixes = [mixes]
+		
+		try:
+			length = int(root["Length"])
+			blocks = int(root["Blocks"])
+			iterations = int(root["Iterations"])
+			if(length < 0 or blocks < 1 or iterations < 1):
+				raise ValueError("Invalid precomputation parameters.")
+			salt = base64.b64decode(root["Salt"])
+			
+			precomputation = cls(public_key, length, blocks)
+			(encryption_key, mac_key) = _derive_keys(passphrase, salt,
+													 iterations)
+			header = precomputation._get_header(len(mixes))
+			
+			for index in range(0, len(mixes)):
+				iv = base64.b64decode(mixes[index]["IV"])
+				ciphertext = base64.b64decode(mixes[index]["Data"])
+				mac = base64.b64decode(mixes[index]["MAC"])
+				
+				# Authenticate before decrypting
+				expected_mac = Crypto.Hash.HMAC.new(mac_key,
+							header + str(index) + "," + iv + ciphertext,
+							Crypto.Hash.SHA256).digest()
+				if(not _constant_time_equals(mac, expected_mac)):
+					raise InvalidPloneVoteCryptoFileError(filename,
+						"File \"%s\" could not be authenticated: the " \
+						"passphrase is wrong or the file has been modified." \
+						% filename)
+				
+				if(len(iv) != AES.block_size or len(ciphertext) == 0 or
+				   len(ciphertext) % AES.block_size != 0):
+					raise ValueError("Invalid encrypted data length.")
+				plaintext = AES.new(encryption_key, AES.MODE_CBC, iv).decrypt(
+																	ciphertext)
+				padding = ord(plaintext[-1])
+				if(not (1 <= padding <= AES.block_size)):
+					raise ValueError("Invalid padding.")
+				plaintext = plaintext[:-padding]
+				
+				precomputation._mappings.append(
+						precomputation._mapping_from_string(plaintext))
+		except (ValueError, TypeError, binascii.Error), e:
+			raise InvalidPloneVoteCryptoFileError(filename,
+				"File \"%s\" does not contain a valid mix precomputation: %s" \
+				% (filename, str(e)))
+		
+		return precomputation
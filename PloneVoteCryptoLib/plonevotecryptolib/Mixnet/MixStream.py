@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  MixStream.py :
+#
+#  This file provides MixStreamWriter and MixStreamReader, which send a 
+#  ciphertext collection and its proof of shuffling between the nodes of a 
+#  mix network through a pipe or socket, as a stream of frames that can be 
+#  processed as they arrive.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import struct
+import binascii
+
+import plonevotecryptolib.utilities.serialize as serialize
+
+from plonevotecryptolib.Ciphertext import Ciphertext
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.ShufflingProof import ShufflingProof
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+## THE STREAM FORMAT:
+#
+# A stream is a sequence of frames, each formed by a 1 byte frame type, the 
+# length of its payload as a 4 byte big-endian unsigned integer, and the 
+# payload itself. The frames of a stream are, in order:
+#
+#	* One FRAME_HEADER frame, whose payload is the BinarySerializer 
+#	  serialization of MixStream_header_serialize_structure_definition: the 
+#	  nbits and public key fingerprint of the ciphertexts, and the stage of 
+#	  the mix network that produced the collection (0 for the input of the 
+#	  first node).
+#
+#	* One FRAME_CIPHERTEXT frame per ciphertext of the collection, in order, 
+#	  whose payload is the gamma and delta values of each of its blocks, 
+#	  each encoded as a fixed-width big-endian number of nbits bits (as in 
+#	  DiskCiphertextStorage). A ciphertext may have at most 
+#	  MAX_CIPHERTEXT_BLOCKS blocks.
+#
+#	* Optionally, one FRAME_PROOF frame, with the proof of shuffling from 
+#	  the collection of the previous stage to this one, serialized with 
+#	  BinarySerializer (see the to_string method of the proof classes). The 
+#	  class of the proof is not stored: all the nodes of a mix network use 
+#	  the same one.
+#
+#	* One FRAME_END frame, with an empty payload.
+#
+# The reader rejects frames longer than their type allows before reading 
+# their payload, so that a peer cannot make it allocate an arbitrary amount 
+# of memory by announcing a long frame. The size of a FRAME_PROOF frame 
+# depends on the collection, so it is read in chunks of at most 
+# _READ_CHUNK_SIZE bytes instead: only the data actually sent is allocated.
+##
+
+FRAME_HEADER = "H"
+FRAME_CIPHERTEXT = "C"
+FRAME_PROOF = "P"
+FRAME_END = "E"
+
+_FRAME_PREFIX_FORMAT = ">cL"
+_FRAME_PREFIX_SIZE = struct.calcsize(_FRAME_PREFIX_FORMAT)
+
+MAX_CIPHERTEXT_BLOCKS = 1024
+_MAX_HEADER_SIZE = 1024
+_READ_CHUNK_SIZE = 64 * 1024
+
+MixStream_header_serialize_structure_definition = {
+	"PloneVoteMixStream" : (1, 1, {		# Root element
+		"nbits" : (1, 1, None),			# exactly 1 nbits element
+		"PKFingerprint" : (1, 1, None),	# exactly 1 PKFingerprint element
+		"Stage" : (1, 1, None)			# exactly 1 Stage element
+	})
+}
+
+class MixStreamWriter:
+	"""
+	Writes a ciphertext collection, and optionally its proof of shuffling, as 
+	a mix stream (see the stream format above).
+	
+	Each ciphertext is written as soon as it is given, so that the reader can 
+	start processing the collection before it has been written completely.
+	
+	Usage:
+		writer = MixStreamWriter(file_object, public_key, stage)
+		writer.write_collection(collection)
+		writer.write_proof(proof)
+		writer.close()
+	"""
+	
+	def __init__(self, file_object, public_key, stage=0):
+		"""
+		Constructs a new MixStreamWriter and writes the header of the stream.
+		
+		Arguments:
+			file_object::file	-- A file object open for writing in binary 
+								   mode (such as a pipe or socket.makefile).
+			public_key::PublicKey	-- The public key of the collection.
+			stage::int	-- The stage of the mix network that produced the 
+						   collection.
+		"""
+		self._file = file_object
+		self.public_key = public_key
+		self.stage = stage
+		
+		self._nbits = public_key.cryptosystem.get_nbits()
+		self._digits = 2 * ((self._nbits + 7) / 8)
+		self._value_format = "%%0%dx" % self._digits
+		
+		header = {
+			"PloneVoteMixStream" : {
+				"nbits" : str(self._nbits),
+				"PKFingerprint" : public_key.get_fingerprint(),
+				"Stage" : str(stage)
+			}
+		}
+		serializer = serialize.BinarySerializer(
+							MixStream_header_serialize_structure_definition)
+		self._write_frame(FRAME_HEADER, serializer.serialize_to_string(header))
+	
+	def _write_frame(self, frame_type, payload):
+		"""
+		Writes a single frame to the stream.
+		"""
+		self._file.write(struct.pack(_FRAME_PREFIX_FORMAT, frame_type, 
+									 len(payload)))
+		self._file.write(payload)
+	
+	def write_ciphertext(self, ciphertext):
+		"""
+		Writes the next ciphertext of the collection.
+		
+		Arguments:
+			ciphertext::Ciphertext	-- The ciphertext to write.
+		
+		Throws:
+			IncompatibleCiphertextError	-- If the ciphertext was not encrypted 
+										   with the public key of the stream 
+										   (or has no blocks, or more than 
+										   MAX_CIPHERTEXT_BLOCKS).
+		"""
+		if(ciphertext.pk_fingerprint != self.public_key.get_fingerprint() or 
+		   ciphertext.nbits != self._nbits):
+			raise IncompatibleCiphertextError("The given ciphertext was not " \
+					"encrypted with the public key of this stream.")
+		if(ciphertext.get_length() > MAX_CIPHERTEXT_BLOCKS):
+			raise IncompatibleCiphertextError("The given ciphertext has %d " \
+					"blocks, but a mix stream can only contain ciphertexts " \
+					"of up to %d blocks." \
+					% (ciphertext.get_length(), MAX_CIPHERTEXT_BLOCKS))
+		parts = []
+		for (gamma, delta) in ciphertext:
+			parts.append(self._value_format % gamma)
+			parts.append(self._value_format % delta)
+		data = "".join(parts)
+		if(len(parts) == 0 or len(data) != len(parts) * self._digits):
+			raise IncompatibleCiphertextError("The given ciphertext is empty " \
+					"or contains a value that does not fit in %d bits." \
+					% self._nbits)
+		try:
+			payload = binascii.unhexlify(data)
+		except TypeError:
+			raise IncompatibleCiphertextError("The given ciphertext contains " \
+					"a negative value.")
+		self._write_frame(FRAME_CIPHERTEXT, payload)
+	
+	def write_collection(self, collection):
+		"""
+		Writes every ciphertext of the given collection, in order.
+		
+		Arguments:
+			collection::CiphertextCollection	-- The collection to write.
+		"""
+		for ciphertext in collection:
+			self.write_ciphertext(ciphertext)
+		self._file.flush()
+	
+	def write_proof(self, proof):
+		"""
+		Writes the proof of shuffling from the collection of the previous 
+		stage to the collection written.
+		
+		Arguments:
+			proof::ShufflingProof	-- The proof of shuffling (a ShufflingProof 
+									   or LinearShufflingProof).
+		"""
+		self._write_frame(FRAME_PROOF, 
+						  proof.to_string(serialize.BinarySerializer))
+		self._file.flush()
+	
+	def close(self):
+		"""
+		Ends the stream (the file object itself is not closed).
+		"""
+		self._write_frame(FRAME_END, "")
+		self._file.flush()
+
+
+class MixStreamReader:
+	"""
+	Reads a ciphertext collection, and optionally its proof of shuffling, from 
+	a mix stream (see the stream format above).
+	
+	The ciphertexts are checked and added to the collection as they arrive, 
+	overlapping this work with the transfer of the rest of the stream.
+	
+	Usage:
+		reader = MixStreamReader(file_object, public_key)
+		collection = reader.read_collection()
+		proof = reader.read_proof(ProofClass)
+	
+	Attributes:
+		stage::int	-- The stage of the mix network that produced the 
+					   collection, as given in the header of the stream.
+	"""
+	
+	def __init__(self, file_object, public_key):
+		"""
+		Constructs a new MixStreamReader and reads the header of the stream.
+		
+		Arguments:
+			file_object::file	-- A file object open for reading in binary 
+								   mode (such as a pipe or socket.makefile).
+			public_key::PublicKey	-- The public key of the collection.
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError	-- If the stream does not start 
+											   with a valid header for the 
+											   given public key.
+		"""
+		self._file = file_object
+		self._name = getattr(file_object, "name", "<stream>")
+		self.public_key = public_key
+		self._nbits = public_key.cryptosystem.get_nbits()
+		self._value_size = (self._nbits + 7) / 8
+		self._next_frame = None
+		
+		(frame_type, payload) = self._read_frame()
+		if(frame_type != FRAME_HEADER):
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s does not start with a mix stream header." \
+				% self._name)
+		serializer = serialize.BinarySerializer(
+							MixStream_header_serialize_structure_definition)
+		try:
+			header = serializer.deserialize_from_string(payload)
+		except serialize.InvalidSerializeDataError, e:
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s has an invalid header: %s" % (self._name, e))
+		header = header["PloneVoteMixStream"]
+		
+		if(header["PKFingerprint"] != public_key.get_fingerprint() or 
+		   header["nbits"] != str(self._nbits)):
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s contains a collection for a different public " \
+				"key." % self._name)
+		try:
+			self.stage = int(header["Stage"])
+		except ValueError:
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s has an invalid stage: %s" \
+				% (self._name, header["Stage"]))
+	
+	def _read_exactly(self, size):
+		"""
+		Reads size bytes from the stream, failing if it ends before.
+		
+		The data is read in chunks of at most _READ_CHUNK_SIZE bytes, so that 
+		no more memory than that of the data actually read is allocated.
+		"""
+		parts = []
+		remaining = size
+		while(remaining > 0):
+			data = self._file.read(min(remaining, _READ_CHUNK_SIZE))
+			if(len(data) == 0):
+				raise InvalidPloneVoteCryptoFileError(self._name, 
+					"The stream %s is truncated." % self._name)
+			parts.append(data)
+			remaining -= len(data)
+		return "".join(parts)
+	
+	def _read_frame(self):
+		"""
+		Reads the next frame of the stream, returning a tuple 
+		(frame_type, payload).
+		"""
+		if(self._next_frame != None):
+			frame = self._next_frame
+			self._next_frame = None
+			return frame
+		(frame_type, length) = struct.unpack(_FRAME_PREFIX_FORMAT, 
+							self._read_exactly(_FRAME_PREFIX_SIZE))
+		
+		# Check the length of the frame before reading it (see the stream 
+		# format above)
+		if(frame_type == FRAME_HEADER):
+			max_length = _MAX_HEADER_SIZE
+		elif(frame_type == FRAME_CIPHERTEXT):
+			max_length = MAX_CIPHERTEXT_BLOCKS * 2 * self._value_size
+		elif(frame_type == FRAME_PROOF):
+			max_length = None
+		elif(frame_type == FRAME_END):
+			max_length = 0
+		else:
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s contains a frame of unknown type %r." \
+				% (self._name, frame_type))
+		if(max_length != None and length > max_length):
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s contains a frame of type %r of %d bytes, " \
+				"but frames of that type may be at most %d bytes long." \
+				% (self._name, frame_type, length, max_length))
+		
+		return (frame_type, self._read_exactly(length))
+	
+	def _decode_ciphertext(self, payload):
+		"""
+		Returns the ciphertext encoded in the payload of a FRAME_CIPHERTEXT 
+		frame.
+		"""
+		digits = 2 * self._value_size
+		if(len(payload) == 0 or len(payload) % (2 * self._value_size) != 0):
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s contains a ciphertext of an invalid size (%d " \
+				"bytes)." % (self._name, len(payload)))
+		data = binascii.hexlify(payload)
+		ciphertext = Ciphertext(self._nbits, self.public_key.get_fingerprint())
+		for pos in range(0, len(data), 2 * digits):
+			gamma = long(data[pos:pos + digits], 16)
+			delta = long(data[pos + digits:pos + 2 * digits], 16)
+			ciphertext.append(gamma, delta)
+		return ciphertext
+	
+	def read_collection(self, storage=None, reject_duplicates=False):
+		"""
+		Reads the ciphertexts of the stream into a new collection.
+		
+		Arguments:
+			storage::CiphertextStorage	-- The (empty) storage in which the 
+										   new collection keeps its 
+										   ciphertexts. A new 
+										   MemoryCiphertextStorage if not 
+										   given.
+			reject_duplicates::bool	-- Whether the new collection rejects 
+									   duplicate ciphertexts (see 
+									   CiphertextCollection.__init__).
+		
+		Returns:
+			collection::CiphertextCollection	-- The collection read.
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError	-- If the stream is truncated, or 
+											   contains an invalid or 
+											   duplicate ciphertext.
+		"""
+		collection = CiphertextCollection(self.public_key, storage, 
+										  reject_duplicates)
+		while(True):
+			(frame_type, payload) = self._read_frame()
+			if(frame_type != FRAME_CIPHERTEXT):
+				self._next_frame = (frame_type, payload)
+				break
+			try:
+				collection.add_ciphertext(self._decode_ciphertext(payload))
+			except IncompatibleCiphertextError, e:
+				raise InvalidPloneVoteCryptoFileError(self._name, 
+					"The stream %s contains an invalid ciphertext: %s" \
+					% (self._name, str(e)))
+		return collection
+	
+	def read_proof(self, ProofClass=None):
+		"""
+		Reads the proof of shuffling that follows the collection, if any, and 
+		the end of the stream.
+		
+		Arguments:
+			ProofClass::class	-- The class of the proof of shuffling: 
+								   ShufflingProof (the default) or 
+								   LinearShufflingProof.
+		
+		Returns:
+			proof::ShufflingProof	-- The proof of shuffling from the 
+									   collection of the previous stage to 
+									   the collection read, or None if the 
+									   stream does not include it.
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError	-- If the stream is truncated, 
+											   has unexpected frames, or 
+											   contains an invalid proof.
+		"""
+		if(ProofClass == None):
+			ProofClass = ShufflingProof
+		
+		proof = None
+		(frame_type, payload) = self._read_frame()
+		if(frame_type == FRAME_PROOF):
+			try:
+				proof = ProofClass.from_string(payload, self.public_key, 
+											   serialize.BinarySerializer)
+			except InvalidPloneVoteCryptoFileError, e:
+				raise InvalidPloneVoteCryptoFileError(self._name, 
+					"The stream %s contains an invalid proof: %s" \
+					% (self._name, e.msg))
+			(frame_type, payload) = self._read_frame()
+		if(frame_type != FRAME_END):
+			raise InvalidPloneVoteCryptoFileError(self._name, 
+				"The stream %s contains an unexpected frame of type %r." \
+				% (self._name, frame_type))
+		return proof
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  ShardedShufflingProof.py :
+#
+#  This file provides ShardedShufflingProof, which shuffles a ciphertext 
+#  collection in several rounds, each of which splits the collection into 
+#  buckets that are shuffled and proven independently (and in parallel), and 
+#  proves the whole shuffle as the composition of the proofs of every bucket.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+# Process pools for shuffling and verifying buckets:
+import plonevotecryptolib.utilities.parallel as parallel
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+
+# Exceptions:
+from plonevotecryptolib.PVCExceptions import \
+										IncompatibleCiphertextCollectionError
+from plonevotecryptolib.PVCExceptions import InvalidShuffilingProofError
+
+def _partition(collection, buckets):
+	"""
+	Splits collection into the given number of buckets, bucket j containing 
+	the ciphertexts at positions j, j + buckets, j + 2*buckets, ..., in order.
+	Returns the list of buckets, as collections.
+	DO NOT USE EXTERNALLY.
+	"""
+	result = []
+	for j in range(0, buckets):
+		bucket = CiphertextCollection(collection.public_key, 
+									  collection._storage.new_storage())
+		for i in range(j, collection.get_length(), buckets):
+			bucket.add_ciphertext(collection[i])
+		result.append(bucket)
+	return result
+
+def _segments(collection, sizes):
+	"""
+	Splits collection into consecutive segments of the given sizes. Returns 
+	the list of segments, as collections.
+	DO NOT USE EXTERNALLY.
+	"""
+	result = []
+	start = 0
+	for size in sizes:
+		segment = CiphertextCollection(collection.public_key, 
+									   collection._storage.new_storage())
+		for i in range(start, start + size):
+			segment.add_ciphertext(collection[i])
+		result.append(segment)
+		start += size
+	return result
+
+def _shuffle_bucket_task(task):
+	"""
+	Worker process task: shuffles a bucket with proof.
+	
+	Takes a tuple (bucket, ProofClass, in_worker) and returns a tuple 
+	(shuffled_bucket, proof), or the message of the 
+	IncompatibleCiphertextCollectionError raised, as a string. in_worker must 
+	be False if the task runs in the parent process.
+	DO NOT USE EXTERNALLY.
+	"""
+	(bucket, ProofClass, in_worker) = task
+	try:
+		(shuffled_bucket, proof) = bucket.shuffle_with_proof(
+												ProofClass=ProofClass)
+	except IncompatibleCiphertextCollectionError, e:
+		return str(e)
+	
+	# The collections created in a worker are returned to the parent process 
+	# (in the parent process, they must not be handed over to the next pool 
+	# that pickles them)
+	if(in_worker):
+		shuffled_bucket._storage.hand_over()
+		for collection in getattr(proof, "_collections", []):
+			if(isinstance(collection, CiphertextCollection)):
+				collection._storage.hand_over()
+	return (shuffled_bucket, proof)
+
+def _verify_bucket_task(task):
+	"""
+	Worker process task: verifies the proof of a bucket.
+	
+	Takes a tuple (round, bucket_index, bucket, shuffled_bucket, proof) and 
+	returns a tuple (round, bucket_index, result), where result is False if 
+	the proof does not verify or does not meet the security standards of 
+	params.py.
+	DO NOT USE EXTERNALLY.
+	"""
+	(r, j, bucket, shuffled_bucket, proof) = task
+	try:
+		result = proof.verify(bucket, shuffled_bucket)
+	except InvalidShuffilingProofError:
+		result = False
+	return (r, j, result)
+
+
+class ShardedShufflingProof:
+	"""
+	A proof of shuffling for a shuffle done in buckets, over several rounds.
+	
+	A ShufflingProof or LinearShufflingProof requires shuffling the whole 
+	collection at once. Instead, a sharded shuffle of a collection runs 
+	several rounds. In each round:
+		
+		1) The collection is split into B buckets, bucket j containing the 
+		   ciphertexts at positions j, j + B, j + 2B, ...
+		
+		2) Each bucket is shuffled with proof, independently (in parallel, by 
+		   separate worker processes, each of which only needs its bucket).
+		
+		3) The shuffled buckets, concatenated in order, form the collection 
+		   for the next round.
+	
+	The collection of the last round is the shuffled collection. Since every 
+	bucket gathers ciphertexts from all the buckets of the previous round, 
+	after enough rounds every ciphertext may end up in any position (see 
+	get_default_rounds). Note, however, that the resulting permutation is not 
+	uniformly distributed among all the permutations of the collection, as 
+	for a ShufflingProof: more rounds make it closer to uniform.
+	
+	The proof is formed by the intermediate collections between rounds and 
+	the proofs of every bucket of every round, and shows the original and 
+	shuffled collections equivalent if each of those proofs verifies.
+	
+	For collections too large for the memory of a worker process, use a 
+	DiskCiphertextStorage, which is also used for the buckets.
+	
+	Usage:
+		(shuffled_collection, proof) = ShardedShufflingProof.shuffle(
+												collection, buckets=8)
+		proof.verify(collection, shuffled_collection)
+	"""
+	
+	## INTERNAL STRUCTURE:
+	#
+	#	* self._buckets: The number of buckets B.
+	#
+	#	* self._collections: The R - 1 intermediate collections, for R rounds: 
+	#	self._collections[r] is the output of round r (the input of round 
+	#	r + 1).
+	#
+	#	* self._proofs: A list of R lists of B proofs, self._proofs[r][j] being 
+	#	the proof for bucket j of round r, from bucket j of the input of the 
+	#	round to the jth segment of its output.
+	##
+	
+	def __init__(self):
+		"""
+		Constructs a new empty ShardedShufflingProof.
+		
+		This method should not be used outside of this class. Consider using 
+		ShardedShufflingProof.shuffle(...).
+		"""
+		self._buckets = None
+		self._collections = []
+		self._proofs = []
+	
+	def get_rounds(self):
+		"""
+		Returns the number of rounds of the shuffle.
+		"""
+		return len(self._proofs)
+	
+	def get_buckets(self):
+		"""
+		Returns the number of buckets into which each round splits the 
+		collection.
+		"""
+		return self._buckets
+	
+	@staticmethod
+	def get_default_rounds(length, buckets):
+		"""
+		Returns the smallest number of rounds after which every ciphertext of 
+		a collection of the given length may end up in any position of the 
+		shuffled collection, when shuffled with the given number of buckets.
+		
+		Each round moves a ciphertext within its bucket, of at least 
+		m = length / buckets positions. Those positions are split among 
+		min(m, buckets) buckets of the next round, so the number of positions 
+		a ciphertext may reach grows by that factor every round.
+		"""
+		if(buckets == 1):
+			return 1
+		bucket_size = length / buckets
+		reach = bucket_size
+		rounds = 1
+		while(reach < length):
+			reach *= min(bucket_size, buckets)
+			rounds += 1
+		return rounds
+	
+	@classmethod
+	def shuffle(cls, collection, buckets, rounds=None, ProofClass=None, 
+				workers=None):
+		"""
+		Produces a sharded shuffle of the given collection, with its proof.
+		
+		Arguments:
+			collection::CiphertextCollection	-- The collection to shuffle.
+			buckets::int	-- The number of buckets into which each round 
+							   splits the collection. Each bucket must have at 
+							   least 2 ciphertexts.
+			rounds::int	-- The number of rounds. By default, the smallest 
+						   number for which every ciphertext may end up in any 
+						   position (see get_default_rounds).
+			ProofClass::class	-- The class of proof of shuffling of each 
+								   bucket (see 
+								   CiphertextCollection.shuffle_with_proof).
+			workers::int	-- If greater than 1, shuffle the buckets of each 
+							   round in parallel, using that many worker 
+							   processes.
+		
+		Returns:
+			(shuffled_collection, proof)::
+				(CiphertextCollection, ShardedShufflingProof)	--
+				The shuffled collection and the proof of the shuffle.
+		
+		Throws:
+			ValueError	-- If buckets or rounds are not positive, or there are 
+						   buckets of less than 2 ciphertexts.
+			IncompatibleCiphertextCollectionError	--
+				If ProofClass is LinearShufflingProof and the ciphertexts in 
+				the collection are not all of the same length in blocks.
+		"""
+		length = collection.get_length()
+		if(buckets < 1 or (buckets > 1 and length < 2 * buckets)):
+			raise ValueError("Cannot split a collection of %d ciphertexts " \
+							 "into %d buckets of at least 2 ciphertexts." \
+							 % (length, buckets))
+		if(rounds == None):
+			rounds = cls.get_default_rounds(length, buckets)
+		if(rounds < 1):
+			raise ValueError("A sharded shuffle needs at least one round, " \
+							 "got %d." % rounds)
+		
+		proof = cls()
+		proof._buckets = buckets
+		
+		pool = parallel.new_pool(workers)
+		success = False
+		try:
+			for r in range(0, rounds):
+				tasks = [(bucket, ProofClass, pool != None) 
+						 for bucket in _partition(collection, buckets)]
+				if(pool == None):
+					results = [_shuffle_bucket_task(task) for task in tasks]
+				else:
+					results = pool.map(_shuffle_bucket_task, tasks)
+				
+				shuffled_collection = CiphertextCollection(
+						collection.public_key, 
+						collection._storage.new_storage())
+				round_proofs = []
+				for result in results:
+					if(isinstance(result, str)):
+						raise IncompatibleCiphertextCollectionError(result)
+					(shuffled_bucket, bucket_proof) = result
+					for ciphertext in shuffled_bucket:
+						shuffled_collection.add_ciphertext(ciphertext)
+					round_proofs.append(bucket_proof)
+				
+				proof._proofs.append(round_proofs)
+				if(r < rounds - 1):
+					proof._collections.append(shuffled_collection)
+				collection = shuffled_collection
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
+		
+		return (collection, proof)
+	
+	def _get_tasks(self, original_collection, shuffled_collection):
+		"""
+		Returns the list of bucket verification tasks (see 
+		_verify_bucket_task) for the given collections, or None if they do not 
+		have the length of the collections of this proof.
+		"""
+		collections = [original_collection] + self._collections + \
+					  [shuffled_collection]
+		length = original_collection.get_length()
+		tasks = []
+		for r in range(0, self.get_rounds()):
+			if(collections[r + 1].get_length() != length):
+				return None
+			buckets = _partition(collections[r], self._buckets)
+			sizes = [bucket.get_length() for bucket in buckets]
+			segments = _segments(collections[r + 1], sizes)
+			for j in range(0, self._buckets):
+				tasks.append((r, j, buckets[j], segments[j], 
+							  self._proofs[r][j]))
+		return tasks
+	
+	def find_failing_round(self, original_collection, shuffled_collection, 
+						   workers=None):
+		"""
+		Verifies this proof for original_collection and shuffled_collection, 
+		returning the round and bucket whose proof failed verification, if 
+		any.
+		
+		Arguments:
+			(see verify)
+		
+		Returns:
+			failing::(int, int)	--
+				None if the proof shows both collections to be equivalent. 
+				(-1, -1) if the collections do not have the length of those 
+				of the proof. Otherwise, a tuple (round, bucket) of the first 
+				bucket proof that failed verification.
+		"""
+		tasks = self._get_tasks(original_collection, shuffled_collection)
+		if(tasks == None):
+			return (-1, -1)
+		
+		if(not parallel.is_parallel(workers)):
+			for task in tasks:
+				(r, j, result) = _verify_bucket_task(task)
+				if(not result):
+					return (r, j)
+			return None
+		
+		pool = parallel.new_pool(workers)
+		success = False
+		try:
+			results = pool.map(_verify_bucket_task, tasks)
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
+		
+		for (r, j, result) in results:
+			if(not result):
+				return (r, j)
+		return None
+	
+	def verify(self, original_collection, shuffled_collection, workers=None):
+		"""
+		Verifies that original_collection and shuffled_collection are 
+		equivalent as proven by this ShardedShufflingProof object.
+		
+		Arguments:
+			original_collection::CiphertextCollection	--
+				The original collection of ciphertexts.
+			shuffled_collection::CiphertextCollection	--
+				Another collection for which we wish to know if the current 
+				proof demonstrates equivalence with original_collection.
+			workers::int --
+				If given (and greater than 1), the number of worker processes 
+				among which to distribute the verification of the bucket 
+				proofs.
+		
+		Returns:
+			result::bool	-- True if this proof shows both collections to be 
+							   equivalent.
+							   False otherwise.
+		"""
+		failing = self.find_failing_round(original_collection, 
+										  shuffled_collection, workers)
+		return (failing == None)
@@ -42,18 +42,521 @@
 # THE SOFTWARE.
 # ============================================================================
 
+import os
+import struct
+import binascii
+import itertools
+
 import Crypto.Hash.SHA256	# sha256 is not available in python 2.4 standard lib
 
 # Use configuration parameters from params.py
 from plonevotecryptolib import params
 
 from plonevotecryptolib.utilities.BitStream import BitStream
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+from plonevotecryptolib.utilities import parallel
+import plonevotecryptolib.utilities.serialize as serialize
 
-from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
-from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import CiphertextCollectionMapping
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection, \
+						CiphertextCollection_serialize_structure_definition
+from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import CiphertextCollectionMapping, \
+				CiphertextCollectionMapping_serialize_structure_definition
 
 # Exceptions:
 from plonevotecryptolib.PVCExceptions import InvalidCiphertextCollectionMappingError
+from plonevotecryptolib.PVCExceptions import InvalidShuffilingProofError
+from plonevotecryptolib.PVCExceptions import IncompatibleMixPrecomputationError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+# Versions of the challenge of a ShufflingProof (see _ChallengeHasher):
+#	1: hex() of every value, in the order O, C_0, ..., C_{P-1}, D, followed by 
+#	   the public key fingerprint. (Proofs created before versioning.)
+#	2: Fixed-width big-endian binary encoding, in the order O, D, C_0, ..., 
+#	   C_{P-1}, preceded by the version and the public key fingerprint.
+_CHALLENGE_HEX = 1
+_CHALLENGE_BINARY = 2
+
+# Version of the challenge used for new proofs
+_CHALLENGE_VERSION = _CHALLENGE_BINARY
+
+# Names of the files in which the shadow collections and mappings of a proof 
+# are stored, inside spill_dir (see ShufflingProof.new)
+_SPILLED_COLLECTION_FILENAME = "shadow_collection_%d.pvcollection"
+_SPILLED_MAPPING_FILENAME = "shadow_mapping_%d.pvmapping"
+
+# Names of the files in which each completed shadow round of a proof is 
+# checkpointed, inside checkpoint_dir (see ShufflingProof.new and 
+# _ProofCheckpoint)
+_CHECKPOINT_COLLECTION_FILENAME = "checkpoint_collection_%d.pvcollection"
+_CHECKPOINT_MAPPING_FILENAME = "checkpoint_mapping_%d.pvmapping"
+_CHECKPOINT_RECORD_FILENAME = "checkpoint_round_%d.pvcheckpoint"
+
+ShufflingProofCheckpoint_serialize_structure_definition = {
+	"PloneVoteShufflingProofCheckpoint" : (1, 1, {	# Root element
+		"Round" : (1, 1, None),					# exactly 1 Round element
+		"OriginalFingerprint" : (1, 1, None),	# exactly 1 
+												# OriginalFingerprint element
+		"CollectionHash" : (1, 1, None),		# exactly 1 CollectionHash 
+												# element
+		# (either the mapping or the seed of the round is stored)
+		"MappingHash" : (0, 1, None),			# 0 or 1 MappingHash elements
+		"Seed" : (0, 1, None)					# 0 or 1 Seed elements
+	})
+}
+
+ShufflingProof_serialize_structure_definition = {
+	"PloneVoteShufflingProof" : (1, 1, {	# Root element
+		"Challenge" : (1, 1, None),			# exactly 1 Challenge element
+		"ChallengeVersion" : (1, 1, None),	# exactly 1 ChallengeVersion 
+											# element
+		"Round" : (0, 0, {					# one Round element per round 
+											# (in order)
+			# (stored as the root element of a serialized collection)
+			"Collection" : (1, 1, 			# exactly 1 Collection element
+				CiphertextCollection_serialize_structure_definition[
+										"PloneVoteCiphertextCollection"][2]),
+			# (stored as the root element of a serialized mapping; either the 
+			# mapping or the seed of the round, or both, are stored)
+			"Mapping" : (0, 1, 				# 0 or 1 Mapping elements
+				CiphertextCollectionMapping_serialize_structure_definition[
+								"PloneVoteCiphertextCollectionMapping"][2]),
+			"Seed" : (0, 1, None)			# 0 or 1 Seed elements
+		})
+	})
+}
+
+def _load_collection(collection, public_key):
+	"""
+	Returns collection, or, if it is a file name, the collection stored in 
+	that file (see spill_dir in ShufflingProof.new).
+	DO NOT USE EXTERNALLY.
+	"""
+	if(isinstance(collection, basestring)):
+		collection = CiphertextCollection.from_file(collection, public_key, 
+												serialize.BinarySerializer)
+	return collection
+
+def _load_mapping(mapping, public_key):
+	"""
+	Returns mapping, or, if it is a file name, the mapping stored in that file 
+	(see spill_dir in ShufflingProof.new).
+	DO NOT USE EXTERNALLY.
+	"""
+	if(isinstance(mapping, basestring)):
+		mapping = CiphertextCollectionMapping.from_file(mapping, public_key, 
+												serialize.BinarySerializer)
+	return mapping
+
+def _get_data(item, structure_definition):
+	"""
+	Returns the contents of the root element of the serialization of a 
+	collection or mapping with the given structure definition (see their 
+	_to_data methods). If item is a file name (see spill_dir in 
+	ShufflingProof.new), the contents are read from that file instead.
+	DO NOT USE EXTERNALLY.
+	"""
+	if(not isinstance(item, basestring)):
+		return item._to_data()
+	serializer = serialize.BinarySerializer(structure_definition)
+	data = serializer.deserialize_from_file(item)
+	return data[structure_definition.keys()[0]]
+
+def _hash_file(filename):
+	"""
+	Returns the SHA-256 digest of the contents of a file, in hexadecimal.
+	DO NOT USE EXTERNALLY.
+	"""
+	hasher = Crypto.Hash.SHA256.new()
+	file_object = open(filename, "rb")
+	try:
+		while(True):
+			data = file_object.read(65536)
+			if(data == ""):
+				break
+			hasher.update(data)
+	finally:
+		file_object.close()
+	return hasher.hexdigest()
+
+class _ProofCheckpoint:
+	"""
+	The checkpoint of the shadow rounds of a proof being generated (see 
+	checkpoint_dir in ShufflingProof.new).
+	
+	Each completed round i is stored as its shadow collection and its mapping 
+	(or seed), followed by a record of the SHA-256 hash of those files and 
+	the fingerprint of the original collection. The record is written last, 
+	under a temporary name and then renamed, so that only complete rounds 
+	have one.
+	DO NOT USE EXTERNALLY.
+	"""
+	
+	def __init__(self, directory, original_collection):
+		self._directory = directory
+		self._original_collection = original_collection
+		self._fingerprint = original_collection.get_fingerprint()
+		self._serializer = serialize.BinarySerializer(
+						ShufflingProofCheckpoint_serialize_structure_definition)
+	
+	def _get_filename(self, template, i):
+		return os.path.join(self._directory, template % i)
+	
+	def save(self, i, shadow_mapping, shadow_collection, seed):
+		"""
+		Checkpoints round i, for which shadow_mapping and seed are as returned 
+		by _new_shadow_mix.
+		"""
+		collection_filename = self._get_filename(
+										_CHECKPOINT_COLLECTION_FILENAME, i)
+		shadow_collection.to_file(collection_filename, 
+								  serialize.BinarySerializer)
+		record = {
+			"Round" : str(i),
+			"OriginalFingerprint" : self._fingerprint,
+			"CollectionHash" : _hash_file(collection_filename)
+		}
+		if(shadow_mapping != None):
+			mapping_filename = self._get_filename(
+										_CHECKPOINT_MAPPING_FILENAME, i)
+			shadow_mapping.to_file(mapping_filename, 
+								   serialize.BinarySerializer)
+			record["MappingHash"] = _hash_file(mapping_filename)
+		else:
+			record["Seed"] = binascii.hexlify(seed)
+		
+		record_filename = self._get_filename(_CHECKPOINT_RECORD_FILENAME, i)
+		self._serializer.serialize_to_file(record_filename + ".tmp", 
+							{"PloneVoteShufflingProofCheckpoint" : record})
+		os.rename(record_filename + ".tmp", record_filename)
+	
+	def _load_round(self, i):
+		"""
+		Returns the tuple (shadow_mapping, shadow_collection, seed) for round 
+		i, or None if it was not checkpointed, or its checkpoint does not 
+		match the original collection or its hashes.
+		"""
+		record_filename = self._get_filename(_CHECKPOINT_RECORD_FILENAME, i)
+		if(not os.path.exists(record_filename)):
+			return None
+		try:
+			record = self._serializer.deserialize_from_file(record_filename)
+		except serialize.InvalidSerializeDataError:
+			return None
+		record = record["PloneVoteShufflingProofCheckpoint"]
+		if(record["Round"] != str(i) or 
+		   record["OriginalFingerprint"] != self._fingerprint or 
+		   record.has_key("MappingHash") == record.has_key("Seed")):
+			return None
+		
+		public_key = self._original_collection.public_key
+		collection_filename = self._get_filename(
+										_CHECKPOINT_COLLECTION_FILENAME, i)
+		mapping_filename = self._get_filename(_CHECKPOINT_MAPPING_FILENAME, i)
+		try:
+			if(_hash_file(collection_filename) != record["CollectionHash"]):
+				return None
+			if(record.has_key("MappingHash") and 
+			   _hash_file(mapping_filename) != record["MappingHash"]):
+				return None
+			
+			shadow_collection = CiphertextCollection.from_file(
+						collection_filename, public_key, 
+						serialize.BinarySerializer, 
+						self._original_collection._storage.new_storage())
+			shadow_mapping = None
+			seed = None
+			if(record.has_key("MappingHash")):
+				shadow_mapping = CiphertextCollectionMapping.from_file(
+						mapping_filename, public_key, 
+						serialize.BinarySerializer)
+			else:
+				seed = binascii.unhexlify(record["Seed"])
+		except (IOError, TypeError, InvalidPloneVoteCryptoFileError):
+			return None
+		
+		if(shadow_collection.get_length() != 
+		   self._original_collection.get_length()):
+			return None
+		return (shadow_mapping, shadow_collection, seed)
+	
+	def load(self, rounds):
+		"""
+		Returns the list of the (shadow_mapping, shadow_collection, seed) 
+		tuples of the consecutive rounds, starting from the first, that were 
+		correctly checkpointed (up to the given number of rounds).
+		"""
+		result = []
+		while(len(result) < rounds):
+			loaded_round = self._load_round(len(result))
+			if(loaded_round == None):
+				break
+			result.append(loaded_round)
+		return result
+	
+	def remove(self):
+		"""
+		Removes the files of all the checkpointed rounds.
+		"""
+		i = 0
+		while(True):
+			found = False
+			for template in (_CHECKPOINT_RECORD_FILENAME, 
+							 _CHECKPOINT_COLLECTION_FILENAME, 
+							 _CHECKPOINT_MAPPING_FILENAME):
+				filename = self._get_filename(template, i)
+				if(os.path.exists(filename)):
+					os.remove(filename)
+					found = True
+			if(not found):
+				break
+			i += 1
+
+# Data shared by all tasks run in a worker process of a proof generation pool. 
+# (Set once per process by _init_proof_worker, see ShufflingProof.new)
+_worker_data = {}
+
+def _init_proof_worker(original_collection, mapping):
+	"""
+	Initializes a worker process of a proof generation pool.
+	DO NOT USE EXTERNALLY.
+	"""
+	_worker_data["original_collection"] = original_collection
+	_worker_data["mapping"] = mapping
+
+def _new_shadow_mix(original_collection, seed=None):
+	"""
+	Generates a new random mapping O->C_i for original_collection O and 
+	applies it to obtain C_i. Returns the tuple (O->C_i, C_i).
+	
+	If a seed is given, the mapping is derived from it and is not returned 
+	(since it can be regenerated from the seed), that is, the tuple 
+	(None, C_i) is returned.
+	DO NOT USE EXTERNALLY.
+	"""
+	shadow_mapping = CiphertextCollectionMapping.new(original_collection, seed)
+	shadow_collection = shadow_mapping.apply(original_collection)
+	if(seed != None):
+		shadow_mapping = None
+	return (shadow_mapping, shadow_collection)
+
+def _get_shadow_mapping(original_collection, shadow_mapping, seed):
+	"""
+	Returns shadow_mapping, or, if it is None, regenerates it from seed.
+	(If shadow_mapping is a file name, the mapping is loaded from that file.)
+	DO NOT USE EXTERNALLY.
+	"""
+	if(shadow_mapping == None):
+		shadow_mapping = CiphertextCollectionMapping.new(original_collection, 
+														 seed)
+	return _load_mapping(shadow_mapping, original_collection.public_key)
+
+def _rebase_shadow_mapping(original_collection, mapping, shadow_mapping, 
+						   seed, filename):
+	"""
+	Returns rebase(O->D, O->C_i) = C_i->D, for O->C_i given as in 
+	_get_shadow_mapping.
+	
+	If filename is not None, the result is stored in that file and filename 
+	is returned instead.
+	DO NOT USE EXTERNALLY.
+	"""
+	shadow_mapping = _get_shadow_mapping(original_collection, shadow_mapping, 
+										 seed)
+	rebased_mapping = mapping.rebase(shadow_mapping)
+	if(filename == None):
+		return rebased_mapping
+	rebased_mapping.to_file(filename, serialize.BinarySerializer)
+	return filename
+
+def _shadow_mix_task(seed):
+	"""
+	Worker process task: _new_shadow_mix for the pool's original collection.
+	DO NOT USE EXTERNALLY.
+	"""
+	(shadow_mapping, shadow_collection) = \
+					_new_shadow_mix(_worker_data["original_collection"], seed)
+	# (the parent process takes over the storage of the collection)
+	shadow_collection._storage.hand_over()
+	return (shadow_mapping, shadow_collection)
+
+def _apply_shadow_task(shadow_mapping):
+	"""
+	Worker process task: applies a (precomputed) mapping O->C_i to the pool's 
+	original collection O, returning C_i.
+	DO NOT USE EXTERNALLY.
+	"""
+	shadow_collection = shadow_mapping.apply(
+										_worker_data["original_collection"])
+	shadow_collection._storage.hand_over()
+	return shadow_collection
+
+def _rebase_task(task):
+	"""
+	Worker process task: _rebase_shadow_mapping for the pool's original 
+	collection and mapping O->D.
+	
+	Takes a tuple (O->C_i, seed, filename).
+	DO NOT USE EXTERNALLY.
+	"""
+	(shadow_mapping, seed, filename) = task
+	return _rebase_shadow_mapping(_worker_data["original_collection"], 
+								  _worker_data["mapping"], 
+								  shadow_mapping, seed, filename)
+
+def _init_verify_worker(original_collection, shuffled_collection):
+	"""
+	Initializes a worker process of a proof verification pool.
+	DO NOT USE EXTERNALLY.
+	"""
+	_worker_data["original_collection"] = original_collection
+	_worker_data["shuffled_collection"] = shuffled_collection
+
+def _verify_round(original_collection, shuffled_collection, bit, 
+				  round_mapping, round_collection, round_seed=None):
+	"""
+	Verifies a single round of a ShufflingProof.
+	
+	If the challenge bit for the round is 0, round_mapping must map 
+	original_collection into round_collection. If it is 1, round_mapping must 
+	map round_collection into shuffled_collection.
+	
+	For rounds with challenge bit 0, round_mapping may be None, in which case 
+	it is regenerated from round_seed. round_mapping and round_collection may 
+	also be the names of the files in which they are stored.
+	DO NOT USE EXTERNALLY.
+	"""
+	public_key = original_collection.public_key
+	round_collection = _load_collection(round_collection, public_key)
+	round_mapping = _load_mapping(round_mapping, public_key)
+	
+	if(round_mapping == None):
+		if(bit != 0 or round_seed == None):
+			return False
+		round_mapping = CiphertextCollectionMapping.new(original_collection, 
+														round_seed)
+	
+	if(bit == 0):
+		return round_mapping.verify(original_collection, round_collection)
+	elif(bit == 1):
+		return round_mapping.verify(round_collection, shuffled_collection)
+	else:
+		assert False, "We took a single bit, its value must be either "\
+				"0 or 1."
+
+def _verify_round_task(task):
+	"""
+	Worker process task: _verify_round for the pool's collections.
+	
+	Takes a tuple (i, bit, round_mapping, round_collection, round_seed) and 
+	returns a tuple (i, result).
+	DO NOT USE EXTERNALLY.
+	"""
+	(i, bit, round_mapping, round_collection, round_seed) = task
+	result = _verify_round(_worker_data["original_collection"], 
+						   _worker_data["shuffled_collection"], 
+						   bit, round_mapping, round_collection, round_seed)
+	return (i, result)
+
+
+class _ChallengeHasher:
+	"""
+	Computes the challenge of a ShufflingProof incrementally, one collection 
+	at a time (see ShufflingProof._generate_challenge).
+	
+	Collections must be added in the order defined by the challenge version.
+	DO NOT USE EXTERNALLY.
+	"""
+	
+	def __init__(self, public_key, version):
+		"""
+		Constructs a new _ChallengeHasher.
+		
+		Arguments:
+			public_key::PublicKey	-- The public key of all the collections.
+			version::int	-- The version of the challenge (see 
+							   _CHALLENGE_VERSION).
+		
+		Throws:
+			ValueError	-- If version is not a known challenge version.
+		"""
+		if(version != _CHALLENGE_HEX and version != _CHALLENGE_BINARY):
+			raise ValueError("Unknown ShufflingProof challenge version: %s" \
+							 % version)
+		
+		self._hasher = Crypto.Hash.SHA256.new()
+		self._public_key = public_key
+		self._version = version
+		
+		if(version == _CHALLENGE_BINARY):
+			# Every block value is encoded in the number of bytes of a value 
+			# of nbits bits. Values are first formatted as fixed-width 
+			# hexadecimal numbers, which are then converted to binary all at 
+			# once for each collection.
+			nbits = public_key.cryptosystem.get_nbits()
+			self._value_digits = 2 * ((nbits + 7) / 8)
+			self._value_format = "%%0%dx" % self._value_digits
+			
+			self._hasher.update(struct.pack(">L", version))
+			self._hasher.update(public_key.get_fingerprint())
+	
+	def add_collection(self, collection):
+		"""
+		Adds the next collection to the challenge.
+		
+		In version 2, the collection is encoded as its number of ciphertexts 
+		(4 bytes) followed by each ciphertext, encoded as its number of blocks 
+		(4 bytes) followed by the gamma and delta values of each block, in 
+		order.
+		
+		Arguments:
+			collection::CiphertextCollection -- The collection to add.
+		
+		Throws:
+			ValueError	-- If the collection contains a value that cannot be 
+						   encoded in nbits bits.
+		"""
+		if(self._version == _CHALLENGE_HEX):
+			ShufflingProof._hash_collection(self._hasher, collection)
+			return
+		
+		value_format = self._value_format
+		parts = ["%08x" % collection.get_length()]
+		num_values = 0
+		for ciphertext in collection:
+			parts.append("%08x" % ciphertext.get_length())
+			for (gamma, delta) in ciphertext:
+				parts.append(value_format % gamma)
+				parts.append(value_format % delta)
+			num_values += 2 * ciphertext.get_length()
+		
+		data = "".join(parts)
+		
+		# (a value of more than nbits bits would make its encoding longer, 
+		# and a negative value would not be hexadecimal)
+		expected_length = 8 * len(parts) - 8 * num_values + \
+						  self._value_digits * num_values
+		if(len(data) != expected_length):
+			raise ValueError("The collection contains a value that does not " \
+							 "fit in the bits of its cryptosystem.")
+		try:
+			data = binascii.unhexlify(data)
+		except TypeError:
+			raise ValueError("The collection contains a negative value.")
+		
+		self._hasher.update(data)
+	
+	def hexdigest(self):
+		"""
+		Returns the challenge for all the collections added so far.
+		
+		Returns:
+			challenge::string - A 256-bit challenge, as a hexadecimal number 
+				encoded as a string.
+		"""
+		hasher = self._hasher.copy()
+		if(self._version == _CHALLENGE_HEX):
+			hasher.update(self._public_key.get_fingerprint())
+		return hasher.hexdigest()
 
 
 class ShufflingProof:
@@ -119,6 +622,24 @@ class ShufflingProof:
 	#	(Storing the challenge is not really necessary, but it can make some 
 	#	diagnostics easier, allowing us to know what part of the proof failed.)
 	#
+	#	* self._challenge_version: The version of the hash used to generate 
+	#	self._challenge (see _ChallengeHasher). Proofs created before the 
+	#	challenge was versioned lack this attribute and use version 1.
+	#
+	#	* self._seeds: A list of P seeds or None values. If the proof was 
+	#	created with seed_mappings=True, for each round i with challenge bit 
+	#	0, self._seeds[i] is the seed from which the mapping from the 
+	#	original collection into self._collections[i] can be regenerated (see 
+	#	CiphertextCollectionMapping.new), and self._mappings[i] is None. The 
+	#	seeds of rounds with challenge bit 1 are never stored, since they 
+	#	would reveal the mapping between the original and the shuffled 
+	#	collection.
+	#
+	# If the proof was created with a spill_dir, the elements of 
+	# self._collections and self._mappings are instead the names of the files 
+	# (inside spill_dir) in which each collection or mapping is stored, and 
+	# they are loaded one by one as needed.
+	#
 	#
 	# To generate a proof of shuffling (the new(...) method), between original 
 	# collection O and shuffled destination collection D, with mapping M (O->D):
@@ -128,7 +649,9 @@ class ShufflingProof:
 	#	   self._collections.
 	#
 	#	2) A fingerprint (SHA-256) of all involved collections, including O, D 
-	#	   and those in self._collections, is generated as a challenge c.
+	#	   and those in self._collections, is generated as a challenge c. 
+	#	   (Each collection in self._collections is hashed as soon as it is 
+	#	   generated in (1).)
 	#
 	#	3) We store c as self._challenge = c.
 	#
@@ -162,7 +685,26 @@ class ShufflingProof:
 		self._collections = []
 		self._mappings = []
 		self._challenge = None
+		self._challenge_version = _CHALLENGE_VERSION
+		self._seeds = []
 	
+	@staticmethod
+	def _hash_collection(hasher, collection):
+		"""
+		Adds a collection to the hash used to generate the challenge, as in 
+		version 1 of the challenge (see _ChallengeHasher).
+		
+		The collection is hashed ciphertext by ciphertext, in order, and each 
+		ciphertext is hashed block by block, in order.
+		
+		Arguments:
+			hasher::Crypto.Hash.SHA256	-- The hash object to update.
+			collection::CiphertextCollection -- The collection to hash.
+		"""
+		for ciphertext in collection:
+			for (gamma, delta) in ciphertext:
+				hasher.update(hex(gamma))
+				hasher.update(hex(delta))
 		
 	def _generate_challenge(self, original_collection, shuffled_collection):
 		"""
@@ -191,44 +733,39 @@ class ShufflingProof:
 		
 		# We generate the challenge c as a SHA-256 hash of all collections, 
 		# including original_collection (O), shuffled_collection (D) and those 
-		# in self._collections.
+		# in self._collections, as well as the fingerprint for the public key 
+		# of the original_collection (which must be the same as for all 
+		# ciphertexts and collections taken into account).
 		#
 		# Each collection is hashed ciphertext by ciphertext, in order, and 
-		# each ciphertext is hashed block by block, in order.
+		# each ciphertext is hashed block by block, in order. The encoding of 
+		# the values and the order of the collections depend on the version 
+		# of the challenge (see _ChallengeHasher):
 		#
-		# Collections order: O -> self._collections[i] by increasing index -> D
-		#
-		# Finally, the fingerprint for the public key of the original_collection
-		# (which must be the same as for all ciphertexts and collections taken 
-		# into account) is added to the hash as well.
+		# Version 1: O -> self._collections[i] by increasing index -> D
+		# Version 2: O -> D -> self._collections[i] by increasing index
 		
-		c = Crypto.Hash.SHA256.new()
+		version = getattr(self, "_challenge_version", _CHALLENGE_HEX)
+		public_key = original_collection.public_key
+		c = _ChallengeHasher(public_key, version)
 		
-		for ciphertext in original_collection:
-			for (gamma, delta) in ciphertext:
-				c.update(hex(gamma))
-				c.update(hex(delta))
+		c.add_collection(original_collection)
+		if(version != _CHALLENGE_HEX):
+			c.add_collection(shuffled_collection)
 		
 		for collection in self._collections:
-			for ciphertext in collection:
-				for (gamma, delta) in ciphertext:
-					c.update(hex(gamma))
-					c.update(hex(delta))
-		
-		for ciphertext in shuffled_collection:
-			for (gamma, delta) in ciphertext:
-				c.update(hex(gamma))
-				c.update(hex(delta))
+			c.add_collection(_load_collection(collection, public_key))
 		
-		c.update(original_collection.public_key.get_fingerprint())
+		if(version == _CHALLENGE_HEX):
+			c.add_collection(shuffled_collection)
 		
-		hexdigest = c.hexdigest()
-		
-		return hexdigest
+		return c.hexdigest()
 	
 	
 	@classmethod
-	def new(cls, original_collection, shuffled_collection, mapping):
+	def new(cls, original_collection, shuffled_collection, mapping, 
+			workers=None, seed_mappings=False, spill_dir=None, 
+			precomputation=None, checkpoint_dir=None):
 		"""
 		Constructs a new proof of equivalence between original_collection and 
 		shuffled_collection.
@@ -247,6 +784,49 @@ class ShufflingProof:
 				original_collection.
 			mapping::CiphertextCollectionMapping --
 				The mapping between original_collection and shuffled_collection.
+			workers::int --
+				If given (and greater than 1), the number of worker processes 
+				among which to distribute the generation of the shadow 
+				shuffles and the rebase operations of the proof. The 
+				collection and mapping are sent to each worker process once. 
+				(Requires the multiprocessing module, otherwise the proof is 
+				generated serially.)
+			seed_mappings::bool --
+				If True, derive the mappings of the shadow shuffles from short 
+				random seeds. For rounds with challenge bit 0, the proof then 
+				stores only the seed instead of the mapping, which roughly 
+				halves the size of the proof and no shadow mapping is kept in 
+				memory during generation. In exchange, those mappings must be 
+				regenerated (which requires modular exponentiations) when 
+				verifying the proof, and when rebasing rounds with challenge 
+				bit 1.
+			spill_dir::string --
+				If given, the path of an existing directory in which to store 
+				each shadow collection and mapping of the proof (in 
+				BinarySerializer format) as soon as it has been hashed. The 
+				proof then only keeps the names of those files, and reads them 
+				back one at a time, both during generation and verification, 
+				so that memory use is bounded by a few collections instead of 
+				growing with the security parameter. The files must be kept 
+				for as long as the proof is used, and removed by the caller 
+				afterwards.
+			precomputation::MixPrecomputation --
+				If given, the mappings of the shadow shuffles are taken from 
+				this precomputation (see MixPrecomputation.next_mapping), 
+				instead of being generated. Cannot be used with seed_mappings.
+			checkpoint_dir::string --
+				If given, the path of an existing directory in which to 
+				checkpoint each shadow shuffle as soon as it is completed. If 
+				the generation of the proof is interrupted, calling this 
+				method again with the same checkpoint_dir and 
+				original_collection (even for a different shuffle of it) 
+				resumes it from the last checkpointed round. Each checkpoint 
+				is validated against a SHA-256 hash of its files and the 
+				fingerprint of original_collection, and ignored (along with 
+				all the following ones) if it does not match. The checkpoint 
+				contains the secret shadow mappings, so the directory must be 
+				as protected as the mapping of the shuffle itself. Its files 
+				are removed once the proof is complete.
 		
 		Returns:
 			proof::ShufflingProof --
@@ -259,7 +839,11 @@ class ShufflingProof:
 				and shuffled_collection.
 			ValueError --
 				If params.SHUFFLING_PROOF_SECURITY_PARAMETER is within an 
-				invalid range.
+				invalid range, or both precomputation and seed_mappings are 
+				given.
+			IncompatibleMixPrecomputationError --
+				If precomputation does not have enough precomputed mappings 
+				left for original_collection.
 		"""
 		# Check that we have a valid mapping between the two collections:
 		if(not mapping.verify(original_collection, shuffled_collection)):
@@ -291,56 +875,184 @@ class ShufflingProof:
 					"to None for deployment operation of plonevotecryptolib." \
 					% security_parameter)
 		
-		# Construct a new empty proof
-		proof = ShufflingProof()
-		
-		# Populate proof._collections with P random shuffles of 
-		# original_collection. We save each mapping for now in proof._mappings.
-		# (ie. every mapping in proof._mappings[i] will initially be from the 
-		# original collection into proof._collections[i])
-		for i in range(0, security_parameter):
-			## print "Generating collection #%d" % i # replace with TaskMonitor API calls
-			new_mapping = CiphertextCollectionMapping.new(original_collection)
-			proof._mappings.append(new_mapping)
-			proof._collections.append(new_mapping.apply(original_collection))
+		# Resume from the checkpointed rounds, if any
+		checkpoint = None
+		resumed_rounds = []
+		if(checkpoint_dir != None):
+			checkpoint = _ProofCheckpoint(checkpoint_dir, original_collection)
+			resumed_rounds = checkpoint.load(security_parameter)
+		first_round = len(resumed_rounds)
 		
-		# Generate the challenge 
-		proof._challenge = \
-			proof._generate_challenge(original_collection, shuffled_collection)
+		# Take the shadow mappings from the precomputation, if given (only 
+		# for the rounds not resumed)
+		if(precomputation != None):
+			if(seed_mappings):
+				raise ValueError("Precomputed mappings cannot be derived " \
+								 "from seeds: seed_mappings cannot be used " \
+								 "together with a precomputation.")
+			if(precomputation.get_remaining() < 
+			   security_parameter - first_round):
+				raise IncompatibleMixPrecomputationError("The precomputation " \
+					"has %d mappings left, but %d are needed for the shadow " \
+					"shuffles of the proof." \
+					% (precomputation.get_remaining(), 
+					   security_parameter - first_round))
+			precomputed_mappings = []
+			for i in range(first_round, security_parameter):
+				precomputed_mappings.append(
+						precomputation.next_mapping(original_collection))
 		
-		# Get the challenge as a BitStream for easier manipulation
-		challenge_bits = BitStream()
-		challenge_bits.put_hex(proof._challenge)
-		challenge_bits.seek(0)	# back to the beginning of the stream
+		# Construct a new empty proof
+		proof = ShufflingProof()
 		
-		# For each of the first P bits in the stream
-		for i in range(0, security_parameter):
-			## print "Processing challenge bit %d" % i # replace with TaskMonitor API calls
-			bit = challenge_bits.get_num(1)
-			if(bit == 0):
-				# Do nothing.
-				# proof._mappings[i] is already a mapping from 
-				# original_collection unto proof._collections[i]
-				pass
-			elif(bit == 1):
-				# Change proof._mappings[i] to be a mapping from 
-				# proof._collections[i] unto shuffled_collection, using 
-				# CiphertextCollectionMapping.rebase(...)
+		# Get a pool of worker processes (None for serial generation)
+		pool = parallel.new_pool(workers, _init_proof_worker, 
+								 (original_collection, mapping))
+		success = False
+		try:
+			# Populate proof._collections with P random shuffles of 
+			# original_collection. We save each mapping for now in 
+			# proof._mappings. (ie. every mapping in proof._mappings[i] will 
+			# initially be from the original collection into 
+			# proof._collections[i])
+			#
+			# At the same time, we generate the challenge (see 
+			# _generate_challenge) hashing each collection as soon as it is 
+			# available, in order.
+			#
+			# With seed_mappings, the mappings are derived from seeds and not 
+			# kept (see _new_shadow_mix).
+			#
+			# With checkpoint_dir, the first rounds may be resumed from their 
+			# checkpoint, and the rest are checkpointed as they are generated.
+			seeds = [seed for (shadow_mapping, shadow_collection, seed) 
+					 in resumed_rounds]
+			if(seed_mappings):
+				random = RandomSource()
+				seeds.extend([random.new_seed() 
+							  for i in range(first_round, security_parameter)])
+			else:
+				seeds.extend([None 
+							  for i in range(first_round, security_parameter)])
+			
+			c = _ChallengeHasher(original_collection.public_key, 
+								 proof._challenge_version)
+			c.add_collection(original_collection)
+			if(proof._challenge_version != _CHALLENGE_HEX):
+				c.add_collection(shuffled_collection)
+			
+			if(precomputation != None):
+				# (only the precomputed mappings need to be applied)
+				if(pool == None):
+					shadow_collections = (shadow_mapping.apply(
+											original_collection) 
+										  for shadow_mapping 
+										  in precomputed_mappings)
+				else:
+					shadow_collections = pool.imap(_apply_shadow_task, 
+												   precomputed_mappings)
+				shadow_mixes = itertools.izip(precomputed_mappings, 
+											  shadow_collections)
+			elif(pool == None):
+				shadow_mixes = (_new_shadow_mix(original_collection, seed) 
+								for seed in seeds[first_round:])
+			else:
+				shadow_mixes = pool.imap(_shadow_mix_task, 
+										 seeds[first_round:])
+			resumed_mixes = [(shadow_mapping, shadow_collection) 
+							 for (shadow_mapping, shadow_collection, seed) 
+							 in resumed_rounds]
+			shadow_mixes = itertools.chain(resumed_mixes, shadow_mixes)
+			
+			for (shadow_mapping, shadow_collection) in shadow_mixes:
+				c.add_collection(shadow_collection)
+				i = len(proof._collections)
 				
-				# rebase(O->D, O->C_{i}) => C_{i}->D
-				rebased_mapping = mapping.rebase(proof._mappings[i])
+				if(checkpoint != None and i >= first_round):
+					checkpoint.save(i, shadow_mapping, shadow_collection, 
+									seeds[i])
 				
-				# Replace O->C_{i} with C_{i}->D
-				proof._mappings[i] = rebased_mapping
+				# Spill the collection and mapping to disk, if requested
+				if(spill_dir != None):
+					filename = os.path.join(spill_dir, 
+											_SPILLED_COLLECTION_FILENAME % i)
+					shadow_collection.to_file(filename, 
+											  serialize.BinarySerializer)
+					shadow_collection = filename
+					
+					if(shadow_mapping != None):
+						filename = os.path.join(spill_dir, 
+												_SPILLED_MAPPING_FILENAME % i)
+						shadow_mapping.to_file(filename, 
+											   serialize.BinarySerializer)
+						shadow_mapping = filename
+				
+				proof._mappings.append(shadow_mapping)
+				proof._collections.append(shadow_collection)
+			
+			if(proof._challenge_version == _CHALLENGE_HEX):
+				c.add_collection(shuffled_collection)
+			proof._challenge = c.hexdigest()
+			
+			# Get the challenge as a BitStream for easier manipulation
+			challenge_bits = BitStream()
+			challenge_bits.put_hex(proof._challenge)
+			challenge_bits.seek(0)	# back to the beginning of the stream
+			
+			# For each of the first P bits in the stream, if the bit is 1, 
+			# proof._mappings[i] must be changed to be a mapping from 
+			# proof._collections[i] unto shuffled_collection, using 
+			# CiphertextCollectionMapping.rebase(...). If the bit is 0, 
+			# proof._mappings[i] is already a mapping from original_collection 
+			# unto proof._collections[i] (or can be regenerated from 
+			# seeds[i], which is then disclosed).
+			rebase_indexes = []
+			for i in range(0, security_parameter):
+				bit = challenge_bits.get_num(1)
+				if(bit == 1):
+					rebase_indexes.append(i)
+					proof._seeds.append(None)
+				else:
+					proof._seeds.append(seeds[i])
+			
+			# rebase(O->D, O->C_{i}) => C_{i}->D
+			# (with spill_dir, C_{i}->D is written over the file of O->C_{i})
+			tasks = []
+			for i in rebase_indexes:
+				if(spill_dir != None):
+					filename = os.path.join(spill_dir, 
+											_SPILLED_MAPPING_FILENAME % i)
+				else:
+					filename = None
+				tasks.append((proof._mappings[i], seeds[i], filename))
+			
+			if(pool == None):
+				rebased_mappings = (_rebase_shadow_mapping(original_collection, 
+									mapping, shadow_mapping, seed, filename) 
+									for (shadow_mapping, seed, filename) 
+									in tasks)
 			else:
-				assert False, "We took a single bit, its value must be either "\
-						"0 or 1."
+				rebased_mappings = pool.imap(_rebase_task, tasks)
+			
+			# Replace O->C_{i} with C_{i}->D
+			j = 0
+			for rebased_mapping in rebased_mappings:
+				proof._mappings[rebase_indexes[j]] = rebased_mapping
+				j += 1
+			
+			success = True
+		finally:
+			parallel.close_pool(pool, success)
+		
+		# The checkpoint is no longer needed (and holds secret mappings)
+		if(checkpoint != None):
+			checkpoint.remove()
 			
 		# return the proof object
 		return proof
 			
 	
-	def verify(self, original_collection, shuffled_collection):
+	def verify(self, original_collection, shuffled_collection, workers=None):
 		"""
 		Verifies that original_collection and shuffled_collection are 
 		equivalent as proven by this ShufflingProof object.
@@ -365,18 +1077,74 @@ class ShufflingProof:
 				Another collection for which we wish to know if the current 
 				ShufflingProof object demonstrates equivalence with 
 				original_collection.
+			workers::int --
+				If given (and greater than 1), the number of worker processes 
+				among which to distribute the verification of the rounds of 
+				the proof (see find_failing_round).
 		
 		Returns:
 			result::bool	-- True if this proof shows both collections to be 
 							   equivalent.
 							   False otherwise.
+		
+		Throws:
+			InvalidShuffilingProofError --
+				If the proof was created with a security parameter that does 
+				not meet the standards set in params.py.
+		"""
+		failing_round = self.find_failing_round(original_collection, 
+												shuffled_collection, workers)
+		return (failing_round == None)
+	
+	def find_failing_round(self, original_collection, shuffled_collection, 
+						   workers=None):
+		"""
+		Verifies this proof for original_collection and shuffled_collection, 
+		returning the round of the proof that failed verification, if any.
+		
+		The challenge is checked first. Then, each of the P rounds of the proof 
+		is checked (for challenge bit 0, that its mapping maps 
+		original_collection into the round's collection; for challenge bit 1, 
+		that its mapping maps the round's collection into shuffled_collection).
+		Verification stops as soon as one round fails.
+		
+		If workers is greater than 1, the rounds are checked in parallel by a 
+		pool of that many worker processes, which is terminated as soon as any 
+		round fails. In that case, if more than one round is incorrect, which 
+		one is reported depends on the order in which the workers finish.
+		
+		For proofs with a version 2 challenge (see _ChallengeHasher) checked 
+		serially, the challenge is instead computed while the rounds are 
+		checked, in a single pass over the collections of the proof. A round 
+		that fails may then be reported even if the challenge does not match 
+		either.
+		
+		Arguments:
+			(see verify)
+		
+		Returns:
+			failing_round::int	--
+				None if the proof shows both collections to be equivalent. 
+				-1 if the challenge of the proof does not match the 
+				collections. Otherwise, the index (0 to P-1) of a round of the 
+				proof that failed verification.
+		
+		Throws:
+			InvalidShuffilingProofError --
+				If the proof was created with a security parameter that does 
+				not meet the standards set in params.py.
 		"""
 		# Get the security parameter P with which the proof was originally 
 		# created. This is reflect in the length of self._collections and 
 		# self._mappings.
-		assert len(self._collections) == len(self._mappings), \
-			"The length of the private properties self._collections and " \
-			"self._mappings of ShufflingProof must always be the same."
+		# (proofs created before seeds were introduced have no self._seeds, 
+		# and all their mappings are stored)
+		seeds = getattr(self, "_seeds", [None] * len(self._collections))
+		assert len(self._collections) == len(self._mappings) == \
+			len(seeds), \
+			"The length of the private properties self._collections, " \
+			"self._mappings and self._seeds of ShufflingProof must always " \
+			"be the same."
 		security_parameter = len(self._collections)
 		
 		
@@ -414,39 +1182,297 @@ class ShufflingProof:
 					% (security_parameter, 
 					  minimum_allowed_security_parameter))
 					
+		version = getattr(self, "_challenge_version", _CHALLENGE_HEX)
+		if(version != _CHALLENGE_HEX and not parallel.is_parallel(workers)):
+			return self._find_failing_round_streaming(original_collection, 
+									shuffled_collection, security_parameter, 
+									seeds)
+		
 		# Generate the challenge 
-		challenge = \
-			self._generate_challenge(original_collection, shuffled_collection)
+		try:
+			challenge = self._generate_challenge(original_collection, 
+												 shuffled_collection)
+		except ValueError:
+			# (the collections contain values that cannot be encoded)
+			return -1
 		
 		# Verify that the challenge corresponds to the stored one
 		if(challenge != self._challenge):
-			return False
+			return -1
 		
 		# Get the challenge as a BitStream for easier manipulation
 		challenge_bits = BitStream()
 		challenge_bits.put_hex(challenge)
 		challenge_bits.seek(0)	# back to the beginning of the stream
 		
-		# For each of the first P bits in the stream
+		# Take the first P bits in the stream, one per round
+		bits = []
+		for i in range(0, security_parameter):
+			bits.append(challenge_bits.get_num(1))
+		
+		if(not parallel.is_parallel(workers)):
+			# Verify each round in order
+			for i in range(0, security_parameter):
+				if(not _verify_round(original_collection, shuffled_collection, 
+									 bits[i], self._mappings[i], 
+									 self._collections[i], seeds[i])):
+					return i
+			
+			# If we made it so far, the proof is correct
+			# (each mapping is in accordance to the challenge and valid)
+			return None
+		
+		# Verify the rounds in a pool of workers, in whichever order they 
+		# finish, stopping at the first failed round.
+		tasks = [(i, bits[i], self._mappings[i], self._collections[i], 
+				  seeds[i]) for i in range(0, security_parameter)]
+		pool = parallel.new_pool(workers, _init_verify_worker, 
+								 (original_collection, shuffled_collection))
+		failing_round = None
+		success = False
+		try:
+			for (i, result) in pool.imap_unordered(_verify_round_task, tasks):
+				if(not result):
+					failing_round = i
+					break
+			
+			# (no need to wait for the remaining workers if a round failed)
+			success = (failing_round == None)
+		finally:
+			parallel.close_pool(pool, success)
+		
+		return failing_round
+	
+	def _find_failing_round_streaming(self, original_collection, 
+									  shuffled_collection, security_parameter, 
+									  seeds):
+		"""
+		Serial find_failing_round for proofs with a version 2 challenge, 
+		computing the challenge while checking the rounds.
+		
+		Each collection of the proof is thus loaded (see spill_dir in new) 
+		only once, and the rounds are checked against the stored challenge 
+		bits, which must then match the computed challenge.
+		"""
+		public_key = original_collection.public_key
+		
+		# Get the bits of the stored challenge, one per round
+		challenge_bits = BitStream()
+		try:
+			challenge_bits.put_hex(self._challenge)
+		except (ValueError, TypeError):
+			return -1
+		if(challenge_bits.get_length() < security_parameter):
+			return -1
+		challenge_bits.seek(0)	# back to the beginning of the stream
+		
+		try:
+			c = _ChallengeHasher(public_key, self._challenge_version)
+			c.add_collection(original_collection)
+			c.add_collection(shuffled_collection)
+		except ValueError:
+			return -1
+		
 		for i in range(0, security_parameter):
+			collection = _load_collection(self._collections[i], public_key)
+			try:
+				c.add_collection(collection)
+			except ValueError:
+				return -1
+			
 			bit = challenge_bits.get_num(1)
-			if(bit == 0):
-				# verify that self._mapping[i] maps original_collection into
-				# self._collections[i]
-				if(not self._mappings[i].verify(original_collection, 
-											   self._collections[i])):
-					return False
-					
-			elif(bit == 1):
-				# verify that self._mapping[i] self._collections[i] into
-				# self._collections[i]
-				if(not self._mappings[i].verify(self._collections[i], 
-											   shuffled_collection)):
-					return False
-			else:
-				assert False, "We took a single bit, its value must be either "\
-						"0 or 1."
+			if(not _verify_round(original_collection, shuffled_collection, 
+								 bit, self._mappings[i], collection, 
+								 seeds[i])):
+				return i
+		
+		# Verify that the stored challenge corresponds to the collections
+		if(c.hexdigest() != self._challenge):
+			return -1
+		
+		return None
+	
+	def _to_data(self):
+		"""
+		Returns the serializable data dictionary of this proof (see 
+		ShufflingProof_serialize_structure_definition).
+		
+		The collections and mappings of proofs created with a spill_dir are 
+		read from their files.
+		"""
+		seeds = getattr(self, "_seeds", [None] * len(self._collections))
+		rounds = []
+		for i in range(0, len(self._collections)):
+			round_data = {"Collection" : _get_data(self._collections[i], 
+							CiphertextCollection_serialize_structure_definition)}
+			if(self._mappings[i] != None):
+				round_data["Mapping"] = _get_data(self._mappings[i], 
+					CiphertextCollectionMapping_serialize_structure_definition)
+			if(seeds[i] != None):
+				round_data["Seed"] = binascii.hexlify(seeds[i])
+			rounds.append(round_data)
+		
+		version = getattr(self, "_challenge_version", _CHALLENGE_HEX)
+		return {
+			"PloneVoteShufflingProof" : {
+				"Challenge" : self._challenge,
+				"ChallengeVersion" : str(version),
+				"Round" : rounds
+			}
+		}
+	
+	@classmethod
+	def _from_data(cls, data, public_key, filename):
+		"""
+		Returns the proof stored in the given data dictionary (see _to_data).
+		
+		filename is the name of the file (or stream) being loaded, used for 
+		error messages. See from_file for the rest of the arguments and the 
+		exceptions raised.
+		"""
+		root = data["PloneVoteShufflingProof"]
+		
+		proof = cls()
+		proof._challenge = root["Challenge"]
+		try:
+			proof._challenge_version = int(root["ChallengeVersion"])
+		except ValueError:
+			proof._challenge_version = None
+		if(proof._challenge_version not in (_CHALLENGE_HEX, 
+											_CHALLENGE_BINARY)):
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" contains a shuffling proof with an unknown " \
+				"challenge version: %s" % (filename, root["ChallengeVersion"]))
+		
+		rounds = root.get("Round", [])
+		if(not isinstance(rounds, list)):
+			rounds = [rounds]
+		
+		for round_data in rounds:
+			proof._collections.append(CiphertextCollection._from_data(
+							round_data["Collection"], public_key, filename))
+			mapping = None
+			if(round_data.has_key("Mapping")):
+				mapping = CiphertextCollectionMapping._from_data(
+							round_data["Mapping"], public_key, filename)
+			proof._mappings.append(mapping)
+			seed = None
+			if(round_data.has_key("Seed")):
+				try:
+					seed = binascii.unhexlify(round_data["Seed"])
+				except (TypeError, binascii.Error), e:
+					raise InvalidPloneVoteCryptoFileError(filename, 
+						"File \"%s\" contains a shuffling proof with an " \
+						"invalid seed: %s" % (filename, str(e)))
+			proof._seeds.append(seed)
 		
-		# If we made it so far, the proof is correct
-		# (each mapping is in accordance to the challenge and valid)
-		return True
+		return proof
+	
+	def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+				compression=None, compact=None):
+		"""
+		Saves this proof to a file.
+		
+		Arguments:
+			filename::string	-- The path to the file in which to store the 
+								   serialized ShufflingProof.
+			SerializerClass::class --
+				The class that provides the serialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate serialize_to_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+			compression::string --
+				The compression to apply to the file, one of the 
+				serialize.COMPRESSION_* constants. None (default) means use 
+				serialize.DEFAULT_COMPRESSION.
+			compact::bool	--
+				Whether to omit formatting whitespace from the file. None 
+				(default) means use serialize.DEFAULT_COMPACT_OUTPUT.
+		"""
+		serializer = SerializerClass(
+							ShufflingProof_serialize_structure_definition)
+		serializer.serialize_to_file(filename, self._to_data(), 
+									 compression=compression, compact=compact)
+	
+	def to_string(self, SerializerClass=serialize.XMLSerializer):
+		"""
+		Returns this proof serialized as a string (see to_file).
+		
+		Arguments:
+			SerializerClass::class --
+				The class that provides the serialization (see to_file).
+		
+		Returns:
+			data::string	-- The serialized ShufflingProof.
+		"""
+		serializer = SerializerClass(
+							ShufflingProof_serialize_structure_definition)
+		return serializer.serialize_to_string(self._to_data())
+	
+	@classmethod
+	def from_file(cls, filename, public_key, 
+				  SerializerClass=serialize.XMLSerializer):
+		"""
+		Loads an instance of ShufflingProof from the given file.
+		
+		Arguments:
+			filename::string	-- The name of a file containing the proof in 
+								   serialized form.
+			public_key::PublicKey	-- The public key of the collections of 
+									   the proof.
+			SerializerClass::class --
+				The class that provides the deserialization. XMLSerializer by 
+				default. Must inherit from serialize.BaseSerializer and provide 
+				an adequate deserialize_from_file method.
+				Note that often the same class used to serialize the data must 
+				be used to deserialize it.
+				(see utilities/serialize.py documentation for more information)
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the file is not a valid 
+											   PloneVoteCryptoLib stored 
+											   shuffling proof file for the 
+											   given public key.
+		"""
+		serializer = SerializerClass(
+							ShufflingProof_serialize_structure_definition)
+		try:
+			data = serializer.deserialize_from_file(filename)
+		except serialize.InvalidSerializeDataError, e:
+			# Convert the exception to an InvalidPloneVoteCryptoFileError
+			raise InvalidPloneVoteCryptoFileError(filename, 
+				"File \"%s\" does not contain a valid shuffling proof. The " \
+				"following error occurred while trying to deserialize the " \
+				"file contents: %s" % (filename, str(e)))
+		return cls._from_data(data, public_key, filename)
+	
+	@classmethod
+	def from_string(cls, string, public_key, 
+					SerializerClass=serialize.XMLSerializer):
+		"""
+		Loads an instance of ShufflingProof from a string (see from_file).
+		
+		Arguments:
+			string::string	-- The proof in serialized form.
+			public_key::PublicKey	-- The public key of the collections of 
+									   the proof.
+			SerializerClass::class --
+				The class that provides the deserialization (see from_file).
+		
+		Throws:
+			InvalidPloneVoteCryptoFileError -- If the string is not a valid 
+											   serialized shuffling proof for 
+											   the given public key.
+		"""
+		serializer = SerializerClass(
+							ShufflingProof_serialize_structure_definition)
+		try:
+			data = serializer.deserialize_from_string(string)
+		except serialize.InvalidSerializeDataError, e:
+			raise InvalidPloneVoteCryptoFileError("<string>", 
+				"The given string does not contain a valid shuffling proof. " \
+				"The following error occurred while trying to deserialize " \
+				"it: %s" % str(e))
+		return cls._from_data(data, public_key, "<string>")
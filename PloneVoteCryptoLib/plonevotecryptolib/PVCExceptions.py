@@ -348,6 +348,27 @@ class IncompatibleCiphertextCollectionError(ParameterError):
 		"""Create a new IncompatibleCiphertextCollectionError exception
 		"""
 		ParameterError.__init__(self, msg)
+
+
+class DuplicateCiphertextError(ParameterError):
+	"""
+	Signals an attempt to add to a CiphertextCollection a ciphertext with the 
+	same gamma components as a ciphertext already in the collection.
+	
+	Such a ciphertext is a copy (or a modified copy) of another ballot, which 
+	can be used to learn how a voter voted.
+
+	Attributes:
+		index::int			-- the index in the collection of the ciphertext 
+							   that was copied
+		msg::string			-- explanation of the error
+	"""
+
+	def __init__(self, index, msg):
+		"""Create a new DuplicateCiphertextError exception
+		"""
+		self.index = index
+		ParameterError.__init__(self, msg)
 		
 class IncompatibleCiphertextCollectionMappingError(ParameterError):
 	"""
@@ -389,3 +410,17 @@ class InvalidShuffilingProofError(ParameterError):
 		"""Create a new InvalidShuffilingProofError exception
 		"""
 		ParameterError.__init__(self, msg)
+
+class IncompatibleMixPrecomputationError(ParameterError):
+	"""
+	Signals an attempt to use a MixPrecomputation for a collection it cannot 
+	shuffle, or that has no precomputed mixes left.
+	
+	Attributes:
+		msg::string			-- explanation of the error
+	"""
+
+	def __init__(self, msg):
+		"""Create a new IncompatibleMixPrecomputationError exception
+		"""
+		ParameterError.__init__(self, msg)
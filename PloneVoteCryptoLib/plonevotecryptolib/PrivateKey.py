@@ -212,7 +212,8 @@ class PrivateKey:
         length = bitstream.get_num(64)
         return bitstream.get_string(length)
     
-    def to_file(self, filename, SerializerClass=serialize.XMLSerializer):
+    def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+                compression=None, compact=None):
         """
         Saves this private key to a file.
         
@@ -226,6 +227,14 @@ class PrivateKey:
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            compression::string --
+                The compression to apply to the file, one of the 
+                serialize.COMPRESSION_* constants. None (default) means use 
+                serialize.DEFAULT_COMPRESSION. Compressed files are detected 
+                automatically by from_file.
+            compact::bool   --
+                Whether to omit formatting whitespace from the file. None 
+                (default) means use serialize.DEFAULT_COMPACT_OUTPUT.
         """
         # Create a new serializer object for the PrivateKey structure definition
         serializer = SerializerClass(PrivateKey_serialize_structure_definition)
@@ -253,7 +262,8 @@ class PrivateKey:
         }
         
         # Use the serializer to store the data to file
-        serializer.serialize_to_file(filename, data)
+        serializer.serialize_to_file(filename, data, compression=compression, 
+                                     compact=compact)
         
     @classmethod
     def from_file(cls, filename, SerializerClass=serialize.XMLSerializer):
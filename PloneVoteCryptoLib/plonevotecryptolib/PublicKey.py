@@ -288,7 +288,8 @@ class PublicKey:
         bitstream.put_string(text)
         return self.encrypt_bitstream(bitstream, pad_to, task_monitor)
         
-    def to_file(self, filename, SerializerClass=serialize.XMLSerializer):
+    def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+                compression=None, compact=None):
         """
         Saves this public key to a file.
         
@@ -302,6 +303,14 @@ class PublicKey:
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            compression::string --
+                The compression to apply to the file, one of the 
+                serialize.COMPRESSION_* constants. None (default) means use 
+                serialize.DEFAULT_COMPRESSION. Compressed files are detected 
+                automatically by from_file.
+            compact::bool   --
+                Whether to omit formatting whitespace from the file. None 
+                (default) means use serialize.DEFAULT_COMPACT_OUTPUT.
         """
         # Create a new serializer object for the PublicKey structure definition
         serializer = SerializerClass(PublicKey_serialize_structure_definition)
@@ -329,10 +338,12 @@ class PublicKey:
         }
         
         # Use the serializer to store the data to file
-        serializer.serialize_to_file(filename, data)
+        serializer.serialize_to_file(filename, data, compression=compression, 
+                                     compact=compact)
         
     @classmethod
-    def from_file(cls, filename, SerializerClass=serialize.XMLSerializer):
+    def from_file(cls, filename, SerializerClass=serialize.XMLSerializer, 
+                  lazy=False):
         """
         Loads an instance of PublicKey from the given file.
         
@@ -346,6 +357,9 @@ class PublicKey:
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            lazy::bool  -- Passed to ThresholdPublicKey.from_file when the 
+                           file contains a threshold public key (see that 
+                           method). Has no effect for single public keys.
         
         Throws:
             InvalidPloneVoteCryptoFileError -- If the file is not a valid 
@@ -372,7 +386,8 @@ class PublicKey:
         if(data["PloneVotePublicKey"].has_key("ThresholdKeyInfo")):
             from plonevotecryptolib.Threshold.ThresholdPublicKey import \
                                               ThresholdPublicKey
-            return ThresholdPublicKey.from_file(filename, SerializerClass)
+            return ThresholdPublicKey.from_file(filename, SerializerClass, 
+                                                lazy=lazy)
                 
         # Helper function to decode numbers from strings and 
         # raise an exception if the string is not a valid number.
@@ -73,6 +73,23 @@ class ThresholdPublicKey(PublicKey):
                            (the k in "k of n"-decryption)
     """
     
+    def __getattr__(self, name):
+        """
+        Decode the partial public keys of a lazily loaded key on first access.
+        
+        (Only called when normal attribute lookup fails, that is, for 
+        _partial_public_keys before they have been decoded. See from_file.)
+        """
+        if(name == "_partial_public_keys" and 
+           self.__dict__.has_key("_lazy_partial_public_keys")):
+            (filename, pp_keys) = self._lazy_partial_public_keys
+            self._partial_public_keys = \
+                ThresholdPublicKey._decode_partial_public_keys(filename, 
+                                    pp_keys, self.cryptosystem.get_prime())
+            del self._lazy_partial_public_keys
+            return self._partial_public_keys
+        raise AttributeError(name)
+    
     def get_fingerprint(self):
         # We override this PublicKey method to add partial public keys to the 
         # input of the hash function to create the fingerprint.
@@ -139,7 +156,8 @@ class ThresholdPublicKey(PublicKey):
         self._partial_public_keys = verification_partial_public_keys
 
         
-    def to_file(self, filename, SerializerClass=serialize.XMLSerializer):
+    def to_file(self, filename, SerializerClass=serialize.XMLSerializer, 
+                compression=None, compact=None):
         """
         Saves this threshold public key to a file.
         
@@ -153,6 +171,14 @@ class ThresholdPublicKey(PublicKey):
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            compression::string --
+                The compression to apply to the file, one of the 
+                serialize.COMPRESSION_* constants. None (default) means use 
+                serialize.DEFAULT_COMPRESSION. Compressed files are detected 
+                automatically by from_file.
+            compact::bool   --
+                Whether to omit formatting whitespace from the file. None 
+                (default) means use serialize.DEFAULT_COMPACT_OUTPUT.
         """
         # Create a new serializer object for the PublicKey structure definition
         serializer = SerializerClass(PublicKey_serialize_structure_definition)
@@ -194,11 +220,57 @@ class ThresholdPublicKey(PublicKey):
         }
         
         # Use the serializer to store the data to file
-        serializer.serialize_to_file(filename, data)
+        serializer.serialize_to_file(filename, data, compression=compression, 
+                                     compact=compact)
     
 
+    @staticmethod
+    def _decode_partial_public_keys(filename, pp_keys, prime):
+        """
+        Decode and check the partial public keys stored in a key file.
+        
+        Arguments:
+            filename::string    -- The name of the file from which the keys 
+                                   were read (for error messages).
+            pp_keys::dict[] -- The deserialized PartialPublicKey elements.
+            prime::long     -- The prime of the key's cryptosystem.
+        
+        Returns:
+            partial_public_keys::long[] -- The partial public key of trustee i 
+                                           on index i.
+        
+        Throws:
+            InvalidPloneVoteCryptoFileError -- If the partial public keys are 
+                                               not valid.
+        """
+        def str_to_num(num_str, base, value_name):
+            try:
+                return int(num_str, base)
+            except ValueError:
+                raise InvalidPloneVoteCryptoFileError(filename, 
+                    "File \"%s\" does not contain a valid threshold public " \
+                    "key. The stored value for %s is not a valid integer in " \
+                    "base %d representation." % (filename, value_name, base))
+        
+        partial_public_keys = [None for o in pp_keys]
+        for pp_key in pp_keys:
+            trustee = str_to_num(pp_key["trustee"], 10, "trustee")
+            key_val = str_to_num(pp_key["key"], 16, "key")
+            partial_public_keys[trustee] = key_val
+        
+        for pp_key in partial_public_keys:
+            if(not (1 <= pp_key <= prime - 2)):
+                raise InvalidPloneVoteCryptoFileError(filename, 
+                    "File \"%s\" does not contain a valid public key. The " \
+                    "value of at least one of the partial public keys given " \
+                    "in the file does not match the indicated cryptosystem. " \
+                    "Could the file be corrupt?" % filename)
+        
+        return partial_public_keys
+    
     @classmethod
-    def from_file(cls, filename, SerializerClass=serialize.XMLSerializer):
+    def from_file(cls, filename, SerializerClass=serialize.XMLSerializer, 
+                  lazy=False):
         """
         Loads an instance of ThresholdPublicKey from the given file.
         
@@ -212,6 +284,11 @@ class ThresholdPublicKey(PublicKey):
                 Note that often the same class used to serialize the data must 
                 be used to deserialize it.
                 (see utilities/serialize.py documentation for more information)
+            lazy::bool  -- If True, the partial public keys are only decoded 
+                           and checked when first needed (e.g. to compute the 
+                           key fingerprint or verify partial decryptions), 
+                           and InvalidPloneVoteCryptoFileError for invalid 
+                           partial public keys is raised at that point.
         
         Throws:
             InvalidPloneVoteCryptoFileError -- If the file is not a valid 
@@ -269,12 +346,8 @@ class ThresholdPublicKey(PublicKey):
                     str_to_num(threshold_info["Threshold"], 10, "Threshold")
         
         pp_keys = threshold_info["PartialPublicKey"]
-        partial_public_keys = [None for o in pp_keys]
-        for pp_key in pp_keys:
-            trustee = str_to_num(pp_key["trustee"], 10, "trustee")
-            key_val = str_to_num(pp_key["key"], 16, "key")
-            partial_public_keys[trustee] = key_val
-            
+        if(not isinstance(pp_keys, list)):
+            pp_keys = [pp_keys]
         
         # Check the loaded values
         if(not (1 <= pub_key <= prime - 2)):
@@ -282,18 +355,22 @@ class ThresholdPublicKey(PublicKey):
                 "File \"%s\" does not contain a valid public key. The value " \
                 "of the public key given in the file does not match the " \
                 "indicated cryptosystem. Could the file be corrupt?" % filename)
-                
-        for pp_key in partial_public_keys:
-            if(not (1 <= pp_key <= prime - 2)):
-                raise InvalidPloneVoteCryptoFileError(filename, 
-                    "File \"%s\" does not contain a valid public key. The " \
-                    "value of at least one of the partial public keys given " \
-                    "in the file does not match the indicated cryptosystem. " \
-                    "Could the file be corrupt?" % filename)
+        
+        if(lazy):
+            # Placeholder values, replaced by the actual keys on first access 
+            # (see __getattr__)
+            partial_public_keys = [None for o in pp_keys]
+        else:
+            partial_public_keys = \
+                cls._decode_partial_public_keys(filename, pp_keys, prime)
         
         # Construct the cryptosystem object
         cryptosystem = EGCryptoSystem.load(nbits, prime, generator)
         
         # Construct and return the PublicKey object
-        return cls(cryptosystem, num_trustees, threshold, pub_key, 
-                   partial_public_keys)
+        public_key = cls(cryptosystem, num_trustees, threshold, pub_key, 
+                         partial_public_keys)
+        if(lazy):
+            del public_key._partial_public_keys
+            public_key._lazy_partial_public_keys = (filename, pp_keys)
+        return public_key
@@ -76,6 +76,7 @@ from plonevotecryptolib.PublicKey import PublicKey
 from plonevotecryptolib.PrivateKey import PrivateKey
 from plonevotecryptolib.Ciphertext import Ciphertext
 from plonevotecryptolib.KeyPair import KeyPair
+import plonevotecryptolib.utilities.serialize as serialize
 
 # plonevotecryptolib.tests.* imports
 # Get Counter and Logger from TestTaskMonitor
@@ -632,6 +633,22 @@ class TestCiphertextSerialization(unittest.TestCase):
         # Check that the message was recovered correctly
         self.assertEqual(recovered_message, self.message)
         
+        # Compressed and compact files are loaded back transparently
+        ciphertext.to_file(file_path, compression=serialize.COMPRESSION_GZIP, 
+                           compact=True)
+        self.assertEqual(Ciphertext.from_file(file_path), ciphertext)
+        
+        # With lazy loading, the metadata is available before the encrypted 
+        # data is decoded
+        lazy_ciphertext = Ciphertext.from_file(file_path, lazy=True)
+        self.assertEqual(lazy_ciphertext.nbits, ciphertext.nbits)
+        self.assertEqual(lazy_ciphertext.pk_fingerprint, 
+                         ciphertext.pk_fingerprint)
+        self.assertFalse(lazy_ciphertext.__dict__.has_key("gamma"))
+        self.assertEqual(lazy_ciphertext, ciphertext)
+        self.assertEqual(
+            self.private_key.decrypt_to_text(lazy_ciphertext), self.message)
+        
         # Delete the temporary file
         os.remove(file_path)
                           
@@ -72,9 +72,11 @@ class TestPVCExceptions(unittest.TestCase):
                      (IncompatibleCiphertextError, (message)),
                      (IncompatibleReencryptionInfoError, (message)),
                      (IncompatibleCiphertextCollectionError, (message)),
+                     (DuplicateCiphertextError, (0, message)),
                      (IncompatibleCiphertextCollectionMappingError, (message)),
                      (InvalidCiphertextCollectionMappingError, (message)),
                      (InvalidShuffilingProofError, (message)),
+                     (IncompatibleMixPrecomputationError, (message)),
                      (ThresholdEncryptionSetUpStateError, (message)),
                      (IncompatibleCommitmentError, (message)),
                      (InvalidCommitmentError, (0, None, message))]:
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestCiphertextCollection.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/CiphertextCollection.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+from plonevotecryptolib.PVCExceptions import DuplicateCiphertextError
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+import plonevotecryptolib.utilities.serialize as serialize
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestCiphertextCollection(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.CiphertextCollection module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.ciphertexts = [self.public_key.encrypt_text("Vote #%d" % i) 
+                            for i in range(0, 4)]
+        
+        # A copy of ciphertext #1 with a different delta component (which 
+        # changes the vote it encodes)
+        self.copy = self.public_key.encrypt_text("Vote #1")
+        self.copy.gamma = list(self.ciphertexts[1].gamma)
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """
+        Test fixture clean up code.
+        """
+        shutil.rmtree(self.directory)
+    
+    def test_reject_duplicates(self):
+        """
+        Test that collections with reject_duplicates refuse copied ciphertexts.
+        """
+        for storage in (None, DiskCiphertextStorage(self.directory)):
+            collection = CiphertextCollection(self.public_key, storage, 
+                                              reject_duplicates=True)
+            for ciphertext in self.ciphertexts:
+                collection.add_ciphertext(ciphertext)
+            
+            for copy in (self.ciphertexts[1], self.copy):
+                try:
+                    collection.add_ciphertext(copy)
+                    self.fail("DuplicateCiphertextError not raised.")
+                except DuplicateCiphertextError, e:
+                    self.assertEqual(e.index, 1)
+            
+            self.assertEqual(collection.get_length(), 4)
+            self.assertEqual(collection.find_duplicates(), [])
+            collection._storage.close()
+    
+    def test_find_duplicates(self):
+        """
+        Test finding the copied ciphertexts of a collection.
+        """
+        for storage in (None, DiskCiphertextStorage(self.directory)):
+            collection = CiphertextCollection(self.public_key, storage)
+            for ciphertext in self.ciphertexts:
+                collection.add_ciphertext(ciphertext)
+            self.assertEqual(collection.find_duplicates(), [])
+            
+            collection.add_ciphertext(self.ciphertexts[3])
+            collection.add_ciphertext(self.copy)
+            collection.add_ciphertext(self.ciphertexts[1])
+            self.assertEqual(collection.find_duplicates(), [[1, 5, 6], [3, 4]])
+            collection._storage.close()
+    
+    def test_fingerprint(self):
+        """
+        Test the fingerprint of collections and its use for equality.
+        """
+        memory_collection = CiphertextCollection(self.public_key)
+        disk_collection = CiphertextCollection(self.public_key, 
+                                        DiskCiphertextStorage(self.directory))
+        fingerprint = memory_collection.get_fingerprint()
+        
+        for ciphertext in self.ciphertexts:
+            memory_collection.add_ciphertext(ciphertext)
+            # (the fingerprint changes with every ciphertext added)
+            self.assertNotEqual(memory_collection.get_fingerprint(), 
+                                fingerprint)
+            fingerprint = memory_collection.get_fingerprint()
+        for ciphertext in self.ciphertexts:
+            disk_collection.add_ciphertext(ciphertext)
+        
+        self.assertEqual(disk_collection.get_fingerprint(), fingerprint)
+        self.assertEqual(memory_collection, disk_collection)
+        
+        # Collections with different ciphertexts or order are not equal
+        reversed_collection = CiphertextCollection(self.public_key)
+        for i in range(0, 4):
+            reversed_collection.add_ciphertext(self.ciphertexts[3 - i])
+        self.assertNotEqual(memory_collection, reversed_collection)
+        
+        disk_collection.add_ciphertext(self.copy)
+        memory_collection.add_ciphertext(self.ciphertexts[1])
+        self.assertNotEqual(memory_collection, disk_collection)
+        disk_collection._storage.close()
+    
+    def test_inclusion_proof(self):
+        """
+        Test proving that a ciphertext is in a collection.
+        """
+        collection = CiphertextCollection(self.public_key)
+        for ciphertext in self.ciphertexts + [self.copy]:
+            collection.add_ciphertext(ciphertext)
+        fingerprint = collection.get_fingerprint()
+        
+        for i in range(0, 5):
+            proof = collection.get_inclusion_proof(i)
+            self.assertTrue(CiphertextCollection.verify_inclusion_proof(
+                                    collection[i], i, 5, fingerprint, proof))
+            self.assertFalse(CiphertextCollection.verify_inclusion_proof(
+                                    collection[(i + 1) % 5], i, 5, 
+                                    fingerprint, proof))
+        
+        self.assertFalse(CiphertextCollection.verify_inclusion_proof(
+                                    collection[0], 0, 5, "not hex", proof))
+        self.assertRaises(IndexError, collection.get_inclusion_proof, 5)
+    
+    def test_group_membership(self):
+        """
+        Test that ciphertexts with values outside of the group of the 
+        cryptosystem are rejected.
+        """
+        prime = self.public_key.cryptosystem.get_prime()
+        collection = CiphertextCollection(self.public_key)
+        invalid_ciphertexts = []
+        for (gamma, delta) in ((0, 1), (1, prime), (prime + 1, 1), (-1, 1), 
+                               (1, 1.0)):
+            ciphertext = self.public_key.encrypt_text("Vote")
+            ciphertext.gamma[0] = gamma
+            ciphertext.delta[0] = delta
+            self.assertFalse(ciphertext.is_in_group(prime))
+            self.assertRaises(IncompatibleCiphertextError, 
+                              collection.add_ciphertext, ciphertext)
+            invalid_ciphertexts.append(ciphertext)
+        
+        self.assertTrue(self.ciphertexts[0].is_in_group(prime))
+        receipts = collection.add_many(invalid_ciphertexts + 
+                                       [self.ciphertexts[0]])
+        self.assertEqual([receipt.accepted for receipt in receipts], 
+                         [False] * 5 + [True])
+        
+        # Invalid ciphertexts are also rejected when loading a collection
+        collection._storage.append(invalid_ciphertexts[1])
+        (file_object, filename) = tempfile.mkstemp()
+        os.close(file_object)
+        try:
+            collection.to_file(filename, serialize.BinarySerializer)
+            self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                              CiphertextCollection.from_file, filename, 
+                              self.public_key, serialize.BinarySerializer)
+        finally:
+            os.remove(filename)
+        
+
+if __name__ == '__main__':
+    unittest.main()
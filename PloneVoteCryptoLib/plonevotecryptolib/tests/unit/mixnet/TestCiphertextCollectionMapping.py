@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestCiphertextCollectionMapping.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/CiphertextCollectionMapping.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import \
+                                                CiphertextCollectionMapping
+from plonevotecryptolib.Mixnet.CiphertextReencryptionInfo import \
+                                                CiphertextReencryptionInfo
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+from plonevotecryptolib.PVCExceptions import \
+                                IncompatibleCiphertextCollectionError
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+import plonevotecryptolib.utilities.serialize as serialize
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestCiphertextCollectionMapping(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.CiphertextCollectionMapping module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 10):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def test_new_apply_verify(self):
+        """
+        Test that a new mapping is a permutation of the collection indexes and 
+        that it verifies against the collection obtained by applying it.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        self.assertEqual(sorted(mapping._reordering), range(0, 10))
+        
+        shuffled_collection = mapping.apply(self.collection)
+        self.assertEqual(shuffled_collection.get_length(), 10)
+        self.assertTrue(mapping.verify(self.collection, shuffled_collection))
+        
+        # A different shuffle of the same collection does not verify with 
+        # this mapping
+        other_shuffled_collection = \
+            CiphertextCollectionMapping.new(self.collection).apply(
+                                                            self.collection)
+        self.assertFalse(mapping.verify(self.collection, 
+                                        other_shuffled_collection))
+        
+        # Collections of a different length are not compatible
+        small_collection = CiphertextCollection(self.public_key)
+        small_collection.add_ciphertext(self.collection[0])
+        self.assertRaises(IncompatibleCiphertextCollectionError, 
+                          mapping.apply, small_collection)
+        self.assertFalse(mapping.verify(small_collection, shuffled_collection))
+    
+    def test_verify_modified_collection(self):
+        """
+        Test that verify rejects shuffled collections with a modified, 
+        missing or extra ciphertext.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        self.assertTrue(mapping.verify(self.collection, shuffled_collection))
+        
+        # Replace the delta of the last block of one ciphertext
+        modified_collection = mapping.apply(self.collection)
+        ciphertext = modified_collection[mapping._reordering[9]]
+        ciphertext.delta[-1] = (ciphertext.delta[-1] * 2) % \
+                               self.public_key.cryptosystem.get_prime()
+        self.assertFalse(mapping.verify(self.collection, modified_collection))
+        
+        # Remove or add a ciphertext
+        short_collection = CiphertextCollection(self.public_key)
+        for i in range(0, 9):
+            short_collection.add_ciphertext(shuffled_collection[i])
+        self.assertFalse(mapping.verify(self.collection, short_collection))
+        shuffled_collection.add_ciphertext(self.collection[0])
+        self.assertFalse(mapping.verify(self.collection, shuffled_collection))
+    
+    def test_new_with_seed(self):
+        """
+        Test that a mapping created with a seed can be regenerated from it.
+        """
+        seed = RandomSource().new_seed()
+        mapping = CiphertextCollectionMapping.new(self.collection, seed)
+        shuffled_collection = mapping.apply(self.collection)
+        
+        regenerated = CiphertextCollectionMapping.new(self.collection, seed)
+        self.assertEqual(regenerated._seed, seed)
+        self.assertEqual(regenerated._reordering, mapping._reordering)
+        self.assertTrue(regenerated.verify(self.collection, 
+                                           shuffled_collection))
+        
+        other = CiphertextCollectionMapping.new(self.collection, 
+                                                RandomSource().new_seed())
+        self.assertFalse(other.verify(self.collection, shuffled_collection))
+    
+    def test_rebase(self):
+        """
+        Test that rebasing A->B on A->C gives a valid C->B mapping.
+        """
+        mapping_ab = CiphertextCollectionMapping.new(self.collection)
+        mapping_ac = CiphertextCollectionMapping.new(self.collection)
+        collection_b = mapping_ab.apply(self.collection)
+        collection_c = mapping_ac.apply(self.collection)
+        
+        mapping_cb = mapping_ab.rebase(mapping_ac)
+        self.assertEqual(sorted(mapping_cb._reordering), range(0, 10))
+        self.assertTrue(mapping_cb.verify(collection_c, collection_b))
+        self.assertFalse(mapping_cb.verify(self.collection, collection_b))
+    
+    def test_parallel_apply_rebase(self):
+        """
+        Test that applying and rebasing mappings in parallel gives the same 
+        results as doing it serially, also for disk collections.
+        """
+        mapping_ab = CiphertextCollectionMapping.new(self.collection)
+        mapping_ac = CiphertextCollectionMapping.new(self.collection)
+        collection_b = mapping_ab.apply(self.collection)
+        
+        for workers in (2, 3):
+            self.assertEqual(mapping_ab.apply(self.collection, workers), 
+                             collection_b)
+            
+            mapping_cb = mapping_ab.rebase(mapping_ac)
+            parallel_mapping_cb = mapping_ab.rebase(mapping_ac, workers)
+            self.assertEqual(parallel_mapping_cb._reordering, 
+                             mapping_cb._reordering)
+            for i in range(0, 10):
+                self.assertEqual(
+                        parallel_mapping_cb._reencryptions[i].get_exponents(), 
+                        mapping_cb._reencryptions[i].get_exponents())
+        
+        directory = tempfile.mkdtemp()
+        try:
+            disk_collection = CiphertextCollection(self.public_key, 
+                                            DiskCiphertextStorage(directory))
+            for ciphertext in self.collection:
+                disk_collection.add_ciphertext(ciphertext)
+            disk_collection_b = mapping_ab.apply(disk_collection, 2)
+            self.assertEqual(disk_collection_b, collection_b)
+            self.assertTrue(mapping_ab.verify(disk_collection, 
+                                              disk_collection_b))
+            disk_collection._storage.close()
+            disk_collection_b._storage.close()
+        finally:
+            shutil.rmtree(directory)
+        
+        # Incompatible collections are still rejected
+        small_collection = CiphertextCollection(self.public_key)
+        small_collection.add_ciphertext(self.collection[0])
+        self.assertRaises(IncompatibleCiphertextCollectionError, 
+                          mapping_ab.apply, small_collection, 2)
+    
+    def test_rebase_exponents(self):
+        """
+        Test that rebasing on exponents gives the same re-encryptions as 
+        rebasing on the (g^{r'}, y^{r'}) blocks.
+        """
+        mapping_ab = CiphertextCollectionMapping.new(self.collection)
+        mapping_ac = CiphertextCollectionMapping.new(self.collection)
+        collection_b = mapping_ab.apply(self.collection)
+        collection_c = mapping_ac.apply(self.collection)
+        
+        # A copy of mapping_ac whose exponents are unknown
+        mapping_ac_blocks = CiphertextCollectionMapping()
+        mapping_ac_blocks._reordering = mapping_ac._reordering
+        for reencryption in mapping_ac._reencryptions:
+            reencryption_blocks = CiphertextReencryptionInfo(self.public_key)
+            for (gr, yr) in reencryption:
+                reencryption_blocks.add_block(gr, yr)
+            mapping_ac_blocks._reencryptions.append(reencryption_blocks)
+        
+        mapping_cb = mapping_ab.rebase(mapping_ac)
+        mapping_cb_blocks = mapping_ab.rebase(mapping_ac_blocks)
+        self.assertEqual(mapping_cb_blocks._reencryptions[0].get_exponents(), 
+                         None)
+        for i in range(0, 10):
+            reencryption = mapping_cb._reencryptions[i]
+            self.assertNotEqual(reencryption.get_exponents(), None)
+            self.assertEqual(list(reencryption), 
+                             list(mapping_cb_blocks._reencryptions[i]))
+        self.assertTrue(mapping_cb.verify(collection_c, collection_b))
+    
+    def test_reencryption_index(self):
+        """
+        Test that indexing a re-encryption out of range raises IndexError.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        reencryption = mapping._reencryptions[0]
+        length = reencryption.get_length()
+        self.assertEqual(reencryption[length - 1], list(reencryption)[-1])
+        self.assertRaises(IndexError, reencryption.__getitem__, length)
+        self.assertRaises(IndexError, reencryption.__getitem__, -1)
+    
+    def test_to_from_file(self):
+        """
+        Test that a collection and a mapping can be stored to and loaded from 
+        a file, using both the XML and the binary serializers.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        
+        (file_object, filename) = tempfile.mkstemp()
+        os.close(file_object)
+        try:
+            for SerializerClass in (serialize.XMLSerializer, 
+                                    serialize.BinarySerializer):
+                shuffled_collection.to_file(filename, SerializerClass)
+                loaded_collection = CiphertextCollection.from_file(filename, 
+                                        self.public_key, SerializerClass)
+                self.assertEqual(loaded_collection.get_length(), 
+                                 shuffled_collection.get_length())
+                
+                mapping.to_file(filename, SerializerClass)
+                loaded_mapping = CiphertextCollectionMapping.from_file(
+                                filename, self.public_key, SerializerClass)
+                self.assertEqual(loaded_mapping._reordering, 
+                                 mapping._reordering)
+                self.assertTrue(loaded_mapping.verify(self.collection, 
+                                                      loaded_collection))
+        finally:
+            os.remove(filename)
+        
+
+if __name__ == '__main__':
+    unittest.main()
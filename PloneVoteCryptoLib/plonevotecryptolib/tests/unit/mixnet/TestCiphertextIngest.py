@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestCiphertextIngest.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/CiphertextIngest.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import threading
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextIngest import CiphertextIngestWorker
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestCiphertextIngest(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.CiphertextIngest module and the 
+    concurrent addition of ciphertexts to a CiphertextCollection.
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        cryptosystem = get_cryptosystem()
+        self.public_key = cryptosystem.new_key_pair().public_key
+        self.other_public_key = cryptosystem.new_key_pair().public_key
+        self.ciphertexts = [self.public_key.encrypt_text("Vote #%d" % i) 
+                            for i in range(0, 20)]
+    
+    def test_add_many(self):
+        """
+        Test adding several ciphertexts, with receipts for each.
+        """
+        collection = CiphertextCollection(self.public_key, 
+                                          reject_duplicates=True)
+        long_ciphertext = self.public_key.encrypt_text("." * 200)
+        ciphertexts = self.ciphertexts[0:3] + \
+                      [self.other_public_key.encrypt_text("Vote"), 
+                       long_ciphertext, self.ciphertexts[1]] + \
+                      self.ciphertexts[3:5]
+        
+        receipts = collection.add_many(ciphertexts, blocks=1)
+        self.assertEqual([receipt.accepted for receipt in receipts], 
+                         [True, True, True, False, False, False, True, True])
+        self.assertEqual([receipt.index for receipt in receipts], 
+                         [0, 1, 2, None, None, None, 3, 4])
+        self.assertEqual(receipts[0].ciphertext_fingerprint, 
+                         self.ciphertexts[0].get_fingerprint())
+        for receipt in receipts:
+            self.assertTrue(receipt.is_done())
+            self.assertEqual(receipt.error == None, receipt.accepted)
+        
+        self.assertEqual(list(collection), 
+                         self.ciphertexts[0:5])
+        
+        # Without a number of blocks, long ciphertexts are accepted
+        receipt = collection.add_many([long_ciphertext])[0]
+        self.assertTrue(receipt.accepted)
+        self.assertEqual(receipt.index, 5)
+    
+    def test_ingest_worker(self):
+        """
+        Test submitting ciphertexts to an ingest worker from several threads.
+        """
+        collection = CiphertextCollection(self.public_key, 
+                                          reject_duplicates=True)
+        worker = CiphertextIngestWorker(collection, blocks=1, batch_size=3)
+        worker.start()
+        
+        receipts = []
+        def submit(ciphertexts):
+            for ciphertext in ciphertexts:
+                receipts.append((ciphertext, worker.submit(ciphertext)))
+        
+        threads = []
+        for i in range(0, 4):
+            # (every thread also submits a copy of the same ciphertext)
+            thread = threading.Thread(target=submit, 
+                args=(self.ciphertexts[5 * i:5 * (i + 1)] + 
+                      [self.ciphertexts[0]],))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        
+        rejected = worker.submit(self.other_public_key.encrypt_text("Vote"))
+        self.assertTrue(rejected.is_done())
+        self.assertFalse(rejected.accepted)
+        
+        worker.stop()
+        
+        # Every ciphertext is accepted once, the copies are rejected
+        self.assertEqual(collection.get_length(), 20)
+        self.assertEqual(len(receipts), 24)
+        accepted = 0
+        for (ciphertext, receipt) in receipts:
+            self.assertTrue(receipt.wait(0))
+            if(receipt.accepted):
+                self.assertEqual(collection[receipt.index], ciphertext)
+                accepted += 1
+            else:
+                self.assertEqual(ciphertext, self.ciphertexts[0])
+        self.assertEqual(accepted, 20)
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestCiphertextStorage.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/CiphertextStorage.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import os
+import pickle
+import tempfile
+import shutil
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                                LinearShufflingProof
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestCiphertextStorage(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.CiphertextStorage module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.key_pair = get_cryptosystem().new_key_pair()
+        self.public_key = self.key_pair.public_key
+        self.directory = tempfile.mkdtemp()
+        self.collection = CiphertextCollection(self.public_key, 
+                                        DiskCiphertextStorage(self.directory))
+        self.ciphertexts = []
+        for i in range(0, 5):
+            # (ciphertexts of different lengths in blocks)
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i + 
+                                                      "." * (150 * i))
+            self.ciphertexts.append(ciphertext)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def tearDown(self):
+        """
+        Test fixture clean up code.
+        """
+        self.collection._storage.close()
+        shutil.rmtree(self.directory)
+    
+    def test_disk_collection(self):
+        """
+        Test that a disk collection behaves as an in-memory collection.
+        """
+        self.assertEqual(self.collection.get_length(), 5)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        for i in range(0, 5):
+            self.assertEqual(self.collection[i], self.ciphertexts[i])
+        self.assertEqual(list(self.collection), self.ciphertexts)
+        self.assertRaises(IndexError, self.collection.__getitem__, 5)
+        self.assertRaises(IndexError, self.collection.__getitem__, -1)
+        
+        memory_collection = CiphertextCollection(self.public_key)
+        for ciphertext in self.ciphertexts:
+            memory_collection.add_ciphertext(ciphertext)
+        self.assertEqual(self.collection, memory_collection)
+        
+        self.assertEqual(self.key_pair.private_key.decrypt_to_text(
+                                            self.collection[3]), 
+                         "Vote #3" + "." * 450)
+        
+        # Reading and appending can be interleaved
+        self.collection.add_ciphertext(self.ciphertexts[0])
+        self.assertEqual(self.collection[5], self.ciphertexts[0])
+    
+    def test_pickle(self):
+        """
+        Test that pickled copies of a disk storage share its file and only 
+        take it over after hand_over().
+        """
+        storage = self.collection._storage
+        copy = pickle.loads(pickle.dumps(storage))
+        self.assertEqual(list(copy), self.ciphertexts)
+        self.assertRaises(ValueError, copy.append, self.ciphertexts[0])
+        copy.close()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        
+        storage.hand_over()
+        copy = pickle.loads(pickle.dumps(storage))
+        self.assertRaises(ValueError, storage.append, self.ciphertexts[0])
+        copy.append(self.ciphertexts[0])
+        self.assertEqual(copy.get_length(), 6)
+        copy.close()
+        self.assertEqual(os.listdir(self.directory), [])
+    
+    def test_shuffle_with_proof(self):
+        """
+        Test shuffling a disk collection with proof, in parallel.
+        """
+        shuffled_collection, proof = self.collection.shuffle_with_proof(
+                                                                workers=2)
+        self.assertTrue(isinstance(shuffled_collection._storage, 
+                                   DiskCiphertextStorage))
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        self.assertTrue(proof.verify(self.collection, shuffled_collection, 2))
+        
+        # (LinearShufflingProof needs ciphertexts of the same length)
+        collection = CiphertextCollection(self.public_key, 
+                                        DiskCiphertextStorage(self.directory))
+        for i in range(0, 5):
+            collection.add_ciphertext(
+                                self.public_key.encrypt_text("Vote #%d" % i))
+        shuffled_collection, proof = collection.shuffle_with_proof(
+                                            ProofClass=LinearShufflingProof)
+        self.assertTrue(proof.verify(collection, shuffled_collection))
+        
+        # Temporary files are deleted with the collections that use them
+        del collection, shuffled_collection, proof
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestLinearShufflingProof.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/LinearShufflingProof.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+import os
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Ciphertext import Ciphertext
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import \
+                                                CiphertextCollectionMapping
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                        LinearShufflingProof, _jacobi
+from plonevotecryptolib.PVCExceptions import \
+                                IncompatibleCiphertextCollectionError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+import plonevotecryptolib.utilities.serialize as serialize
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestLinearShufflingProof(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.LinearShufflingProof module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 5):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def test_jacobi(self):
+        """
+        Test that _jacobi agrees with Euler's criterion for a small prime.
+        """
+        prime = 23
+        for a in range(0, 2 * prime):
+            euler = pow(a, (prime - 1) / 2, prime)
+            if(euler == prime - 1):
+                euler = -1
+            self.assertEqual(_jacobi(a, prime), euler)
+    
+    def test_shuffle_with_proof(self):
+        """
+        Test that a LinearShufflingProof generated by shuffle_with_proof 
+        verifies for the shuffled collection only.
+        """
+        shuffled_collection, proof = self.collection.shuffle_with_proof(
+                                        ProofClass=LinearShufflingProof)
+        self.assertTrue(isinstance(proof, LinearShufflingProof))
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        
+        # The proof does not verify for a different shuffle
+        other_shuffled_collection = \
+            CiphertextCollectionMapping.new(self.collection).apply(
+                                                            self.collection)
+        self.assertFalse(proof.verify(self.collection, 
+                                      other_shuffled_collection))
+        self.assertFalse(proof.verify(self.collection, self.collection))
+        
+        # Nor if any response is altered
+        proof._permutation_responses[2] += 1
+        self.assertFalse(proof.verify(self.collection, shuffled_collection))
+    
+    def test_to_from_file(self):
+        """
+        Test that a proof can be stored to and loaded from a file or string, 
+        using both the XML and the binary serializers.
+        """
+        shuffled_collection, proof = self.collection.shuffle_with_proof(
+                                        ProofClass=LinearShufflingProof)
+        (file_object, filename) = tempfile.mkstemp()
+        os.close(file_object)
+        try:
+            for SerializerClass in (serialize.XMLSerializer, 
+                                    serialize.BinarySerializer):
+                proof.to_file(filename, SerializerClass)
+                loaded_proof = LinearShufflingProof.from_file(filename, 
+                                            self.public_key, SerializerClass)
+                self.assertEqual(loaded_proof._responses, proof._responses)
+                self.assertTrue(loaded_proof.verify(self.collection, 
+                                                    shuffled_collection))
+                
+                loaded_proof = LinearShufflingProof.from_string(
+                                        proof.to_string(SerializerClass), 
+                                        self.public_key, SerializerClass)
+                self.assertTrue(loaded_proof.verify(self.collection, 
+                                                    shuffled_collection))
+            
+            # Other files are rejected
+            shuffled_collection.to_file(filename, serialize.BinarySerializer)
+            self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                              LinearShufflingProof.from_file, filename, 
+                              self.public_key, serialize.BinarySerializer)
+        finally:
+            os.remove(filename)
+    
+    def test_negated_plaintext(self):
+        """
+        Test that a proof cannot be forged for a shuffled collection in 
+        which a plaintext m has been replaced by -m.
+        
+        (Both have the same square, so only the quadratic characters of the 
+        plaintexts, which are part of the proof, tell them apart.)
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        prime = self.public_key.cryptosystem.get_prime()
+        
+        forged_collection = CiphertextCollection(self.public_key)
+        for i in range(0, shuffled_collection.get_length()):
+            ciphertext = shuffled_collection[i]
+            forged_ciphertext = Ciphertext(ciphertext.nbits, 
+                                           ciphertext.pk_fingerprint)
+            for (gamma, delta) in ciphertext:
+                if(i == 3):
+                    delta = prime - delta
+                forged_ciphertext.append(gamma, delta)
+            forged_collection.add_ciphertext(forged_ciphertext)
+        
+        # Generate the proof with the real mapping, skipping its check
+        mapping.verify = lambda original, shuffled: True
+        proof = LinearShufflingProof.new(self.collection, forged_collection, 
+                                         mapping)
+        self.assertFalse(proof.verify(self.collection, forged_collection))
+    
+    def test_seed_int_long(self):
+        """
+        Test that the seed does not depend on whether the values of the 
+        collections are stored as int or long.
+        """
+        nbits = self.public_key.cryptosystem.get_nbits()
+        fingerprint = self.public_key.get_fingerprint()
+        int_collection = CiphertextCollection(self.public_key)
+        long_collection = CiphertextCollection(self.public_key)
+        for i in range(2, 5):
+            int_ciphertext = Ciphertext(nbits, fingerprint)
+            int_ciphertext.append(i, i + 1)
+            int_collection.add_ciphertext(int_ciphertext)
+            long_ciphertext = Ciphertext(nbits, fingerprint)
+            long_ciphertext.append(long(i), long(i + 1))
+            long_collection.add_ciphertext(long_ciphertext)
+        
+        self.assertEqual(
+            LinearShufflingProof._generate_seed(int_collection, 
+                                                int_collection, [1, 2]),
+            LinearShufflingProof._generate_seed(long_collection, 
+                                                long_collection, 
+                                                [1L, 2L]))
+    
+    def test_different_lengths(self):
+        """
+        Test that collections of ciphertexts with different lengths are 
+        rejected.
+        """
+        self.collection.add_ciphertext(
+                            self.public_key.encrypt_text("A" * 1000))
+        self.assertRaises(IncompatibleCiphertextCollectionError, 
+                          self.collection.shuffle_with_proof, 
+                          None, LinearShufflingProof)
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestMixCascade.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/MixCascade.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import shutil
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                                LinearShufflingProof
+from plonevotecryptolib.Mixnet.MixCascade import MixCascade
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+class _FailingProof(LinearShufflingProof):
+    """
+    A proof of shuffling that never verifies, to simulate a dishonest mixer.
+    """
+    
+    @classmethod
+    def new(cls, *args, **kwargs):
+        proof = LinearShufflingProof.new(*args, **kwargs)
+        proof.__class__ = cls
+        return proof
+    
+    def verify(self, original_collection, shuffled_collection, workers=None):
+        return False
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestMixCascade(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.MixCascade module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        # (LinearShufflingProof needs ciphertexts of the same length)
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 6):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def _check_cascade(self, cascade, stages):
+        """
+        Check that a cascade that was run has all its stages verified.
+        """
+        self.assertEqual(len(cascade.collections), stages + 1)
+        self.assertEqual(len(cascade.proofs), stages)
+        self.assertEqual(cascade.verified, [True] * stages)
+        self.assertEqual(len(cascade.shuffle_times), stages)
+        self.assertEqual(len(cascade.verify_times), stages)
+        for elapsed_time in cascade.shuffle_times + cascade.verify_times:
+            self.assertTrue(elapsed_time >= 0)
+        self.assertEqual(cascade.get_first_failing_stage(), None)
+        self.assertEqual(MixCascade.find_failing_stage(cascade.collections, 
+                                                       cascade.proofs), None)
+        
+        # The stages are chained
+        for i in range(0, stages):
+            self.assertTrue(cascade.proofs[i].verify(cascade.collections[i], 
+                                                cascade.collections[i + 1]))
+        self.assertNotEqual(cascade.collections[-1], self.collection)
+    
+    def test_run(self):
+        """
+        Test running a cascade serially and in parallel.
+        """
+        for workers in (None, 2):
+            cascade = MixCascade(3, LinearShufflingProof, workers)
+            shuffled_collection = cascade.run(self.collection)
+            self.assertTrue(shuffled_collection is cascade.collections[-1])
+            self.assertTrue(self.collection is cascade.collections[0])
+            self._check_cascade(cascade, 3)
+        
+        self.assertRaises(ValueError, MixCascade, 0)
+    
+    def test_run_on_disk(self):
+        """
+        Test that a cascade given a directory keeps its collections there.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            cascade = MixCascade(2, LinearShufflingProof, 2, directory)
+            cascade.run(self.collection)
+            self._check_cascade(cascade, 2)
+            self.assertEqual(cascade.collections[0], self.collection)
+            for collection in cascade.collections:
+                self.assertTrue(isinstance(collection._storage, 
+                                           DiskCiphertextStorage))
+                collection._storage.close()
+        finally:
+            shutil.rmtree(directory)
+    
+    def test_failing_stage(self):
+        """
+        Test that the first stage failing verification is reported, and that 
+        no further stages are started after it (when run serially).
+        """
+        cascade = MixCascade(3, _FailingProof)
+        cascade.run(self.collection)
+        self.assertEqual(cascade.get_first_failing_stage(), 0)
+        self.assertEqual(cascade.verified, [False])
+        self.assertEqual(len(cascade.collections), 2)
+        
+        cascade = MixCascade(3, _FailingProof, 2)
+        cascade.run(self.collection)
+        self.assertEqual(cascade.get_first_failing_stage(), 0)
+        
+        # A tampered intermediate collection
+        cascade = MixCascade(3, LinearShufflingProof)
+        cascade.run(self.collection)
+        collections = list(cascade.collections)
+        tampered_collection = CiphertextCollection(self.public_key)
+        for ciphertext in collections[2]:
+            tampered_collection.add_ciphertext(ciphertext)
+        tampered_collection.add_ciphertext(self.collection[0])
+        collections[2] = tampered_collection
+        for workers in (None, 2):
+            self.assertEqual(MixCascade.find_failing_stage(collections, 
+                                                cascade.proofs, workers), 1)
+        self.assertRaises(ValueError, MixCascade.find_failing_stage, 
+                          collections[0:2], cascade.proofs)
+
+
+if __name__ == '__main__':
+    unittest.main()
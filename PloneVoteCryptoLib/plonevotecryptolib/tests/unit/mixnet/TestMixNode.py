@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestMixNode.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/MixNode.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+import threading
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+import plonevotecryptolib.utilities.serialize as serialize
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                                LinearShufflingProof
+from plonevotecryptolib.Mixnet.MixCascade import MixCascade
+from plonevotecryptolib.Mixnet.MixNode import MixNode
+from plonevotecryptolib.Mixnet.MixStream import MixStreamReader
+from plonevotecryptolib.Mixnet.MixStream import MixStreamWriter
+from plonevotecryptolib.PVCExceptions import \
+                                            InvalidPloneVoteCryptoFileError
+from plonevotecryptolib.PVCExceptions import InvalidShuffilingProofError
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestMixNode(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.MixNode module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        # (LinearShufflingProof needs ciphertexts of the same length)
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 6):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+        
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """
+        Test fixture tear down code.
+        """
+        shutil.rmtree(self.directory)
+    
+    def _run_in_thread(self, function, *args):
+        """
+        Start a thread running function(*args), storing its result (or 
+        exception) in the returned dictionary.
+        """
+        result = {}
+        def target():
+            try:
+                result["value"] = function(*args)
+            except Exception, e:
+                result["error"] = e
+        thread = threading.Thread(target=target)
+        thread.start()
+        result["thread"] = thread
+        return result
+    
+    def _send(self, collection, file_object):
+        """
+        Write collection as the input mix stream of the first node.
+        """
+        writer = MixStreamWriter(file_object, self.public_key, 0)
+        writer.write_collection(collection)
+        writer.close()
+        file_object.close()
+    
+    def _stream(self, collection, stage):
+        """
+        Return a mix stream for the given stage containing only collection.
+        """
+        stream = StringIO()
+        writer = MixStreamWriter(stream, self.public_key, stage)
+        writer.write_collection(collection)
+        writer.close()
+        return stream.getvalue()
+    
+    def _run_node(self, node, input_file, output_file):
+        """
+        Run node, closing its streams afterwards.
+        """
+        try:
+            return node.run(input_file, output_file)
+        finally:
+            input_file.close()
+            if(output_file != None):
+                output_file.close()
+    
+    def test_pipeline(self):
+        """
+        Test a mix network of three nodes connected by pipes, which publish to 
+        a bulletin board.
+        """
+        board = os.path.join(self.directory, "board")
+        os.mkdir(board)
+        
+        # source -> node 0 -> node 1 -> node 2
+        pipes = []
+        for i in range(0, 3):
+            (read_fd, write_fd) = os.pipe()
+            pipes.append((os.fdopen(read_fd, "rb"), os.fdopen(write_fd, "wb")))
+        
+        nodes = [MixNode(self.public_key, board, LinearShufflingProof), 
+                 MixNode(self.public_key, board, LinearShufflingProof), 
+                 MixNode(self.public_key, board, LinearShufflingProof, 
+                         directory=self.directory)]
+        results = []
+        for i in range(0, 3):
+            if(i < 2):
+                output_file = pipes[i + 1][1]
+            else:
+                output_file = None
+            results.append(self._run_in_thread(self._run_node, nodes[i], 
+                                               pipes[i][0], output_file))
+        self._send(self.collection, pipes[0][1])
+        
+        for i in range(0, 3):
+            results[i]["thread"].join()
+            self.assertFalse(results[i].has_key("error"))
+            self.assertEqual(nodes[i].stage, i)
+            for step in ("receive", "shuffle", "send", "verify", "prove", 
+                         "publish"):
+                self.assertTrue(nodes[i].timings[step] >= 0)
+        
+        # Each node received the output and proof of the previous one
+        self.assertEqual(nodes[0].input_collection, self.collection)
+        self.assertEqual(nodes[0].input_proof, None)
+        self.assertEqual(nodes[0].input_verified, None)
+        for i in range(1, 3):
+            self.assertTrue(nodes[i].input_verified)
+            (shuffled_collection, proof) = results[i - 1]["value"]
+            self.assertEqual(nodes[i].input_collection, shuffled_collection)
+            self.assertTrue(nodes[i].input_proof.verify(
+                        nodes[i - 1].input_collection, 
+                        nodes[i].input_collection))
+        
+        # The bulletin board can be checked independently
+        (collections, proofs) = MixNode.load_bulletin_board(board, 
+                                        self.public_key, LinearShufflingProof)
+        self.assertEqual(len(collections), 4)
+        self.assertEqual(len(proofs), 3)
+        self.assertEqual(collections[0], self.collection)
+        self.assertEqual(collections[3], results[2]["value"][0])
+        self.assertEqual(MixCascade.find_failing_stage(collections, proofs), 
+                         None)
+        
+        # A stage that is not published yet is not loaded
+        os.remove(os.path.join(board, "proof_2.pvproof"))
+        (collections, proofs) = MixNode.load_bulletin_board(board, 
+                                        self.public_key, LinearShufflingProof)
+        self.assertEqual(len(collections), 3)
+        self.assertEqual(len(proofs), 2)
+    
+    def test_output_stream(self):
+        """
+        Test that the output stream of a node is a valid mix stream for the 
+        next stage.
+        """
+        (read_fd, write_fd) = os.pipe()
+        input_file = os.fdopen(read_fd, "rb")
+        sender = self._run_in_thread(self._send, self.collection, 
+                                     os.fdopen(write_fd, "wb"))
+        
+        (read_fd, write_fd) = os.pipe()
+        output_file = os.fdopen(read_fd, "rb")
+        node = MixNode(self.public_key, ProofClass=LinearShufflingProof)
+        result = self._run_in_thread(self._run_node, node, input_file, 
+                                     os.fdopen(write_fd, "wb"))
+        
+        reader = MixStreamReader(output_file, self.public_key)
+        self.assertEqual(reader.stage, 1)
+        shuffled_collection = reader.read_collection()
+        proof = reader.read_proof(LinearShufflingProof)
+        output_file.close()
+        sender["thread"].join()
+        result["thread"].join()
+        
+        self.assertEqual(shuffled_collection, result["value"][0])
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+
+    
+    def test_input_proof_verification(self):
+        """
+        Test that a node fails, without sending or publishing its proof, if 
+        the proof of the previous stage does not verify.
+        """
+        # A valid input stream for stage 1
+        stage_1_stream = StringIO()
+        node = MixNode(self.public_key, ProofClass=LinearShufflingProof)
+        node.run(StringIO(self._stream(self.collection, 0)), stage_1_stream)
+        
+        # The proof is verified against the given previous collection
+        node = MixNode(self.public_key, ProofClass=LinearShufflingProof)
+        node.run(StringIO(stage_1_stream.getvalue()), StringIO(), 
+                 self.collection)
+        self.assertEqual(node.stage, 1)
+        self.assertTrue(node.input_verified)
+        
+        # Without a previous collection, the proof is not verified
+        node = MixNode(self.public_key, ProofClass=LinearShufflingProof)
+        node.run(StringIO(stage_1_stream.getvalue()))
+        self.assertEqual(node.input_verified, None)
+        self.assertTrue(node.timings["verify"] >= 0)
+        
+        # A bulletin board whose collection 0 is not the one shuffled
+        board = os.path.join(self.directory, "board")
+        os.mkdir(board)
+        other_collection = CiphertextCollection(self.public_key)
+        for i in range(0, 6):
+            ciphertext = self.public_key.encrypt_text("Other vote #%d" % i)
+            other_collection.add_ciphertext(ciphertext)
+        other_collection.to_file(os.path.join(board, 
+                                              "collection_0.pvcollection"), 
+                                 serialize.BinarySerializer)
+        
+        output_file = StringIO()
+        node = MixNode(self.public_key, board, LinearShufflingProof)
+        self.assertRaises(InvalidShuffilingProofError, node.run, 
+                          StringIO(stage_1_stream.getvalue()), output_file)
+        self.assertFalse(os.path.exists(os.path.join(board, 
+                                                     "proof_1.pvproof")))
+        # (the output stream is never ended)
+        reader = MixStreamReader(StringIO(output_file.getvalue()), 
+                                 self.public_key)
+        self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                          reader.read_collection)
+        
+        # A stream for stage 1 without a proof
+        node = MixNode(self.public_key, ProofClass=LinearShufflingProof)
+        self.assertRaises(InvalidShuffilingProofError, node.run, 
+                          StringIO(self._stream(self.collection, 1)), None, 
+                          self.collection)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestMixPrecomputation.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/MixPrecomputation.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import os
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                                LinearShufflingProof
+from plonevotecryptolib.Mixnet.MixPrecomputation import MixPrecomputation
+import plonevotecryptolib.Mixnet.MixPrecomputation as MixPrecomputationModule
+from plonevotecryptolib.PVCExceptions import \
+                                IncompatibleMixPrecomputationError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestMixPrecomputation(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.MixPrecomputation module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 5):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def test_pbkdf2(self):
+        """
+        Test the PBKDF2-HMAC-SHA256 key derivation against a known vector 
+        (RFC 7914, section 11).
+        """
+        key = MixPrecomputationModule._pbkdf2("passwd", "salt", 1)
+        self.assertEqual(key.encode("hex"), "55ac046e56e3089fec1691c22544b605"
+                                            "f94185216dde0465e68b9d57c20dacbc")
+    
+    def test_shuffle_with_proof(self):
+        """
+        Test shuffling with proof using precomputed mappings.
+        """
+        precomputation = MixPrecomputation.new(self.public_key, 5, workers=2)
+        self.assertEqual(precomputation.get_remaining(), 
+                         params.SHUFFLING_PROOF_SECURITY_PARAMETER + 1)
+        
+        shuffled_collection, proof = self.collection.shuffle_with_proof(
+                                            precomputation=precomputation)
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        self.assertEqual(precomputation.get_remaining(), 0)
+        
+        # The precomputed mappings can only be used once
+        self.assertRaises(IncompatibleMixPrecomputationError, 
+                          self.collection.shuffle_with_proof, 
+                          precomputation=precomputation)
+    
+    def test_restricted_mapping(self):
+        """
+        Test shuffling a collection smaller than the precomputation.
+        """
+        precomputation = MixPrecomputation.new(self.public_key, 8, blocks=2, 
+                                               count=2)
+        shuffled_collection, proof = self.collection.shuffle_with_proof(
+                                    ProofClass=LinearShufflingProof, 
+                                    precomputation=precomputation)
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        
+        mapping = precomputation.next_mapping(self.collection)
+        self.assertEqual(sorted(mapping._reordering), range(0, 5))
+        self.assertEqual(mapping._reencryptions[0].get_length(), 1)
+        self.assertTrue(mapping.verify(self.collection, 
+                                       mapping.apply(self.collection)))
+        
+        # Collections larger than the precomputation are rejected
+        small_precomputation = MixPrecomputation.new(self.public_key, 4, 
+                                                     count=1)
+        self.assertRaises(IncompatibleMixPrecomputationError, 
+                          small_precomputation.next_mapping, self.collection)
+    
+    def test_to_from_file(self):
+        """
+        Test storing a precomputation to an encrypted file and loading it.
+        """
+        precomputation = MixPrecomputation.new(self.public_key, 5, count=2)
+        reorderings = [mapping._reordering 
+                       for mapping in precomputation._mappings]
+        
+        (file_object, filename) = tempfile.mkstemp()
+        os.close(file_object)
+        try:
+            precomputation.to_file(filename, "passphrase", iterations=10)
+            self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                              MixPrecomputation.from_file, filename, 
+                              self.public_key, "wrong passphrase")
+            
+            loaded = MixPrecomputation.from_file(filename, self.public_key, 
+                                                 "passphrase")
+            self.assertEqual(loaded.get_length(), 5)
+            self.assertEqual([mapping._reordering 
+                              for mapping in loaded._mappings], reorderings)
+            
+            mapping = loaded.next_mapping(self.collection)
+            self.assertTrue(mapping.verify(self.collection, 
+                                           mapping.apply(self.collection)))
+        finally:
+            os.remove(filename)
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestMixStream.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/MixStream.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import pickle
+import struct
+import unittest
+from StringIO import StringIO
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Ciphertext import Ciphertext
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                                LinearShufflingProof
+from plonevotecryptolib.Mixnet.MixStream import MixStreamReader
+from plonevotecryptolib.Mixnet.MixStream import MixStreamWriter
+import plonevotecryptolib.Mixnet.MixStream as MixStream
+from plonevotecryptolib.PVCExceptions import IncompatibleCiphertextError
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestMixStream(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.MixStream module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.cryptosystem = get_cryptosystem()
+        self.public_key = self.cryptosystem.new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 5):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def _write_stream(self, collection, proof=None, stage=0):
+        """
+        Write the given collection and proof as a mix stream, returning it as 
+        a string.
+        """
+        stream = StringIO()
+        writer = MixStreamWriter(stream, self.public_key, stage)
+        writer.write_collection(collection)
+        if(proof != None):
+            writer.write_proof(proof)
+        writer.close()
+        return stream.getvalue()
+    
+    def test_write_read(self):
+        """
+        Test that a collection and its proof can be written to and read from 
+        a mix stream.
+        """
+        stream = self._write_stream(self.collection)
+        reader = MixStreamReader(StringIO(stream), self.public_key)
+        self.assertEqual(reader.stage, 0)
+        read_collection = reader.read_collection()
+        self.assertEqual(read_collection, self.collection)
+        self.assertEqual(reader.read_proof(), None)
+        
+        # (LinearShufflingProof needs ciphertexts of the same length)
+        (shuffled_collection, proof) = self.collection.shuffle_with_proof(
+                                            ProofClass=LinearShufflingProof)
+        stream = self._write_stream(shuffled_collection, proof, 1)
+        reader = MixStreamReader(StringIO(stream), self.public_key)
+        self.assertEqual(reader.stage, 1)
+        read_collection = reader.read_collection()
+        self.assertEqual(read_collection, shuffled_collection)
+        read_proof = reader.read_proof(LinearShufflingProof)
+        self.assertTrue(read_proof.verify(self.collection, read_collection))
+        
+        # The proof must be read with its own class
+        reader = MixStreamReader(StringIO(stream), self.public_key)
+        reader.read_collection()
+        self.assertRaises(InvalidPloneVoteCryptoFileError, reader.read_proof)
+        
+        # An empty collection
+        empty_collection = CiphertextCollection(self.public_key)
+        stream = self._write_stream(empty_collection)
+        reader = MixStreamReader(StringIO(stream), self.public_key)
+        self.assertEqual(reader.read_collection().get_length(), 0)
+        self.assertEqual(reader.read_proof(), None)
+    
+    def test_invalid_streams(self):
+        """
+        Test that truncated, modified or incompatible streams are rejected.
+        """
+        stream = self._write_stream(self.collection)
+        
+        # A different public key
+        other_public_key = self.cryptosystem.new_key_pair().public_key
+        self.assertRaises(InvalidPloneVoteCryptoFileError, MixStreamReader, 
+                          StringIO(stream), other_public_key)
+        
+        # Not a mix stream
+        self.assertRaises(InvalidPloneVoteCryptoFileError, MixStreamReader, 
+                          StringIO("Not a mix stream"), self.public_key)
+        
+        # Truncated streams
+        for length in (3, len(stream) / 2, len(stream) - 1):
+            truncated_stream = StringIO(stream[0:length])
+            try:
+                reader = MixStreamReader(truncated_stream, self.public_key)
+                reader.read_collection()
+                reader.read_proof()
+                self.fail("A truncated stream was read.")
+            except InvalidPloneVoteCryptoFileError:
+                pass
+        
+        # A ciphertext frame of the wrong size
+        writer_stream = StringIO()
+        writer = MixStreamWriter(writer_stream, self.public_key)
+        writer._write_frame(MixStream.FRAME_CIPHERTEXT, "\x01\x02\x03")
+        writer.close()
+        reader = MixStreamReader(StringIO(writer_stream.getvalue()), 
+                                 self.public_key)
+        self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                          reader.read_collection)
+        
+        # A ciphertext outside the group
+        prime = self.cryptosystem.get_prime()
+        ciphertext = self.collection[0]
+        ciphertext.gamma[0] = prime
+        writer_stream = StringIO()
+        writer = MixStreamWriter(writer_stream, self.public_key)
+        writer.write_ciphertext(ciphertext)
+        writer.close()
+        reader = MixStreamReader(StringIO(writer_stream.getvalue()), 
+                                 self.public_key)
+        self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                          reader.read_collection)
+        
+        # Frames longer than their type allows are rejected before their 
+        # payload is read, as are frames of unknown types
+        value_size = (self.cryptosystem.get_nbits() + 7) / 8
+        max_size = MixStream.MAX_CIPHERTEXT_BLOCKS * 2 * value_size
+        for (frame_type, length) in ((MixStream.FRAME_HEADER, 2048), 
+                                     (MixStream.FRAME_CIPHERTEXT, 
+                                      max_size + 2 * value_size), 
+                                     (MixStream.FRAME_END, 1), 
+                                     ("X", 0)):
+            frame = StringIO(struct.pack(MixStream._FRAME_PREFIX_FORMAT, 
+                                         frame_type, length) + 
+                             "\x01" * length)
+            if(frame_type == MixStream.FRAME_HEADER):
+                self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                                  MixStreamReader, frame, self.public_key)
+            else:
+                reader = MixStreamReader(StringIO(stream), self.public_key)
+                reader._file = frame
+                self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                                  reader.read_collection)
+            self.assertEqual(frame.tell(), MixStream._FRAME_PREFIX_SIZE)
+        
+        # Ciphertexts with too many blocks cannot be written
+        long_ciphertext = Ciphertext(ciphertext.nbits, 
+                                     ciphertext.pk_fingerprint)
+        for i in range(0, MixStream.MAX_CIPHERTEXT_BLOCKS + 1):
+            long_ciphertext.append(1, 1)
+        self.assertRaises(IncompatibleCiphertextError, 
+                          writer.write_ciphertext, long_ciphertext)
+        
+        # Proofs are not unpickled
+        writer_stream = StringIO()
+        writer = MixStreamWriter(writer_stream, self.public_key)
+        writer.write_ciphertext(self.public_key.encrypt_text("Vote"))
+        writer._write_frame(MixStream.FRAME_PROOF, 
+                            pickle.dumps(LinearShufflingProof(), 2))
+        writer.close()
+        reader = MixStreamReader(StringIO(writer_stream.getvalue()), 
+                                 self.public_key)
+        reader.read_collection()
+        self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                          reader.read_proof, LinearShufflingProof)
+        
+        # Ciphertexts of a different public key cannot be written
+        other_ciphertext = other_public_key.encrypt_text("Vote")
+        self.assertRaises(IncompatibleCiphertextError, 
+                          writer.write_ciphertext, other_ciphertext)
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestShardedShufflingProof.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/ShardedShufflingProof.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextStorage import DiskCiphertextStorage
+from plonevotecryptolib.Mixnet.LinearShufflingProof import \
+                                                LinearShufflingProof
+from plonevotecryptolib.Mixnet.ShardedShufflingProof import \
+                                                ShardedShufflingProof
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestShardedShufflingProof(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.ShardedShufflingProof module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        # (LinearShufflingProof needs ciphertexts of the same length)
+        key_pair = get_cryptosystem().new_key_pair()
+        self.private_key = key_pair.private_key
+        self.public_key = key_pair.public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 12):
+            ciphertext = self.public_key.encrypt_text("Vote #%02d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def _decrypt(self, collection):
+        """
+        Return the sorted list of the plaintexts of a collection.
+        """
+        return sorted([self.private_key.decrypt_to_text(ciphertext) 
+                       for ciphertext in collection])
+    
+    def test_default_rounds(self):
+        """
+        Test the default number of rounds for some collection lengths.
+        """
+        self.assertEqual(ShardedShufflingProof.get_default_rounds(12, 1), 1)
+        self.assertEqual(ShardedShufflingProof.get_default_rounds(16, 4), 2)
+        self.assertEqual(ShardedShufflingProof.get_default_rounds(100, 10), 2)
+        self.assertEqual(ShardedShufflingProof.get_default_rounds(8, 4), 3)
+        self.assertEqual(ShardedShufflingProof.get_default_rounds(12, 3), 2)
+    
+    def test_shuffle_verify(self):
+        """
+        Test that a sharded shuffle verifies, serially and in parallel, and 
+        contains the same plaintexts as the original collection.
+        """
+        plaintexts = self._decrypt(self.collection)
+        for workers in (None, 2):
+            (shuffled_collection, proof) = ShardedShufflingProof.shuffle(
+                        self.collection, 3, ProofClass=LinearShufflingProof, 
+                        workers=workers)
+            self.assertEqual(proof.get_buckets(), 3)
+            self.assertEqual(proof.get_rounds(), 2)
+            self.assertEqual(shuffled_collection.get_length(), 12)
+            self.assertNotEqual(shuffled_collection, self.collection)
+            self.assertEqual(self._decrypt(shuffled_collection), plaintexts)
+            
+            self.assertTrue(proof.verify(self.collection, shuffled_collection))
+            self.assertTrue(proof.verify(self.collection, shuffled_collection, 
+                                         2))
+        
+        # A ShufflingProof for each bucket, and a single round
+        (shuffled_collection, proof) = ShardedShufflingProof.shuffle(
+                                                self.collection, 4, rounds=1)
+        self.assertEqual(proof.get_rounds(), 1)
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        
+        # Invalid numbers of buckets or rounds
+        self.assertRaises(ValueError, ShardedShufflingProof.shuffle, 
+                          self.collection, 7)
+        self.assertRaises(ValueError, ShardedShufflingProof.shuffle, 
+                          self.collection, 0)
+        self.assertRaises(ValueError, ShardedShufflingProof.shuffle, 
+                          self.collection, 2, 0)
+    
+    def test_find_failing_round(self):
+        """
+        Test that modified collections are detected, and the round and bucket 
+        at fault reported.
+        """
+        (shuffled_collection, proof) = ShardedShufflingProof.shuffle(
+                        self.collection, 3, ProofClass=LinearShufflingProof)
+        
+        # Move a ciphertext from the last segment to the first
+        moved_collection = CiphertextCollection(self.public_key)
+        moved_collection.add_ciphertext(shuffled_collection[11])
+        for i in range(0, 11):
+            moved_collection.add_ciphertext(shuffled_collection[i])
+        for workers in (None, 2):
+            self.assertEqual(proof.find_failing_round(self.collection, 
+                                        moved_collection, workers), (1, 0))
+        
+        # Replace a ciphertext of the intermediate collection
+        proof._collections[0] = moved_collection
+        failing = proof.find_failing_round(self.collection, 
+                                           shuffled_collection)
+        self.assertEqual(failing[0], 0)
+        self.assertFalse(proof.verify(self.collection, shuffled_collection))
+        
+        # Collections of a different length
+        short_collection = CiphertextCollection(self.public_key)
+        short_collection.add_ciphertext(self.collection[0])
+        self.assertEqual(proof.find_failing_round(self.collection, 
+                                                  short_collection), (-1, -1))
+    
+    def test_disk_storage(self):
+        """
+        Test a sharded shuffle of a collection kept on disk.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            disk_collection = CiphertextCollection(self.public_key, 
+                                            DiskCiphertextStorage(directory))
+            for ciphertext in self.collection:
+                disk_collection.add_ciphertext(ciphertext)
+            (shuffled_collection, proof) = ShardedShufflingProof.shuffle(
+                    disk_collection, 2, ProofClass=LinearShufflingProof, 
+                    workers=2)
+            self.assertTrue(isinstance(shuffled_collection._storage, 
+                                       DiskCiphertextStorage))
+            self.assertEqual(self._decrypt(shuffled_collection), 
+                             self._decrypt(self.collection))
+            self.assertTrue(proof.verify(disk_collection, shuffled_collection, 
+                                         2))
+            for collection in [shuffled_collection] + proof._collections:
+                collection._storage.close()
+            
+            # A serial shuffle keeps its files (including those of the shadow 
+            # collections of each ShufflingProof) when verified by workers
+            (shuffled_collection, proof) = ShardedShufflingProof.shuffle(
+                    disk_collection, 2, rounds=1)
+            filenames = os.listdir(directory)
+            filenames.sort()
+            for i in range(0, 2):
+                self.assertTrue(proof.verify(disk_collection, 
+                                             shuffled_collection, 2))
+                remaining_filenames = os.listdir(directory)
+                remaining_filenames.sort()
+                self.assertEqual(remaining_filenames, filenames)
+            for collection in [disk_collection, shuffled_collection]:
+                collection._storage.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
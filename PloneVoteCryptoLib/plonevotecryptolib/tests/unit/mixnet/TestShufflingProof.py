@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestShufflingProof.py : Unit tests for 
+#     plonevotecryptolib/Mixnet/ShufflingProof.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+# Use configuration parameters from params.py
+import plonevotecryptolib.params as params
+
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.CiphertextCollectionMapping import \
+                                                CiphertextCollectionMapping
+from plonevotecryptolib.Mixnet.MixPrecomputation import MixPrecomputation
+import plonevotecryptolib.Mixnet.ShufflingProof as ShufflingProofModule
+from plonevotecryptolib.Mixnet.ShufflingProof import ShufflingProof
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+from plonevotecryptolib.PVCExceptions import InvalidPloneVoteCryptoFileError
+import plonevotecryptolib.utilities.serialize as serialize
+
+# Get the cryptosystem used for testing from TestBasicEncryption
+from plonevotecryptolib.tests.unit.main.TestBasicEncryption import \
+                                                        get_cryptosystem
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestShufflingProof(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.Mixnet.ShufflingProof module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Allow the 1024 bits test cryptosystem
+        params.MINIMUM_KEY_SIZE = 0
+        
+        self.public_key = get_cryptosystem().new_key_pair().public_key
+        self.collection = CiphertextCollection(self.public_key)
+        for i in range(0, 5):
+            ciphertext = self.public_key.encrypt_text("Vote #%d" % i)
+            self.collection.add_ciphertext(ciphertext)
+    
+    def _check_proof(self, workers):
+        """
+        Generate a proof with the given number of workers and check that it 
+        verifies for the shuffled collection only.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        proof = ShufflingProof.new(self.collection, shuffled_collection, 
+                                   mapping, workers)
+        self.assertEqual(len(proof._collections), 
+                         params.SHUFFLING_PROOF_SECURITY_PARAMETER)
+        self.assertEqual(proof._challenge, 
+                         proof._generate_challenge(self.collection, 
+                                                   shuffled_collection))
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        
+        # The proof does not verify for a different shuffle
+        other_shuffled_collection = \
+            CiphertextCollectionMapping.new(self.collection).apply(
+                                                            self.collection)
+        self.assertFalse(proof.verify(self.collection, 
+                                      other_shuffled_collection))
+    
+    def test_new_verify(self):
+        """
+        Test that a proof generated serially verifies.
+        """
+        self._check_proof(None)
+    
+    def test_new_verify_parallel(self):
+        """
+        Test that a proof generated using a pool of worker processes verifies.
+        """
+        self._check_proof(2)
+    
+    def test_seed_mappings(self):
+        """
+        Test proofs that store seeds instead of mappings for the rounds with 
+        challenge bit 0.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        for workers in (None, 2):
+            proof = ShufflingProof.new(self.collection, shuffled_collection, 
+                                       mapping, workers, seed_mappings=True)
+            
+            # Only one of the mapping or the seed is kept for each round
+            # (and the seeds of rounds with challenge bit 1 never are)
+            for i in range(0, len(proof._collections)):
+                seeded_mapping = proof._mappings[i]
+                seed = proof._seeds[i]
+                self.assertTrue((seeded_mapping == None) != (seed == None))
+                if(seed == None):
+                    self.assertEqual(seeded_mapping._seed, None)
+            
+            self.assertTrue(proof.verify(self.collection, shuffled_collection, 
+                                         workers))
+        
+        # A wrong seed makes its round fail
+        i = proof._seeds.index([seed for seed in proof._seeds 
+                                if seed != None][0])
+        proof._seeds[i] = RandomSource().new_seed()
+        self.assertEqual(proof.find_failing_round(self.collection, 
+                                                  shuffled_collection), i)
+    
+    def test_without_seeds(self):
+        """
+        Test that proofs created before seeds were introduced, which lack 
+        _seeds, still verify.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        proof = ShufflingProof.new(self.collection, shuffled_collection, 
+                                   mapping)
+        del proof._seeds
+        for workers in (None, 2):
+            self.assertTrue(proof.verify(self.collection, shuffled_collection, 
+                                         workers))
+        
+        proof._mappings[1] = CiphertextCollectionMapping.new(self.collection)
+        self.assertEqual(proof.find_failing_round(self.collection, 
+                                                  shuffled_collection), 1)
+    
+    def test_spill_dir(self):
+        """
+        Test proofs whose shadow collections and mappings are stored in files.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        spill_dir = tempfile.mkdtemp()
+        try:
+            for (workers, seed_mappings) in ((None, False), (2, True)):
+                proof = ShufflingProof.new(self.collection, 
+                                           shuffled_collection, mapping, 
+                                           workers, seed_mappings, spill_dir)
+                for i in range(0, len(proof._collections)):
+                    self.assertTrue(os.path.isfile(proof._collections[i]))
+                    if(proof._mappings[i] != None):
+                        self.assertTrue(os.path.isfile(proof._mappings[i]))
+                
+                self.assertTrue(proof.verify(self.collection, 
+                                             shuffled_collection, workers))
+                self.assertEqual(proof.find_failing_round(self.collection, 
+                                    shuffled_collection, workers), None)
+        finally:
+            shutil.rmtree(spill_dir)
+    
+    def _interrupt_proof(self, shuffled_collection, mapping, checkpoint_dir, 
+                         rounds):
+        """
+        Start generating a proof with checkpoint_dir, interrupting it after 
+        the given number of shadow rounds. Return the checkpointed shadow 
+        collections.
+        """
+        new_shadow_mix = ShufflingProofModule._new_shadow_mix
+        calls = []
+        def interrupted_shadow_mix(original_collection, seed=None):
+            if(len(calls) == rounds):
+                raise RuntimeError("Interrupted")
+            calls.append(seed)
+            return new_shadow_mix(original_collection, seed)
+        ShufflingProofModule._new_shadow_mix = interrupted_shadow_mix
+        try:
+            self.assertRaises(RuntimeError, ShufflingProof.new, 
+                              self.collection, shuffled_collection, mapping, 
+                              checkpoint_dir=checkpoint_dir)
+        finally:
+            ShufflingProofModule._new_shadow_mix = new_shadow_mix
+        
+        return [CiphertextCollection.from_file(os.path.join(checkpoint_dir, 
+                    "checkpoint_collection_%d.pvcollection" % i), 
+                    self.public_key, serialize.BinarySerializer) 
+                for i in range(0, rounds)]
+    
+    def test_checkpoint_dir(self):
+        """
+        Test that an interrupted proof generation resumes from its 
+        checkpointed rounds, unless they are corrupted or belong to another 
+        collection.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        checkpoint_dir = tempfile.mkdtemp()
+        try:
+            # Resume (with different options)
+            for (workers, seed_mappings) in ((None, False), (2, True)):
+                checkpointed = self._interrupt_proof(shuffled_collection, 
+                                                 mapping, checkpoint_dir, 3)
+                proof = ShufflingProof.new(self.collection, 
+                                           shuffled_collection, mapping, 
+                                           workers, seed_mappings, 
+                                           checkpoint_dir=checkpoint_dir)
+                self.assertEqual(proof._collections[0:3], checkpointed)
+                self.assertTrue(proof.verify(self.collection, 
+                                             shuffled_collection))
+                self.assertEqual(os.listdir(checkpoint_dir), [])
+            
+            # A corrupted round is generated again, as are the following ones
+            checkpointed = self._interrupt_proof(shuffled_collection, 
+                                                 mapping, checkpoint_dir, 3)
+            collection_file = open(os.path.join(checkpoint_dir, 
+                                "checkpoint_collection_1.pvcollection"), "ab")
+            collection_file.write("corrupted")
+            collection_file.close()
+            proof = ShufflingProof.new(self.collection, shuffled_collection, 
+                                       mapping, checkpoint_dir=checkpoint_dir)
+            self.assertEqual(proof._collections[0], checkpointed[0])
+            self.assertNotEqual(proof._collections[1], checkpointed[1])
+            self.assertNotEqual(proof._collections[2], checkpointed[2])
+            self.assertTrue(proof.verify(self.collection, shuffled_collection))
+            
+            # The checkpoint of another collection is not used
+            checkpointed = self._interrupt_proof(shuffled_collection, 
+                                                 mapping, checkpoint_dir, 2)
+            other_collection = CiphertextCollection(self.public_key)
+            for ciphertext in shuffled_collection:
+                other_collection.add_ciphertext(ciphertext)
+            (other_shuffled_collection, proof) = \
+                other_collection.shuffle_with_proof(
+                                            checkpoint_dir=checkpoint_dir)
+            self.assertNotEqual(proof._collections[0], checkpointed[0])
+            self.assertTrue(proof.verify(other_collection, 
+                                         other_shuffled_collection))
+            self.assertEqual(os.listdir(checkpoint_dir), [])
+            
+            # A resumed shuffle only needs precomputed mappings for the 
+            # shuffle and the rounds not checkpointed
+            self._interrupt_proof(shuffled_collection, mapping, 
+                                  checkpoint_dir, 3)
+            precomputation = MixPrecomputation.new(self.public_key, 5, 
+                    count=params.SHUFFLING_PROOF_SECURITY_PARAMETER - 2)
+            (resumed_shuffled_collection, proof) = \
+                self.collection.shuffle_with_proof(
+                                            precomputation=precomputation, 
+                                            checkpoint_dir=checkpoint_dir)
+            self.assertTrue(proof.verify(self.collection, 
+                                         resumed_shuffled_collection))
+            self.assertEqual(precomputation.get_remaining(), 0)
+        finally:
+            shutil.rmtree(checkpoint_dir)
+    
+    def test_to_from_file(self):
+        """
+        Test that a proof can be stored to and loaded from a file or string, 
+        using both the XML and the binary serializers, including proofs with 
+        seeds and proofs whose rounds were spilled to disk.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        spill_dir = tempfile.mkdtemp()
+        (file_object, filename) = tempfile.mkstemp()
+        os.close(file_object)
+        try:
+            proofs = [ShufflingProof.new(self.collection, shuffled_collection, 
+                                         mapping), 
+                      ShufflingProof.new(self.collection, shuffled_collection, 
+                                         mapping, seed_mappings=True, 
+                                         spill_dir=spill_dir)]
+            for proof in proofs:
+                for SerializerClass in (serialize.XMLSerializer, 
+                                        serialize.BinarySerializer):
+                    proof.to_file(filename, SerializerClass)
+                    loaded_proof = ShufflingProof.from_file(filename, 
+                                            self.public_key, SerializerClass)
+                    self.assertEqual(loaded_proof._challenge, 
+                                     proof._challenge)
+                    self.assertEqual(loaded_proof._seeds, proof._seeds)
+                    self.assertTrue(loaded_proof.verify(self.collection, 
+                                                        shuffled_collection))
+                    
+                    loaded_proof = ShufflingProof.from_string(
+                                        proof.to_string(SerializerClass), 
+                                        self.public_key, SerializerClass)
+                    self.assertTrue(loaded_proof.verify(self.collection, 
+                                                        shuffled_collection))
+            
+            # Other files are rejected
+            shuffled_collection.to_file(filename, serialize.BinarySerializer)
+            self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                              ShufflingProof.from_file, filename, 
+                              self.public_key, serialize.BinarySerializer)
+        finally:
+            os.remove(filename)
+            shutil.rmtree(spill_dir)
+    
+    def test_challenge_versions(self):
+        """
+        Test that proofs with the legacy (version 1) challenge still verify, 
+        and that both challenge versions differ.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        
+        current_version = ShufflingProofModule._CHALLENGE_VERSION
+        ShufflingProofModule._CHALLENGE_VERSION = 1
+        try:
+            proof = ShufflingProof.new(self.collection, shuffled_collection, 
+                                       mapping)
+        finally:
+            ShufflingProofModule._CHALLENGE_VERSION = current_version
+        
+        # Proofs created before the challenge was versioned lack the version
+        del proof._challenge_version
+        for workers in (None, 2):
+            self.assertTrue(proof.verify(self.collection, shuffled_collection, 
+                                         workers))
+        
+        proof._challenge_version = 2
+        self.assertNotEqual(proof._generate_challenge(self.collection, 
+                                                      shuffled_collection), 
+                            proof._challenge)
+        self.assertFalse(proof.verify(self.collection, shuffled_collection))
+    
+    def test_find_failing_round(self):
+        """
+        Test that find_failing_round reports an invalid challenge or the 
+        round that fails verification, both serially and in parallel.
+        """
+        mapping = CiphertextCollectionMapping.new(self.collection)
+        shuffled_collection = mapping.apply(self.collection)
+        proof = ShufflingProof.new(self.collection, shuffled_collection, 
+                                   mapping)
+        for workers in (None, 2):
+            self.assertEqual(proof.find_failing_round(self.collection, 
+                                        shuffled_collection, workers), None)
+            self.assertTrue(proof.verify(self.collection, 
+                                         shuffled_collection, workers))
+        
+        # A different shuffled collection changes the challenge
+        other_shuffled_collection = \
+            CiphertextCollectionMapping.new(self.collection).apply(
+                                                            self.collection)
+        self.assertEqual(proof.find_failing_round(self.collection, 
+                                    other_shuffled_collection, 2), -1)
+        
+        # Replacing the mapping of a round (which does not change the 
+        # challenge) makes that round fail
+        proof._mappings[3] = CiphertextCollectionMapping.new(self.collection)
+        for workers in (None, 2):
+            self.assertEqual(proof.find_failing_round(self.collection, 
+                                        shuffled_collection, workers), 3)
+            self.assertFalse(proof.verify(self.collection, 
+                                          shuffled_collection, workers))
+    
+    def test_shuffle_with_proof(self):
+        """
+        Test CiphertextCollection.shuffle_with_proof with worker processes.
+        """
+        shuffled_collection, proof = \
+                            self.collection.shuffle_with_proof(workers=2)
+        self.assertTrue(proof.verify(self.collection, shuffled_collection))
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -51,6 +51,7 @@ import plonevotecryptolib.params as params
 from plonevotecryptolib.EGCryptoSystem import EGCryptoSystem
 from plonevotecryptolib.Threshold.ThresholdEncryptionSetUp import *
 from plonevotecryptolib.Threshold.ThresholdPublicKey import *
+from plonevotecryptolib.PublicKey import PublicKey
 from plonevotecryptolib.PVCExceptions import *
 from plonevotecryptolib.utilities.TaskMonitor import TaskMonitor
 
@@ -243,6 +244,15 @@ class TestThresholdPublicKey(unittest.TestCase):
         # Check that the fingerprints match (and thus they're the same key)
         self.assertEqual(recovered_fingerprint, original_fingerprint)
         
+        # Load it lazily: partial public keys are decoded on first use
+        lazy_key = PublicKey.from_file(file_path, lazy=True)
+        self.assertTrue(isinstance(lazy_key, ThresholdPublicKey))
+        self.assertEqual(lazy_key.num_trustees, key.num_trustees)
+        self.assertTrue(lazy_key.__dict__.has_key("_lazy_partial_public_keys"))
+        self.assertEqual(lazy_key.get_partial_public_key(1), 
+                         key.get_partial_public_key(1))
+        self.assertEqual(lazy_key.get_fingerprint(), original_fingerprint)
+        
         # Delete the temporary file
         os.remove(file_path)
                                 
@@ -266,6 +276,14 @@ class TestThresholdPublicKey(unittest.TestCase):
             inv_file = os.path.join(invalid_files_dir, file_name)
             self.assertRaises(InvalidPloneVoteCryptoFileError, 
                               ThresholdPublicKey.from_file, inv_file)
+        
+        # With lazy loading, invalid partial public keys are detected on first 
+        # use
+        inv_file = os.path.join(invalid_files_dir, 
+                                "err_par_pub_key_too_large.pvpubkey")
+        lazy_key = ThresholdPublicKey.from_file(inv_file, lazy=True)
+        self.assertRaises(InvalidPloneVoteCryptoFileError, 
+                          lazy_key.get_fingerprint)
 
 if __name__ == '__main__':
     unittest.main()  
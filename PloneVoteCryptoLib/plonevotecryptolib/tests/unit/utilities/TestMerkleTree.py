@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestMerkleTree.py : Unit tests for 
+#                      plonevotecryptolib/utilities/MerkleTree.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+import unittest
+
+import Crypto.Hash.SHA256
+
+from plonevotecryptolib.utilities.MerkleTree import MerkleTree
+
+# The leaves of the reference test vectors of RFC 6962 (from the Certificate 
+# Transparency implementation), and the roots of the trees of their first 
+# 1, ..., 8 items
+REFERENCE_LEAVES = ["", "\x00", "\x10", "\x20\x21", "\x30\x31", 
+                    "\x40\x41\x42\x43", "\x50\x51\x52\x53\x54\x55\x56\x57", 
+                    "\x60\x61\x62\x63\x64\x65\x66\x67"
+                    "\x68\x69\x6a\x6b\x6c\x6d\x6e\x6f"]
+REFERENCE_ROOTS = [
+    "6e340b9cffb37a989ca544e6bb780a2c78901d3fb33738768511a30617afa01d",
+    "fac54203e7cc696cf0dfcb42c92a1d9dbaf70ad9e621f4bd8d98662f00e3c125",
+    "aeb6bcfe274b70a14fb067a5e5578264db0fa9b51af5e0ba159158f329e06e77",
+    "d37ee418976dd95753c1c73862b9398fa2a2cf9b4ff0fdfe8b30cd95209614b7",
+    "4e3bbb1f7b478dcfe71fb631631519a3bca12c9aefca1612bfce4c13a86264d4",
+    "76e67dadbcdf1e10e1b74ddc608abd2f98dfb16fbce75277b5232a127f2087ef",
+    "ddb89be403809e325750d3d263cd78929c2942b7942a34b77e122c9594a74c8c",
+    "5dc9da79a70659a9ad559cb701ded9a2ab9d823aad2f4960cfe370eff4604328"]
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestMerkleTree(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.utilities.MerkleTree module
+    """
+    
+    def test_root(self):
+        """
+        Test the roots of the tree against the RFC 6962 reference vectors.
+        """
+        tree = MerkleTree()
+        self.assertEqual(tree.get_size(), 0)
+        self.assertEqual(tree.get_root(), 
+                         Crypto.Hash.SHA256.new("").digest())
+        
+        for i in range(0, len(REFERENCE_LEAVES)):
+            tree.append(REFERENCE_LEAVES[i])
+            self.assertEqual(tree.get_size(), i + 1)
+            self.assertEqual(tree.get_root().encode("hex"), REFERENCE_ROOTS[i])
+    
+    def test_inclusion_proof(self):
+        """
+        Test that inclusion proofs verify for every item of trees of several 
+        sizes, and only for that item at that index of that tree.
+        """
+        tree = MerkleTree()
+        items = []
+        for size in range(1, 20):
+            previous_root = tree.get_root()
+            item = "item #%d" % size
+            tree.append(item)
+            items.append(item)
+            root = tree.get_root()
+            
+            for i in range(0, size):
+                proof = tree.get_inclusion_proof(i)
+                self.assertTrue(MerkleTree.verify_inclusion_proof(
+                                            items[i], i, size, proof, root))
+                self.assertFalse(MerkleTree.verify_inclusion_proof(
+                                            "other item", i, size, proof, root))
+                self.assertFalse(MerkleTree.verify_inclusion_proof(
+                                    items[i], i, size, proof, previous_root))
+                if(size > 1):
+                    self.assertFalse(MerkleTree.verify_inclusion_proof(
+                                items[i], (i + 1) % size, size, proof, root))
+            
+            self.assertRaises(IndexError, tree.get_inclusion_proof, size)
+
+
+if __name__ == '__main__':
+    unittest.main()
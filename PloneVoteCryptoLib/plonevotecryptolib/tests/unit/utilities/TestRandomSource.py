@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  TestRandomSource.py : Unit tests for 
+#                        plonevotecryptolib/utilities/RandomSource.py
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+
+import unittest
+
+from plonevotecryptolib.utilities.RandomSource import RandomSource
+
+# ============================================================================
+# Test cases:
+# ============================================================================
+
+class TestRandomSource(unittest.TestCase):
+    """
+    Test the plonevotecryptolib.utilities.RandomSource module
+    """
+    
+    def setUp(self):
+        """
+        Test fixture set up code.
+        """
+        # Use a small buffer, so that it gets refilled during the tests
+        self.random = RandomSource(buffer_size=64)
+    
+    def test_read(self):
+        """
+        Test that read returns the requested number of bytes, including when 
+        more bytes than the buffer size are requested.
+        """
+        for n in [0, 1, 7, 64, 100, 1000]:
+            self.assertEqual(len(self.random.read(n)), n)
+        
+        # Two reads should (almost certainly) not give the same bytes
+        self.assertNotEqual(self.random.read(32), self.random.read(32))
+    
+    def test_randbelow_and_randint_ranges(self):
+        """
+        Test that randbelow and randint always return values within range.
+        """
+        for n in [1, 2, 3, 10, 1000, 2**32 - 1, 2**32, 2**32 + 1, 2**100 + 7]:
+            for i in range(0, 50):
+                r = self.random.randbelow(n)
+                self.assertTrue(0 <= r < n)
+        
+        for (a, b) in [(0, 0), (5, 5), (-3, 3), (1, 2**128)]:
+            for i in range(0, 50):
+                r = self.random.randint(a, b)
+                self.assertTrue(a <= r <= b)
+        
+        self.assertRaises(ValueError, self.random.randbelow, 0)
+        self.assertRaises(ValueError, self.random.randbelow, -5)
+        self.assertRaises(ValueError, self.random.randint, 3, 2)
+    
+    def test_randbelow_distribution(self):
+        """
+        Test that randbelow covers its whole range, with roughly uniform 
+        frequencies.
+        """
+        n = 6
+        samples = 6000
+        counts = [0] * n
+        for i in range(0, samples):
+            counts[self.random.randbelow(n)] += 1
+        
+        # Each value is expected 1000 times, with a standard deviation of ~29
+        for count in counts:
+            self.assertTrue(800 < count < 1200)
+        
+        # Large bounds also reach the top of their range
+        n = 2**40 + 3
+        values = [self.random.randbelow(n) for i in range(0, 100)]
+        self.assertTrue(max(values) > 2**39)
+    
+    def test_permutation(self):
+        """
+        Test that permutation returns a valid permutation and that all 
+        permutations of a small set are generated.
+        """
+        for n in [0, 1, 2, 10, 1000]:
+            permutation = self.random.permutation(n)
+            self.assertEqual(len(permutation), n)
+            self.assertEqual(sorted(permutation), range(0, n))
+        
+        seen = {}
+        for i in range(0, 300):
+            seen[tuple(self.random.permutation(3))] = True
+        self.assertEqual(len(seen), 6)
+    
+    def test_seeded(self):
+        """
+        Test that seeded sources produce the same values for the same seed, 
+        and different values for different seeds.
+        """
+        seed = self.random.new_seed()
+        self.assertEqual(len(seed), 32)
+        
+        values = []
+        for s in [seed, seed, self.random.new_seed()]:
+            random = RandomSource(buffer_size=64, seed=s)
+            values.append((random.read(100), random.randbelow(2**100), 
+                           list(random.permutation(50))))
+        self.assertEqual(values[0], values[1])
+        self.assertNotEqual(values[0], values[2])
+        
+        # Seeded values are fixed across platforms and versions
+        random = RandomSource(seed="\x00" * 32)
+        self.assertEqual(random.read(4), "\x2c\x34\xce\x1d")
+        
+
+if __name__ == '__main__':
+    unittest.main()
@@ -324,6 +324,38 @@ class TestSerialize(unittest.TestCase):
         }
         self.assertRaises(invStructErr, serialize.XMLSerializer, inv_structure)
         
+    def test_structure_definition_compiled_once(self):
+        """
+        Test that structure definitions are compiled only once and shared by 
+        all serializers using them.
+        """
+        xmlSerializer = serialize.XMLSerializer(books_structure_definition)
+        binarySerializer = serialize.BinarySerializer(books_structure_definition)
+        self.assertTrue(xmlSerializer._compiled_structure is 
+                        binarySerializer._compiled_structure)
+        
+        # An equal, but distinct, dictionary gets its own compiled structure
+        structure_def = books_structure_definition.copy()
+        otherSerializer = serialize.XMLSerializer(structure_def)
+        self.assertFalse(xmlSerializer._compiled_structure is 
+                         otherSerializer._compiled_structure)
+        
+        # Validation of a long list of elements
+        data = {"book" : [{"title" : "T%d" % i, "author" : "A", "year" : "1"} 
+                          for i in range(0, 1000)]}
+        xmlSerializer._check_data(data)
+        data["book"][500]["year"] = ["1", "2"]
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          xmlSerializer._check_data, data)
+        
+        # Structure definitions built on the fly are not all kept alive
+        for i in range(0, 2 * serialize._COMPILED_STRUCTURE_CACHE_SIZE):
+            serialize.XMLSerializer({"root%d" % i : (1, 1, None)})
+        self.assertTrue(len(serialize._compiled_structure_cache) <= 
+                        serialize._COMPILED_STRUCTURE_CACHE_SIZE)
+        self.assertEqual(len(serialize._compiled_structure_cache), 
+                         len(serialize._compiled_structure_cache_order))
+    
     def test_invalid_data_dictionaries(self):
         """
         Test that passing data to a serializer object that doesn't match the 
@@ -500,6 +532,343 @@ class TestSerialize(unittest.TestCase):
                               xmlSerializer.deserialize_from_file, inv_file)
         
         
+    def test_streaming_xml_serialize_deserialize_file(self):
+        """
+        Test that we can serialize some data to an XML file using 
+        StreamingXMLSerializer and deserialize it back, both with 
+        StreamingXMLSerializer and XMLSerializer (and vice versa).
+        """
+        data = {
+            "book" : [{
+                    "title" : "Cien años de soledad",
+                    "author" : "Gabriel García Márquez",
+                    "year" : "1967"
+                },
+                {
+                    "title" : "Design Patterns & <Friends>",
+                    "author" : ["Erich Gamma",
+                            "Richard Helm",
+                            "Ralph Johnson",
+                            "John Vlissides"
+                        ],
+                    "year" : "1994"
+                }]
+        }
+        
+        streamingSerializer = \
+            serialize.StreamingXMLSerializer(books_structure_definition)
+        xmlSerializer = serialize.XMLSerializer(books_structure_definition)
+        
+        # StreamingXMLSerializer -> StreamingXMLSerializer and XMLSerializer
+        streamingSerializer.serialize_to_file(self.filename, data)
+        self.assertEqual(streamingSerializer.deserialize_from_file(
+                                                    self.filename), data)
+        self.assertEqual(xmlSerializer.deserialize_from_file(self.filename), 
+                         data)
+        
+        # XMLSerializer -> StreamingXMLSerializer
+        xmlSerializer.serialize_to_file(self.filename, data)
+        self.assertEqual(streamingSerializer.deserialize_from_file(
+                                                    self.filename), data)
+        
+        # Deserializing with the wrong structure definition results in an 
+        # exception
+        wrongSerializer = \
+            serialize.StreamingXMLSerializer(person_structure_definition)
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          wrongSerializer.deserialize_from_file, self.filename)
+        
+    def test_streaming_xml_serialize_deserialize_string(self):
+        """
+        Test that we can serialize some data to an XML string using 
+        StreamingXMLSerializer and deserialize it back.
+        """
+        data = {
+            "person" : {
+                "names" : {
+                    "first" : "Jane",
+                    "middle" : "Ann",
+                    "last" : "Smith"
+                },
+                "age" : "99"
+            }
+        }
+        streamingSerializer = \
+            serialize.StreamingXMLSerializer(person_structure_definition)
+        serialized_data = streamingSerializer.serialize_to_string(data)
+        self.assertEqual(
+            streamingSerializer.deserialize_from_string(serialized_data), data)
+        
+        # Invalid data is rejected when serializing
+        inv_data = {"person" : {"names" : "Jane Ann Smith", "age" : "99"}}
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          streamingSerializer.serialize_to_string, inv_data)
+        
+        # Malformed XML is rejected when deserializing
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          streamingSerializer.deserialize_from_string, 
+                          "<person><age>42</person>")
+        
+    def test_streaming_deserialize_xml_file_invalid_data(self):
+        """
+        Test that StreamingXMLSerializer rejects the same badly-formed 
+        serialized data files as XMLSerializer.
+        """
+        invalid_files_dir = os.path.join(os.path.dirname(__file__), 
+                                         "TestSerialize.resources",
+                                         "invalid_serialize_xml_files")
+        streamingSerializer = \
+            serialize.StreamingXMLSerializer(person_structure_definition)
+        for file_name in ["err_dummy_root_without_inner_elements.xml",
+                          "err_element_without_element_or_text_children.xml"]:
+            inv_file = os.path.join(invalid_files_dir, file_name)
+            self.assertRaises(serialize.InvalidSerializeDataError, 
+                              streamingSerializer.deserialize_from_file, 
+                              inv_file)
+        
+    def test_binary_serialize_deserialize_file(self):
+        """
+        Test that we can serialize some data to a binary file using 
+        BinarySerializer and deserialize it back.
+        """
+        data = {
+            "book" : [{
+                    "title" : "Cien años de soledad",
+                    "author" : "Gabriel García Márquez",
+                    "year" : "1967"
+                },
+                {
+                    "title" : "Design Patterns",
+                    "author" : ["Erich Gamma",
+                            "Richard Helm",
+                            "Ralph Johnson",
+                            "John Vlissides"
+                        ],
+                    "year" : "1994"
+                }]
+        }
+        
+        binarySerializer = serialize.BinarySerializer(books_structure_definition)
+        binarySerializer.serialize_to_file(self.filename, data)
+        self.assertEqual(binarySerializer.deserialize_from_file(self.filename), 
+                         data)
+        
+    def test_binary_serialize_deserialize_string_values(self):
+        """
+        Test that BinarySerializer restores exactly the same string values 
+        that were serialized, including those it stores as raw bytes 
+        (hexadecimal numbers and base64 data).
+        """
+        binarySerializer = \
+            serialize.BinarySerializer(person_structure_definition)
+        
+        for value in ["", "0", "a", "00a", "0a", "ff00", "FF00", "abc", 
+                      "deadbeef" * 40, "3q2+7w==", "3q2+7w=", "aGVsbG8=", 
+                      "99", "Hello World!", "\x00\x01\xff"]:
+            data = {
+                "person" : {
+                    "names" : {
+                        "first" : value,
+                        "last" : "Smith"
+                    },
+                    "age" : value
+                }
+            }
+            serialized_data = binarySerializer.serialize_to_string(data)
+            self.assertEqual(
+                binarySerializer.deserialize_from_string(serialized_data), 
+                data)
+        
+        # Large hex numbers are stored as raw bytes
+        data = {"person" : {"names" : {"first" : "a" * 512, "last" : "b" * 512}, 
+                            "age" : "f" * 512}}
+        serialized_data = binarySerializer.serialize_to_string(data)
+        self.assertTrue(len(serialized_data) < 800)
+        
+    def test_binary_deserialize_invalid_data(self):
+        """
+        Test that BinarySerializer rejects invalid serialized data.
+        """
+        binarySerializer = \
+            serialize.BinarySerializer(person_structure_definition)
+        data = {
+            "person" : {
+                "names" : {
+                    "first" : "Jane",
+                    "middle" : "Ann",
+                    "last" : "Smith"
+                },
+                "age" : "99"
+            }
+        }
+        serialized_data = binarySerializer.serialize_to_string(data)
+        
+        # Invalid data is rejected when serializing
+        inv_data = {"person" : {"names" : "Jane Ann Smith", "age" : "99"}}
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          binarySerializer.serialize_to_string, inv_data)
+        
+        # Wrong header
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          binarySerializer.deserialize_from_string, 
+                          "<person><age>42</age></person>")
+        
+        # Every truncation of the data is rejected
+        for i in range(0, len(serialized_data)):
+            self.assertRaises(serialize.InvalidSerializeDataError, 
+                              binarySerializer.deserialize_from_string, 
+                              serialized_data[:i])
+        
+        # Unknown tag
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          binarySerializer.deserialize_from_string, 
+                          binarySerializer._header + "\x07\x00")
+        
+        # Data not matching the structure definition (person twice)
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          binarySerializer.deserialize_from_string, 
+                          serialized_data + \
+                          serialized_data[len(binarySerializer._header):])
+        
+        # Data serialized with a different structure definition, even one 
+        # with the same tags
+        renamed_structure = {
+            "person" : (1, 1, {
+                "names" : (1, 1, {
+                    "first" : (1, None),
+                    "middle" : (None),
+                    "last" : (1, None)
+                }),
+                "ages" : (1, 1, None)
+            }),
+        }
+        renamedSerializer = serialize.BinarySerializer(renamed_structure)
+        self.assertRaises(serialize.InvalidSerializeDataError, 
+                          renamedSerializer.deserialize_from_string, 
+                          serialized_data)
+        
+        # Data in version 1 of the format (without structure digest) is 
+        # still read
+        legacy_data = serialize._BINARY_SERIALIZER_MAGIC_V1 + \
+                      serialized_data[len(binarySerializer._header):]
+        self.assertEqual(binarySerializer.deserialize_from_string(legacy_data), 
+                         binarySerializer.deserialize_from_string(
+                                                            serialized_data))
+        
+        
+    def test_compressed_and_compact_files(self):
+        """
+        Test that every serializer can write compact and compressed files and 
+        that compressed files are read back transparently.
+        """
+        data = {
+            "person" : {
+                "names" : {
+                    "first" : "Jane",
+                    "middle" : "Ann",
+                    "last" : "Smith"
+                },
+                "age" : "99"
+            }
+        }
+        compressions = [serialize.COMPRESSION_NONE, serialize.COMPRESSION_GZIP,
+                        serialize.COMPRESSION_BZ2, serialize.COMPRESSION_ZLIB]
+        if(serialize.lzma != None):
+            compressions.append(serialize.COMPRESSION_LZMA)
+        magic = {
+            serialize.COMPRESSION_GZIP : "\x1f\x8b",
+            serialize.COMPRESSION_BZ2 : "BZh",
+            serialize.COMPRESSION_ZLIB : "\x78",
+            serialize.COMPRESSION_LZMA : "\xfd7zXZ\x00"
+        }
+        
+        for SerializerClass in (serialize.XMLSerializer, 
+                                serialize.StreamingXMLSerializer,
+                                serialize.BinarySerializer):
+            serializer = SerializerClass(person_structure_definition)
+            for compression in compressions:
+                for compact in (False, True):
+                    serializer.serialize_to_file(self.filename, data, 
+                                                 compression=compression, 
+                                                 compact=compact)
+                    if(magic.has_key(compression)):
+                        f = open(self.filename, "rb")
+                        header = f.read(len(magic[compression]))
+                        f.close()
+                        self.assertEqual(header, magic[compression])
+                    self.assertEqual(
+                        serializer.deserialize_from_file(self.filename), data)
+        
+        # Compact XML has no formatting whitespace, and can be read by the 
+        # other XML serializer
+        xmlSerializer = serialize.XMLSerializer(person_structure_definition)
+        streamingSerializer = \
+            serialize.StreamingXMLSerializer(person_structure_definition)
+        for serializer, other_serializer in ((xmlSerializer, 
+                                              streamingSerializer), 
+                                             (streamingSerializer, 
+                                              xmlSerializer)):
+            xml_string = serializer.serialize_to_string(data, compact=True)
+            self.assertFalse("\n<" in xml_string or "\t" in xml_string)
+            self.assertEqual(
+                other_serializer.deserialize_from_string(xml_string), data)
+        
+        # The module level defaults are used when no options are given
+        old_defaults = (serialize.DEFAULT_COMPRESSION, 
+                        serialize.DEFAULT_COMPACT_OUTPUT)
+        try:
+            serialize.DEFAULT_COMPRESSION = serialize.COMPRESSION_GZIP
+            serialize.DEFAULT_COMPACT_OUTPUT = True
+            xmlSerializer.serialize_to_file(self.filename, data)
+        finally:
+            (serialize.DEFAULT_COMPRESSION, 
+             serialize.DEFAULT_COMPACT_OUTPUT) = old_defaults
+        f = open(self.filename, "rb")
+        self.assertEqual(f.read(2), "\x1f\x8b")
+        f.close()
+        self.assertEqual(xmlSerializer.deserialize_from_file(self.filename), 
+                         data)
+        
+        # Unknown compression methods are rejected
+        self.assertRaises(ValueError, xmlSerializer.serialize_to_file, 
+                          self.filename, data, compression="rar")
+        
+        # Compressed files are read back whole or in pieces of any size, 
+        # across the chunks in which they are decompressed
+        long_data = "".join(["%d," % i for i in range(0, 100000)])
+        for compression in compressions[1:]:
+            f = serialize._open_file_for_writing(self.filename, compression)
+            f.write(long_data)
+            f.close()
+            f = serialize._open_file_for_reading(self.filename)
+            self.assertEqual(f.read(), long_data)
+            self.assertEqual(f.read(), "")
+            f.close()
+            f = serialize._open_file_for_reading(self.filename)
+            pieces = [f.read(0), f.read(1)]
+            while(True):
+                piece = f.read(7777)
+                if(piece == ""):
+                    break
+                self.assertTrue(len(piece) == 7777 or f.read() == "")
+                pieces.append(piece)
+            f.close()
+            self.assertEqual("".join(pieces), long_data)
+        
+        # Corrupt compressed data is rejected
+        streamingSerializer.serialize_to_file(self.filename, data, 
+                                    compression=serialize.COMPRESSION_GZIP)
+        f = open(self.filename, "rb")
+        compressed_data = f.read()
+        f.close()
+        f = open(self.filename, "wb")
+        f.write(compressed_data[:10] + "\x00" * 20)
+        f.close()
+        for serializer in (xmlSerializer, streamingSerializer):
+            self.assertRaises(serialize.InvalidSerializeDataError, 
+                              serializer.deserialize_from_file, 
+                              self.filename)
+        
     ## =======================================================================
     ## Test exception classes:
     ## =======================================================================
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+#
+#  plonevote.mix_node.py : A tool to run a node (mix server) of a mix network 
+#    as a separate process, connected to the other nodes by pipes or local 
+#    sockets, using PloneVoteCryptoLib.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import os
+import sys
+import time
+import socket
+import getopt
+
+from plonevotecryptolib.PublicKey import PublicKey
+from plonevotecryptolib.Mixnet.CiphertextCollection import CiphertextCollection
+from plonevotecryptolib.Mixnet.LinearShufflingProof import LinearShufflingProof
+from plonevotecryptolib.Mixnet.MixNode import MixNode
+from plonevotecryptolib.Mixnet.MixStream import MixStreamWriter
+from plonevotecryptolib.Mixnet.ShufflingProof import ShufflingProof
+import plonevotecryptolib.utilities.serialize as serialize
+from plonevotecryptolib.PVCExceptions import *
+
+# How long to keep trying to connect to the socket of the next node
+CONNECT_TIMEOUT = 60
+
+def print_usage():
+	"""
+	Prints the tool's usage message
+	"""
+	print """USAGE:
+		  
+		  plonevote.mix_node.py --key=public_key.pvpubkey [--in=STREAM] [--out=STREAM] [--board=DIR] [--proof=(shuffling|linear)] [--workers=W] [--disk=DIR]
+		  
+		  plonevote.mix_node.py --key=public_key.pvpubkey --send=collection.pvcollection [--out=STREAM]
+		  
+		  plonevote.mix_node.py (--help|-h)
+		  
+		  Arguments can be given in any order. STREAM is either - (standard input or output, the default), or unix:PATH, a local socket. A node listens on the socket given as --in, and connects to the socket given as --out. Progress messages are written to standard error.
+		  
+		  Example (a mix network of two nodes):
+		  	
+		  	plonevote.mix_node.py --key=k.pvpubkey --send=votes.pvcollection | plonevote.mix_node.py --key=k.pvpubkey --board=board | plonevote.mix_node.py --key=k.pvpubkey --board=board --out=/dev/null
+		  	
+		  	--key=public_key.pvpubkey  : The file containing the public key of the collection to be mixed.
+		  	
+		  	--in=STREAM	: (optional) The mix stream from which to read the collection to shuffle.
+		  	
+		  	--out=STREAM	: (optional) The mix stream to which to write the shuffled collection and its proof.
+		  	
+		  	--board=DIR	: (optional) The bulletin board directory in which to publish the collections and proofs.
+		  	
+		  	--proof=(shuffling|linear)	: (optional) The proof of shuffling to generate: ShufflingProof (the default) or LinearShufflingProof.
+		  	
+		  	--workers=W	: (optional) The number of worker processes to use.
+		  	
+		  	--disk=DIR	: (optional) Keep the collections on disk, in this directory.
+		  	
+		  	--send=collection.pvcollection	: Instead of running a node, send the collection in this file as the input of the first node.
+		  	
+		  	--help|-h : Shows this message
+		  """
+
+def log(msg):
+	"""
+	Writes a progress message to standard error (standard output may carry a 
+	mix stream).
+	"""
+	sys.stderr.write(msg + "\n")
+	sys.stderr.flush()
+
+def open_input_stream(stream):
+	"""
+	Opens the given input STREAM for reading, waiting for a connection if it 
+	is a local socket.
+	"""
+	if(stream == "-"):
+		return sys.stdin
+	if(not stream.startswith("unix:")):
+		return open(stream, "rb")
+	path = stream[len("unix:"):]
+	listening_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	listening_socket.bind(path)
+	listening_socket.listen(1)
+	log("Waiting for a connection on %s..." % path)
+	try:
+		(connection, address) = listening_socket.accept()
+	finally:
+		listening_socket.close()
+		os.remove(path)
+	return connection.makefile("rb")
+
+def open_output_stream(stream):
+	"""
+	Opens the given output STREAM for writing, waiting for the next node to 
+	listen if it is a local socket.
+	"""
+	if(stream == "-"):
+		return sys.stdout
+	if(not stream.startswith("unix:")):
+		return open(stream, "wb")
+	path = stream[len("unix:"):]
+	deadline = time.time() + CONNECT_TIMEOUT
+	while(True):
+		connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			connection.connect(path)
+			return connection.makefile("wb")
+		except socket.error, e:
+			connection.close()
+			if(time.time() > deadline):
+				raise
+			time.sleep(0.1)
+
+def load_collection(filename, public_key):
+	"""
+	Loads a collection file, in any of the formats of 
+	CiphertextCollection.to_file.
+	"""
+	for SerializerClass in (serialize.BinarySerializer, 
+							serialize.XMLSerializer):
+		try:
+			return CiphertextCollection.from_file(filename, public_key, 
+												  SerializerClass)
+		except InvalidPloneVoteCryptoFileError, e:
+			error = e
+	raise error
+
+def run_tool(key_file, in_stream, out_stream, board, ProofClass, workers, 
+			 disk, send_file):
+	"""
+	Runs the plonevote.mix_node tool, either as a node or, if send_file is 
+	given, as the source of the mix network.
+	"""
+	# Load the public key
+	log("Loading public key...")
+	try:
+		public_key = PublicKey.from_file(key_file)
+	except InvalidPloneVoteCryptoFileError, e:
+		log("Invalid public key file (%s): %s" % (key_file, e.msg))
+		sys.exit(2)
+	
+	if(send_file != None):
+		log("Loading collection...")
+		try:
+			collection = load_collection(send_file, public_key)
+		except InvalidPloneVoteCryptoFileError, e:
+			log("Invalid collection file (%s): %s" % (send_file, e.msg))
+			sys.exit(2)
+		
+		log("Sending %d ciphertexts..." % collection.get_length())
+		out_f = open_output_stream(out_stream)
+		writer = MixStreamWriter(out_f, public_key, 0)
+		writer.write_collection(collection)
+		writer.close()
+		out_f.close()
+		log("SENT.")
+		return
+	
+	if(board != None and not os.path.isdir(board)):
+		os.makedirs(board)
+	
+	in_f = open_input_stream(in_stream)
+	out_f = open_output_stream(out_stream)
+	
+	log("Mixing...")
+	node = MixNode(public_key, board, ProofClass, workers, disk)
+	try:
+		node.run(in_f, out_f)
+	except InvalidPloneVoteCryptoFileError, e:
+		log("Invalid input stream: %s" % e.msg)
+		sys.exit(2)
+	except InvalidShuffilingProofError, e:
+		log("The proof of shuffling of the previous stage does not " \
+			"verify: %s" % e.msg)
+		sys.exit(2)
+	out_f.close()
+	
+	if(node.stage > 0 and node.input_verified == None):
+		log("WARNING: The collection of the previous stage is not on the " \
+			"bulletin board, the proof of shuffling of the previous stage " \
+			"was not verified.")
+	log("Stage %d: %d ciphertexts. Received in %.2fs, shuffled in %.2fs, " \
+		"sent in %.2fs, verified in %.2fs, proved in %.2fs, published in " \
+		"%.2fs." \
+		% (node.stage, node.input_collection.get_length(), 
+		   node.timings["receive"], node.timings["shuffle"], 
+		   node.timings["send"], node.timings["verify"], 
+		   node.timings["prove"], node.timings["publish"]))
+	log("DONE.")
+
+def main():
+	"""
+	Parses command line options and runs the tool
+	"""
+    # parse command line options
+	try:
+		opts, args = getopt.getopt(sys.argv[1:], 'h', ['key=', 'in=', 'out=', 
+							'board=', 'proof=', 'workers=', 'disk=', 'send=', 
+							'help'])
+	except getopt.error, msg:
+		print msg
+		print "for help use --help"
+		sys.exit(2)
+	
+	# process options
+	key_file = board = workers = disk = send_file = None
+	in_stream = out_stream = "-"
+	ProofClass = ShufflingProof
+	try:
+		for o, a in opts:
+			if o in ("-h", "--help"):
+				print_usage()
+				sys.exit(0)
+			elif o == "--key":
+				key_file = a
+			elif o == "--in":
+				in_stream = a
+			elif o == "--out":
+				out_stream = a
+			elif o == "--board":
+				board = a
+			elif o == "--proof":
+				if(a == "shuffling"):
+					ProofClass = ShufflingProof
+				elif(a == "linear"):
+					ProofClass = LinearShufflingProof
+				else:
+					print "ERROR: Invalid proof: %s\n" % a
+					print_usage()
+					sys.exit(2)
+			elif o == "--workers":
+				workers = int(a)
+			elif o == "--disk":
+				disk = a
+			elif o == "--send":
+				send_file = a
+	except ValueError:
+		print "ERROR: Invalid number: %s=%s\n" % (o, a)
+		print_usage()
+		sys.exit(2)
+	
+	# The key is mandatory
+	if(key_file == None):
+		print_usage()
+		sys.exit(2)
+    
+    # Run the node
+	run_tool(key_file, in_stream, out_stream, board, ProofClass, workers, 
+			 disk, send_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+#  plonevote.precompute_mix.py : A tool to precompute the random shuffles of a
+#    future mix into a passphrase-encrypted file, using PloneVoteCryptoLib.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import sys
+import getopt
+import getpass
+
+from plonevotecryptolib.PublicKey import PublicKey
+from plonevotecryptolib.Mixnet.MixPrecomputation import MixPrecomputation
+from plonevotecryptolib.PVCExceptions import *
+
+def print_usage():
+	"""
+	Prints the tool's usage message
+	"""
+	print """USAGE:
+		  
+		  plonevote.precompute_mix.py --key=public_key.pvpubkey --length=N [--blocks=B] [--count=C] [--workers=W] --out=file.pvmixprecomp
+		  
+		  plonevote.precompute_mix.py (--help|-h)
+		  
+		  Arguments can be given in any order. The passphrase used to encrypt the output file is asked for interactively.
+		  	
+		  	--key=public_key.pvpubkey  : The file containing the public key of the collection to be mixed.
+		  	
+		  	--length=N	: The maximum number of ciphertexts of the collection to be mixed.
+		  	
+		  	--blocks=B	: (optional) The maximum length in blocks of each ciphertext (1 by default).
+		  	
+		  	--count=C	: (optional) The number of shuffles to precompute (by default, enough for one mix with a ShufflingProof).
+		  	
+		  	--workers=W	: (optional) The number of worker processes to use.
+		  	
+		  	--out=file.pvmixprecomp	: The destination (output) file that will contain the encrypted precomputation. It must be deleted once used for a mix.
+		  	
+		  	--help|-h : Shows this message
+		  """
+	
+def run_tool(key_file, length, blocks, count, workers, out_file):
+	"""
+	Runs the plonevote.precompute_mix tool and stores the precomputation in 
+	out_file.
+	"""
+	# Load the public key
+	print "Loading public key..."
+	try:
+		public_key = PublicKey.from_file(key_file)
+	except InvalidPloneVoteCryptoFileError, e:
+		print "Invalid public key file (%s): %s" % (key_file, e.msg)
+		sys.exit(2)
+	
+	# Ask for the passphrase
+	passphrase = getpass.getpass("Passphrase for %s: " % out_file)
+	if(passphrase != getpass.getpass("Repeat the passphrase: ")):
+		print "ERROR: The passphrases do not match."
+		sys.exit(2)
+	
+	# Precompute the shuffles
+	print "Precomputing shuffles..."
+	precomputation = MixPrecomputation.new(public_key, length, blocks, count, 
+										   workers)
+	
+	# Save the precomputation to the output file
+	print "Saving precomputation to %s..." % out_file
+	try:
+		precomputation.to_file(out_file, passphrase)
+	except Exception, e:
+		print "Problem while saving the output file %s: %s" % (out_file, e)
+		sys.exit(2)
+	
+	print "SAVED.\n"
+
+def main():
+	"""
+	Parses command line options and runs the tool
+	"""
+    # parse command line options
+	try:
+		opts, args = getopt.getopt(sys.argv[1:], 'h', ['key=', 'length=', 
+							'blocks=', 'count=', 'workers=', 'out=', 'help'])
+	except getopt.error, msg:
+		print msg
+		print "for help use --help"
+		sys.exit(2)
+	
+	# process options
+	key_file = length = out_file = count = workers = None
+	blocks = 1
+	try:
+		for o, a in opts:
+			if o in ("-h", "--help"):
+				print_usage()
+				sys.exit(0)
+			elif o == "--key":
+				key_file = a
+			elif o == "--length":
+				length = int(a)
+			elif o == "--blocks":
+				blocks = int(a)
+			elif o == "--count":
+				count = int(a)
+			elif o == "--workers":
+				workers = int(a)
+			elif o == "--out":
+				out_file = a
+	except ValueError:
+		print "ERROR: Invalid number: %s=%s\n" % (o, a)
+		print_usage()
+		sys.exit(2)
+	
+	# Key, length and output file are mandatory
+	for option in [key_file, length, out_file]:
+		if(option == None):
+			print_usage()
+			sys.exit(2)
+    
+    # Run precomputation
+	run_tool(key_file, length, blocks, count, workers, out_file)
+
+if __name__ == "__main__":
+    main()
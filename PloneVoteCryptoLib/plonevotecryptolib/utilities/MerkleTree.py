@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  MerkleTree.py : An append-only Merkle hash tree with inclusion proofs
+#
+#  MerkleTree hashes a sequence of data items into a single root digest, 
+#  which can be updated cheaply as items are appended, and produces short 
+#  proofs that a given item is part of the sequence. The tree has the 
+#  structure and hashing of RFC 6962 (Certificate Transparency), so that its 
+#  roots and proofs can be checked by existing implementations.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+from array import array
+
+import Crypto.Hash.SHA256
+
+__all__ = ["MerkleTree"]
+
+# Size in bytes of the digests of the tree (SHA256)
+DIGEST_SIZE = 32
+
+# Prefixes of the hashed data of leaves and interior nodes (see RFC 6962, 
+# section 2.1), which keep a leaf from being taken for an interior node
+_LEAF_PREFIX = "\x00"
+_NODE_PREFIX = "\x01"
+
+def _hash_leaf(data):
+    return Crypto.Hash.SHA256.new(_LEAF_PREFIX + data).digest()
+
+def _hash_node(left, right):
+    return Crypto.Hash.SHA256.new(_NODE_PREFIX + left + right).digest()
+
+def _largest_power_of_two_below(n):
+    """
+    Returns the largest power of two strictly smaller than n (n > 1).
+    """
+    k = 1
+    while(k * 2 < n):
+        k *= 2
+    return k
+
+
+class MerkleTree:
+    """
+    An append-only Merkle hash tree over a sequence of data items (strings).
+    
+    The root of the tree (see get_root()) is a digest of the whole sequence. 
+    An inclusion proof for an item (see get_inclusion_proof()) is a list of 
+    O(log n) digests which, given the item, its index and the number of items 
+    in the tree, allows recomputing the root (see verify_inclusion_proof()).
+    
+    The tree follows RFC 6962 ("Certificate Transparency", section 2.1): a 
+    leaf is hashed as SHA256(0x00 || item), an interior node as 
+    SHA256(0x01 || left || right), and a tree of n > 1 items is split into a 
+    left subtree with the largest power of two smaller than n items and a 
+    right subtree with the rest. The root of the empty tree is SHA256("").
+    
+    Only the digests of the complete subtrees (those of 2^h items, for each 
+    h) are stored, about two digests per item, so appending an item hashes 
+    only one node on average.
+    """
+    
+    def __init__(self):
+        """
+        Constructs a new empty MerkleTree.
+        """
+        # self._levels[h] holds the digests of the complete subtrees of 2^h 
+        # items, from left to right, concatenated
+        self._levels = [array('c')]
+        self._root = None
+    
+    def get_size(self):
+        """
+        Returns the number of items in the tree.
+        """
+        return len(self._levels[0]) / DIGEST_SIZE
+    
+    def _get_node(self, height, index):
+        """
+        Returns the digest of the index-th complete subtree of 2^height items.
+        """
+        start = index * DIGEST_SIZE
+        return self._levels[height][start:start + DIGEST_SIZE].tostring()
+    
+    def append(self, data):
+        """
+        Appends a new item to the tree.
+        
+        Arguments:
+            data::string    -- The item to append.
+        """
+        node = _hash_leaf(data)
+        height = 0
+        while(True):
+            level = self._levels[height]
+            level.fromstring(node)
+            count = len(level) / DIGEST_SIZE
+            if(count % 2 == 1):
+                break
+            
+            # The new node completes a subtree of twice its size
+            node = _hash_node(self._get_node(height, count - 2), node)
+            height += 1
+            if(height == len(self._levels)):
+                self._levels.append(array('c'))
+        self._root = None
+    
+    def get_root(self):
+        """
+        Returns the root digest of the tree.
+        
+        The root is cached until the next item is appended.
+        
+        Returns:
+            root::string    -- The root of the tree, as DIGEST_SIZE bytes.
+        """
+        if(self._root == None):
+            # The complete subtrees with no parent are those at the end of the 
+            # levels with an odd number of subtrees. They are joined from 
+            # right (the smallest) to left.
+            root = None
+            for height in range(0, len(self._levels)):
+                count = len(self._levels[height]) / DIGEST_SIZE
+                if(count % 2 == 1):
+                    node = self._get_node(height, count - 1)
+                    if(root == None):
+                        root = node
+                    else:
+                        root = _hash_node(node, root)
+            if(root == None):
+                root = Crypto.Hash.SHA256.new("").digest()
+            self._root = root
+        return self._root
+    
+    def _get_subtree_root(self, start, size):
+        """
+        Returns the root of the subtree of the items start to start + size - 1.
+        
+        (Only for the subtrees used in the RFC 6962 tree, whose start is a 
+        multiple of the largest power of two not greater than size.)
+        """
+        height = 0
+        while((1 << height) < size):
+            height += 1
+        if((1 << height) == size):
+            return self._get_node(height, start >> height)
+        
+        k = _largest_power_of_two_below(size)
+        return _hash_node(self._get_subtree_root(start, k), 
+                          self._get_subtree_root(start + k, size - k))
+    
+    def get_inclusion_proof(self, index):
+        """
+        Returns a proof that the item at the given index is in the tree.
+        
+        This is the audit path of RFC 6962, section 2.1.1.
+        
+        Arguments:
+            index::int  -- The index of the item.
+        
+        Returns:
+            proof::string[] -- A list of digests (of DIGEST_SIZE bytes each), 
+                               from the leaf up to the root.
+        
+        Throws:
+            IndexError  -- If index is not between 0 and get_size() - 1.
+        """
+        size = self.get_size()
+        if(not (0 <= index < size)):
+            raise IndexError("Index out of range: Got %d, expected index " \
+                             "between 0 and %d." % (index, size - 1))
+        
+        proof = []
+        start = 0
+        while(size > 1):
+            k = _largest_power_of_two_below(size)
+            if(index - start < k):
+                proof.append(self._get_subtree_root(start + k, size - k))
+                size = k
+            else:
+                proof.append(self._get_subtree_root(start, k))
+                start += k
+                size -= k
+        proof.reverse()
+        return proof
+    
+    @staticmethod
+    def verify_inclusion_proof(data, index, size, proof, root):
+        """
+        Checks that an item is in a tree, given an inclusion proof.
+        
+        (This is the verification algorithm of RFC 9162, section 2.1.3.2.)
+        
+        Arguments:
+            data::string    -- The item.
+            index::int      -- The index of the item in the tree.
+            size::int       -- The number of items in the tree.
+            proof::string[] -- The proof, as returned by get_inclusion_proof.
+            root::string    -- The root of the tree, as returned by get_root.
+        
+        Returns:
+            result::bool    -- True if the proof shows that data is the item at 
+                               the given index of the tree with the given root 
+                               and size, False otherwise.
+        """
+        if(not (0 <= index < size)):
+            return False
+        
+        fn = index
+        sn = size - 1
+        node = _hash_leaf(data)
+        for sibling in proof:
+            if(sn == 0):
+                return False
+            if(fn % 2 == 1 or fn == sn):
+                node = _hash_node(sibling, node)
+                # (skip the levels in which the node has no sibling)
+                while(fn % 2 == 0 and fn != 0):
+                    fn >>= 1
+                    sn >>= 1
+            else:
+                node = _hash_node(node, sibling)
+            fn >>= 1
+            sn >>= 1
+        
+        return (sn == 0 and node == root)
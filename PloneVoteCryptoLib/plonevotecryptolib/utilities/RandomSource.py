@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  RandomSource.py : A buffered source of cryptographically secure randomness
+#
+#  RandomSource provides random bytes, integers and permutations drawn from
+#  pycrypto's CSPRNG (Crypto.Random), requesting the underlying random bytes
+#  in large batches instead of once per value. It can also produce the same
+#  values deterministically from a short seed.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import sys
+import struct
+from array import array
+
+import Crypto.Hash.SHA256
+import Crypto.Random
+import Crypto.Util.number
+
+__all__ = ["RandomSource"]
+
+# Number of random bytes requested at a time from the CSPRNG
+_DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# An array type code for unsigned 32 bit words (its item size depends on the
+# platform)
+if(array('I').itemsize == 4):
+    _WORD_TYPECODE = 'I'
+else: # pragma: no cover (platform dependent)
+    _WORD_TYPECODE = 'L'
+assert array(_WORD_TYPECODE).itemsize == 4
+
+_WORD_RANGE = 2**32
+
+# Size in bytes of the seeds returned by RandomSource.new_seed()
+SEED_SIZE = 32
+
+
+class _SeededGenerator:
+    """
+    A deterministic stream of pseudo-random bytes expanded from a seed.
+    
+    The stream is SHA256(seed || counter) for counter = 0, 1, 2, ..., where 
+    counter is encoded as 8 big-endian bytes.
+    """
+    
+    def __init__(self, seed):
+        self._seed = seed
+        self._counter = 0
+    
+    def read(self, n):
+        blocks = []
+        for i in range(0, (n + 31) / 32):
+            hasher = Crypto.Hash.SHA256.new()
+            hasher.update(self._seed)
+            hasher.update(struct.pack(">Q", self._counter))
+            blocks.append(hasher.digest())
+            self._counter += 1
+        return "".join(blocks)[:n]
+
+
+class RandomSource:
+    """
+    A buffered source of cryptographically secure random values.
+    
+    RandomSource reads random bytes from pycrypto's CSPRNG (Crypto.Random) in
+    large batches and uses them to produce uniformly distributed random
+    integers, through rejection sampling, and random permutations, through the
+    Fisher-Yates shuffle.
+    
+    A RandomSource object must not be shared between processes. In a process
+    created by os.fork(), Crypto.Random.atfork() must be called before
+    creating any RandomSource.
+    
+    If constructed with a seed, RandomSource instead expands that seed with 
+    SHA256 in counter mode. The values it returns are then a deterministic 
+    function of the seed, the buffer size and the sequence of calls made, on 
+    any platform. This can be used to replace large random objects (such as 
+    a shuffle) by the seed from which they can be regenerated.
+    
+    Note that the buffered random bytes are kept in memory until used.
+    """
+    
+    def __init__(self, buffer_size=_DEFAULT_BUFFER_SIZE, seed=None):
+        """
+        Constructs a new RandomSource.
+        
+        Arguments:
+            buffer_size::int    -- The number of bytes to request from the
+                                   CSPRNG each time the buffer is refilled.
+            seed::string    -- If given, derive all values deterministically 
+                               from this seed instead of using the CSPRNG. 
+                               (See new_seed())
+        """
+        if(seed == None):
+            self._rng = Crypto.Random.new()
+        else:
+            self._rng = _SeededGenerator(seed)
+        self._buffer_size = buffer_size
+        self._bytes = ""
+        self._bytes_pos = 0
+        self._words = array(_WORD_TYPECODE)
+    
+    def read(self, n):
+        """
+        Returns n random bytes.
+        
+        Arguments:
+            n::int  -- The number of bytes to return.
+        
+        Returns:
+            bytes::string   -- A string of n random bytes.
+        """
+        end = self._bytes_pos + n
+        if(end > len(self._bytes)):
+            self._bytes = self._bytes[self._bytes_pos:] + \
+                          self._rng.read(max(self._buffer_size, n))
+            self._bytes_pos = 0
+            end = n
+        result = self._bytes[self._bytes_pos:end]
+        self._bytes_pos = end
+        return result
+    
+    def _random_word(self):
+        """
+        Returns a random integer between 0 and 2^32 - 1 (inclusive).
+        """
+        if(len(self._words) == 0):
+            # (read a whole number of words)
+            nbytes = max(4, self._buffer_size - self._buffer_size % 4)
+            self._words.fromstring(self._rng.read(nbytes))
+            # (words are always read as little-endian, so that seeded 
+            # sources give the same values on every platform)
+            if(sys.byteorder == "big"): # pragma: no cover (platform dependent)
+                self._words.byteswap()
+        return self._words.pop()
+    
+    def new_seed(self):
+        """
+        Returns a new random seed, which can be used to construct a seeded 
+        RandomSource.
+        
+        Returns:
+            seed::string    -- A string of SEED_SIZE random bytes.
+        """
+        return self.read(SEED_SIZE)
+    
+    def randbelow(self, n):
+        """
+        Returns a random integer r, with 0 <= r < n.
+        
+        Random values are sampled with rejection, so that every integer in the
+        range is equally likely.
+        
+        Arguments:
+            n::int  -- The (exclusive) upper bound. Must be positive.
+        
+        Returns:
+            r::long -- A uniformly distributed integer in [0, n).
+        
+        Throws:
+            ValueError  -- If n is not positive.
+        """
+        if(n <= 0):
+            raise ValueError("randbelow requires a positive upper bound, got " \
+                             "%d." % n)
+        
+        if(n <= _WORD_RANGE):
+            # Reject words in the incomplete last block of n values.
+            limit = _WORD_RANGE - (_WORD_RANGE % n)
+            while(True):
+                word = self._random_word()
+                if(word < limit):
+                    return word % n
+        
+        # Large bounds: take the smallest number of bits that can represent
+        # n - 1 and retry until the value is in range. (Each try succeeds with
+        # probability at least 1/2.)
+        nbits = Crypto.Util.number.size(n - 1)
+        nbytes = (nbits + 7) / 8
+        extra_bits = nbytes * 8 - nbits
+        while(True):
+            r = Crypto.Util.number.bytes_to_long(self.read(nbytes)) >> \
+                extra_bits
+            if(r < n):
+                return r
+    
+    def randint(self, a, b):
+        """
+        Returns a random integer r, with a <= r <= b.
+        
+        Arguments:
+            a::int  -- The (inclusive) lower bound.
+            b::int  -- The (inclusive) upper bound. Must be at least a.
+        
+        Returns:
+            r::long -- A uniformly distributed integer in [a, b].
+        
+        Throws:
+            ValueError  -- If b < a.
+        """
+        if(b < a):
+            raise ValueError("randint requires a <= b, got a=%d, b=%d." % \
+                             (a, b))
+        return a + self.randbelow(b - a + 1)
+    
+    def permutation(self, n):
+        """
+        Returns a random permutation of the integers 0, ..., n - 1.
+        
+        The permutation is generated in linear time by the Fisher-Yates
+        shuffle and each of the n! possible permutations is equally likely.
+        
+        Arguments:
+            n::int  -- The number of elements to permute.
+        
+        Returns:
+            permutation::array('l')    -- An array with each integer between
+                                          0 and n - 1 appearing once.
+        """
+        permutation = array('l', xrange(n))
+        for i in xrange(n - 1, 0, -1):
+            j = self.randbelow(i + 1)
+            permutation[i], permutation[j] = permutation[j], permutation[i]
+        return permutation
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# ============================================================================
+# About this file:
+# ============================================================================
+#
+#  parallel.py : Helpers for running PloneVoteCryptoLib tasks in a process pool
+#
+#  parallel.py wraps python's multiprocessing module (when available) to
+#  create worker pools that are safe for use with pycrypto's random number
+#  generator, and falls back to serial execution otherwise.
+#
+#  Part of the PloneVote cryptographic library (PloneVoteCryptoLib)
+#
+#  Originally written by: Lazaro Clapp
+#
+# ============================================================================
+# LICENSE (MIT License - http://www.opensource.org/licenses/mit-license):
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# ============================================================================
+
+import Crypto.Random
+
+# multiprocessing is part of the standard library since python 2.6. Without 
+# it, every task runs serially in the current process.
+try:
+    import multiprocessing
+except ImportError: # pragma: no cover (python 2.4 and 2.5)
+    multiprocessing = None
+
+__all__ = ["is_parallel", "new_pool", "close_pool"]
+
+
+def is_parallel(workers):
+    """
+    Check whether the given number of workers requires a process pool.
+    
+    Arguments:
+        workers::int    -- The number of worker processes requested (None or 
+                           anything less than 2 means serial execution).
+    
+    Returns:
+        result::bool    -- True if work should be distributed over a pool of 
+                           that many processes, False if it should run 
+                           serially in the current process (this is also the 
+                           case when multiprocessing is not available).
+    """
+    return (multiprocessing != None and workers != None and workers > 1)
+
+def _init_worker(initializer, initargs):
+    """
+    Initialization function for every worker process of a pool.
+    
+    Re-seeds pycrypto's random number generator, which must not share state 
+    with the parent process after a fork, and then runs the pool's own 
+    initializer, if any.
+    """
+    Crypto.Random.atfork()
+    if(initializer != None):
+        initializer(*initargs)
+
+def new_pool(workers, initializer=None, initargs=()):
+    """
+    Create a new pool of worker processes.
+    
+    Worker processes are initialized by calling initializer(*initargs) once 
+    per process. This is the place to pass data shared by all tasks (such as 
+    the collection being shuffled), so that it is sent to each worker only 
+    once, instead of once per task.
+    
+    Arguments:
+        workers::int    -- The number of worker processes.
+        initializer::function   -- A (module level) function to run in each 
+                                   worker process at start-up.
+        initargs::tuple         -- The arguments for initializer.
+    
+    Returns:
+        pool::multiprocessing.Pool  -- The new pool of workers, or None if 
+                                       is_parallel(workers) is False.
+    """
+    if(not is_parallel(workers)):
+        return None
+    return multiprocessing.Pool(workers, _init_worker, 
+                                (initializer, initargs))
+
+def close_pool(pool, success=True):
+    """
+    Shut down a pool created by new_pool.
+    
+    Arguments:
+        pool::multiprocessing.Pool  -- The pool to shut down (may be None).
+        success::bool   -- If True, wait for the workers to exit normally. 
+                           Otherwise (e.g. when an exception is being 
+                           propagated), terminate them immediately.
+    """
+    if(pool == None):
+        return
+    if(success):
+        pool.close()
+    else:
+        pool.terminate()
+    pool.join()
@@ -150,6 +150,12 @@ provide at least serialize_to_file and serialize_to_string:
 
     serializer.serialize_to_file(file_name, data)
     
+serialize_to_file also takes optional compression and compact arguments, to 
+write the file compressed (see the COMPRESSION_* constants) and/or without 
+formatting whitespace. When not given, DEFAULT_COMPRESSION and 
+DEFAULT_COMPACT_OUTPUT are used. Compressed files are detected and 
+decompressed automatically when deserialized.
+
 To deserialize the data, one must use a serializer object of the same class, 
 created with the same structure definition dictionary. Each serialize_to_X 
 should have a corresponding deserialize_from_X method:
@@ -176,12 +182,82 @@ world, this is just a toy example.
 # ============================================================================
 
 import xml.dom.minidom
+import binascii
+import collections
+from xml.sax.saxutils import escape as _xml_escape
+import cStringIO
+import zlib
+import Crypto.Hash.SHA256    # sha256 is not available in python 2.4 standard lib
+import bz2
+
+# cElementTree is part of the standard library since python 2.5. For 
+# python 2.4, we fall back to the stand-alone cElementTree module (if 
+# installed). StreamingXMLSerializer is unavailable if neither is present.
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError: # pragma: no cover (python 2.4)
+    try:
+        import cElementTree as ElementTree
+    except ImportError:
+        ElementTree = None
+
+# lzma compression is optional: it is only in the standard library for python 
+# 3.3 and later, or provided by the backports.lzma package.
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+# Exceptions raised by the decompressors on corrupt or truncated data
+if(lzma == None):
+    _DECOMPRESSION_ERRORS = (zlib.error, IOError, EOFError)
+else:
+    _DECOMPRESSION_ERRORS = (zlib.error, IOError, EOFError, lzma.LZMAError)
 
-__all__ = ["XMLSerializer", "InvalidSerializeStructureDefinitionError", 
+__all__ = ["XMLSerializer", "StreamingXMLSerializer", "BinarySerializer", 
+           "InvalidSerializeStructureDefinitionError", 
            "InvalidSerializeDataError"]
 
 DUMMY_ROOT_ELEMENT_NAME = "s__SerializedDataRoot__s"
 
+# Every file written by BinarySerializer starts with these bytes (the last 
+# one is the version of the binary format), followed by the digest of the 
+# structure definition (see BinarySerializer).
+BINARY_SERIALIZER_MAGIC = "\x89PVB\x02"
+
+# Files of version 1 of the binary format have no structure digest. They are 
+# still read, but cannot be checked against the structure definition.
+_BINARY_SERIALIZER_MAGIC_V1 = "\x89PVB\x01"
+
+# Size in bytes of the (truncated SHA-256) structure digest of binary files
+_BINARY_STRUCTURE_DIGEST_SIZE = 8
+
+# Value types for leaf elements in BinarySerializer's format
+_BINARY_VALUE_TEXT = 0      # utf-8 text
+_BINARY_VALUE_HEX = 1       # hexadecimal number, stored as raw bytes
+_BINARY_VALUE_ODD_HEX = 2   # same, but with an odd number of hex digits
+_BINARY_VALUE_BASE64 = 3    # base64 encoded data, stored as raw bytes
+
+# Compression methods for serialized files. Compressed files are detected and 
+# decompressed automatically when read, whatever the compression method.
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_BZ2 = "bz2"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_LZMA = "lzma"   # (only if the lzma module is available)
+
+# Default output options for serialize_to_file (and the to_file methods of 
+# PloneVoteCryptoLib objects), used whenever compression or compact are not 
+# given (or None). Applications may change these module attributes.
+DEFAULT_COMPRESSION = COMPRESSION_NONE
+DEFAULT_COMPACT_OUTPUT = False  # True: omit formatting whitespace in XML
+
+# Size of the chunks in which compressed files are read
+_FILE_CHUNK_SIZE = 64 * 1024
+
 # ============================================================================
 # Exception classes:
 # ============================================================================
@@ -313,6 +389,286 @@ def _parse_schema_tuple(schema_tuple):
        
     return (min_occurrences, max_occurrences, sub_sd_node)
 
+class _CompiledStructure:
+    """
+    A validated, pre-processed form of a structure definition dictionary.
+    
+    Compiling a structure definition dictionary validates it and parses all 
+    of its schema tuples once, so that checking data against the structure 
+    definition (which happens on every serialize and deserialize operation) 
+    does no re-parsing and only builds error messages when the check fails.
+    
+    Compiled structures are obtained through _compile_structure, which caches 
+    them per (root) structure definition dictionary. The compiled structure 
+    for a non-leaf element's definition is itself a _CompiledStructure, 
+    compiled along with its parent.
+    
+    Attributes:
+        names::list<string> -- The element names defined at this level, in 
+                               sorted order. The index of a name in this list 
+                               is the tag used for the element by 
+                               BinarySerializer.
+        schemas::dict   -- Maps each element name to a tuple (min_occurrences, 
+                           max_occurrences, sub_structure, tag), where 
+                           sub_structure is None for leaf elements and a 
+                           _CompiledStructure otherwise.
+        sub_structures::list    -- The sub_structure for each tag.
+        required::list<string>  -- The names of the elements with 
+                                   min_occurrences > 0.
+    """
+    
+    def __init__(self, sd_node):
+        """
+        Compile the given structure definition dictionary.
+        
+        Arguments:
+            sd_node::dict   -- A structure definition dictionary (the "root" 
+                               of the dictionary or any sub-definition of a 
+                               non-leaf element).
+          
+        Throws:
+            InvalidSerializeStructureDefinitionError    -- 
+                If sd_node is anything other than a valid structure definition 
+                dictionary.
+        """
+        self.names = sd_node.keys()
+        self.names.sort()
+        self.schemas = {}
+        self.sub_structures = []
+        self.required = []
+        
+        for tag in range(0, len(self.names)):
+            name = self.names[tag]
+            (min_occurrences, max_occurrences, sub_sd_node) = \
+                                        _parse_schema_tuple(sd_node[name])
+            
+            if(max_occurrences < 0 or min_occurrences < 0):
+                raise InvalidSerializeStructureDefinitionError(\
+                    "Error in serialize structure definition dictionary for " \
+                    "key %s: min_occurrences is %d, max_occurrences is %d. " \
+                    "A serialize structure definition dictionary must never " \
+                    "define a key where min_occurrences and/or " \
+                    "max_occurrences have negative values." % \
+                    (name, max_occurrences, min_occurrences))
+            
+            if(max_occurrences != 0 and max_occurrences < min_occurrences):
+                raise InvalidSerializeStructureDefinitionError(\
+                    "Error in serialize structure definition dictionary for " \
+                    "key %s: min_occurrences is %d, max_occurrences is %d. " \
+                    "A serialize structure definition dictionary must never " \
+                    "define a key where min_occurrences is greater than " \
+                    "max_occurrences." % \
+                    (name, max_occurrences, min_occurrences))
+            
+            if(sub_sd_node is None):
+                sub_structure = None
+            elif(isinstance(sub_sd_node, dict)):
+                sub_structure = _CompiledStructure(sub_sd_node)
+            else:
+                raise InvalidSerializeStructureDefinitionError(\
+                    "Error in serialize structure definition dictionary for " \
+                    "key %s: object of type %s encountered as the " \
+                    "corresponding element's definition. An element " \
+                    "definition inside a serialize structure definition " \
+                    "dictionary must be either None (indicating a " \
+                    "string/text element) or another structure definition " \
+                    "dictionary indicating a composite sub-structure. For " \
+                    "more information, see the documentation for the " \
+                    "serialize module." % (name, str(type(sub_sd_node))))
+            
+            self.schemas[name] = (min_occurrences, max_occurrences, 
+                                  sub_structure, tag)
+            self.sub_structures.append(sub_structure)
+            if(min_occurrences > 0):
+                self.required.append(name)
+    
+    def check(self, data_node):
+        """
+        Check that the given data matches this compiled structure.
+        
+        See module level documentation for a description of how a serializable 
+        data dictionary matching a given serialize structure definition 
+        dictionary should be constructed.
+        
+        Arguments:
+            data_node::dict -- A serializable data dictionary for which we 
+                               wish to check if it matches this structure.
+          
+        Throws:
+            InvalidSerializeDataError    -- 
+                If data_node is anything other than a valid serializable data 
+                dictionary matching this structure.
+        """
+        schemas = self.schemas
+        
+        for name, value in data_node.iteritems():
+            schema = schemas.get(name)
+            if(schema is None):
+                self._raise_unknown_element(name)
+            (min_occurrences, max_occurrences, sub_structure, tag) = schema
+            
+            is_list = isinstance(value, list)
+            if(is_list):
+                occurrences = len(value)
+                if((occurrences < min_occurrences) or
+                   (max_occurrences != 0 and (occurrences > max_occurrences))):
+                    self._raise_bad_occurrences(name, occurrences)
+            elif(min_occurrences > 1):
+                self._raise_bad_occurrences(name, 1)
+            
+            if(sub_structure is None):
+                if(is_list):
+                    for s in value:
+                        if(not isinstance(s, basestring)):
+                            raise InvalidSerializeDataError(\
+                                "The given data doesn't match the " \
+                                "corresponding serialize structure " \
+                                "definition dictionary. According the " \
+                                "structure definition, element \"%s\" is a " \
+                                "leaf element and thus its value must be a " \
+                                "string. The data has the value %s for this " \
+                                "element." % (name, s))
+                elif(not isinstance(value, basestring)):
+                    raise InvalidSerializeDataError(\
+                        "The given data doesn't match the corresponding " \
+                        "serialize structure definition dictionary. According "\
+                        "the structure definition, element \"%s\" is a leaf " \
+                        "element and thus its value must be a string. The " \
+                        "data has the value %s (%s) for this element." % \
+                        (name, value, type(value)))
+            else:
+                if(is_list):
+                    check_sub_structure = sub_structure.check
+                    for v_element in value:
+                        if(not isinstance(v_element, dict)):
+                            self._raise_not_composite(name, v_element)
+                        check_sub_structure(v_element)
+                elif(isinstance(value, dict)):
+                    sub_structure.check(value)
+                else:
+                    self._raise_not_composite(name, value)
+        
+        for name in self.required:
+            if(not data_node.has_key(name)):
+                raise InvalidSerializeDataError(\
+                    "The given data doesn't match the corresponding " \
+                    "serialize structure definition dictionary. The element " \
+                    "\"%s\" is required by the structure definition, but was " \
+                    "not found in the data." % name)
+    
+    def _raise_unknown_element(self, name):
+        """
+        Raise InvalidSerializeDataError for an element not defined at this 
+        level of the structure definition.
+        """
+        raise InvalidSerializeDataError(\
+            "The given data doesn't match the corresponding serialize " \
+            "structure definition dictionary. An element named \"%s\" " \
+            "appears in the data, but it is not defined in the structure " \
+            "definition dictionary at the same level. Defined elements in " \
+            "the structure definition dictionary at the current level are: " \
+            "%s." % (name, ", ".join(self.names)))
+    
+    def _raise_bad_occurrences(self, name, occurrences):
+        """
+        Raise InvalidSerializeDataError for an element occurring an invalid 
+        number of times.
+        """
+        (min_occurrences, max_occurrences, sub_structure, tag) = \
+                                                        self.schemas[name]
+        if(max_occurrences == 0):
+            max_occ_str = "infinite"
+        else:
+            max_occ_str = str(max_occurrences)
+        
+        raise InvalidSerializeDataError(\
+            "The given data doesn't match the corresponding serialize " \
+            "structure definition dictionary. According the structure " \
+            "definition, the element \"%s\" must occur between %d and %s " \
+            "times. But %d occurrences of that element where found in " \
+            "the data." % (name, min_occurrences, max_occ_str, occurrences))
+    
+    def describe(self):
+        """
+        Return a canonical textual description of the compiled structure 
+        (element names, in tag order, with their occurrence bounds and 
+        sub-structures), which changes whenever the tags or the meaning of 
+        any element change.
+        """
+        parts = []
+        for name in self.names:
+            (min_occurrences, max_occurrences, sub_structure, tag) = \
+                                                        self.schemas[name]
+            if(sub_structure == None):
+                sub_description = "-"
+            else:
+                sub_description = "{%s}" % sub_structure.describe()
+            if(isinstance(name, unicode)):
+                name = name.encode('utf-8')
+            parts.append("%s:%d:%d:%s" % (name, min_occurrences, 
+                                          max_occurrences, sub_description))
+        return ";".join(parts)
+    
+    def _raise_not_composite(self, name, value):
+        """
+        Raise InvalidSerializeDataError for a composite element whose value is 
+        not a dictionary.
+        """
+        raise InvalidSerializeDataError(\
+            "The given data doesn't match the corresponding serialize " \
+            "structure definition dictionary. According the structure " \
+            "definition, element \"%s\" is a composite element and thus its " \
+            "value must be a dictionary matching the element's structure " \
+            "definition. The data has the value %s for this element." % \
+            (name, value))
+
+# Compiled structures, indexed by the id() of their structure definition 
+# dictionary. Each entry is a (structure_definition, compiled_structure) tuple; 
+# keeping a reference to the dictionary ensures its id is not reused.
+#
+# The cache keeps at most _COMPILED_STRUCTURE_CACHE_SIZE entries, evicting the 
+# oldest first (_compiled_structure_cache_order lists the keys from oldest to 
+# newest), so that callers that build structure definitions on the fly do not 
+# keep all of them alive. The (few) module level structure definitions of 
+# PloneVoteCryptoLib easily fit in it.
+_COMPILED_STRUCTURE_CACHE_SIZE = 64
+_compiled_structure_cache = {}
+_compiled_structure_cache_order = []
+
+def _compile_structure(sd_node):
+    """
+    Get the compiled form of a structure definition dictionary.
+    
+    Structure definitions are compiled only once, on first use, and then 
+    cached. Because of this, structure definition dictionaries must not be 
+    modified after they have been used to construct a serializer.
+    
+    Arguments:
+        sd_node::dict   -- A structure definition dictionary.
+    
+    Returns:
+        compiled::_CompiledStructure    -- The compiled structure definition.
+      
+    Throws:
+        InvalidSerializeStructureDefinitionError    -- 
+            If sd_node is anything other than a valid structure definition 
+            dictionary.
+    """
+    key = id(sd_node)
+    entry = _compiled_structure_cache.get(key)
+    if(entry is not None and entry[0] is sd_node):
+        return entry[1]
+    
+    compiled = _CompiledStructure(sd_node)
+    if(entry is None):
+        while(len(_compiled_structure_cache_order) >= 
+              _COMPILED_STRUCTURE_CACHE_SIZE):
+            oldest_key = _compiled_structure_cache_order.pop(0)
+            _compiled_structure_cache.pop(oldest_key, None)
+        _compiled_structure_cache_order.append(key)
+    _compiled_structure_cache[key] = (sd_node, compiled)
+    return compiled
+
 def _check_validate_structure(sd_node):
     """
     Validate a serialize structure definition dictionary.
@@ -332,43 +688,7 @@ def _check_validate_structure(sd_node):
             If sd_node is anything other than a valid structure definition 
             dictionary.
     """
-    for name, schema in sd_node.items():
-        
-        (min_occurrences, max_occurrences, sub_sd_node) = \
-                                        _parse_schema_tuple(schema)
-            
-        if(max_occurrences < 0 or min_occurrences < 0):
-            raise InvalidSerializeStructureDefinitionError(\
-                "Error in serialize structure definition dictionary for key " \
-                "%s: min_occurrences is %d, max_occurrences is %d. " \
-                "A serialize structure definition dictionary must never " \
-                "define a key where min_occurrences and/or max_occurrences " \
-                "have negative values." % \
-                (name, max_occurrences, min_occurrences))
-        
-        if(max_occurrences != 0 and max_occurrences < min_occurrences):
-            raise InvalidSerializeStructureDefinitionError(\
-                "Error in serialize structure definition dictionary for key " \
-                "%s: min_occurrences is %d, max_occurrences is %d. " \
-                "A serialize structure definition dictionary must never " \
-                "define a key where min_occurrences is greater than " \
-                "max_occurrences." % (name, max_occurrences, min_occurrences))
-        
-        if(sub_sd_node is None):
-            pass    
-        elif(isinstance(sub_sd_node, dict)):
-            _check_validate_structure(sub_sd_node)
-        else:
-            raise InvalidSerializeStructureDefinitionError(\
-                "Error in serialize structure definition dictionary for key " \
-                "%s: object of type %s encountered as the corresponding " \
-                "element's definition. An element definition inside a " \
-                "serialize structure definition dictionary must be " \
-                "either None (indicating a string/text element) or another " \
-                "structure definition dictionary indicating a composite " \
-                "sub-structure. For more information, see the documentation " \
-                "for the serialize module." % (name, str(type(sub_sd_node))))
-    
+    _compile_structure(sd_node)
 
 def _check_data_matches_structure(sd_node, data_node):
     """
@@ -395,123 +715,318 @@ def _check_data_matches_structure(sd_node, data_node):
             If data_node is anything other than a valid serializable data 
             dictionary matching the structure definition dictionary sd_node.
     """
-    # First, lets check that all keys in the data have a corresponding 
-    # definition in the structure dictionary:
-    for key in data_node.keys():
-        if(not sd_node.has_key(key)):
-            # Construct the basic error message
-            error_msg = "The given data doesn't match the corresponding " \
-                "serialize structure definition dictionary. An element named " \
-                "\"%s\" appears in the data, but it is not defined in the " \
-                "structure definition dictionary at the same level. Defined " \
-                "elements in the structure definition dictionary at the " \
-                "current level are: " % key
-            # Append the list of valid elements at the current level
-            valid_elements = sd_node.keys()
-            for i in range(0, len(valid_elements) - 1):
-                error_msg += valid_elements[i] + ", "
-            error_msg += valid_elements[len(valid_elements) - 1] + "."
-            # Raise the exception
-            raise InvalidSerializeDataError(error_msg)
-    
-    # Now, for each definition in the structure dictionary at the current level:
-    for name, schema in sd_node.items():
-    
-        (min_occurrences, max_occurrences, sub_sd_node) = \
-                                        _parse_schema_tuple(schema)
-                                        
-        # Check if the name appears in the data:
-        if(not data_node.has_key(name)):
-            if(min_occurrences == 0):
-                # If the schema allows for 0 occurrences of this key, 
-                # just continue
-                continue
-            else: 
-                # Otherwise, this is an error
-                raise InvalidSerializeDataError(\
-                    "The given data doesn't match the corresponding " \
-                    "serialize structure definition dictionary. The element " \
-                    "\"%s\" is required by the structure definition, but was " \
-                    "not found in the data." % name)
-                
-        # Here the name should appear in the data, lets get its value
-        value = data_node[name]
+    _compile_structure(sd_node).check(data_node)
+
+def _remove_dummy_root_element(data):
+    """
+    Unwrap data read from an XML document with a dummy root element.
+    
+    XML serializers wrap the top level elements of the data inside a dummy 
+    root element (DUMMY_ROOT_ELEMENT_NAME) whenever the structure definition 
+    does not guarantee a single document-level root element. This function 
+    takes the data read from the whole XML document and removes that dummy 
+    element, if present.
+    
+    Arguments:
+        data::dict  -- The (unchecked) data read from an XML document, which 
+                       must contain exactly one root element.
+    
+    Returns:
+        data::dict  -- The same data, without the dummy root element.
         
-        # Get the number of actual occurrences of the schema name
-        if(isinstance(value, list)):
-            occurrences = len(value)
-        else:
-            occurrences = 1
-            
-        # Check that this is a valid number of occurrences
-        if((occurrences < min_occurrences) or
-           (max_occurrences != 0 and (occurrences > max_occurrences))):
-           
-            if(max_occurrences == 0):
-                max_occ_str = "infinite"
-            else:
-                max_occ_str = str(max_occurrences)
-            
+    Throws:
+        InvalidSerializeDataError   -- 
+            If the dummy root element is present but does not contain other 
+            elements inside.
+    """
+    assert len(data) == 1, \
+        "A valid XML document must have a single root element."
+    
+    # Check for dummy root element in the XML
+    root_element_name = data.keys()[0]
+    if(root_element_name == DUMMY_ROOT_ELEMENT_NAME):
+        # The root element is a dummy element, remove it
+        if(not isinstance(data[root_element_name], dict)):
             raise InvalidSerializeDataError(\
-                "The given data doesn't match the corresponding serialize " \
-                "structure definition dictionary. According the structure " \
-                "definition, the element \"%s\" must occur between %d and %s " \
-                "times. But %d occurrences of that element where found in " \
-                "the data." % (name, min_occurrences, max_occ_str, occurrences))
-        
-        # Two cases: either sub_sd_node is None and thus this is a "leaf" of  
-        # the structure dictionary, or sub_sd_node is another structure 
-        # definition dictionary
-        if(sub_sd_node == None):
-            # Two cases: either value is a string or a list of strings, both 
-            # are fine. No other type is allowed.
-            if(isinstance(value, basestring)):
-                pass
-            elif(isinstance(value, list)):
-                for s in value:
-                    if(not isinstance(s, basestring)):
-                        raise InvalidSerializeDataError(\
-                            "The given data doesn't match the corresponding " \
-                            "serialize structure definition dictionary. " \
-                            "According the structure definition, element " \
-                            "\"%s\" is a leaf element and thus its value " \
-                            "must be a string. The data has the value %s for " \
-                            "this element." % (name, s))
-            else:
-                # Invalid value type for a data dictionary
-                raise InvalidSerializeDataError(\
-                    "The given data doesn't match the corresponding serialize "\
-                    "structure definition dictionary. According the structure "\
-                    "definition, element \"%s\" is a leaf element and thus " \
-                    "its value must be a string. The data has the value %s " \
-                    "(%s) for this element." % (name, value, type(value)))
-        else:
-            # Two cases: either value is a dictionary or a list of dictionaries
-            if(isinstance(value, dict)):
-                # call this function recursively for sub_sd_node and value
-                _check_data_matches_structure(sub_sd_node, value)
-            elif(isinstance(value, list)):
-                for v_element in value:
-                    if(isinstance(v_element, dict)):
-                        _check_data_matches_structure(sub_sd_node, v_element)
+                "The given XML document does not seem to contain a well " \
+                "formed serialization of any valid serializable data " \
+                "dictionary. The dummy element %s should always be " \
+                "unique and contain other elements inside." % \
+                DUMMY_ROOT_ELEMENT_NAME)
+        data = data[root_element_name]
+    
+    return data
+
+def _encode_varint(num):
+    """
+    Encode a non-negative integer as an unsigned LEB128 varint.
+    
+    Arguments:
+        num::int    -- The integer to encode.
+    
+    Returns:
+        varint::string  -- The encoded integer (7 bits per byte, least 
+                           significant group first, high bit set on all bytes 
+                           but the last).
+    """
+    if(num < 0x80):
+        return chr(num)
+    varint_bytes = []
+    while(num >= 0x80):
+        varint_bytes.append(chr((num & 0x7f) | 0x80))
+        num >>= 7
+    varint_bytes.append(chr(num))
+    return "".join(varint_bytes)
+
+def _decode_varint(buf, pos, end):
+    """
+    Decode an unsigned LEB128 varint.
+    
+    Arguments:
+        buf::string -- The string containing the varint.
+        pos::int    -- The position of the varint within buf.
+        end::int    -- The position in buf past which we may not read.
+    
+    Returns:
+        (num, pos)::(int, int)  -- The decoded integer and the position in 
+                                   buf immediately after the varint.
+    
+    Throws:
+        InvalidSerializeDataError   -- If the varint is truncated.
+    """
+    num = 0
+    shift = 0
+    while(pos < end):
+        byte = ord(buf[pos])
+        pos += 1
+        num |= (byte & 0x7f) << shift
+        if(byte < 0x80):
+            return (num, pos)
+        shift += 7
+    raise InvalidSerializeDataError("The given data is truncated: " \
+                                    "incomplete tag or length field.")
+
+def _resolve_output_options(compression, compact):
+    """
+    Complete the output options given to a serialize_to_file method.
+    
+    Arguments:
+        compression::string -- One of the COMPRESSION_* constants, or None to 
+                               use DEFAULT_COMPRESSION.
+        compact::bool       -- Whether to omit formatting whitespace, or None 
+                               to use DEFAULT_COMPACT_OUTPUT.
+    
+    Returns:
+        (compression, compact)::(string, bool)  -- The options to use.
+    
+    Throws:
+        ValueError  -- If compression is not a supported compression method.
+    """
+    if(compression is None):
+        compression = DEFAULT_COMPRESSION
+    if(compact is None):
+        compact = DEFAULT_COMPACT_OUTPUT
+    
+    if(compression not in (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_BZ2, 
+                           COMPRESSION_ZLIB, COMPRESSION_LZMA)):
+        raise ValueError("Unknown compression method: %s. Use one of the " \
+                         "serialize.COMPRESSION_* constants." % compression)
+    if(compression == COMPRESSION_LZMA and lzma == None):
+        raise ValueError("lzma compression requires the lzma module, which " \
+                         "is not available.")
+    
+    return (compression, compact)
+
+class _CompressingFileWriter:
+    """
+    A write-only file-like object that compresses everything written to it.
+    """
+    
+    def __init__(self, file_object, compressor):
+        """
+        Arguments:
+            file_object::file   -- The file to which the compressed data is 
+                                   written.
+            compressor::object  -- A compressor object, with compress(data) and 
+                                   flush() methods (e.g. zlib.compressobj()).
+        """
+        self._file = file_object
+        self._compressor = compressor
+    
+    def write(self, data):
+        self._file.write(self._compressor.compress(data))
+    
+    def close(self):
+        try:
+            self._file.write(self._compressor.flush())
+        finally:
+            self._file.close()
+
+class _DecompressingFileReader:
+    """
+    A read-only file-like object that decompresses the data read from a file.
+    
+    Decompression errors (corrupt or truncated data) are reported as 
+    InvalidSerializeDataError.
+    """
+    
+    def __init__(self, file_object, decompressor):
+        """
+        Arguments:
+            file_object::file   -- The file containing the compressed data.
+            decompressor::object    -- A decompressor object, with a 
+                                       decompress(data) method (e.g. 
+                                       zlib.decompressobj()).
+        """
+        self._file = file_object
+        self._decompressor = decompressor
+        # Decompressed data not yet read: a deque of strings, of which the 
+        # first self._offset characters of the first one were already read, 
+        # self._length characters in total. (Concatenating to a single 
+        # buffer string would copy it on every chunk.)
+        self._chunks = collections.deque()
+        self._offset = 0
+        self._length = 0
+        self._eof = False
+    
+    def _fill(self, size):
+        """
+        Decompress data until at least size characters are buffered, or the 
+        end of the file is reached (for size < 0, until the end of the file).
+        
+        DO NOT USE EXTERNALLY.
+        """
+        try:
+            while(not self._eof and (size < 0 or self._length < size)):
+                chunk = self._file.read(_FILE_CHUNK_SIZE)
+                if(chunk == ""):
+                    self._eof = True
+                    if(hasattr(self._decompressor, "flush")):
+                        data = self._decompressor.flush()
                     else:
-                        raise InvalidSerializeDataError(\
-                            "The given data doesn't match the corresponding " \
-                            "serialize structure definition dictionary. " \
-                            "According the structure definition, element " \
-                            "\"%s\" is a composite element and thus its value "\
-                            "must be a dictionary matching the element's " \
-                            "structure definition. The data has the value %s " \
-                            "for this element." % (name, v_element))
+                        data = ""
+                else:
+                    data = self._decompressor.decompress(chunk)
+                if(data != ""):
+                    self._chunks.append(data)
+                    self._length += len(data)
+        except _DECOMPRESSION_ERRORS, e:
+            raise InvalidSerializeDataError("The given file contains " \
+                "corrupt compressed data: %s" % str(e))
+    
+    def read(self, size=-1):
+        self._fill(size)
+        if(size < 0 or size > self._length):
+            size = self._length
+        
+        pieces = []
+        needed = size
+        while(needed > 0):
+            chunk = self._chunks[0]
+            available = len(chunk) - self._offset
+            if(available <= needed):
+                pieces.append(chunk[self._offset:])
+                self._chunks.popleft()
+                self._offset = 0
+                needed -= available
             else:
-                # Invalid value type for a data dictionary
-                raise InvalidSerializeDataError(\
-                    "The given data doesn't match the corresponding serialize "\
-                    "structure definition dictionary. According the structure "\
-                    "definition, element \"%s\" is a composite element and " \
-                    "thus its value must be a dictionary matching the " \
-                    "element's structure definition. The data has the value " \
-                    "%s for this element." % (name, value))
+                pieces.append(chunk[self._offset:self._offset + needed])
+                self._offset += needed
+                needed = 0
+        self._length -= size
+        return "".join(pieces)
+    
+    def close(self):
+        self._file.close()
+
+def _open_file_for_writing(filename, compression):
+    """
+    Open a file for writing serialized data, with the given compression.
+    
+    Arguments:
+        filename::string    -- The name of the file to create.
+        compression::string -- One of the COMPRESSION_* constants.
+    
+    Returns:
+        file_object::file   -- A (file-like) object with write and close 
+                               methods.
+    """
+    file_object = open(filename, "wb")
+    if(compression == COMPRESSION_NONE):
+        return file_object
+    elif(compression == COMPRESSION_GZIP):
+        # (wbits > 16 makes zlib write a gzip header and trailer)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif(compression == COMPRESSION_BZ2):
+        compressor = bz2.BZ2Compressor()
+    elif(compression == COMPRESSION_ZLIB):
+        compressor = zlib.compressobj()
+    else:
+        assert compression == COMPRESSION_LZMA
+        compressor = lzma.LZMACompressor()
+    return _CompressingFileWriter(file_object, compressor)
+
+def _open_file_for_reading(filename):
+    """
+    Open a file containing serialized data, which may be compressed.
+    
+    The compression method, if any, is detected from the first bytes of the 
+    file, so that files written with any compression setting can be read.
+    
+    Arguments:
+        filename::string    -- The name of the file to open.
+    
+    Returns:
+        file_object::file   -- A (file-like) object with read and close 
+                               methods, returning the uncompressed data.
+    
+    Throws:
+        InvalidSerializeDataError   -- If the file is lzma compressed and the 
+                                       lzma module is not available.
+    """
+    file_object = open(filename, "rb")
+    magic = file_object.read(6)
+    file_object.seek(0)
+    
+    if(magic[:2] == "\x1f\x8b"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif(magic[:3] == "BZh"):
+        decompressor = bz2.BZ2Decompressor()
+    elif(magic == "\xfd7zXZ\x00"):
+        if(lzma == None):
+            file_object.close()
+            raise InvalidSerializeDataError("The given file is lzma " \
+                "compressed, but the lzma module is not available.")
+        decompressor = lzma.LZMADecompressor()
+    elif(len(magic) >= 2 and (ord(magic[0]) & 0x0f) == 8 and 
+         (ord(magic[0]) * 256 + ord(magic[1])) % 31 == 0):
+        # zlib header: deflate method and valid header checksum. (Neither XML 
+        # nor BinarySerializer's format can start this way.)
+        decompressor = zlib.decompressobj()
+    else:
+        return file_object
+    
+    return _DecompressingFileReader(file_object, decompressor)
+
+def _read_file(filename):
+    """
+    Read the whole (uncompressed) contents of a file with serialized data.
+    
+    Arguments:
+        filename::string    -- The name of the file to read.
+    
+    Returns:
+        data::string    -- The contents of the file, decompressed if needed.
+    
+    Throws:
+        InvalidSerializeDataError   -- If the file contains corrupt compressed 
+                                       data.
+    """
+    file_object = _open_file_for_reading(filename)
+    try:
+        return file_object.read()
+    finally:
+        file_object.close()
 
 # ============================================================================
 # Main (non-exception) classes:
@@ -527,9 +1042,40 @@ class BaseSerializer:
     serializers.
     
     BaseSerializer objects should never be used directly. For usable 
-    serializer classes see XMLSerializer and JSONSerializer.
+    serializer classes see XMLSerializer, StreamingXMLSerializer and 
+    BinarySerializer.
     """
     
+    def _structure_has_single_root(self):
+        """
+        Check whether data for this serializer always has a single root element.
+        
+        This is the case when the structure definition dictionary contains a 
+        single top level element, which can occur at most once. Formats that 
+        require a unique document-level root (such as XML) must otherwise wrap 
+        the top level elements inside a dummy root element.
+        
+        For consistency, we use the structure definition and not the actual 
+        data: the structure definition may have multiple (optional) top level 
+        elements, while particular instances of the data include just one.
+        
+        Returns:
+            result::bool    -- True if the structure definition has a single 
+                               root element, False otherwise.
+        """
+        if(len(self.structure_definition) != 1):
+            # More than one different root element allowed by structure def
+            return False
+        
+        root_element_name = self._compiled_structure.names[0]
+        max_occurrences = \
+                self._compiled_structure.schemas[root_element_name][1]
+        
+        # More than one root element of the same kind allowed by structure 
+        # def (note that max_occurrences == 0 means any number of occurrences 
+        # allowed)
+        return (max_occurrences == 1)
+    
     def _check_data(self, data):
         """
         Check the given serializable data dictionary against this serializer 
@@ -546,7 +1092,7 @@ class BaseSerializer:
                 dictionary matching the structure definition dictionary
                 associated with this BaseSerializer instance.
         """
-        _check_data_matches_structure(self.structure_definition, data)
+        self._compiled_structure.check(data)
     
     def __init__(self, structure_definition):
         """
@@ -562,7 +1108,7 @@ class BaseSerializer:
                 If structure_definition is anything other than a valid 
                 structure definition dictionary.
         """
-        _check_validate_structure(structure_definition)
+        self._compiled_structure = _compile_structure(structure_definition)
         self.structure_definition = structure_definition
 
         
@@ -677,25 +1223,7 @@ class XMLSerializer(BaseSerializer):
         # Valid XML must have a single document-level root element.
         # Two cases: Either the structure definition has a single root element, 
         # or there are multiple top level elements.
-        # For consistency, we use structure_definition and not the actual data.
-        # The structure definition may have multiple (optional) top level 
-        # elements, while particular instances of the data include just one.
-        structure_has_single_root = True
-        if(len(self.structure_definition) != 1):
-            # More than one different root element allowed by structure def
-            structure_has_single_root = False
-        else:
-            root_element_def_tuple = self.structure_definition.items()[0][1]
-            (min_occurrences, max_occurrences, sd_node) = \
-                            _parse_schema_tuple(root_element_def_tuple)
-            if(max_occurrences != 1):
-                # More than one root element of the same kind allowed by 
-                # structure def (note that max_occurrences == 0 means any 
-                # number of occurrences allowed)
-                structure_has_single_root = False
-            
-        
-        if(structure_has_single_root):
+        if(self._structure_has_single_root()):
             # Use the top level element of the structure as the document's 
             # root.
             root_element_name, root_element_value = data.items()[0]
@@ -713,7 +1241,8 @@ class XMLSerializer(BaseSerializer):
         return doc
         
         
-    def serialize_to_file(self, filename, data):
+    def serialize_to_file(self, filename, data, compression=None, 
+                          compact=None):
         """
         Serialize the given data into a new XML file.
         
@@ -722,25 +1251,42 @@ class XMLSerializer(BaseSerializer):
                                    XML representation of data.
             data::dict  -- A serializable data dictionary (see module level 
                            documentation).
+            compression::string -- One of the COMPRESSION_* constants of this 
+                                   module, or None (default) to use 
+                                   DEFAULT_COMPRESSION.
+            compact::bool       -- If True, write the XML without indentation 
+                                   whitespace. None (default) means use 
+                                   DEFAULT_COMPACT_OUTPUT.
         
         Throws:
             InvalidSerializeDataError   -- 
                 If data is not a serializable data dictionary corresponding to 
                 the structure definition dictionary associated with this 
                 serializer object.
+            ValueError  -- If compression is not a supported compression 
+                           method.
         """
-        xml_document = self.serialize_to_dom(data)
-        file_object = open(filename, "w")
-        file_object.write(xml_document.toprettyxml())
-        file_object.close()
+        (compression, compact) = _resolve_output_options(compression, compact)
+        xml_string = self.serialize_to_string(data, compact)
+        if(isinstance(xml_string, unicode)):
+            xml_string = xml_string.encode('utf-8')
         
-    def serialize_to_string(self, data):
+        file_object = _open_file_for_writing(filename, compression)
+        try:
+            file_object.write(xml_string)
+        finally:
+            file_object.close()
+        
+    def serialize_to_string(self, data, compact=None):
         """
         Serialize the given data as XML and return it in string form.
         
         Arguments:
             data::dict  -- A serializable data dictionary (see module level 
                            documentation).
+            compact::bool   -- If True, do not add indentation whitespace to 
+                               the XML. None (default) means use 
+                               DEFAULT_COMPACT_OUTPUT.
                            
         Returns:
             result::string  -- 
@@ -752,8 +1298,13 @@ class XMLSerializer(BaseSerializer):
                 the structure definition dictionary associated with this 
                 serializer object.
         """
+        if(compact is None):
+            compact = DEFAULT_COMPACT_OUTPUT
         xml_document = self.serialize_to_dom(data)
-        return xml_document.toprettyxml()
+        if(compact):
+            return xml_document.toxml()
+        else:
+            return xml_document.toprettyxml()
         
     def _read_from_dom_element(self, dom_element):
         """
@@ -872,25 +1423,7 @@ class XMLSerializer(BaseSerializer):
                 representation of data matching the structure definition 
                 dictionary associated with this serializer object.
         """
-        data = self._read_from_dom_element(dom)
-        
-        assert len(data) == 1, \
-            "A valid XML document must have a single root element."
-        
-        # Check for dummy root element in the XML
-        root_element_name = data.keys()[0]
-        if(root_element_name == DUMMY_ROOT_ELEMENT_NAME):
-            # The root element is a dummy element, remove it
-            if(not isinstance(data[root_element_name], dict)):
-                raise InvalidSerializeDataError(\
-                    "The given XML document does not seem to contain a well " \
-                    "formed serialization of any valid serializable data " \
-                    "dictionary. The dummy element %s should always be " \
-                    "unique and contain other elements inside." % \
-                    DUMMY_ROOT_ELEMENT_NAME)
-            data = data[root_element_name]
-            
-        
+        data = _remove_dummy_root_element(self._read_from_dom_element(dom))
         self._check_data(data)
         return data
         
@@ -917,7 +1450,7 @@ class XMLSerializer(BaseSerializer):
                 representation of data matching the structure definition 
                 dictionary associated with this serializer object.
         """
-        dom = xml.dom.minidom.parse(filename)
+        dom = xml.dom.minidom.parseString(_read_file(filename))
         return self.deserialize_from_dom(dom)
         
     def deserialize_from_string(self, string):
@@ -947,6 +1480,713 @@ class XMLSerializer(BaseSerializer):
         return self.deserialize_from_dom(dom)
         
 
+class StreamingXMLSerializer(BaseSerializer):
+    """
+    A serializer object for serializing/deserializing data as XML, based on 
+    cElementTree.
+    
+    StreamingXMLSerializer produces and accepts the same XML format as 
+    XMLSerializer and can be used in its place (data written by either class 
+    can be read by the other). However, it never constructs a DOM for the 
+    whole document: data is written to file element by element as the 
+    serializable data dictionary is traversed, and read back incrementally 
+    using cElementTree's iterparse, discarding each XML element as soon as its 
+    contents have been recovered. This makes it considerably faster and less 
+    memory hungry than XMLSerializer for large files, such as those 
+    containing ciphertexts or threshold keys.
+    
+    Use serialize_to_file to store data matching the structure definition into 
+    an XML file.
+    
+    Use deserialize_from_file to recover data matching the structure definition 
+    from an existing XML file.
+    """
+    
+    def __init__(self, structure_definition):
+        """
+        Construct a serializer for data matching the given structure definition.
+        
+        Arguments:
+            structure_definition::dict  -- The structure definition dictionary 
+                                           that defines the data accepted by 
+                                           this serializer.
+      
+        Throws:
+            InvalidSerializeStructureDefinitionError    -- 
+                If structure_definition is anything other than a valid 
+                structure definition dictionary.
+            ImportError --
+                If cElementTree is not available (python 2.4 without the 
+                stand-alone cElementTree module).
+        """
+        if(ElementTree == None): # pragma: no cover (python 2.4)
+            raise ImportError("StreamingXMLSerializer requires cElementTree, " \
+                              "which is not available. Use XMLSerializer " \
+                              "instead.")
+        BaseSerializer.__init__(self, structure_definition)
+    
+    def _write_element(self, file_object, element_name, element_value, 
+                       depth, compact=False):
+        """
+        Write the XML representation of the given data to a file object.
+        
+        This method writes element_value as an XML element with name 
+        element_name directly into file_object. How the contents of the 
+        element are written depends on the type of element_value, see 
+        XMLSerializer._write_to_dom_element for details.
+        
+        Arguments:
+            file_object::file   -- The (file-like) object to which the XML 
+                                   is being written.
+            element_name::string    -- The name of the element to write.
+            element_value::(string|dict|list)   -- 
+                The contents of the element to write.
+            depth::int  -- The nesting level of the element, used for 
+                           indentation.
+            compact::bool   -- If True, write no indentation or line breaks.
+        """
+        if(compact):
+            indent = ""
+            newline = ""
+        else:
+            indent = "\t" * depth
+            newline = "\n"
+        
+        # Three options: element_value is either a dictionary, a list or a 
+        # string
+        if(isinstance(element_value, dict)):
+            file_object.write("%s<%s>%s" % (indent, element_name, newline))
+            for child_name, child_value in element_value.items():
+                self._write_element(file_object, child_name, child_value, 
+                                    depth + 1, compact)
+            file_object.write("%s</%s>%s" % (indent, element_name, newline))
+            
+        elif(isinstance(element_value, list)):
+            # (list means "these are all different elements with the same name")
+            for single_ev in element_value:
+                assert (not isinstance(single_ev, list)), \
+                    "The given data dictionary does not match the format " \
+                    "for data dictionaries."
+                self._write_element(file_object, element_name, single_ev, 
+                                    depth, compact)
+        
+        else:
+            # element_value must then be a string. 
+            # We write all text as utf-8.
+            if(isinstance(element_value, unicode)):
+                element_value = element_value.encode('utf-8')
+            file_object.write("%s<%s>%s</%s>%s" % (indent, element_name, 
+                                                  _xml_escape(element_value),
+                                                  element_name, newline))
+    
+    def _write_to_file_object(self, file_object, data, compact=False):
+        """
+        Serialize the given data as XML into an open file object.
+        
+        Arguments:
+            file_object::file   -- The (file-like) object to which the XML 
+                                   representation of data is written.
+            data::dict  -- A serializable data dictionary (see module level 
+                           documentation).
+            compact::bool   -- If True, write no indentation or line breaks.
+        
+        Throws:
+            InvalidSerializeDataError   -- 
+                If data is not a serializable data dictionary corresponding to 
+                the structure definition dictionary associated with this 
+                serializer object.
+        """
+        self._check_data(data)
+        
+        file_object.write('<?xml version="1.0" encoding="utf-8"?>')
+        if(not compact):
+            file_object.write("\n")
+        
+        # Valid XML must have a single document-level root element. If the 
+        # structure definition doesn't guarantee one, we use a dummy root 
+        # element, exactly as XMLSerializer does.
+        if(self._structure_has_single_root()):
+            root_element_name, root_element_value = data.items()[0]
+            self._write_element(file_object, root_element_name, 
+                                root_element_value, 0, compact)
+        else:
+            self._write_element(file_object, DUMMY_ROOT_ELEMENT_NAME, data, 0, 
+                                compact)
+    
+    def serialize_to_file(self, filename, data, compression=None, 
+                          compact=None):
+        """
+        Serialize the given data into a new XML file.
+        
+        Arguments:
+            filename::string    -- The name of the file to which to write the 
+                                   XML representation of data.
+            data::dict  -- A serializable data dictionary (see module level 
+                           documentation).
+            compression::string -- One of the COMPRESSION_* constants of this 
+                                   module, or None (default) to use 
+                                   DEFAULT_COMPRESSION.
+            compact::bool       -- If True, write the XML without indentation 
+                                   whitespace. None (default) means use 
+                                   DEFAULT_COMPACT_OUTPUT.
+        
+        Throws:
+            InvalidSerializeDataError   -- 
+                If data is not a serializable data dictionary corresponding to 
+                the structure definition dictionary associated with this 
+                serializer object.
+            ValueError  -- If compression is not a supported compression 
+                           method.
+        """
+        (compression, compact) = _resolve_output_options(compression, compact)
+        
+        # Check the data before creating the file, so that we don't leave a 
+        # truncated file behind on error.
+        self._check_data(data)
+        file_object = _open_file_for_writing(filename, compression)
+        try:
+            self._write_to_file_object(file_object, data, compact)
+        finally:
+            file_object.close()
+        
+    def serialize_to_string(self, data, compact=None):
+        """
+        Serialize the given data as XML and return it in string form.
+        
+        Arguments:
+            data::dict  -- A serializable data dictionary (see module level 
+                           documentation).
+            compact::bool   -- If True, write no indentation or line breaks. 
+                               None (default) means use 
+                               DEFAULT_COMPACT_OUTPUT.
+                           
+        Returns:
+            result::string  -- 
+                An string representing the given data serialized into XML.
+        
+        Throws:
+            InvalidSerializeDataError   -- 
+                If data is not a serializable data dictionary corresponding to 
+                the structure definition dictionary associated with this 
+                serializer object.
+        """
+        if(compact is None):
+            compact = DEFAULT_COMPACT_OUTPUT
+        string_buffer = cStringIO.StringIO()
+        self._write_to_file_object(string_buffer, data, compact)
+        return string_buffer.getvalue()
+    
+    def _read_from_file_object(self, file_object):
+        """
+        Recover the data serialized as XML in the given file object.
+        
+        The XML is parsed incrementally. Each XML element is converted into a 
+        string or a serializable data dictionary as soon as it has been fully 
+        parsed and is then discarded, so that no tree representing the whole 
+        document is ever kept in memory.
+        
+        Arguments:
+            file_object::file   -- The (file-like) object from which to read 
+                                   the XML serialized data.
+                
+        Return:
+            data::dict  -- The deserialized data in the form of a serializable 
+                           data dictionary (see module level documentation).
+                           
+        Throws:
+            InvalidSerializeDataError   -- 
+                If the given XML doesn't contain a valid serialized 
+                representation of data matching the structure definition 
+                dictionary associated with this serializer object.
+        """
+        # For each currently open XML element, we keep the element itself and 
+        # a dictionary mapping the names of its (already parsed) child 
+        # elements to the list of their values. The bottom of the stack 
+        # stands for the document itself.
+        stack = [(None, {})]
+        
+        try:
+            for event, element in ElementTree.iterparse(file_object, 
+                                                       ("start", "end")):
+                if(event == "start"):
+                    stack.append((element, {}))
+                    continue
+                
+                # event == "end"
+                (element, named_values) = stack.pop()
+                
+                if(len(named_values) == 0):
+                    # Leaf element, its value is its textual contents, 
+                    # removing padding whitespace (e.g. '\n', '\t').
+                    # (As for XMLSerializer, an element must contain either 
+                    # more elements or simple textual contents)
+                    if(element.text == None):
+                        raise InvalidSerializeDataError(\
+                            "The given XML document does not seem to contain " \
+                            "a well formed serialization of any valid " \
+                            "serializable data dictionary. Well formed " \
+                            "serializations created with XMLSerializer are " \
+                            "such that all XML elements contain either more " \
+                            "elements or simple textual/string contents; " \
+                            "element %s doesn't meet this requirements." % \
+                            element.tag)
+                    value = element.text.strip()
+                    # We return the string as utf-8 instead of a unicode 
+                    # string
+                    if(isinstance(value, unicode)):
+                        value = value.encode('utf-8')
+                else:
+                    # Composite element, a single sub element with a given 
+                    # name is stored as a value, multiple sub elements with 
+                    # the same name are stored as a list.
+                    value = {}
+                    for name, values in named_values.items():
+                        if(len(values) == 1):
+                            value[name] = values[0]
+                        else:
+                            value[name] = values
+                
+                # Add the value to those of the parent element
+                parent_named_values = stack[-1][1]
+                if(not parent_named_values.has_key(element.tag)):
+                    parent_named_values[element.tag] = []
+                parent_named_values[element.tag].append(value)
+                
+                # Discard the element, so that the memory used by the parsed 
+                # document doesn't grow with its size.
+                parent_element = stack[-1][0]
+                element.clear()
+                if(parent_element != None):
+                    parent_element.remove(element)
+                    
+        except SyntaxError, e:
+            # (cElementTree parse errors are subclasses of SyntaxError)
+            raise InvalidSerializeDataError("The given data is not valid " \
+                "XML. Parser error: %s" % str(e))
+        
+        # Collect the (single) root element of the document
+        document_named_values = stack[0][1]
+        data = {}
+        for name, values in document_named_values.items():
+            data[name] = values[0]
+        
+        data = _remove_dummy_root_element(data)
+        self._check_data(data)
+        return data
+        
+    def deserialize_from_file(self, filename):
+        """
+        Deserialize (recover) data from an XML file.
+        
+        This method restores the data serialized into the XML file as a 
+        serializable data dictionary. Recovered data is checked to be valid 
+        according to the structure definition dictionary associated with this 
+        serializer object.
+        
+        Arguments:
+            filename::string   -- The name of the file containing the 
+                                  serialized data we wish to deserialize.
+                
+        Return:
+            data::dict  -- The deserialized data in the form of a serializable 
+                           data dictionary (see module level documentation).
+                           
+        Throws:
+            InvalidSerializeDataError   -- 
+                If the given XML file doesn't contain a valid serialized 
+                representation of data matching the structure definition 
+                dictionary associated with this serializer object.
+        """
+        file_object = _open_file_for_reading(filename)
+        try:
+            return self._read_from_file_object(file_object)
+        finally:
+            file_object.close()
+        
+    def deserialize_from_string(self, string):
+        """
+        Deserialize data from a string containing its XML representation.
+        
+        This method restores the data serialized into the XML string as a 
+        serializable data dictionary. Recovered data is checked to be valid 
+        according to the structure definition dictionary associated with this 
+        serializer object.
+        
+        Arguments:
+            string::string   -- The string containing the XML serialized data 
+                                we wish to deserialize.
+                
+        Return:
+            data::dict  -- The deserialized data in the form of a serializable 
+                           data dictionary (see module level documentation).
+                           
+        Throws:
+            InvalidSerializeDataError   -- 
+                If the given XML string doesn't contain a valid serialized 
+                representation of data matching the structure definition 
+                dictionary associated with this serializer object.
+        """
+        if(isinstance(string, unicode)):
+            string = string.encode('utf-8')
+        return self._read_from_file_object(cStringIO.StringIO(string))
+        
+
+class BinarySerializer(BaseSerializer):
+    """
+    A serializer object for serializing/deserializing data in a compact binary 
+    type-length-value (TLV) format.
+    
+    BinarySerializer accepts exactly the same structure definition 
+    dictionaries and serializable data dictionaries as the XML serializers 
+    (including nested structures, occurrence bounds and list semantics), but 
+    stores the data in a much more compact form:
+    
+        * Element names are not stored. Instead, each element is identified 
+          by its index (tag) among the names defined at its level of the 
+          structure definition dictionary, taken in sorted order. Data must 
+          thus be deserialized using the same structure definition with which 
+          it was serialized.
+        
+        * Leaf values that are hexadecimal numbers (such as keys or primes) or 
+          base64 encoded data (such as encrypted data) are stored as the raw 
+          bytes they represent. Any other string is stored as utf-8 text.
+    
+    Deserialization requires no text parsing of the file itself, only reading 
+    tags and lengths and slicing the corresponding values.
+    
+    See BINARY_SERIALIZER_MAGIC and the _encode_* / _read_* methods for 
+    the details of the format.
+    
+    Use serialize_to_file to store data matching the structure definition into 
+    a binary file.
+    
+    Use deserialize_from_file to recover data matching the structure definition 
+    from an existing binary file.
+    """
+    
+    ## THE BINARY FORMAT:
+    #
+    # A file is formed by BINARY_SERIALIZER_MAGIC, the structure digest, and 
+    # the encoding of the top level elements of the data, in any order.
+    #
+    # The structure digest is the first _BINARY_STRUCTURE_DIGEST_SIZE bytes 
+    # of the SHA-256 hash of the canonical description of the structure 
+    # definition (see _CompiledStructure.describe). Since tags depend on the 
+    # element names of the structure definition, data is only deserialized 
+    # with the structure definition with which it was serialized: files 
+    # whose digest does not match are rejected.
+    #
+    # Each element is encoded as:
+    #
+    #   Leaf element:       [tag | value type (1 byte) | length | value]
+    #   Composite element:  [tag | length | encoded sub-elements]
+    #
+    # Where tag and length are unsigned LEB128 varints. Whether an element is 
+    # a leaf or composite is given by the structure definition. Each 
+    # occurrence of an element that appears multiple times (a list in the 
+    # data dictionary) is encoded as a separate element with the same tag.
+    ##
+    
+    def __init__(self, structure_definition):
+        """
+        Construct a serializer for data matching the given structure definition.
+        
+        Arguments:
+            structure_definition::dict  -- The structure definition dictionary 
+                                           that defines the data accepted by 
+                                           this serializer.
+      
+        Throws:
+            InvalidSerializeStructureDefinitionError    -- 
+                If structure_definition is anything other than a valid 
+                structure definition dictionary.
+        """
+        BaseSerializer.__init__(self, structure_definition)
+        digest = Crypto.Hash.SHA256.new(
+                        self._compiled_structure.describe()).digest()
+        self._header = BINARY_SERIALIZER_MAGIC + \
+                       digest[:_BINARY_STRUCTURE_DIGEST_SIZE]
+    
+    def _encode_leaf(self, value):
+        """
+        Encode a leaf (string) value as its value type and payload.
+        
+        Arguments:
+            value::string   -- The string value of a leaf element.
+        
+        Returns:
+            (value_type, payload)::(int, string)    --
+                The value type (one of _BINARY_VALUE_*) and the raw bytes 
+                stored for the value.
+        """
+        if(isinstance(value, unicode)):
+            return (_BINARY_VALUE_TEXT, value.encode('utf-8'))
+        
+        if(len(value) == 0):
+            return (_BINARY_VALUE_TEXT, value)
+        
+        # Hexadecimal numbers. We only store as raw bytes those strings that 
+        # we can recover exactly (e.g. lower case hexadecimal digits only).
+        if(len(value) % 2 == 0):
+            padded_value = value
+            value_type = _BINARY_VALUE_HEX
+        else:
+            padded_value = "0" + value
+            value_type = _BINARY_VALUE_ODD_HEX
+        try:
+            payload = binascii.unhexlify(padded_value)
+            if(binascii.hexlify(payload) == padded_value):
+                return (value_type, payload)
+        except (TypeError, binascii.Error):
+            pass
+        
+        # Base64 data, again only if we can recover the exact same string.
+        if(len(value) % 4 == 0):
+            try:
+                payload = binascii.a2b_base64(value)
+                if(binascii.b2a_base64(payload)[:-1] == value):
+                    return (_BINARY_VALUE_BASE64, payload)
+            except binascii.Error:
+                pass
+        
+        return (_BINARY_VALUE_TEXT, value)
+    
+    def _encode_elements(self, structure, data_node, chunks):
+        """
+        Encode all the elements of a serializable data dictionary.
+        
+        Arguments:
+            structure::_CompiledStructure   -- 
+                The compiled structure definition for the level of data_node.
+            data_node::dict -- The serializable data dictionary to encode.
+            chunks::list    -- A list of strings to which the encoded data is 
+                               appended.
+        """
+        for name, value in data_node.items():
+            (min_occ, max_occ, sub_structure, tag) = structure.schemas[name]
+            
+            if(isinstance(value, list)):
+                values = value
+            else:
+                values = [value]
+            
+            for single_value in values:
+                chunks.append(_encode_varint(tag))
+                if(sub_structure == None):
+                    (value_type, payload) = self._encode_leaf(single_value)
+                    chunks.append(chr(value_type))
+                else:
+                    sub_chunks = []
+                    self._encode_elements(sub_structure, single_value, 
+                                          sub_chunks)
+                    payload = "".join(sub_chunks)
+                chunks.append(_encode_varint(len(payload)))
+                chunks.append(payload)
+    
+    def serialize_to_string(self, data):
+        """
+        Serialize the given data in binary form and return it as a string.
+        
+        Arguments:
+            data::dict  -- A serializable data dictionary (see module level 
+                           documentation).
+                           
+        Returns:
+            result::string  -- 
+                An (binary) string representing the given data.
+        
+        Throws:
+            InvalidSerializeDataError   -- 
+                If data is not a serializable data dictionary corresponding to 
+                the structure definition dictionary associated with this 
+                serializer object.
+        """
+        self._check_data(data)
+        chunks = [self._header]
+        self._encode_elements(self._compiled_structure, data, chunks)
+        return "".join(chunks)
+    
+    def serialize_to_file(self, filename, data, compression=None, 
+                          compact=None):
+        """
+        Serialize the given data into a new binary file.
+        
+        Arguments:
+            filename::string    -- The name of the file to which to write the 
+                                   binary representation of data.
+            data::dict  -- A serializable data dictionary (see module level 
+                           documentation).
+            compression::string -- One of the COMPRESSION_* constants of this 
+                                   module, or None (default) to use 
+                                   DEFAULT_COMPRESSION.
+            compact::bool       -- Ignored (the binary format is always 
+                                   compact), accepted for compatibility with 
+                                   the other serializers.
+        
+        Throws:
+            InvalidSerializeDataError   -- 
+                If data is not a serializable data dictionary corresponding to 
+                the structure definition dictionary associated with this 
+                serializer object.
+            ValueError  -- If compression is not a supported compression 
+                           method.
+        """
+        (compression, compact) = _resolve_output_options(compression, compact)
+        serialized_data = self.serialize_to_string(data)
+        file_object = _open_file_for_writing(filename, compression)
+        try:
+            file_object.write(serialized_data)
+        finally:
+            file_object.close()
+    
+    def _read_elements(self, structure, buf, pos, end):
+        """
+        Read the encoded elements found in buf[pos:end].
+        
+        Arguments:
+            structure::_CompiledStructure   -- 
+                The compiled structure definition for the level being read.
+            buf::string     -- The binary serialized data.
+            pos::int        -- The position in buf at which to start reading.
+            end::int        -- The position in buf at which to stop reading.
+        
+        Returns:
+            data::dict  -- The elements read, as a serializable data 
+                           dictionary.
+        
+        Throws:
+            InvalidSerializeDataError   -- 
+                If buf[pos:end] doesn't contain well-formed binary serialized 
+                data for the given structure.
+        """
+        names = structure.names
+        sub_structures = structure.sub_structures
+        named_values = {}
+        
+        while(pos < end):
+            (tag, pos) = _decode_varint(buf, pos, end)
+            if(tag >= len(names)):
+                raise InvalidSerializeDataError("The given data is not a " \
+                    "valid binary serialization for this structure " \
+                    "definition: unknown element tag %d." % tag)
+            name = names[tag]
+            sub_structure = sub_structures[tag]
+            
+            if(sub_structure == None):
+                if(pos >= end):
+                    raise InvalidSerializeDataError("The given data is " \
+                        "truncated: missing value type for element %s." % name)
+                value_type = ord(buf[pos])
+                pos += 1
+            
+            (length, pos) = _decode_varint(buf, pos, end)
+            value_end = pos + length
+            if(value_end > end):
+                raise InvalidSerializeDataError("The given data is " \
+                    "truncated: element %s is %d bytes long, but only %d " \
+                    "bytes remain." % (name, length, end - pos))
+            
+            if(sub_structure == None):
+                payload = buf[pos:value_end]
+                if(value_type == _BINARY_VALUE_TEXT):
+                    value = payload
+                elif(value_type == _BINARY_VALUE_HEX):
+                    value = binascii.hexlify(payload)
+                elif(value_type == _BINARY_VALUE_ODD_HEX):
+                    value = binascii.hexlify(payload)[1:]
+                elif(value_type == _BINARY_VALUE_BASE64):
+                    value = binascii.b2a_base64(payload)[:-1]
+                else:
+                    raise InvalidSerializeDataError("The given data is not " \
+                        "a valid binary serialization: unknown value type %d " \
+                        "for element %s." % (value_type, name))
+            else:
+                value = self._read_elements(sub_structure, buf, pos, 
+                                            value_end)
+            pos = value_end
+            
+            if(not named_values.has_key(name)):
+                named_values[name] = []
+            named_values[name].append(value)
+        
+        # As for XML, a single occurrence of an element is stored as a value, 
+        # multiple occurrences as a list.
+        data = {}
+        for name, values in named_values.items():
+            if(len(values) == 1):
+                data[name] = values[0]
+            else:
+                data[name] = values
+        return data
+    
+    def deserialize_from_string(self, string):
+        """
+        Deserialize data from a string containing its binary representation.
+        
+        This method restores the binary serialized data as a serializable data 
+        dictionary. Recovered data is checked to be valid according to the 
+        structure definition dictionary associated with this serializer object.
+        
+        Arguments:
+            string::string   -- The string containing the binary serialized 
+                                data we wish to deserialize.
+                
+        Return:
+            data::dict  -- The deserialized data in the form of a serializable 
+                           data dictionary (see module level documentation).
+                           
+        Throws:
+            InvalidSerializeDataError   -- 
+                If the given string doesn't contain a valid serialized 
+                representation of data matching the structure definition 
+                dictionary associated with this serializer object.
+        """
+        if(string[:len(_BINARY_SERIALIZER_MAGIC_V1)] == 
+           _BINARY_SERIALIZER_MAGIC_V1):
+            header_length = len(_BINARY_SERIALIZER_MAGIC_V1)
+        elif(string[:len(BINARY_SERIALIZER_MAGIC)] == BINARY_SERIALIZER_MAGIC):
+            header_length = len(self._header)
+            if(string[:header_length] != self._header):
+                raise InvalidSerializeDataError("The given data was " \
+                    "serialized with a different structure definition than " \
+                    "that of this serializer (the structure digests do not " \
+                    "match).")
+        else:
+            raise InvalidSerializeDataError("The given data is not in the " \
+                "binary serialization format of BinarySerializer (or is of " \
+                "an unsupported version of said format).")
+        
+        data = self._read_elements(self._compiled_structure, string, header_length, 
+                                   len(string))
+        self._check_data(data)
+        return data
+    
+    def deserialize_from_file(self, filename):
+        """
+        Deserialize (recover) data from a binary file.
+        
+        This method restores the data serialized into the file as a 
+        serializable data dictionary. Recovered data is checked to be valid 
+        according to the structure definition dictionary associated with this 
+        serializer object.
+        
+        Arguments:
+            filename::string   -- The name of the file containing the 
+                                  serialized data we wish to deserialize.
+                
+        Return:
+            data::dict  -- The deserialized data in the form of a serializable 
+                           data dictionary (see module level documentation).
+                           
+        Throws:
+            InvalidSerializeDataError   -- 
+                If the given file doesn't contain a valid serialized 
+                representation of data matching the structure definition 
+                dictionary associated with this serializer object.
+        """
+        return self.deserialize_from_string(_read_file(filename))
+        
+
 ## Should be simple to write if needed, use XMLSerializer as an example
 #        
 #class JSONSerializer(BaseSerializer):